@@ -93,6 +93,8 @@ class Task(object):
         self.exception = response_body.get('exception')
         self.traceback = response_body.get('traceback')
         self.error = response_body.get('error')
+        # Only included when the task was retrieved while waiting for changes
+        self.digest = response_body.get('digest')
         self.spawned_tasks = []
         spawned_tasks = response_body.get('spawned_tasks')
         if spawned_tasks:
@@ -26,17 +26,33 @@ class TasksAPI(PulpAPI):
         response = self.server.DELETE(path)
         return response
 
-    def get_task(self, task_id):
+    def get_task(self, task_id, wait=None, digest=None):
         """
         Retrieves the status of the given task if it exists.
 
+        When wait is specified, the returned task includes its digest. When the
+        digest of the task last retrieved is also specified, the server delays
+        the response until the task changes, completes or wait seconds elapse.
+
+        @param task_id: ID of the task
+        @type  task_id: str
+        @param wait: maximum number of seconds to wait for the task to change
+        @type  wait: float
+        @param digest: digest of the task last retrieved
+        @type  digest: str
+
         @return: response with a Task object in the response_body
         @rtype:  Response
 
         @raise NotFoundException: if there is no task with the given ID
         """
         path = '/v2/tasks/%s/' % task_id
-        response = self.server.GET(path)
+        queries = []
+        if wait is not None:
+            queries.append(('wait', wait))
+            if digest:
+                queries.append(('digest', digest))
+        response = self.server.GET(path, queries=queries)
 
         # Since it was a 200, the connection parsed the response body into a
         # Document. We know this will be task data, so convert the object here.
@@ -52,6 +52,27 @@ class TaskSearchAPITests(unittest.TestCase):
         self.assertEqual(task.state, response_body[0]['state'])
 
 
+class TestGetTask(unittest.TestCase):
+    def setUp(self):
+        self.server = mock.MagicMock()
+        self.api = tasks.TasksAPI(self.server)
+
+        self.server.GET.return_value.response_body = dict(TASKS[0], digest='abc')
+
+    def test_get_task(self):
+        ret = self.api.get_task('123').response_body
+
+        self.server.GET.assert_called_once_with('/v2/tasks/123/', queries=[])
+        self.assertTrue(isinstance(ret, responses.Task))
+        self.assertEqual(ret.digest, 'abc')
+
+    def test_wait(self):
+        self.api.get_task('123', wait=10, digest='abc')
+
+        self.server.GET.assert_called_once_with(
+            '/v2/tasks/123/', queries=[('wait', 10), ('digest', 'abc')])
+
+
 class TestGetAllTasks(unittest.TestCase):
     def setUp(self):
         self.server = mock.MagicMock()
@@ -22,6 +22,10 @@ DESC_BACKGROUND = _('if specified, the client process will end immediately (the
                     'continue to run on the server)')
 FLAG_BACKGROUND = PulpCliFlag('--bg', DESC_BACKGROUND)
 
+# Maximum number of seconds the server is asked to wait for a task to change
+# before responding to each poll
+POLL_WAIT_IN_SECONDS = 5
+
 
 class PollingCommand(PulpCliCommand):
     """
@@ -32,11 +36,16 @@ class PollingCommand(PulpCliCommand):
     If the poll_frequency_in_seconds is not specified, it will be loaded from
     the configuration under output -> poll_frequency_in_seconds.
 
+    Each poll asks the server to wait (up to poll_wait_in_seconds) for the task to
+    change before responding, so task changes are displayed as they happen. Polls are
+    never made more often than once every poll_frequency_in_seconds.
+
     :ivar context: the client context
     :type context: pulp.client.extensions.core.ClientContext
     """
 
-    def __init__(self, name, description, method, context, poll_frequency_in_seconds=None):
+    def __init__(self, name, description, method, context, poll_frequency_in_seconds=None,
+                 poll_wait_in_seconds=POLL_WAIT_IN_SECONDS):
         """
         :param name: command name
         :type  name: str
@@ -48,6 +57,9 @@ class PollingCommand(PulpCliCommand):
         :type  context: pulp.client.extensions.core.ClientContext
         :param poll_frequency_in_seconds: time between polling calls to the server
         :type  poll_frequency_in_seconds: float
+        :param poll_wait_in_seconds: maximum time the server waits for a task to change
+                                     before responding to a polling call
+        :type  poll_wait_in_seconds: float
         """
         PulpCliCommand.__init__(self, name, description, method)
         self.context = context
@@ -58,6 +70,7 @@ class PollingCommand(PulpCliCommand):
             self.poll_frequency_in_seconds = float(
                 self.context.config['output']['poll_frequency_in_seconds']
             )
+        self.poll_wait_in_seconds = poll_wait_in_seconds
 
         self.add_flag(FLAG_BACKGROUND)
 
@@ -198,6 +211,7 @@ class PollingCommand(PulpCliCommand):
         running_spinner.spin_tag = 'running-spinner'
 
         first_run = True
+        polled = 0
         while not task.is_completed():
 
             if task.is_waiting():
@@ -210,9 +224,14 @@ class PollingCommand(PulpCliCommand):
                     first_run = False
                 self.progress(task, running_spinner)
 
-            time.sleep(self.poll_frequency_in_seconds)
+            # The server responds as soon as the task changes, so only sleep for what
+            # remains of the poll frequency since the previous call
+            elapsed = time.time() - polled
+            time.sleep(max(0, self.poll_frequency_in_seconds - elapsed))
 
-            response = self.context.server.tasks.get_task(task.task_id)
+            polled = time.time()
+            response = self.context.server.tasks.get_task(
+                task.task_id, wait=self.poll_wait_in_seconds, digest=task.digest)
             task = response.response_body
 
         # One final call to update the progress with the end state. It's possible the run state
@@ -75,6 +75,32 @@ class PollingCommandTests(base.PulpClientTests):
         self.assertEqual(1, len(completed_tasks))
         self.assertEqual(STATE_FINISHED, completed_tasks[0].state)
 
+    @mock.patch('time.sleep')
+    def test_poll_wait_for_changes(self, mock_sleep):
+        """
+        Each poll passes the digest of the task last retrieved so the server can
+        wait for the task to change.
+        """
+        # Setup
+        running = Task({'task_id': '123', 'state': STATE_RUNNING, 'digest': 'a'})
+        finished = Task({'task_id': '123', 'state': STATE_FINISHED, 'digest': 'b'})
+        self.bindings.tasks = mock.MagicMock()
+        self.bindings.tasks.get_task.side_effect = [
+            mock.MagicMock(response_body=running),
+            mock.MagicMock(response_body=finished),
+        ]
+        self.command.poll_wait_in_seconds = 5
+
+        # Test
+        completed_tasks = self.command.poll([Task({'task_id': '123', 'state': STATE_WAITING})], {})
+
+        # Verify
+        self.assertEqual(self.bindings.tasks.get_task.call_args_list, [
+            mock.call('123', wait=5, digest=None),
+            mock.call('123', wait=5, digest='a'),
+        ])
+        self.assertEqual(STATE_FINISHED, completed_tasks[0].state)
+
     def test_poll_task_list(self):
         """
         Task Count: 3
@@ -105,9 +105,10 @@ class TaskSimulator(object):
         tasks = [self.add_task_state(task_id, s) for s in state_list]
         return tasks
 
-    def get_task(self, task_id):
+    def get_task(self, task_id, wait=None, digest=None):
         """
-        Returns the next state for the given task.
+        Returns the next state for the given task. Waiting for the task to change
+        is not simulated; wait and digest are ignored.
 
         :return: response object as if the bindings had contacted the server
         :rtype:  pulp.bindings.response.Response
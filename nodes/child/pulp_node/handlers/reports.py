@@ -1,3 +1,5 @@
+from threading import RLock
+
 from pulp_node.error import ErrorList
 from pulp_node.reports import RepositoryReport, RepositoryProgress
 
@@ -71,6 +73,8 @@ class HandlerProgress(object):
     :type state: str
     :ivar progress: A list of RepositoryProgress reports.
     :type progress: list
+    :ivar lock: Serializes updates made by repositories synchronized concurrently.
+    :type lock: RLock
     """
 
     PENDING = 'pending'
@@ -85,6 +89,7 @@ class HandlerProgress(object):
         self.conduit = conduit
         self.state = self.PENDING
         self.progress = []
+        self.lock = RLock()
 
     def started(self, bindings):
         """
@@ -128,18 +133,26 @@ class HandlerProgress(object):
         :param report: The update repository progress report.
         :type report: RepositoryProgress
         """
-        for i, p in enumerate(self.progress):
-            if p.repo_id == report.repo_id:
-                self.progress[i] = report
-            self._updated()
-            break
+        self.lock.acquire()
+        try:
+            for i, p in enumerate(self.progress):
+                if p.repo_id == report.repo_id:
+                    self.progress[i] = report
+                    self._updated()
+                    break
+        finally:
+            self.lock.release()
 
     def _updated(self):
         """
         Notification that the report has been updated.
         Reported using the conduit.
         """
-        self.conduit.update_progress(self.dict())
+        self.lock.acquire()
+        try:
+            self.conduit.update_progress(self.dict())
+        finally:
+            self.lock.release()
 
     def dict(self):
         return dict(
@@ -1,5 +1,6 @@
 from gettext import gettext as _
 from logging import getLogger
+from multiprocessing.pool import ThreadPool
 from operator import itemgetter
 
 from pulp_node import constants
@@ -128,34 +129,58 @@ class HandlerStrategy(object):
         Add or update repositories based on bindings.
           - Merge repositories found in BOTH parent and child.
           - Add repositories found in the parent but NOT in the child.
+        Up to the number of repositories specified by the
+        max_repository_concurrency option are merged and synchronized concurrently.
         :param request: A synchronization request.
         :type request: SyncRequest
         """
-        for bind in request.bindings:
-            try:
-                repo_id = bind['repo_id']
-                details = bind['details']
-                if request.cancelled():
-                    request.summary[repo_id].action = RepositoryReport.CANCELLED
-                    continue
-                parent = model.Repository(repo_id, details)
-                child = model.Repository.fetch(repo_id)
-                progress = request.progress.find_report(repo_id)
-                progress.begin_merging()
-                if child:
-                    request.summary[repo_id].action = RepositoryReport.MERGED
-                    child.merge(parent)
-                else:
-                    child = model.Repository(repo_id, parent.details)
-                    request.summary[repo_id].action = RepositoryReport.ADDED
-                    child.add()
-                self._synchronize_repository(request, repo_id)
-            except NodeError, ne:
-                request.summary.errors.append(ne)
-            except Exception, e:
-                log.exception(repo_id)
-                error = CaughtException(e, repo_id)
-                request.summary.errors.append(error)
+        concurrency = request.options.get(constants.MAX_REPOSITORY_CONCURRENCY_KEYWORD) or \
+            constants.DEFAULT_REPOSITORY_CONCURRENCY
+        concurrency = min(int(concurrency), len(request.bindings))
+        if concurrency < 2:
+            for bind in request.bindings:
+                self._merge_repository(request, bind)
+            return
+        pool = ThreadPool(concurrency)
+        try:
+            pool.map(lambda bind: self._merge_repository(request, bind), request.bindings)
+        finally:
+            pool.close()
+            pool.join()
+
+    def _merge_repository(self, request, bind):
+        """
+        Add or update the repository specified in the binding and synchronize it.
+        Errors are added to the summary report.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :param bind: A consumer binding payload.
+        :type bind: dict
+        """
+        repo_id = bind['repo_id']
+        try:
+            details = bind['details']
+            if request.cancelled():
+                request.summary[repo_id].action = RepositoryReport.CANCELLED
+                return
+            parent = model.Repository(repo_id, details)
+            child = model.Repository.fetch(repo_id)
+            progress = request.progress.find_report(repo_id)
+            progress.begin_merging()
+            if child:
+                request.summary[repo_id].action = RepositoryReport.MERGED
+                child.merge(parent)
+            else:
+                child = model.Repository(repo_id, parent.details)
+                request.summary[repo_id].action = RepositoryReport.ADDED
+                child.add()
+            self._synchronize_repository(request, repo_id)
+        except NodeError, ne:
+            request.summary.errors.append(ne)
+        except Exception, e:
+            log.exception(repo_id)
+            error = CaughtException(e, repo_id)
+            request.summary.errors.append(error)
 
     def _synchronize_repository(self, request, repo_id):
         """
@@ -85,6 +85,7 @@ class ContentDownloadListener(Listener):
           2. Update the storage_path on the unit.
           3. Add the unit.
           4. Extract downloaded tarballs as needed.
+          5. Update the index of downloaded files (when enabled).
         :param request: The download request that succeeded.
         :type request: Request
         """
@@ -95,6 +96,8 @@ class ContentDownloadListener(Listener):
         self._strategy.add_unit(self.request, unit)
         if unit.get(constants.TARBALL_PATH):
             untar_dir(request.destination, storage_path)
+        if self.request.file_index is not None:
+            self.request.file_index.downloaded(unit)
 
     def download_failed(self, request):
         """
@@ -0,0 +1,295 @@
+# Copyright (c) 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import os
+import errno
+import hashlib
+
+from logging import getLogger
+
+from pulp.server.compat import json
+
+from pulp_node import constants
+
+
+_log = getLogger(__name__)
+
+
+# The name of the index file within the repository working directory.
+FILE_INDEX = 'files.json'
+
+# The number of bytes read at a time when calculating checksums.
+BUFFER_SIZE = 65536
+
+# The keys of the index file.
+ENTRIES = 'entries'
+DIRECTORIES = 'directories'
+
+# The positions of the fields within an index entry.
+SIZE = 0
+MTIME = 1
+CHECKSUM_TYPE = 2
+CHECKSUM = 3
+
+
+def file_checksum(path, checksum_type):
+    """
+    Calculate the checksum of a file.
+    :param path: The absolute path to a file.
+    :type path: str
+    :param checksum_type: The checksum algorithm.  Eg: sha256.
+    :type checksum_type: str
+    :return: The hex digest.
+    :rtype: str
+    :raise ValueError: when the algorithm is not supported.
+    :raise IOError: on i/o errors.
+    """
+    digest = hashlib.new(checksum_type)
+    with open(path, 'rb') as fp:
+        while True:
+            buf = fp.read(BUFFER_SIZE)
+            if not buf:
+                break
+            digest.update(buf)
+    return digest.hexdigest()
+
+
+class FileIndex(object):
+    """
+    An index of the files associated with the units of a repository on the child.
+    Each entry is keyed by storage path and contains: [size, mtime, checksum_type, checksum].
+    The modification time of each directory holding indexed files is recorded when the
+    index is saved.  When the index is used, each directory is stat'ed once: entries in
+    directories that have not changed are trusted so that whether a file needs to be
+    downloaded can be decided without accessing the file.  The entries in a directory
+    that changed are checked against the size and mtime of their file, and dropped when
+    the file is missing or differs.  Files are only read when the parent has published
+    a checksum that has not yet been verified against the file, and after a download.
+    The file system is otherwise accessed only for paths that are not yet indexed.
+    Modifying a file in place without changing its directory is not detected, so the
+    index must be cleared (the index file deleted) after changing the content of
+    stored files out of band.
+    The index is saved in the repository working directory and only contains
+    the entries for paths seen (or kept) since it was loaded.
+    :ivar path: The absolute path to the index file.
+    :type path: str
+    :ivar entries: The index entries keyed by storage path.
+    :type entries: dict
+    :ivar directories: The mtime of each directory holding indexed files when the
+        index was saved, keyed by path.
+    :type directories: dict
+    :ivar seen: The storage paths seen since the index was loaded.
+    :type seen: set
+    :ivar checked: The directories checked since the index was loaded.
+    :type checked: set
+    """
+
+    def __init__(self, dir_path):
+        """
+        :param dir_path: The absolute path to the directory containing the index.
+        :type dir_path: str
+        """
+        self.path = os.path.join(dir_path, FILE_INDEX)
+        self.entries = {}
+        self.directories = {}
+        self.seen = set()
+        self.checked = set()
+        self._by_dir = None
+
+    def load(self):
+        """
+        Load the index.
+        A missing or corrupted index is treated as empty.
+        """
+        self.seen = set()
+        self.checked = set()
+        self._by_dir = None
+        try:
+            with open(self.path) as fp:
+                index = json.load(fp)
+            self.entries = index[ENTRIES]
+            self.directories = index[DIRECTORIES]
+        except IOError, e:
+            if e.errno != errno.ENOENT:
+                raise
+            self.entries = {}
+            self.directories = {}
+        except (ValueError, KeyError, TypeError):
+            # json decoding failed or not an index
+            _log.warn('discarding corrupted file index: %s', self.path)
+            self.entries = {}
+            self.directories = {}
+
+    def save(self):
+        """
+        Save the index.
+        Entries for paths not seen (or kept) since the index was loaded are dropped.
+        The mtime of each directory holding indexed files is recorded.
+        The index is written to a temporary file and renamed into place.
+        """
+        entries = dict((p, e) for p, e in self.entries.items() if p in self.seen)
+        directories = {}
+        for dir_path in set(os.path.dirname(p) for p in entries):
+            try:
+                directories[dir_path] = os.stat(dir_path).st_mtime
+            except OSError:
+                continue
+        tmp_path = '.'.join((self.path, 'tmp'))
+        with open(tmp_path, 'w+') as fp:
+            json.dump({ENTRIES: entries, DIRECTORIES: directories}, fp)
+        os.rename(tmp_path, self.path)
+        self.entries = entries
+        self.directories = directories
+
+    def keep(self, paths):
+        """
+        Keep the entries for the specified paths when the index is saved.
+        :param paths: A list of storage paths.
+        :type paths: iterable
+        """
+        self.seen.update(p for p in paths if p)
+
+    def discard(self, path):
+        """
+        Discard the entry for the specified path.
+        :param path: A storage path.
+        :type path: str
+        """
+        self.entries.pop(path, None)
+        self.seen.discard(path)
+
+    def needs_download(self, unit):
+        """
+        Get whether the file associated with the unit needs to be downloaded.
+        The file needs to be downloaded when it does not exist, its size differs from
+        the published size or its checksum differs from the published checksum.
+        :param unit: A published content unit.
+        :type unit: dict
+        :return: True if the file needs to be downloaded.
+        :rtype: bool
+        """
+        path = unit[constants.STORAGE_PATH]
+        self.seen.add(path)
+        self._check(os.path.dirname(path))
+        entry = self.entries.get(path)
+        if entry is None:
+            entry = self._add(path)
+            if entry is None:
+                return True
+        if entry[SIZE] != unit[constants.FILE_SIZE]:
+            return True
+        checksum = unit.get(constants.CHECKSUM)
+        if not checksum:
+            return False
+        checksum_type = unit[constants.CHECKSUM_TYPE]
+        if entry[CHECKSUM_TYPE] != checksum_type:
+            entry = self._add(path)
+            if entry is None or entry[SIZE] != unit[constants.FILE_SIZE]:
+                return True
+            if not self._verify(path, entry, checksum_type):
+                return True
+            if entry[CHECKSUM_TYPE] is None:
+                # algorithm not supported
+                return False
+        return entry[CHECKSUM] != checksum
+
+    def downloaded(self, unit):
+        """
+        Update the index after the file associated with the unit has been
+        downloaded.  When the parent published a checksum, the checksum of the
+        downloaded file is calculated and recorded so that a download that does
+        not match the published checksum is downloaded again.
+        :param unit: A published content unit.
+        :type unit: dict
+        """
+        path = unit[constants.STORAGE_PATH]
+        self.seen.add(path)
+        entry = self._add(path)
+        if entry is None:
+            return
+        if unit.get(constants.CHECKSUM):
+            self._verify(path, entry, unit[constants.CHECKSUM_TYPE])
+
+    def _check(self, dir_path):
+        """
+        Check the entries in the specified directory when the directory has changed
+        since the index was saved.  Entries of files that are missing or whose size
+        or mtime differs from the entry are dropped.  Each directory is checked once
+        after the index is loaded.
+        :param dir_path: The absolute path to a directory.
+        :type dir_path: str
+        """
+        if dir_path in self.checked:
+            return
+        self.checked.add(dir_path)
+        try:
+            mtime = os.stat(dir_path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime is not None and self.directories.get(dir_path) == mtime:
+            return
+        if self._by_dir is None:
+            self._by_dir = {}
+            for path in self.entries:
+                self._by_dir.setdefault(os.path.dirname(path), []).append(path)
+        for path in self._by_dir.get(dir_path, []):
+            entry = self.entries.get(path)
+            if entry is None:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self.entries[path]
+                continue
+            if st.st_size != entry[SIZE] or st.st_mtime != entry[MTIME]:
+                del self.entries[path]
+
+    def _verify(self, path, entry, checksum_type):
+        """
+        Calculate the checksum of the file and record it in the entry.
+        The entry is left without a checksum when the algorithm is not supported.
+        :param path: A storage path.
+        :type path: str
+        :param entry: The entry for the path.
+        :type entry: list
+        :param checksum_type: The checksum algorithm.
+        :type checksum_type: str
+        :return: False when the file could not be read and the entry was discarded.
+        :rtype: bool
+        """
+        try:
+            entry[CHECKSUM] = file_checksum(path, checksum_type)
+            entry[CHECKSUM_TYPE] = checksum_type
+        except ValueError:
+            # algorithm not supported
+            pass
+        except IOError:
+            self.discard(path)
+            return False
+        return True
+
+    def _add(self, path):
+        """
+        Add (or replace) the entry for the specified path using the file size
+        and modification time.
+        :param path: A storage path.
+        :type path: str
+        :return: The added entry or None when the file does not exist.
+        :rtype: list
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.entries.pop(path, None)
+            return None
+        entry = [st.st_size, st.st_mtime, None, None]
+        self.entries[path] = entry
+        return entry
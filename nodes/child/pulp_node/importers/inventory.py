@@ -9,50 +9,37 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import hashlib
+
 from pulp_node import constants
+from pulp_node.manifest import unit_uid
 
 
-class UniqueKey(object):
+def unique_key(unit):
     """
-    A unique unit key consisting of a unit's type_id & unit_key.
-    The unit key is sorted to ensure consistency.
-    :ivar uid: The unique ID.
-    :type uid: A tuple of: (type_id, unit_key)
+    Get a compact key that uniquely identifies a unit using its type_id & unit_key.
+    :param unit: A content unit.
+    :type unit: dict
+    :return: The (binary) SHA1 digest of the unit's unique ID.
+    :rtype: str
     """
-
-    def __init__(self, unit):
-        """
-        :param unit: A content unit.
-        :type unit: dict
-        """
-        type_id = unit['type_id']
-        unit_key = tuple(sorted(unit['unit_key'].items()))
-        self.uid = (type_id, unit_key)
-
-    def __hash__(self):
-        return hash(self.uid)
-
-    def __eq__(self, other):
-        return self.uid == other.uid
-
-    def __ne__(self, other):
-        return self.uid != other.uid
+    return hashlib.sha1(unit_uid(unit)).digest()
 
 
 class UnitInventory(object):
     """
     The unit inventory contains both the parent and child inventory
     of content units associated with a specific repository.  Each is contained
-    within a dictionary keyed by {UnitKey} to ensure uniqueness.
+    within a dictionary keyed by unique_key() to ensure uniqueness.
+    Parent units are stored only as references into the units file
+    and are decoded on demand using UnitRef.fetch().
     """
 
     @staticmethod
     def _import_parent_units(units):
         _units = {}
         for unit, ref in units:
-            unit.pop('metadata', None)
-            key = UniqueKey(unit)
-            _units[key] = (unit, ref)
+            _units[unique_key(unit)] = ref
         return _units
 
     @staticmethod
@@ -60,8 +47,7 @@ class UnitInventory(object):
         _units = {}
         for unit in units:
             unit.pop('metadata', None)
-            key = UniqueKey(unit)
-            _units[key] = unit
+            _units[unique_key(unit)] = unit
         return _units
 
     def __init__(self, base_URL, parent_units, child_units):
@@ -80,7 +66,7 @@ class UnitInventory(object):
         """
         Listing of units contained in the parent inventory
         but not contained in the child inventory.
-        :return: List of (unit, ref).
+        :return: List of unit references.
         :rtype: list
         """
         return [r for k, r in self.parent_units.items() if k not in self.child_units]
@@ -97,16 +83,17 @@ class UnitInventory(object):
     def updated_units(self):
         """
         Listing of units updated on the parent.
-        :return: List of (unit, ref).
+        :return: List of unit references.
         :rtype: list
         """
         updated = []
-        for key, (unit, ref) in self.parent_units.items():
+        for key, ref in self.parent_units.items():
             child_unit = self.child_units.get(key)
             if child_unit is None:
                 continue
+            unit = ref.fetch()
             parent_last_updated = unit.get(constants.LAST_UPDATED, 0)
             child_last_updated = child_unit.get(constants.LAST_UPDATED, 0)
             if parent_last_updated > child_last_updated:
-                updated.append((unit, ref))
+                updated.append(ref)
         return updated
\ No newline at end of file
@@ -19,6 +19,7 @@ from pulp_node import pathlib
 from pulp_node.conduit import NodesConduit
 from pulp_node.manifest import Manifest, RemoteManifest
 from pulp_node.importers.inventory import UnitInventory
+from pulp_node.importers.index import FileIndex
 from pulp_node.importers.download import ContentDownloadListener
 from pulp_node.error import (NodeError, GetChildUnitsError, GetParentUnitsError, AddUnitError,
                              DeleteUnitError, InvalidManifestError, CaughtException)
@@ -49,6 +50,8 @@ class Request(object):
     :type repo_id: str
     :ivar working_dir: The absolute path to a directory to be used as temporary storage.
     :type working_dir: str
+    :ivar file_index: The index of downloaded files.  None when not enabled.
+    :type file_index: pulp_node.importers.index.FileIndex
     """
 
     def __init__(self, cancel_event, conduit, config, downloader, progress, summary, repo):
@@ -77,6 +80,7 @@ class Request(object):
         self.summary = summary
         self.repo_id = repo.id
         self.working_dir = repo.working_dir
+        self.file_index = None
 
     def started(self):
         """
@@ -111,7 +115,12 @@ class ImporterStrategy(object):
         request.started()
 
         try:
-            self._synchronize(request)
+            request.file_index = self._file_index(request)
+            try:
+                self._synchronize(request)
+            finally:
+                if request.file_index is not None:
+                    request.file_index.save()
         except NodeError, ne:
             request.summary.errors.append(ne)
         except Exception, e:
@@ -150,6 +159,20 @@ class ImporterStrategy(object):
 
     # --- protected ---------------------------------------------------------------------
 
+    def _file_index(self, request):
+        """
+        Load the index of downloaded files when enabled by the configuration.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :return: The loaded index or None when not enabled.
+        :rtype: FileIndex
+        """
+        if not request.config.get(constants.FILE_INDEX_KEYWORD):
+            return None
+        file_index = FileIndex(request.working_dir)
+        file_index.load()
+        return file_index
+
     def _unit_inventory(self, request):
         """
         Build the unit inventory.
@@ -185,9 +208,10 @@ class ImporterStrategy(object):
             fetched_manifest.fetch()
             if manifest != fetched_manifest or \
                     not manifest.is_valid() or not manifest.has_valid_units():
-                fetched_manifest.write()
-                fetched_manifest.fetch_units()
-                manifest = fetched_manifest
+                if not self._apply_deltas(request, manifest, fetched_manifest):
+                    fetched_manifest.write()
+                    fetched_manifest.fetch_units()
+                    manifest = fetched_manifest
             if not manifest.is_valid():
                 raise InvalidManifestError()
         except NodeError:
@@ -202,6 +226,37 @@ class ImporterStrategy(object):
         inventory = UnitInventory(base_URL, parent_units, child_units)
         return inventory
 
+    def _apply_deltas(self, request, manifest, fetched_manifest):
+        """
+        Update the local manifest and units file to match the fetched manifest
+        using the deltas listed in the fetched manifest.  Deltas can only be used
+        when the local manifest and units file are valid and the local manifest
+        is one of the manifests the deltas lead from.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :param manifest: The local manifest.
+        :type manifest: Manifest
+        :param fetched_manifest: The manifest fetched from the parent.
+        :type fetched_manifest: RemoteManifest
+        :return: True if the deltas were applied.  On False, all of
+            the units need to be fetched.
+        :rtype: bool
+        """
+        if not (manifest.is_valid() and manifest.has_valid_units()):
+            return False
+        if not fetched_manifest.is_valid():
+            return False
+        chain = fetched_manifest.delta_chain(manifest.id)
+        if not chain:
+            return False
+        try:
+            paths = fetched_manifest.fetch_deltas(chain)
+            manifest.apply_deltas(fetched_manifest, paths)
+            return True
+        except Exception:
+            _log.exception(request.repo_id)
+            return False
+
     def _reset_storage_path(self, unit):
         """
         Reset the storage_path using the storage_dir defined in
@@ -241,11 +296,15 @@ class ImporterStrategy(object):
         units = unit_inventory.units_on_parent_only()
         request.progress.begin_adding_units(len(units))
         listener = ContentDownloadListener(self, request)
-        for unit, unit_ref in units:
+        if request.file_index is not None:
+            paths = [u.get(constants.STORAGE_PATH) for u in unit_inventory.child_units.values()]
+            request.file_index.keep(paths)
+        for unit_ref in units:
             if request.cancelled():
                 return
+            unit = unit_ref.fetch()
             self._reset_storage_path(unit)
-            if not self._needs_download(unit):
+            if not self._needs_download(unit, request.file_index):
                 # unit has no file associated
                 self.add_unit(request, unit_ref.fetch())
                 continue
@@ -269,9 +328,8 @@ class ImporterStrategy(object):
         :param unit_inventory: The inventory of both parent and child content units.
         :type unit_inventory: UnitInventory
         """
-        for unit, ref in unit_inventory.updated_units():
-            unit = ref.fetch()
-            self.add_unit(request, unit)
+        for ref in unit_inventory.updated_units():
+            self.add_unit(request, ref.fetch())
 
     def _path_and_destination(self, unit):
         """
@@ -290,21 +348,28 @@ class ImporterStrategy(object):
             return pathlib.quote(tar_path),\
                 pathlib.join(os.path.dirname(storage_path), os.path.basename(tar_path))
 
-    def _needs_download(self, unit):
+    def _needs_download(self, unit, file_index=None):
         """
         Get whether the unit has an associated file that needs to be downloaded.
+        When an index of downloaded files is specified, it is used to make the
+        decision and the file is only accessed when not yet indexed or when the
+        published checksum needs to be verified.
         :param unit: A content unit.
         :type unit: dict
+        :param file_index: An (optional) index of downloaded files.
+        :type file_index: FileIndex
         :return: True if has associated file that needs to be downloaded.
         :rtype: bool
         """
         storage_path = unit.get(constants.STORAGE_PATH)
-        if storage_path:
-            if not os.path.exists(storage_path):
-                return True
-            if os.path.getsize(storage_path) != unit[constants.FILE_SIZE]:
-                return True
-        return False
+        if not storage_path:
+            return False
+        if file_index is not None:
+            return file_index.needs_download(unit)
+        try:
+            return os.stat(storage_path).st_size != unit[constants.FILE_SIZE]
+        except OSError:
+            return True
 
     def _delete_units(self, request, unit_inventory):
         """
@@ -328,6 +393,8 @@ class ImporterStrategy(object):
                     updated=None)
                 _unit.id = unit['unit_id']
                 request.conduit.remove_unit(_unit)
+                if request.file_index is not None:
+                    request.file_index.discard(unit.get(constants.STORAGE_PATH))
             except Exception:
                 _log.exception(unit['unit_id'])
                 request.summary.errors.append(DeleteUnitError(request.repo_id))
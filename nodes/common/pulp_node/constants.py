@@ -41,8 +41,10 @@ PURGE_ORPHANS_KEYWORD = 'purge_orphans'
 
 MAX_DOWNLOAD_BANDWIDTH_KEYWORD = 'max_download_bandwidth'
 MAX_DOWNLOAD_CONCURRENCY_KEYWORD = 'max_download_concurrency'
+MAX_REPOSITORY_CONCURRENCY_KEYWORD = 'max_repository_concurrency'
 
 SKIP_CONTENT_UPDATE_KEYWORD = 'skip_content_update'
+FILE_INDEX_KEYWORD = 'file_index'
 
 
 # --- unit/publishing --------------------------------------------------------
@@ -55,6 +57,8 @@ RELATIVE_PATH = 'relative_path'
 FILE_SIZE = 'size'
 TARBALL_PATH = 'tgz_path'
 LAST_UPDATED = 'last_updated'
+CHECKSUM = 'checksum'
+CHECKSUM_TYPE = 'checksum_type'
 
 
 # --- consumer notes ---------------------------------------------------------
@@ -66,6 +70,7 @@ STRATEGY_NOTE_KEY = '_node-update-strategy'
 # --- settings ---------------------------------------------------------------
 
 DEFAULT_DOWNLOAD_CONCURRENCY = 20
+DEFAULT_REPOSITORY_CONCURRENCY = 4
 
 
 # --- profiling --------------------------------------------------------------
@@ -14,11 +14,17 @@ Provides classes for managing the content unit manifest.
 The manifest is a json encoded file that defines content units
 associated with repository.  The units themselves are stored in a separate
 json encoded file.  For performance reasons, the unit files are compressed.
+The manifest may also list deltas.  Each delta is a compressed json encoded
+file of the units added (or updated) and removed since a previous manifest.
+A child holding a previous manifest applies the deltas to its copy of the
+units file instead of downloading the whole units file.
 """
 
 import os
 import gzip
+import mmap
 import errno
+import hashlib
 
 from logging import getLogger
 
@@ -48,6 +54,15 @@ UNITS = 'units'
 UNITS_PATH = 'path'
 UNITS_TOTAL = 'total'
 UNITS_SIZE = 'size'
+DELTAS = 'deltas'
+DELTAS_DIR = 'deltas'
+DELTA_BASE = 'base'
+DELTA_PATH = 'path'
+DELTA_SIZE = 'size'
+DELTA_ACTION = 'action'
+DELTA_UNIT = 'unit'
+DELTA_ADDED = 'added'
+DELTA_REMOVED = 'removed'
 
 
 # --- utils -----------------------------------------------------------------------------
@@ -76,6 +91,69 @@ def unzip(path, destination, bfrlen=65535):
         fp_in.close()
 
 
+def unit_uid(unit):
+    """
+    Get a string that uniquely identifies a content unit using its type_id & unit_key.
+    The unit key, including any nested dictionaries, is sorted to ensure consistency.
+    :param unit: A content unit.
+    :type unit: dict
+    :return: The unique ID.
+    :rtype: str
+    """
+    return json.dumps((unit['type_id'], unit['unit_key']), sort_keys=True)
+
+
+def unit_digests(path):
+    """
+    Read the units file at the specified path and digest each unit.
+    :param path: The path to a (compressed) units file.
+    :type path: str
+    :return: A dictionary of (digest, unit) keyed by unit_uid().  The unit contains
+        only the type_id and unit_key.
+    :rtype: dict
+    :raise IOError: on I/O errors.
+    :raise ValueError: json decoding errors
+    """
+    digests = {}
+    for unit in read_units(path):
+        key = dict(type_id=unit['type_id'], unit_key=unit['unit_key'])
+        digests[unit_uid(unit)] = (unit_digest(unit), key)
+    return digests
+
+
+def unit_digest(unit):
+    """
+    Get a digest of the json encoding of a content unit.
+    Used to detect units that have changed between manifests.
+    :param unit: A content unit.
+    :type unit: dict
+    :return: The hex digest.
+    :rtype: str
+    """
+    return hashlib.sha1(json.dumps(unit, sort_keys=True)).hexdigest()
+
+
+def read_units(path):
+    """
+    Read the json encoded lines of a (compressed) units or delta file.
+    :param path: The path to the file.
+    :type path: str
+    :return: A generator of the decoded lines.
+    :rtype: generator
+    :raise IOError: on I/O errors.
+    :raise ValueError: json decoding errors
+    """
+    if path.endswith('.gz'):
+        fp = gzip.open(path)
+    else:
+        fp = open(path)
+    try:
+        for line in fp:
+            yield json.loads(line)
+    finally:
+        fp.close()
+
+
 # --- manifest --------------------------------------------------------------------------
 
 
@@ -90,6 +168,9 @@ class Manifest(object):
     :type total_units: int
     :param publishing_details: Details of how units have been published.
     :type publishing_details: dict
+    :ivar deltas: The deltas that lead to this manifest, oldest first.  Each
+        is a dictionary of: base (manifest ID), id (manifest ID), path and size.
+    :type deltas: list
     """
 
     def __init__(self, path, manifest_id=None):
@@ -104,6 +185,7 @@ class Manifest(object):
         self.version = MANIFEST_VERSION
         self.units = {UNITS_PATH: None, UNITS_TOTAL: 0, UNITS_SIZE: 0}
         self.publishing_details = {}
+        self.deltas = []
         if os.path.isdir(path):
             path = pathlib.join(path, MANIFEST_FILE_NAME)
         self.path = path
@@ -118,7 +200,8 @@ class Manifest(object):
             ID: self.id,
             VERSION: self.version,
             UNITS: self.units,
-            PUBLISHING_DETAILS: self.publishing_details
+            PUBLISHING_DETAILS: self.publishing_details,
+            DELTAS: self.deltas
         }
         with open(self.path, 'w+') as fp:
             json.dump(state, fp, indent=2)
@@ -138,6 +221,7 @@ class Manifest(object):
         self.version = d.get(VERSION, 0)
         self.units = d.get(UNITS, {UNITS_PATH: None, UNITS_TOTAL: 0, UNITS_SIZE: 0})
         self.publishing_details = d.get(PUBLISHING_DETAILS, {})
+        self.deltas = d.get(DELTAS, [])
 
     def get_units(self):
         """
@@ -229,6 +313,75 @@ class Manifest(object):
         """
         return self.units[UNITS_PATH] or pathlib.join(os.path.dirname(self.path), UNITS_FILE_NAME)
 
+    def delta_chain(self, manifest_id):
+        """
+        Get the deltas that lead from the specified (previous) manifest to this manifest.
+        :param manifest_id: The ID of a previous manifest.
+        :type manifest_id: str
+        :return: The deltas to be applied in order or None when this
+            manifest cannot be reached from the specified manifest using deltas.
+        :rtype: list
+        """
+        for index, delta in enumerate(self.deltas):
+            if delta[DELTA_BASE] == manifest_id:
+                chain = self.deltas[index:]
+                break
+        else:
+            return None
+        expected = manifest_id
+        for delta in chain:
+            if delta[DELTA_BASE] != expected:
+                return None
+            expected = delta[ID]
+        if expected != self.id:
+            return None
+        return chain
+
+    def apply_deltas(self, manifest, paths):
+        """
+        Apply downloaded deltas to the units file associated with this manifest
+        and update this manifest to be the specified (newer) manifest.
+        The units file is replaced only after all of the deltas have been read
+        so this manifest is left unchanged on failure.  The delta files are
+        deleted once applied.
+        :param manifest: The manifest that the deltas lead to.
+        :type manifest: Manifest
+        :param paths: The paths to the downloaded delta files, in the order
+            returned by delta_chain().
+        :type paths: list
+        :raise IOError: on I/O errors.
+        :raise ValueError: json decoding errors
+        """
+        changes = {}
+        for path in paths:
+            for entry in read_units(path):
+                unit = entry[DELTA_UNIT]
+                changes[unit_uid(unit)] = (entry[DELTA_ACTION], unit)
+        units_path = self.units_path()
+        if units_path.endswith('.gz'):
+            units_path = units_path[:-3]
+        staged_path = pathlib.join(os.path.dirname(units_path), '.' + os.path.basename(units_path))
+        with UnitWriter(staged_path, compressed=False) as writer:
+            for unit, ref in self.get_units():
+                if unit_uid(unit) not in changes:
+                    writer.add(unit)
+            for action, unit in changes.values():
+                if action == DELTA_ADDED:
+                    writer.add(unit)
+        os.rename(staged_path, units_path)
+        self.id = manifest.id
+        self.version = manifest.version
+        self.units = {
+            UNITS_PATH: units_path,
+            UNITS_TOTAL: writer.total_units,
+            UNITS_SIZE: os.path.getsize(units_path)
+        }
+        self.publishing_details = manifest.publishing_details
+        self.deltas = manifest.deltas
+        self.write()
+        for path in paths:
+            os.unlink(path)
+
     def __eq__(self, other):
         if isinstance(other, Manifest):
             return self.id == other.id
@@ -292,6 +445,37 @@ class RemoteManifest(Manifest):
             report = listener.failed_reports[0]
             raise ManifestDownloadError(self.url, report.error_msg)
 
+    def fetch_deltas(self, chain):
+        """
+        Fetch the delta files referenced in the manifest.
+        :param chain: The deltas to fetch.  See: delta_chain().
+        :type chain: list
+        :return: The paths to the downloaded delta files, in the order of the chain.
+        :rtype: list
+        :raise ManifestDownloadError: on downloading errors or when a downloaded
+            delta does not have the expected size.
+        """
+        base_url = self.url.rsplit('/', 1)[0]
+        working_dir = os.path.dirname(self.path)
+        pathlib.mkdir(pathlib.join(working_dir, DELTAS_DIR))
+        requests = []
+        paths = []
+        for delta in chain:
+            url = pathlib.join(base_url, delta[DELTA_PATH])
+            destination = pathlib.join(working_dir, delta[DELTA_PATH])
+            requests.append(DownloadRequest(str(url), destination))
+            paths.append(destination)
+        listener = AggregatingEventListener()
+        self.downloader.event_listener = listener
+        self.downloader.download(requests)
+        if listener.failed_reports:
+            report = listener.failed_reports[0]
+            raise ManifestDownloadError(self.url, report.error_msg)
+        for delta, path in zip(chain, paths):
+            if os.path.getsize(path) != delta[DELTA_SIZE]:
+                raise ManifestDownloadError(self.url, 'delta size mismatch: %s' % path)
+        return paths
+
 
 class UnitWriter(object):
     """
@@ -308,17 +492,22 @@ class UnitWriter(object):
     :type bytes_written: int
     """
 
-    def __init__(self, path):
+    def __init__(self, path, compressed=True):
         """
         :param path: The absolute path to a file or directory.
             When a directory is specified, the standard file name is appended.
         :type path: str
+        :param compressed: Compress the written file.
+        :type compressed: bool
         :raise IOError: on I/O errors
         """
         if os.path.isdir(path):
             path = pathlib.join(path, UNITS_FILE_NAME)
         self.path = path
-        self.fp = gzip.open(path, 'wb')
+        if compressed:
+            self.fp = gzip.open(path, 'wb')
+        else:
+            self.fp = open(path, 'wb')
         self.total_units = 0
         self.bytes_written = 0
 
@@ -369,6 +558,139 @@ class UnitWriter(object):
         return False
 
 
+class DeltaWriter(object):
+    """
+    Writes the units added (or updated) and removed since a previous manifest.
+    Units are added in the same way as they are added to a UnitWriter and those
+    that are new or differ from the previous units are written to the delta.
+    On close, the previous units that were not added are written as removed.
+    :ivar writer: The writer used to write the delta entries.
+    :type writer: UnitWriter
+    :ivar previous: The digests of the previous units not (yet) added.
+        See: unit_digests().
+    :type previous: dict
+    """
+
+    def __init__(self, path, previous):
+        """
+        :param path: The absolute path to the delta file.
+        :type path: str
+        :param previous: The digests of the units in the previous manifest.
+            See: unit_digests().
+        :type previous: dict
+        :raise IOError: on I/O errors
+        """
+        self.writer = UnitWriter(path)
+        self.previous = dict(previous)
+
+    @property
+    def path(self):
+        return self.writer.path
+
+    @property
+    def total_units(self):
+        return self.writer.total_units
+
+    @property
+    def bytes_written(self):
+        return self.writer.bytes_written
+
+    def add(self, unit):
+        """
+        Add the specified unit to the delta when new or changed.
+        :param unit: A content unit.
+        :type unit: dict
+        :raise IOError: on I/O errors.
+        :raise ValueError: json encoding errors
+        """
+        digest, key = self.previous.pop(unit_uid(unit), (None, None))
+        if digest != unit_digest(unit):
+            self.writer.add({DELTA_ACTION: DELTA_ADDED, DELTA_UNIT: unit})
+
+    def close(self):
+        """
+        Write the removed units then close and compress the delta file.
+        This method is idempotent.
+        :return: The number of entries written.
+        :rtype: int
+        """
+        if not self.writer.closed:
+            for digest, key in self.previous.values():
+                self.writer.add({DELTA_ACTION: DELTA_REMOVED, DELTA_UNIT: key})
+            self.previous = {}
+        return self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *unused):
+        self.close()
+        return False
+
+
+class UnitsFile(object):
+    """
+    A units file mapped into memory.
+    The file is mapped once and shared by the references to the units
+    it contains.  Units are decoded only when fetched.
+    :ivar path: The absolute path to the units file.
+    :type path: str
+    :ivar map: The memory map of the file.  None when the file is empty.
+    :type map: mmap.mmap
+    """
+
+    def __init__(self, path):
+        """
+        :param path: The absolute path to the (uncompressed) units file.
+        :type path: str
+        :raise IOError: on I/O errors.
+        """
+        self.path = path
+        self.map = None
+        with open(path) as fp:
+            if os.fstat(fp.fileno()).st_size:
+                self.map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def refs(self):
+        """
+        Get a reference to each unit (line) in the file.
+        :return: A generator of: UnitRef
+        :rtype: generator
+        """
+        if self.map is None:
+            return
+        begin = 0
+        size = self.map.size()
+        while begin < size:
+            end = self.map.find('\n', begin)
+            if end < 0:
+                end = size
+            else:
+                end += 1
+            yield UnitRef(self, begin, end - begin)
+            begin = end
+
+    def read(self, offset, length):
+        """
+        Read the json encoded unit at the specified offset.
+        :param offset: The offset of the unit within the file.
+        :type offset: int
+        :param length: The length of the unit within the file.
+        :type length: int
+        :return: The json encoded unit.
+        :rtype: str
+        """
+        return self.map[offset:offset + length]
+
+    def close(self):
+        """
+        Unmap the file.  The references to units in the file become unusable.
+        """
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+
 class UnitIterator:
     """
     Used to iterate content units inventory file associated with a manifest.
@@ -378,18 +700,9 @@ class UnitIterator:
 
     @staticmethod
     def get_units(path):
-        with open(path) as fp:
-            while True:
-                begin = fp.tell()
-                json_unit = fp.readline()
-                end = fp.tell()
-                if json_unit:
-                    unit = json.loads(json_unit)
-                    length = (end - begin)
-                    ref = UnitRef(path, begin, length)
-                    yield (unit, ref)
-                else:
-                    break
+        units_file = UnitsFile(path)
+        for ref in units_file.refs():
+            yield (ref.fetch(), ref)
 
     def __init__(self, path, total_units):
         """
@@ -414,36 +727,39 @@ class UnitIterator:
 class UnitRef(object):
     """
     Reference to a unit within the downloaded units file.
-    :ivar path: The absolute path to the units file.
-    :type path: str
+    :ivar units_file: The mapped units file.
+    :type units_file: UnitsFile
     :ivar offset: The offset for a specific unit with the file.
     :type offset: int
     :ivar length: The length of a specific unit within the file.
     :type length: int
     """
 
-    def __init__(self, path, offset, length):
+    __slots__ = ('units_file', 'offset', 'length')
+
+    def __init__(self, units_file, offset, length):
         """
-        :param path: The absolute path to the units file.
-        :type path: str
+        :param units_file: The mapped units file.
+        :type units_file: UnitsFile
         :param offset: The offset for a specific unit with the file.
         :type offset: int
         :param length: The length of a specific unit within the file.
         :type length: int
         """
-        self.path = path
+        self.units_file = units_file
         self.offset = offset
         self.length = length
 
+    @property
+    def path(self):
+        return self.units_file.path
+
     def fetch(self):
         """
         Fetch referenced content unit from the units file.
         :return: The json decoded unit.
         :rtype: dict
-        :raise IOError: on I/O errors.
         :raise ValueError: json decoding errors
         """
-        with open(self.path) as fp:
-            fp.seek(self.offset)
-            json_unit = fp.read(self.length)
-            return json.loads(json_unit)
+        json_unit = self.units_file.read(self.offset, self.length)
+        return json.loads(json_unit)
@@ -10,7 +10,7 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 import httplib
-from time import sleep
+from time import sleep, time
 from gettext import gettext as _
 
 from pulp.common.constants import CALL_COMPLETE_STATES, CALL_ERROR_STATE
@@ -38,23 +38,32 @@ class PollingFailed(Exception):
 class TaskPoller(object):
     """
     The task poller is used to poll a running task by ID.
+    Each poll asks the server to wait for the task to change before responding.
     :ivar binding: A pulp API binding.
     :type binding: pulp_node.handlers.model.PulpBinding
-    :ivar delay: The delay in seconds between each poll.
+    :ivar delay: The minimum delay in seconds between each poll.
     :type delay: int
+    :ivar wait: The maximum number of seconds the server waits for the task
+        to change before responding to a poll.
+    :type wait: int
     """
 
     DELAY = 1
+    WAIT = 5
 
-    def __init__(self, binding, delay=DELAY):
+    def __init__(self, binding, delay=DELAY, wait=WAIT):
         """
         :param binding: A pulp API binding.
         :type binding: pulp_node.handlers.model.PulpBinding
-        :param delay: The delay in seconds between each poll.
+        :param delay: The minimum delay in seconds between each poll.
         :type delay: int
+        :param wait: The maximum number of seconds the server waits for the task
+            to change before responding to a poll.
+        :type wait: int
         """
         self.binding = binding
         self.delay = delay
+        self.wait = wait
 
     def join(self, task_id, progress, cancelled):
         """
@@ -73,20 +82,28 @@ class TaskPoller(object):
         poll = True
         task_result = None
         last_hash = 0
+        digest = None
+        polled = 0
 
         while poll:
             if cancelled():
                 poll = False
                 continue
 
-            sleep(self.delay)
+            # the server responds as soon as the task changes so only
+            # sleep for what remains of the delay since the last poll.
+            elapsed = time() - polled
+            if elapsed < self.delay:
+                sleep(self.delay - elapsed)
 
-            http = self.binding.tasks.get_task(task_id)
+            polled = time()
+            http = self.binding.tasks.get_task(task_id, wait=self.wait, digest=digest)
             if http.response_code != httplib.OK:
                 msg = FETCH_TASK_FAILED % {'t': task_id, 'c': http.response_code}
                 raise PollingFailed(msg)
 
             task = http.response_body
+            digest = task.digest
 
             if task.state == CALL_ERROR_STATE:
                 msg = TASK_FAILED % {'t': task_id, 's': task.state}
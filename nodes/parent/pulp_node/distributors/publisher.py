@@ -10,20 +10,49 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 import os
+import errno
+import shutil
+import hashlib
 import tarfile
 
 from uuid import uuid4
 from tempfile import mkdtemp
 from logging import getLogger
+from multiprocessing.pool import ThreadPool
+
+from pulp.server.compat import json
 
 from pulp_node import constants
 from pulp_node import pathlib
-from pulp_node.manifest import Manifest, UnitWriter
+from pulp_node import manifest as _manifest
+from pulp_node.manifest import Manifest, UnitWriter, DeltaWriter
 
 
 log = getLogger(__name__)
 
 
+# The maximum number of deltas listed in a manifest.
+# The units file is always published so children holding a manifest that
+# is older than the oldest delta fetch all of the units.
+MAX_DELTAS = 10
+
+# The number of threads used to stage files and build tarballs.
+STAGING_CONCURRENCY = 4
+
+# The number of files symlinked by each staging job.
+STAGING_BATCH_SIZE = 1000
+
+# The name of the file that indexes published tarballs by fingerprint.
+# Used to reuse tarballs of directories that have not changed since
+# the previous publish.
+TARBALL_INDEX = 'tarballs.json'
+
+# Checksum algorithms named in unit metadata that are known to hashlib by another name.
+CHECKSUM_ALIASES = {
+    'sha': 'sha1',
+}
+
+
 # --- utils --------------------------------------------------------
 
 def tar_path(path):
@@ -36,6 +65,29 @@ def tar_path(path):
     return path + '.TGZ'
 
 
+def unit_checksum(unit):
+    """
+    Get the checksum of the file associated with the unit as found in the
+    unit metadata.  Only checksums calculated using an algorithm supported
+    by hashlib are returned.
+    :param unit: A content unit.
+    :type unit: dict
+    :return: A tuple of: (checksum_type, checksum) or None when not found.
+    :rtype: tuple
+    """
+    metadata = unit.get('metadata') or {}
+    checksum = metadata.get('checksum')
+    checksum_type = metadata.get('checksumtype')
+    if not (checksum and checksum_type):
+        return None
+    checksum_type = CHECKSUM_ALIASES.get(checksum_type, checksum_type)
+    try:
+        hashlib.new(checksum_type)
+    except ValueError:
+        return None
+    return checksum_type, checksum
+
+
 def tar_dir(dir_path, tar_path, bufsize=65535):
     """
     Tar up the directory at the specified path.
@@ -57,6 +109,27 @@ def tar_dir(dir_path, tar_path, bufsize=65535):
         tb.close()
 
 
+def fingerprint(dir_path):
+    """
+    Calculate a fingerprint of the content of the directory at the specified path.
+    The fingerprint changes when a file or directory within the tree is
+    added, removed, renamed or when its size, mode or modification time changes.
+    :param dir_path: The absolute path to a directory.
+    :type dir_path: str
+    :return: The hex digest.
+    :rtype: str
+    """
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(dir_path):
+        dirs.sort()
+        for name in sorted(dirs + files):
+            path = os.path.join(root, name)
+            st = os.lstat(path)
+            entry = (os.path.relpath(path, dir_path), st.st_size, st.st_mode, st.st_mtime)
+            digest.update(repr(entry))
+    return digest.hexdigest()
+
+
 # --- publisher ----------------------------------------------------
 
 
@@ -94,16 +167,38 @@ class FilePublisher(Publisher):
     :type tmp_dir: str
     :ivar staged: A flag indicating that publishing has been staged and needs commit.
     :type staged: bool
+    :ivar max_deltas: The maximum number of deltas listed in the manifest.
+    :type max_deltas: int
+    :ivar concurrency: The number of threads used to stage files and build tarballs.
+    :type concurrency: int
+    :ivar batch_size: The number of files symlinked by each staging job.
+    :type batch_size: int
     """
 
-    def __init__(self, publish_dir):
+    def __init__(self, publish_dir, max_deltas=MAX_DELTAS, concurrency=STAGING_CONCURRENCY,
+                 batch_size=STAGING_BATCH_SIZE):
         """
         :param publish_dir: The publishing root directory for this repository
         :type publish_dir: str
+        :param max_deltas: The maximum number of deltas listed in the manifest.
+            When 0, deltas are not published.
+        :type max_deltas: int
+        :param concurrency: The number of threads used to stage files and build tarballs.
+        :type concurrency: int
+        :param batch_size: The number of files symlinked by each staging job.
+        :type batch_size: int
         """
         self.publish_dir = publish_dir
         self.tmp_dir = None
         self.staged = False
+        self.max_deltas = max_deltas
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self._pool = None
+        self._jobs = []
+        self._tarball_jobs = []
+        self._batch = []
+        self._tarballs = {}
 
     def publish(self, units):
         """
@@ -111,6 +206,11 @@ class FilePublisher(Publisher):
         Writes the units.json file and symlinks each of the files associated
         to the unit.storage_path.  Publishing is staged in a temporary directory and
         must use commit() to make the publishing permanent.
+        When a previous manifest has been published, a delta of the units added (or updated)
+        and removed since the previous manifest is published along with the deltas
+        listed in the previous manifest.
+        Files are staged and tarballs are built by a pool of threads.  Tarballs of
+        directories that have not changed since the previous publish are reused.
         :param units: A list of units to publish.
         :type units: iterable
         :return: The absolute path to the manifest.
@@ -121,12 +221,47 @@ class FilePublisher(Publisher):
         pathlib.mkdir(parent_path)
         self.tmp_dir = mkdtemp(dir=parent_path)
 
-        with UnitWriter(self.tmp_dir) as writer:
-            for unit in units:
-                self.publish_unit(unit)
-                writer.add(unit)
         manifest_id = str(uuid4())
         manifest = Manifest(self.tmp_dir, manifest_id)
+        previous = self._previous_manifest()
+        delta = None
+        if previous is not None:
+            digests = _manifest.unit_digests(previous.units_path())
+            delta_path = self._delta_path(manifest_id)
+            pathlib.mkdir(os.path.dirname(pathlib.join(self.tmp_dir, delta_path)))
+            delta = DeltaWriter(pathlib.join(self.tmp_dir, delta_path), digests)
+        self._tarballs = self._tarball_index()
+        self._pool = ThreadPool(self.concurrency)
+        try:
+            with UnitWriter(self.tmp_dir) as writer:
+                for unit in units:
+                    self.publish_unit(unit)
+                    writer.add(unit)
+                    if delta is not None:
+                        delta.add(unit)
+            self._stage_batch()
+            for job in self._jobs:
+                job.get()
+            index = dict(job.get() for job in self._tarball_jobs)
+        finally:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+            self._jobs = []
+            self._tarball_jobs = []
+            self._batch = []
+            if delta is not None:
+                delta.close()
+        with open(pathlib.join(self.tmp_dir, TARBALL_INDEX), 'w') as fp:
+            json.dump(index, fp)
+        if delta is not None:
+            manifest.deltas = self._carry_deltas(previous)
+            manifest.deltas.append({
+                _manifest.DELTA_BASE: previous.id,
+                _manifest.ID: manifest_id,
+                _manifest.DELTA_PATH: delta_path,
+                _manifest.DELTA_SIZE: delta.bytes_written,
+            })
         manifest.units_published(writer)
         manifest.write()
         self.staged = True
@@ -135,23 +270,153 @@ class FilePublisher(Publisher):
     def publish_unit(self, unit):
         """
         Publish the file associated with the unit into the publish directory.
+        The unit is updated with the file size, checksum (when found in the metadata)
+        and tarball path and the file is queued to be staged (symlinked or tarred)
+        by the thread pool.
+        Must be called within publish().
         :param unit: A content unit.
         :type unit: dict
         """
         storage_path = unit.get(constants.STORAGE_PATH)
         if not storage_path:
             # not all units have associated files.
-            return unit, None
+            return
         relative_path = unit[constants.RELATIVE_PATH]
-        published_path = pathlib.join(self.tmp_dir, relative_path)
-        pathlib.mkdir(os.path.dirname(published_path))
         unit[constants.FILE_SIZE] = os.path.getsize(storage_path)
         if os.path.isdir(storage_path):
-            tar_dir(storage_path, tar_path(published_path))
             unit[constants.TARBALL_PATH] = tar_path(relative_path)
+            job = self._pool.apply_async(self._stage_tarball, (storage_path, relative_path))
+            self._tarball_jobs.append(job)
         else:
+            checksum = unit_checksum(unit)
+            if checksum:
+                unit[constants.CHECKSUM_TYPE], unit[constants.CHECKSUM] = checksum
+            self._batch.append((storage_path, relative_path))
+            if len(self._batch) >= self.batch_size:
+                self._stage_batch()
+
+    def _stage_batch(self):
+        """
+        Queue the batch of files to be symlinked by the thread pool.
+        """
+        if not self._batch:
+            return
+        job = self._pool.apply_async(self._stage_files, (self._batch,))
+        self._jobs.append(job)
+        self._batch = []
+
+    def _stage_files(self, batch):
+        """
+        Symlink a batch of files into the temporary directory.
+        Each directory is created once per batch.
+        :param batch: A list of: (storage_path, relative_path).
+        :type batch: list
+        """
+        created = set()
+        for storage_path, relative_path in batch:
+            published_path = pathlib.join(self.tmp_dir, relative_path)
+            dir_path = os.path.dirname(published_path)
+            if dir_path not in created:
+                pathlib.mkdir(dir_path)
+                created.add(dir_path)
             os.symlink(storage_path, published_path)
 
+    def _stage_tarball(self, storage_path, relative_path):
+        """
+        Tar up the directory at the specified storage path into the temporary directory.
+        The tarball published by the previous publish is linked instead when the
+        directory has the same fingerprint.
+        :param storage_path: The absolute path to the directory.
+        :type storage_path: str
+        :param relative_path: The unit's relative path.
+        :type relative_path: str
+        :return: (fingerprint, tarball path relative to the publish directory)
+        :rtype: tuple(2)
+        """
+        published_path = tar_path(pathlib.join(self.tmp_dir, relative_path))
+        pathlib.mkdir(os.path.dirname(published_path))
+        key = fingerprint(storage_path)
+        cached = self._tarballs.get(key)
+        if cached:
+            cached = pathlib.join(self.publish_dir, cached)
+            if os.path.isfile(cached):
+                try:
+                    os.link(cached, published_path)
+                except OSError:
+                    shutil.copy(cached, published_path)
+                return key, tar_path(relative_path)
+        tar_dir(storage_path, published_path)
+        return key, tar_path(relative_path)
+
+    def _tarball_index(self):
+        """
+        Read the index of tarballs published by the previous publish.
+        :return: A dictionary of relative tarball paths keyed by fingerprint.
+        :rtype: dict
+        """
+        path = pathlib.join(self.publish_dir, TARBALL_INDEX)
+        try:
+            with open(path) as fp:
+                return json.load(fp)
+        except IOError, e:
+            if e.errno != errno.ENOENT:
+                log.exception(path)
+        except ValueError:
+            log.exception(path)
+        return {}
+
+    def _previous_manifest(self):
+        """
+        Get the previously published manifest.
+        :return: The manifest or None when a valid manifest and units
+            file have not been published or deltas are not published.
+        :rtype: Manifest
+        """
+        if not self.max_deltas:
+            return None
+        path = pathlib.join(self.publish_dir, _manifest.MANIFEST_FILE_NAME)
+        if not os.path.exists(path):
+            return None
+        try:
+            previous = Manifest(path)
+            previous.read()
+        except (IOError, ValueError):
+            log.exception(path)
+            return None
+        if not (previous.is_valid() and previous.has_valid_units()):
+            return None
+        return previous
+
+    def _carry_deltas(self, previous):
+        """
+        Copy the most recent deltas published with the previous manifest into
+        the temporary directory.  Copying stops at the first missing delta file.
+        :param previous: The previous manifest.
+        :type previous: Manifest
+        :return: The list of deltas copied, oldest first.
+        :rtype: list
+        """
+        carried = []
+        first = max(0, len(previous.deltas) - self.max_deltas + 1)
+        for delta in reversed(previous.deltas[first:]):
+            path = pathlib.join(self.publish_dir, delta[_manifest.DELTA_PATH])
+            if not os.path.exists(path):
+                break
+            shutil.copy(path, pathlib.join(self.tmp_dir, delta[_manifest.DELTA_PATH]))
+            carried.insert(0, delta)
+        return carried
+
+    @staticmethod
+    def _delta_path(manifest_id):
+        """
+        Get the path of a delta relative to the publishing directory.
+        :param manifest_id: The ID of the manifest the delta leads to.
+        :type manifest_id: str
+        :return: The relative path.
+        :rtype: str
+        """
+        return pathlib.join(_manifest.DELTAS_DIR, '%s.json.gz' % manifest_id)
+
     def commit(self):
         """
         Commit publishing.
@@ -45,7 +45,9 @@ class TestSummaryReport(TestCase):
                     'content-world': {'total_failed': 2, 'total_succeeded': 98},
                     'content-galaxy': {'total_failed': 0, 'total_succeeded': 999999}
                 },
-                'total_sources': 10
+                'total_sources': 10,
+                'catalog': {'total_queries': 0, 'total_locators': 0, 'total_cached': 0,
+                            'seconds': 0.0}
             },
             'errors': [
                 {'details': {'A': 1, 'B': 2}, 'error_id': 1},
@@ -187,6 +187,58 @@ class TestBase(TestCase):
         self.assertEqual(units.updated, 0)
         self.assertEqual(units.removed, 0)
 
+    @patch('pulp_node.handlers.strategies.ThreadPool')
+    @patch('pulp_node.handlers.strategies.HandlerStrategy._merge_repository')
+    def test_merge_repositories_concurrently(self, mock_merge, mock_pool):
+        # Setup
+        request = self.request()
+        request.bindings = [dict(repo_id='repo_%d' % n, details={}) for n in range(10)]
+        request.options[constants.MAX_REPOSITORY_CONCURRENCY_KEYWORD] = 3
+        mock_pool.return_value.map.side_effect = lambda fn, items: [fn(i) for i in items]
+        # Test
+        strategy = HandlerStrategy()
+        strategy._merge_repositories(request)
+        # Verify
+        mock_pool.assert_called_with(3)
+        mock_pool.return_value.close.assert_called_with()
+        mock_pool.return_value.join.assert_called_with()
+        self.assertEqual(mock_merge.call_count, 10)
+        for bind in request.bindings:
+            mock_merge.assert_any_call(request, bind)
+
+    @patch('pulp_node.handlers.strategies.ThreadPool')
+    @patch('pulp_node.handlers.strategies.HandlerStrategy._merge_repository')
+    def test_merge_repositories_serially(self, mock_merge, mock_pool):
+        # Setup
+        request = self.request()
+        request.options[constants.MAX_REPOSITORY_CONCURRENCY_KEYWORD] = 3
+        # Test
+        strategy = HandlerStrategy()
+        strategy._merge_repositories(request)
+        # Verify
+        self.assertFalse(mock_pool.called)
+        mock_merge.assert_called_once_with(request, request.bindings[0])
+
+    @patch('pulp_node.handlers.strategies.HandlerStrategy._synchronize_repository')
+    @patch('pulp_node.handlers.model.Repository.add')
+    @patch('pulp_node.handlers.model.Repository.fetch', return_value=None)
+    def test_merge_repositories_threads(self, *unused):
+        # Setup
+        request = self.request()
+        request.bindings = [dict(repo_id='repo_%d' % n, details={}) for n in range(10)]
+        request.summary.setup(request.bindings)
+        request.started()
+        # Test
+        strategy = HandlerStrategy()
+        strategy._merge_repositories(request)
+        # Verify
+        self.assertEqual(len(request.summary.errors), 0)
+        for bind in request.bindings:
+            repo_id = bind['repo_id']
+            self.assertEqual(request.summary[repo_id].action, RepositoryReport.ADDED)
+            progress = request.progress.find_report(repo_id)
+            self.assertEqual(progress.state, progress.MERGING)
+
     @patch('pulp_node.handlers.model.Repository.fetch_all', return_value=[TestRepo(REPO_ID)])
     def test_delete_repositories_cancelled(self, *unused):
         # Setup
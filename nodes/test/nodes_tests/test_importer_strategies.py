@@ -10,6 +10,7 @@ from pulp.server.config import config as pulp_conf
 
 from pulp_node.importers.strategies import *
 from pulp_node.importers.inventory import UnitInventory
+from pulp_node.importers.index import FileIndex, file_checksum
 from pulp_node.importers.reports import SummaryReport, ProgressListener
 from pulp_node.reports import RepositoryProgress
 from pulp_node.error import *
@@ -241,6 +242,58 @@ class TestBase(TestCase):
         self.assertEqual(request.cancel_event.call_count, 2)
         self.assertFalse(mock_download.called)
 
+    def test_apply_deltas(self):
+        # Setup
+        request = self.request()
+        manifest = Mock(id='A')
+        fetched_manifest = Mock()
+        fetched_manifest.delta_chain.return_value = [{'base': 'A', 'id': 'B'}]
+        fetched_manifest.fetch_deltas.return_value = ['B.json.gz']
+        # Test
+        strategy = ImporterStrategy()
+        applied = strategy._apply_deltas(request, manifest, fetched_manifest)
+        # Verify
+        self.assertTrue(applied)
+        fetched_manifest.delta_chain.assert_called_with('A')
+        manifest.apply_deltas.assert_called_with(fetched_manifest, ['B.json.gz'])
+
+    def test_apply_deltas_fallback(self):
+        # Setup
+        request = self.request()
+        manifest = Mock(id='A')
+        fetched_manifest = Mock()
+        strategy = ImporterStrategy()
+        # Test invalid local units
+        manifest.has_valid_units.return_value = False
+        self.assertFalse(strategy._apply_deltas(request, manifest, fetched_manifest))
+        # Test no chain
+        manifest.has_valid_units.return_value = True
+        fetched_manifest.delta_chain.return_value = None
+        self.assertFalse(strategy._apply_deltas(request, manifest, fetched_manifest))
+        # Test download failed
+        fetched_manifest.delta_chain.return_value = [{'base': 'A', 'id': 'B'}]
+        fetched_manifest.fetch_deltas.side_effect = MANIFEST_ERROR
+        self.assertFalse(strategy._apply_deltas(request, manifest, fetched_manifest))
+        self.assertFalse(manifest.apply_deltas.called)
+
+    def test_inventory(self):
+        # Setup
+        parent_units = [
+            dict(type_id='T', unit_key={'a': 1, 'b': 2}, last_updated=2, metadata={}),
+            dict(type_id='T', unit_key={'a': 2}, metadata={}),
+        ]
+        child_units = [
+            dict(type_id='T', unit_key={'b': 2, 'a': 1}, last_updated=1),
+            dict(type_id='T', unit_key={'a': 3}),
+        ]
+        manifest = TestManifest(parent_units)
+        # Test
+        inventory = UnitInventory(BASE_URL, manifest.get_units(), child_units)
+        # Verify
+        self.assertEqual([r.fetch() for r in inventory.units_on_parent_only()], parent_units[1:])
+        self.assertEqual(inventory.units_on_child_only(), child_units[1:])
+        self.assertEqual([r.fetch() for r in inventory.updated_units()], parent_units[:1])
+
     def test_needs_update(self):
         # Setup
         path = os.path.join(self.tmp_dir, 'unit_1')
@@ -256,6 +309,102 @@ class TestBase(TestCase):
         unit = {constants.STORAGE_PATH: path, constants.FILE_SIZE: size + 1}
         self.assertTrue(strategy._needs_download(unit))
 
+    def test_needs_update_indexed(self):
+        # Setup
+        path = os.path.join(self.tmp_dir, 'unit_1')
+        with open(path, 'w+') as fp:
+            fp.write('123')
+        size = os.path.getsize(path)
+        checksum = file_checksum(path, 'sha256')
+        strategy = ImporterStrategy()
+        file_index = FileIndex(self.tmp_dir)
+        file_index.load()
+        # Test
+        unit = {constants.STORAGE_PATH: path, constants.FILE_SIZE: size}
+        self.assertFalse(strategy._needs_download(unit, file_index))
+        unit[constants.CHECKSUM_TYPE] = 'sha256'
+        unit[constants.CHECKSUM] = checksum
+        self.assertFalse(strategy._needs_download(unit, file_index))
+        # corrupted but same size
+        with open(path, 'w+') as fp:
+            fp.write('456')
+        self.assertFalse(strategy._needs_download(unit, file_index))
+        file_index.discard(path)
+        self.assertTrue(strategy._needs_download(unit, file_index))
+        unit = {constants.STORAGE_PATH: '&&&&&&&', constants.FILE_SIZE: size}
+        self.assertTrue(strategy._needs_download(unit, file_index))
+
+    def test_file_index(self):
+        # Setup
+        paths = []
+        for n in range(3):
+            path = os.path.join(self.tmp_dir, 'unit_%d' % n)
+            with open(path, 'w+') as fp:
+                fp.write('123')
+            paths.append(path)
+        unit = {
+            constants.STORAGE_PATH: paths[0],
+            constants.FILE_SIZE: 3,
+            constants.CHECKSUM_TYPE: 'sha256',
+            constants.CHECKSUM: 'abc'
+        }
+        # Test
+        file_index = FileIndex(self.tmp_dir)
+        file_index.load()
+        file_index.downloaded(unit)
+        file_index.needs_download({constants.STORAGE_PATH: paths[1], constants.FILE_SIZE: 3})
+        file_index.keep([paths[2]])
+        file_index.save()
+        os.unlink(paths[0])
+        loaded = FileIndex(self.tmp_dir)
+        loaded.load()
+        # Verify
+        self.assertEqual(sorted(loaded.entries), paths[:2])
+        self.assertTrue(loaded.needs_download(unit))
+        self.assertEqual(sorted(loaded.entries), paths[1:2])
+
+    def test_file_index_downloaded(self):
+        # Setup
+        path = os.path.join(self.tmp_dir, 'unit_1')
+        with open(path, 'w+') as fp:
+            fp.write('123')
+        unit = {
+            constants.STORAGE_PATH: path,
+            constants.FILE_SIZE: 3,
+            constants.CHECKSUM_TYPE: 'sha256',
+            constants.CHECKSUM: 'abc'
+        }
+        file_index = FileIndex(self.tmp_dir)
+        file_index.load()
+        # Test
+        file_index.downloaded(unit)
+        # Verify
+        self.assertEqual(file_index.entries[path][3], file_checksum(path, 'sha256'))
+        self.assertTrue(file_index.needs_download(unit))
+        unit[constants.CHECKSUM] = file_checksum(path, 'sha256')
+        self.assertFalse(file_index.needs_download(unit))
+
+    def test_file_index_replaced(self):
+        # Setup
+        path = os.path.join(self.tmp_dir, 'unit_1')
+        with open(path, 'w+') as fp:
+            fp.write('123')
+        unit = {constants.STORAGE_PATH: path, constants.FILE_SIZE: 3}
+        file_index = FileIndex(self.tmp_dir)
+        file_index.load()
+        file_index.needs_download(unit)
+        file_index.save()
+        tmp_path = os.path.join(self.tmp_dir, 'replacement')
+        with open(tmp_path, 'w+') as fp:
+            fp.write('1234')
+        os.rename(tmp_path, path)
+        loaded = FileIndex(self.tmp_dir)
+        loaded.load()
+        # Test
+        self.assertTrue(loaded.needs_download(unit))
+        unit[constants.FILE_SIZE] = 4
+        self.assertFalse(loaded.needs_download(unit))
+
     def test_strategy_factory(self):
         for name, strategy in STRATEGIES.items():
             self.assertEqual(find_strategy(name), strategy)
@@ -131,4 +131,104 @@ class TestManifest(TestCase):
             units_in.append(unit)
             _unit = ref.fetch()
             self.assertEqual(unit, _unit)
-        self.verify(units, units_in)
\ No newline at end of file
+        self.verify(units, units_in)
+
+    def test_delta_chain(self):
+        manifest = Manifest(self.tmp_dir, 'D')
+        manifest.deltas = [
+            {DELTA_BASE: 'A', ID: 'B', DELTA_PATH: 'deltas/B.json.gz', DELTA_SIZE: 0},
+            {DELTA_BASE: 'B', ID: 'C', DELTA_PATH: 'deltas/C.json.gz', DELTA_SIZE: 0},
+            {DELTA_BASE: 'C', ID: 'D', DELTA_PATH: 'deltas/D.json.gz', DELTA_SIZE: 0},
+        ]
+        # Test
+        self.assertEqual(manifest.delta_chain('A'), manifest.deltas)
+        self.assertEqual(manifest.delta_chain('C'), manifest.deltas[2:])
+        self.assertEqual(manifest.delta_chain('D'), None)
+        self.assertEqual(manifest.delta_chain('X'), None)
+        self.assertEqual(manifest.delta_chain(None), None)
+        # broken chain
+        manifest.deltas[1][DELTA_BASE] = 'X'
+        self.assertEqual(manifest.delta_chain('A'), None)
+
+    def test_delta_round_trip(self):
+        # Setup
+        units = []
+        for i in range(0, self.NUM_UNITS):
+            unit = dict(unit_id=i, type_id='T', unit_key={'n': i})
+            units.append(unit)
+        working_dir = os.path.join(self.tmp_dir, 'working_dir')
+        os.makedirs(working_dir)
+        with UnitWriter(os.path.join(working_dir, UNITS_FILE_NAME)) as writer:
+            for u in units:
+                writer.add(u)
+        manifest = Manifest(working_dir, 'A')
+        manifest.units_published(writer)
+        manifest.write()
+        previous = unit_digests(manifest.units_path())
+        # update: remove unit 0, change unit 1 and add unit 10
+        units = units[1:]
+        units[0]['unit_id'] = 100
+        units.append(dict(unit_id=10, type_id='T', unit_key={'n': 10}))
+        delta_path = os.path.join(self.tmp_dir, 'B.json.gz')
+        with DeltaWriter(delta_path, previous) as delta:
+            for u in units:
+                delta.add(u)
+        published = Manifest(self.tmp_dir, 'B')
+        published.deltas = [
+            {DELTA_BASE: 'A', ID: 'B', DELTA_PATH: 'B.json.gz', DELTA_SIZE: delta.bytes_written}
+        ]
+        # Test
+        manifest.apply_deltas(published, [delta_path])
+        # Verify
+        self.assertEqual(delta.total_units, 3)
+        self.assertFalse(os.path.exists(delta_path))
+        self.assertEqual(manifest.id, 'B')
+        self.assertEqual(manifest.deltas, published.deltas)
+        self.assertTrue(manifest.has_valid_units())
+        manifest = Manifest(working_dir)
+        manifest.read()
+        self.assertEqual(manifest.id, 'B')
+        self.assertTrue(manifest.has_valid_units())
+        units_in = sorted([u for u, r in manifest.get_units()], key=lambda u: u['unit_key']['n'])
+        self.verify(units, units_in)
+
+    def test_units_file(self):
+        # Setup
+        path = os.path.join(self.tmp_dir, 'units.json')
+        with UnitWriter(path, compressed=False) as writer:
+            for i in range(0, self.NUM_UNITS):
+                writer.add(dict(unit_id=i, type_id='T', unit_key={'n': i}))
+        # Test
+        units_file = UnitsFile(path)
+        refs = list(units_file.refs())
+        # Verify
+        self.assertEqual(len(refs), self.NUM_UNITS)
+        self.assertEqual(refs[-1].offset + refs[-1].length, os.path.getsize(path))
+        for i, ref in enumerate(refs):
+            self.assertEqual(ref.path, path)
+            self.assertEqual(ref.fetch()['unit_id'], i)
+        units_file.close()
+        self.assertEqual(units_file.map, None)
+
+    def test_units_file_empty(self):
+        # Setup
+        path = os.path.join(self.tmp_dir, 'units.json')
+        open(path, 'w').close()
+        # Test
+        units_file = UnitsFile(path)
+        # Verify
+        self.assertEqual(list(units_file.refs()), [])
+        units_file.close()
+
+
+class TestUnitUid(TestCase):
+
+    def test_nested_key_order(self):
+        unit_1 = {'type_id': 'T', 'unit_key': {'a': 1, 'b': {'x': 1, 'y': 2, 'z': 3}}}
+        unit_2 = {'type_id': 'T', 'unit_key': {'b': {'z': 3, 'y': 2, 'x': 1}, 'a': 1}}
+        self.assertEqual(unit_uid(unit_1), unit_uid(unit_2))
+
+    def test_different_units(self):
+        unit_1 = {'type_id': 'T', 'unit_key': {'a': 1, 'b': {'x': 1}}}
+        unit_2 = {'type_id': 'T', 'unit_key': {'a': 1, 'b': {'x': 2}}}
+        self.assertNotEqual(unit_uid(unit_1), unit_uid(unit_2))
@@ -21,7 +21,7 @@ from nectar.config import DownloaderConfig
 from pulp_node import constants
 from pulp_node import pathlib
 from pulp_node.distributors.http.publisher import HttpPublisher
-from pulp_node.manifest import RemoteManifest
+from pulp_node.manifest import Manifest, RemoteManifest
 
 
 class TestHttp(TestCase):
@@ -157,3 +157,152 @@ class TestHttp(TestCase):
             p.publish(units)
         # verify
         self.assertFalse(os.path.exists(p.tmp_dir))
+
+    def test_delta(self):
+        # setup
+        units = self.populate()
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        repo_publish_dir = os.path.join(publish_dir, repo_id)
+        virtual_host = (publish_dir, publish_dir)
+        conf = DownloaderConfig()
+        downloader = LocalFileDownloader(conf)
+        working_dir = os.path.join(self.tmpdir, 'working_dir')
+        os.makedirs(working_dir)
+        with HttpPublisher(base_url, virtual_host, repo_id, repo_publish_dir) as p:
+            p.publish(units)
+            p.commit()
+        url = pathlib.url_join(base_url, p.manifest_path())
+        manifest = RemoteManifest(url, downloader, working_dir)
+        manifest.fetch()
+        manifest.write()
+        manifest.fetch_units()
+        self.assertEqual(manifest.deltas, [])
+        # test
+        # publish again without the 1st unit
+        with HttpPublisher(base_url, virtual_host, repo_id, repo_publish_dir) as p:
+            p.publish(units[1:])
+            p.commit()
+        fetched_manifest = RemoteManifest(url, downloader, working_dir)
+        fetched_manifest.fetch()
+        chain = fetched_manifest.delta_chain(manifest.id)
+        paths = fetched_manifest.fetch_deltas(chain)
+        manifest = Manifest(working_dir)
+        manifest.read()
+        manifest.apply_deltas(fetched_manifest, paths)
+        # verify
+        self.assertEqual(len(fetched_manifest.deltas), 1)
+        self.assertEqual(len(chain), 1)
+        self.assertEqual(manifest.id, fetched_manifest.id)
+        self.assertTrue(manifest.has_valid_units())
+        units_in = [u for u, r in manifest.get_units()]
+        self.assertEqual([u['unit_key']['n'] for u in units_in], [1, 2])
+        self.assertEqual(units_in, units[1:])
+
+    def test_delta_limit(self):
+        # setup
+        units = self.populate()
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        repo_publish_dir = os.path.join(publish_dir, repo_id)
+        virtual_host = (publish_dir, publish_dir)
+        # test
+        for n in range(0, 4):
+            p = HttpPublisher(base_url, virtual_host, repo_id, repo_publish_dir)
+            p.max_deltas = 2
+            p.publish(units[n % 2:])
+            p.commit()
+        # verify
+        manifest = Manifest(repo_publish_dir)
+        manifest.read()
+        self.assertEqual(len(manifest.deltas), 2)
+        self.assertEqual(manifest.deltas[-1]['id'], manifest.id)
+        self.assertEqual(manifest.deltas[0]['id'], manifest.deltas[1]['base'])
+        for delta in manifest.deltas:
+            self.assertTrue(os.path.isfile(os.path.join(repo_publish_dir, delta['path'])))
+        self.assertEqual(len(os.listdir(os.path.join(repo_publish_dir, 'deltas'))), 2)
+
+    def test_delta_chain_grows(self):
+        # setup
+        units = self.populate()
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        repo_publish_dir = os.path.join(publish_dir, repo_id)
+        virtual_host = (publish_dir, publish_dir)
+        # test
+        chain_lengths = []
+        for n in range(0, 7):
+            p = HttpPublisher(base_url, virtual_host, repo_id, repo_publish_dir)
+            p.max_deltas = 5
+            p.publish(units[n % 2:])
+            p.commit()
+            manifest = Manifest(repo_publish_dir)
+            manifest.read()
+            chain_lengths.append(len(manifest.deltas))
+        # verify
+        self.assertEqual(chain_lengths, [0, 1, 2, 3, 4, 5, 5])
+        for base, delta in zip(manifest.deltas, manifest.deltas[1:]):
+            self.assertEqual(delta['base'], base['id'])
+        self.assertEqual(manifest.deltas[-1]['id'], manifest.id)
+
+    def test_tarball_cache(self):
+        # setup
+        units = self.populate()
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        repo_publish_dir = os.path.join(publish_dir, repo_id)
+        virtual_host = (publish_dir, publish_dir)
+        tarball = os.path.join(repo_publish_dir, units[0]['relative_path'] + '.TGZ')
+        # test
+        with HttpPublisher(base_url, virtual_host, repo_id, repo_publish_dir) as p:
+            p.batch_size = 1
+            p.publish(units)
+            p.commit()
+        inode = os.stat(tarball).st_ino
+        with HttpPublisher(base_url, virtual_host, repo_id, repo_publish_dir) as p:
+            p.publish(units)
+            p.commit()
+        reused = os.stat(tarball).st_ino
+        # change the directory
+        path = os.path.join(units[0]['storage_path'], 'new.rpm')
+        with open(path, 'w') as fp:
+            fp.write('new')
+        with HttpPublisher(base_url, virtual_host, repo_id, repo_publish_dir) as p:
+            p.publish(units)
+            p.commit()
+        # verify
+        self.assertEqual(reused, inode)
+        self.assertNotEqual(os.stat(tarball).st_ino, inode)
+        tb = tarfile.open(tarball)
+        try:
+            files = sorted(tb.getnames())
+        finally:
+            tb.close()
+        self.assertEqual(len(files), self.NUM_TARED_FILES + 1)
+        for unit in units[1:]:
+            path = os.path.join(repo_publish_dir, unit['relative_path'])
+            self.assertTrue(os.path.islink(path))
+
+    def test_checksum(self):
+        # setup
+        units = self.populate()
+        units[1]['metadata'] = {'checksum': 'abc', 'checksumtype': 'sha'}
+        units[2]['metadata'] = {'checksum': 'abc', 'checksumtype': 'unknown'}
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        repo_publish_dir = os.path.join(publish_dir, repo_id)
+        virtual_host = (publish_dir, publish_dir)
+        # test
+        with HttpPublisher(base_url, virtual_host, repo_id, repo_publish_dir) as p:
+            p.publish(units)
+            p.commit()
+        # verify
+        self.assertEqual(units[1][constants.CHECKSUM_TYPE], 'sha1')
+        self.assertEqual(units[1][constants.CHECKSUM], 'abc')
+        self.assertFalse(constants.CHECKSUM in units[2])
+        self.assertFalse(constants.CHECKSUM in units[0])
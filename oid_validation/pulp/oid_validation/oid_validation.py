@@ -13,37 +13,42 @@ The OID structure follows the Red Hat model. Download URLs are found at:
 The * represents the product ID and is not used as part of this calculation.
 '''
 
-from ConfigParser import NoOptionError, SafeConfigParser
+from ConfigParser import NoOptionError
 
 from rhsm import certificate
 
+from pulp.repoauth import config as repo_auth_config
 from pulp.repoauth.protected_repo_utils import ProtectedRepoUtils
 from pulp.repoauth.repo_cert_utils import RepoCertUtils
 
-# This needs to be accessible on both Pulp and the CDS instances, so a
-# separate config file for repo auth purposes is used.
-CONFIG_FILENAME = '/etc/pulp/repo_auth.conf'
+CONFIG_FILENAME = repo_auth_config.CONFIG_FILENAME
 
 
 def authenticate(environ, config=None):
     '''
     Framework hook method.
+
+    Unless a config is given, the validator is built once per process and
+    again only when the repo auth configuration file changes.
     '''
     cert_pem = environ["mod_ssl.var_lookup"]("SSL_CLIENT_CERT")
 
     if config is None:
-        config = _config()
+        validator = _validator()
+    else:
+        validator = OidValidator(config)
 
-    validator = OidValidator(config)
     valid = validator.is_valid(environ["REQUEST_URI"], cert_pem,
                                environ["wsgi.errors"].write)
     return valid
 
 
 def _config():
-    config = SafeConfigParser()
-    config.read(CONFIG_FILENAME)
-    return config
+    return repo_auth_config.get_config()
+
+
+def _validator():
+    return repo_auth_config.get_derived('oid_validator', OidValidator)
 
 
 class OidValidator:
@@ -124,8 +129,8 @@ class OidValidator:
 
     def _matching_repo_bundle(self, dest, repo_url_prefixes):
 
-        # Load the path -> repo ID mappings
-        prot_repos = self.protected_repo_utils.read_protected_repo_listings()
+        # Load the path -> repo ID index; it is only rebuilt when the listings change
+        prot_repos = self.protected_repo_utils.read_protected_repo_index()
 
         repo_id = None
         for prefix in repo_url_prefixes:
@@ -134,16 +139,9 @@ class OidValidator:
             #   Repo Portion: /my-repo/pulp/fedora-13/i386/repodata/repomd.xml
             repo_url = dest[dest.find(prefix) + len(prefix):]
 
-            # If the repo portion of the URL starts with any of the protected relative URLs,
+            # If the repo portion of the URL contains any of the protected relative URLs,
             # it is considered to be a request against that protected repo
-            for relative_repo_url in prot_repos.keys():
-
-                # Relative URL is inconsistent in Pulp, so a simple "startswith" tends to
-                # break. Changing this to a find helps remove issues where the leading /
-                # is missing, present, or duplicated.
-                if repo_url.find(relative_repo_url) != -1:
-                    repo_id = prot_repos[relative_repo_url]
-                    break
+            repo_id = prot_repos.find(repo_url)
 
             # break out of checking URLs once we find a matching repo id
             if repo_id:
@@ -235,6 +235,39 @@ class TestOidValidation(unittest.TestCase):
         self.assertTrue(not response_x)
         self.assertTrue(response_y)
 
+    @mock.patch(
+        'pulp.repoauth.protected_repo_utils.ProtectedRepoUtils.read_protected_repo_listings')
+    @mock.patch('pulp.repoauth.repo_cert_utils.RepoCertUtils.read_consumer_cert_bundle')
+    @mock.patch('pulp.repoauth.repo_cert_utils.RepoCertUtils.read_global_cert_bundle')
+    def test_scenario_2_substring(self, mock_read_global_bundle, mock_read_bundle,
+                                  mock_read_listings):
+        """
+        Setup
+        - Global auth disabled
+        - Individual repo auth enabled for repo X
+        - Client cert signed by different CA than repo X
+        - Request URL contains the relative path of repo X, but not on a path
+          segment boundary
+
+        Expected
+        - Denied, since the URL still contains the relative path of repo X
+        """
+        mock_read_global_bundle.return_value = None
+        repo_x_bundle = {'ca': INVALID_CA, 'key': ANYKEY, 'cert': ANYCERT, }
+        mock_read_listings.return_value = {'/pulp/pulp/fedora-14/x86_64': 'repo-x'}
+        mock_read_bundle.return_value = repo_x_bundle
+
+        # Test
+        request = mock_environ(FULL_CLIENT_CERT,
+                               'https://localhost/pulp/repos/repos/pulp/pulp/fedora-14/'
+                               'x86_64-debug/')
+
+        response = oid_validation.authenticate(request, config=self.config)
+
+        # Verify
+        self.assertTrue(not response)
+        mock_read_bundle.assert_called_once_with('repo-x', ['ca'])
+
     @mock.patch(
         'pulp.repoauth.protected_repo_utils.ProtectedRepoUtils.read_protected_repo_listings')
     @mock.patch('pulp.repoauth.repo_cert_utils.RepoCertUtils.read_consumer_cert_bundle')
@@ -655,23 +688,39 @@ class TestOidValidation(unittest.TestCase):
         self.assertTrue(response_y)
         self.assertTrue(response_xx)
 
-    @mock.patch("pulp.oid_validation.oid_validation._config")
+    @mock.patch("pulp.oid_validation.oid_validation._validator")
     @mock.patch("pulp.oid_validation.oid_validation.OidValidator")
-    def test_authenticate_loads_config(self, mock_validator, mock_config):
+    def test_authenticate_uses_cached_validator(self, mock_validator, mock_cached_validator):
         mock_environ = mock.MagicMock()
 
         oid_validation.authenticate(mock_environ)
 
-        mock_config.assert_called_once_with()
+        mock_cached_validator.assert_called_once_with()
+        self.assertFalse(mock_validator.called)
+        mock_cached_validator.return_value.is_valid.assert_called_once_with(
+            mock_environ["REQUEST_URI"], mock_environ["mod_ssl.var_lookup"].return_value,
+            mock_environ["wsgi.errors"].write)
+
+    @mock.patch("pulp.oid_validation.oid_validation._validator")
+    @mock.patch("pulp.oid_validation.oid_validation.OidValidator")
+    def test_authenticate_given_config(self, mock_validator, mock_cached_validator):
+        mock_environ = mock.MagicMock()
+
+        oid_validation.authenticate(mock_environ, config=self.config)
+
+        mock_validator.assert_called_once_with(self.config)
+        self.assertFalse(mock_cached_validator.called)
 
-    @mock.patch("pulp.oid_validation.oid_validation.SafeConfigParser")
-    def test_config(self, mock_config_parser):
-        mock_config_parser_instance = mock.Mock()
-        mock_config_parser.return_value = mock_config_parser_instance
+    @mock.patch("pulp.oid_validation.oid_validation.repo_auth_config.get_config")
+    def test_config(self, mock_get_config):
+        self.assertTrue(oid_validation._config() is mock_get_config.return_value)
 
-        oid_validation._config()
+    @mock.patch("pulp.oid_validation.oid_validation.repo_auth_config.get_derived")
+    def test_validator(self, mock_get_derived):
+        validator = oid_validation._validator()
 
-        mock_config_parser_instance.read.assert_called_once_with('/etc/pulp/repo_auth.conf')
+        self.assertTrue(validator is mock_get_derived.return_value)
+        mock_get_derived.assert_called_once_with('oid_validator', oid_validation.OidValidator)
 
     def test_get_repo_url_prefixes_from_config(self):
         mock_config = mock.Mock()
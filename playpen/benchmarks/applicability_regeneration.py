@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+Benchmark applicability regeneration for a single repository against the number of consumer
+profiles that have applicability data for it.
+
+Both the batched regeneration path used by the tasks dispatched by
+regenerate_applicability_for_repos() and the previous path, which loaded, recalculated and saved
+one RepoProfileApplicability document at a time, are timed. A trivial in-process profiler is
+used so that the numbers reflect the database and bookkeeping cost rather than the cost of a real
+profiler.
+"""
+import common
+
+from pulp.plugins.profiler import Profiler
+from pulp.server.db.model.consumer import RepoProfileApplicability, UnitProfile
+from pulp.server.managers.consumer.applicability import ApplicabilityRegenerationManager
+
+
+REPO_ID = 'benchmark-repo'
+TYPE_ID = 'benchmark_rpm'
+
+
+class BenchmarkProfiler(Profiler):
+
+    @classmethod
+    def metadata(cls):
+        return {'id': 'benchmark_profiler', 'display_name': 'Benchmark', 'types': [TYPE_ID]}
+
+    def calculate_applicable_units(self, profile, repo_id, call_config, conduit):
+        return {TYPE_ID: [p['name'] for p in profile if p['version'] == '1.0']}
+
+
+def install_profiler():
+    """
+    Make the applicability manager use the benchmark profiler and treat the benchmark repository
+    as containing units of the benchmark type.
+    """
+    profiler = BenchmarkProfiler()
+    ApplicabilityRegenerationManager._profiler = staticmethod(lambda type_id: (profiler, {}))
+    ApplicabilityRegenerationManager._get_existing_repo_content_types = staticmethod(
+        lambda repo_id: [TYPE_ID])
+
+
+def populate(count):
+    """
+    Create count consumer profiles, each with existing applicability data for the benchmark repo.
+    """
+    UnitProfile.get_collection().remove()
+    RepoProfileApplicability.get_collection().remove()
+    profiles = []
+    applicabilities = []
+    for i in range(count):
+        # Every consumer has a distinct profile, so every profile has its own applicability
+        profile = [{'name': 'package-%d' % n, 'version': '%d.0' % ((i + n) % 3)} for n in range(20)]
+        profile.append({'name': 'consumer-%d' % i, 'version': '1.0'})
+        unit_profile = UnitProfile('consumer-%d' % i, TYPE_ID, profile)
+        profiles.append(dict(unit_profile))
+        applicabilities.append({'profile_hash': unit_profile.profile_hash, 'repo_id': REPO_ID,
+                                'profile': profile, 'applicability': {}})
+    for start in range(0, count, 1000):
+        UnitProfile.get_collection().insert(profiles[start:start + 1000])
+        RepoProfileApplicability.get_collection().insert(applicabilities[start:start + 1000])
+
+
+def regenerate_batched(repo_id):
+    """
+    Regenerate the applicability of every profile of the repo in a single chunk.
+    """
+    repo_profile_hashes = [(repo_id, a['profile_hash']) for a in
+                           RepoProfileApplicability.get_collection().find(
+                               {'repo_id': repo_id}, fields=['profile_hash'])]
+    return ApplicabilityRegenerationManager.regenerate_applicability_for_repo_profiles(
+        repo_profile_hashes)
+
+
+def regenerate_one_at_a_time(repo_id):
+    """
+    The regeneration loop used before batching was introduced.
+    """
+    existing_applicabilities = RepoProfileApplicability.get_collection().find(
+        {'repo_id': repo_id}).batch_size(5)
+    for existing_applicability in existing_applicabilities:
+        existing_applicability = RepoProfileApplicability(**dict(existing_applicability))
+        profile_hash = existing_applicability['profile_hash']
+        unit_profile = UnitProfile.get_collection().find_one({'profile_hash': profile_hash},
+                                                             fields=['id', 'content_type'])
+        if unit_profile is None:
+            continue
+        ApplicabilityRegenerationManager.regenerate_applicability(
+            profile_hash, unit_profile['content_type'], unit_profile['id'], repo_id,
+            existing_applicability)
+
+
+def main():
+    parser = common.option_parser('usage: %prog [options]', '1000,5000,10000,40000')
+    parser.add_option('--skip-legacy', action='store_true', default=False,
+                      help='do not time the one-document-at-a-time path')
+    options, args = parser.parse_args()
+
+    common.connect(options.database)
+    install_profiler()
+    rows = []
+    try:
+        for size in common.sizes(options):
+            populate(size)
+            batched, updated = common.timed(regenerate_batched, REPO_ID)
+            row = [size, batched, size / batched]
+            if not options.skip_legacy:
+                legacy, unused = common.timed(regenerate_one_at_a_time, REPO_ID)
+                row.extend([legacy, legacy / batched])
+            rows.append(row)
+    finally:
+        common.drop(options.database)
+
+    headers = ['profiles', 'batched (s)', 'profiles/s']
+    if not options.skip_legacy:
+        headers.extend(['one at a time (s)', 'speedup'])
+    common.print_table(headers, rows)
+
+
+if __name__ == '__main__':
+    main()
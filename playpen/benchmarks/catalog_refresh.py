@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+Benchmark a cataloger plugin adding entries to the content catalog during a refresh.
+
+Synthetic entries are added through a CatalogerConduit into an empty catalog. Buffered adding,
+enabled by the catalog_flush_size of the content source and which writes the entries with one
+bulk insert per flush, is timed together with unbuffered adding, which inserts each entry in
+turn.
+"""
+import uuid
+
+import common
+
+from pulp.plugins.conduits.cataloger import CatalogerConduit
+from pulp.server.db.model.content import ContentCatalog
+
+
+TYPE_ID = 'benchmark_unit'
+SOURCE_ID = 'benchmark-source'
+EXPIRES = 3600
+FLUSH_SIZE = 1000
+
+
+def entries(count):
+    """
+    :return: count (unit_key, url) tuples
+    :rtype:  list of tuple
+    """
+    result = []
+    for i in range(count):
+        unit_key = {'name': 'unit-%d' % i, 'version': '1.0.%d' % i, 'release': '1',
+                    'checksum': str(uuid.uuid4())}
+        result.append((unit_key, 'file://redhat.com/unit-%d' % i))
+    return result
+
+
+def refresh(units, flush_size):
+    """
+    Add the entries through a conduit with the given flush size.
+
+    :return: the number of entries added
+    :rtype:  int
+    """
+    conduit = CatalogerConduit(SOURCE_ID, EXPIRES, flush_size)
+    for unit_key, url in units:
+        conduit.add_entry(TYPE_ID, unit_key, url)
+    conduit.flush()
+    return conduit.added_count
+
+
+def main():
+    parser = common.option_parser('usage: %prog [options]', '5000,50000')
+    options, args = parser.parse_args()
+
+    common.connect(options.database)
+    collection = ContentCatalog.get_collection()
+    rows = []
+    try:
+        for size in common.sizes(options):
+            units = entries(size)
+            row = [size]
+            for flush_size in (FLUSH_SIZE, 0):
+                collection.remove()
+                seconds, added = common.timed(refresh, units, flush_size)
+                assert added == size == collection.find().count()
+                row.append(seconds)
+            rows.append(row + [row[2] / row[1]])
+    finally:
+        common.drop(options.database)
+
+    common.print_table(['entries', 'buffered (s)', 'unbuffered (s)', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
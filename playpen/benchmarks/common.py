@@ -0,0 +1,93 @@
+"""
+Helpers shared by the benchmark scripts in this directory.
+"""
+import time
+from optparse import OptionParser
+
+from pulp.server.db import connection
+
+
+DEFAULT_DATABASE = 'pulp_benchmark'
+
+
+def option_parser(usage, default_sizes):
+    """
+    Build an option parser with the options understood by every benchmark.
+
+    :param usage:         usage string for the script
+    :type  usage:         str
+    :param default_sizes: comma separated list of data set sizes to run
+    :type  default_sizes: str
+    :return: an option parser
+    :rtype:  optparse.OptionParser
+    """
+    parser = OptionParser(usage=usage)
+    parser.add_option('--database', default=DEFAULT_DATABASE,
+                      help='scratch database to use; it is dropped! [default: %default]')
+    parser.add_option('--sizes', default=default_sizes,
+                      help='comma separated data set sizes [default: %default]')
+    return parser
+
+
+def sizes(options):
+    """
+    :return: the data set sizes requested on the command line
+    :rtype:  list of int
+    """
+    return [int(s) for s in options.sizes.split(',') if s.strip()]
+
+
+def connect(database):
+    """
+    Initialize the database connection to a freshly dropped scratch database.
+
+    :param database: name of the scratch database
+    :type  database: str
+    """
+    connection.initialize(name=database)
+    drop(database)
+
+
+def drop(database):
+    """
+    Drop the scratch database.
+
+    :param database: name of the scratch database
+    :type  database: str
+    """
+    connection._CONNECTION.drop_database(database)
+
+
+def timed(function, *args, **kwargs):
+    """
+    Call function and measure the wall clock time it took.
+
+    :return: (seconds, return value) tuple
+    :rtype:  tuple
+    """
+    start = time.time()
+    result = function(*args, **kwargs)
+    return time.time() - start, result
+
+
+def print_table(headers, rows):
+    """
+    Print rows of results as a simple table.
+
+    :param headers: column titles
+    :type  headers: list of str
+    :param rows:    rows of values, one value per column
+    :type  rows:    list of list
+    """
+    formatted = [[_format(v) for v in row] for row in rows]
+    widths = [max([len(h)] + [len(row[i]) for row in formatted]) for i, h in enumerate(headers)]
+    print '  '.join(h.rjust(w) for h, w in zip(headers, widths))
+    print '  '.join('-' * w for w in widths)
+    for row in formatted:
+        print '  '.join(v.rjust(w) for v, w in zip(row, widths))
+
+
+def _format(value):
+    if isinstance(value, float):
+        return '%.3f' % value
+    return str(value)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""
+Benchmark the nodes child reading a units file into the unit inventory.
+
+A synthetic units file is written for each size and read into a UnitInventory, then every
+unit is fetched through its reference the way a sync of an empty child repository does. The
+memory mapped reader, which keeps only compact keys and (offset, length) references in the
+inventory, is timed together with the previous reader, which kept every decoded unit in the
+inventory and opened the units file again for each fetch.
+
+Each reader runs in a forked process so that the peak resident set size reported for it
+is its own.
+"""
+import json
+import os
+import resource
+import shutil
+import tempfile
+from optparse import OptionParser
+
+import common
+
+from pulp_node import constants
+from pulp_node.importers.inventory import UnitInventory
+from pulp_node.manifest import UnitIterator, UnitWriter
+
+
+METADATA = dict(('field_%d' % n, 'value ' * 10) for n in range(10))
+
+
+def write_units(path, count):
+    """
+    Write an uncompressed units file of count units.
+    """
+    with UnitWriter(path, compressed=False) as writer:
+        for n in range(count):
+            unit = {
+                'unit_id': str(n),
+                'type_id': 'rpm',
+                'unit_key': {'name': 'unit-%d' % n, 'version': '1.0', 'release': '1'},
+                'metadata': METADATA,
+                constants.STORAGE_PATH: '/var/lib/pulp/content/rpm/unit-%d.rpm' % n,
+                constants.RELATIVE_PATH: 'rpm/unit-%d.rpm' % n,
+                constants.FILE_SIZE: 1024,
+            }
+            writer.add(unit)
+
+
+class LegacyUniqueKey(object):
+    """
+    The inventory key as it was before keys were digested.
+    """
+
+    def __init__(self, unit):
+        self.uid = (unit['type_id'], tuple(sorted(unit['unit_key'].items())))
+
+    def __hash__(self):
+        return hash(self.uid)
+
+    def __eq__(self, other):
+        return self.uid == other.uid
+
+
+class LegacyUnitRef(object):
+    """
+    The unit reference as it was before the units file was memory mapped.
+    """
+
+    def __init__(self, path, offset, length):
+        self.path = path
+        self.offset = offset
+        self.length = length
+
+    def fetch(self):
+        with open(self.path) as fp:
+            fp.seek(self.offset)
+            return json.loads(fp.read(self.length))
+
+
+def legacy_units(path):
+    with open(path) as fp:
+        while True:
+            begin = fp.tell()
+            json_unit = fp.readline()
+            if not json_unit:
+                break
+            yield json.loads(json_unit), LegacyUnitRef(path, begin, fp.tell() - begin)
+
+
+def legacy_sync(path, count):
+    """
+    The inventory and fetching as they were before the units file was memory mapped.
+    """
+    inventory = {}
+    for unit, ref in legacy_units(path):
+        unit.pop('metadata', None)
+        inventory[LegacyUniqueKey(unit)] = (unit, ref)
+    for unit, ref in inventory.values():
+        ref.fetch()
+    return len(inventory)
+
+
+def mapped_sync(path, count):
+    inventory = UnitInventory('', UnitIterator(path, count), [])
+    refs = inventory.units_on_parent_only()
+    for ref in refs:
+        ref.fetch()
+    return len(refs)
+
+
+def run(function, path, count):
+    """
+    Run function in a forked process.
+
+    :return: (seconds, peak resident set size in KB) tuple
+    :rtype:  tuple
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        seconds, synced = common.timed(function, path, count)
+        assert synced == count
+        os.write(write_fd, repr(seconds))
+        os._exit(0)
+    os.close(write_fd)
+    seconds = float(os.read(read_fd, 64))
+    os.close(read_fd)
+    unused, status, usage = os.wait4(pid, 0)
+    assert status == 0
+    return seconds, usage.ru_maxrss
+
+
+def main():
+    parser = OptionParser(usage='usage: %prog [options]')
+    parser.add_option('--sizes', default='10000,100000',
+                      help='comma separated numbers of units [default: %default]')
+    options, args = parser.parse_args()
+
+    print 'RSS at start (KB): %d' % resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tmp_dir = tempfile.mkdtemp()
+    rows = []
+    try:
+        for size in common.sizes(options):
+            path = os.path.join(tmp_dir, 'units.json')
+            write_units(path, size)
+            mapped, mapped_rss = run(mapped_sync, path, size)
+            legacy, legacy_rss = run(legacy_sync, path, size)
+            rows.append([size, mapped, mapped_rss, legacy, legacy_rss, legacy / mapped])
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    common.print_table(
+        ['units', 'mapped (s)', 'mapped RSS (KB)', 'legacy (s)', 'legacy RSS (KB)', 'speedup'],
+        rows)
+
+
+if __name__ == '__main__':
+    main()
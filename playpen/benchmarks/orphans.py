@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Benchmark orphan detection against the number of content units of a type.
+
+A tenth of the synthetic units are left orphaned; the rest are associated with a repository.
+Counting orphans with the paged path used by OrphanManager is timed together with the previous
+path, which issued one repo_content_units count query per content unit.
+"""
+import uuid
+
+import common
+
+from pulp.plugins.types import database as content_types_db
+from pulp.plugins.types.model import TypeDefinition
+from pulp.server.db.model.repository import RepoContentUnit
+from pulp.server.managers.content.orphan import OrphanManager
+
+
+TYPE_DEF = TypeDefinition('benchmark_unit', 'Benchmark Unit', None, 'name', [], [])
+REPO_ID = 'benchmark-repo'
+
+
+def populate(count):
+    """
+    Create count content units, associating all but every tenth one with the benchmark repo.
+
+    :return: the number of orphaned units
+    :rtype:  int
+    """
+    content_types_db.clean()
+    content_types_db.update_database([TYPE_DEF])
+    RepoContentUnit.get_collection().remove()
+    units_collection = content_types_db.type_units_collection(TYPE_DEF.id)
+    orphans = 0
+    for start in range(0, count, 1000):
+        units = []
+        associations = []
+        for i in range(start, min(start + 1000, count)):
+            unit_id = str(uuid.uuid4())
+            units.append({'_id': unit_id, 'name': 'unit-%d' % i,
+                          '_content_type_id': TYPE_DEF.id})
+            if i % 10:
+                associations.append({'repo_id': REPO_ID, 'unit_id': unit_id,
+                                     'unit_type_id': TYPE_DEF.id})
+            else:
+                orphans += 1
+        units_collection.insert(units)
+        if associations:
+            RepoContentUnit.get_collection().insert(associations)
+    return orphans
+
+
+def count_one_at_a_time(content_type_id):
+    """
+    The orphan counting loop used before orphans were found a page at a time.
+    """
+    units_collection = content_types_db.type_units_collection(content_type_id)
+    repo_content_units_collection = RepoContentUnit.get_collection()
+    count = 0
+    for content_unit in units_collection.find({}, fields=['_id']):
+        if repo_content_units_collection.find({'unit_id': content_unit['_id']}).count() > 0:
+            continue
+        count += 1
+    return count
+
+
+def main():
+    parser = common.option_parser('usage: %prog [options]', '10000,100000,1000000')
+    parser.add_option('--skip-legacy', action='store_true', default=False,
+                      help='do not time the one-count-per-unit path')
+    options, args = parser.parse_args()
+
+    common.connect(options.database)
+    rows = []
+    try:
+        for size in common.sizes(options):
+            expected = populate(size)
+            paged, count = common.timed(OrphanManager().orphans_count_by_type, TYPE_DEF.id)
+            assert count == expected
+            row = [size, expected, paged, size / paged]
+            if not options.skip_legacy:
+                legacy, count = common.timed(count_one_at_a_time, TYPE_DEF.id)
+                assert count == expected
+                row.extend([legacy, legacy / paged])
+            rows.append(row)
+    finally:
+        content_types_db.clean()
+        common.drop(options.database)
+
+    headers = ['units', 'orphans', 'paged (s)', 'units/s']
+    if not options.skip_legacy:
+        headers.extend(['one at a time (s)', 'speedup'])
+    common.print_table(headers, rows)
+
+
+if __name__ == '__main__':
+    main()
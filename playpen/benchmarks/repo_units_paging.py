@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+"""
+Benchmark fetching a deep page of the units associated with a repository.
+
+Synthetic units of one type are associated with a repository, and the last page of them
+is fetched through RepoUnitAssociationQueryManager.get_units, which serves both unit
+searches and the plugin conduits, ordered by association creation and in the default (unit
+key) order. The paged query, which has the database perform the skip and limit when ordering
+by association fields and otherwise reads only the unit IDs of the associations, is timed
+together with the previous query, which loaded every association of the repository into
+memory before skipping to the page.
+"""
+import itertools
+import uuid
+
+import common
+
+from pulp.plugins.types import database as content_types_db
+from pulp.plugins.types.model import TypeDefinition
+from pulp.server.db import model
+from pulp.server.db.model.criteria import UnitAssociationCriteria
+from pulp.server.db.model.repository import RepoContentUnit
+from pulp.server.managers import factory as manager_factory
+from pulp.server.managers.repo.unit_association_query import RepoUnitAssociationQueryManager
+
+
+TYPE_DEF = TypeDefinition('benchmark_unit', 'Benchmark Unit', None, 'name', [], [])
+REPO_ID = 'benchmark-repo'
+PAGE = 100
+RUNS = 5
+
+
+def populate(count):
+    """
+    Create count content units associated with the repository.
+    """
+    content_types_db.clean()
+    content_types_db.update_database([TYPE_DEF])
+    RepoContentUnit.get_collection().remove()
+    model.Repository.objects.delete()
+    model.Repository(repo_id=REPO_ID).save()
+    units_collection = content_types_db.type_units_collection(TYPE_DEF.id)
+    for start in range(0, count, 1000):
+        units = []
+        associations = []
+        for i in range(start, min(start + 1000, count)):
+            unit_id = str(uuid.uuid4())
+            units.append({'_id': unit_id, 'name': 'unit-%09d' % i,
+                          '_content_type_id': TYPE_DEF.id})
+            association = RepoContentUnit(REPO_ID, unit_id, TYPE_DEF.id)
+            association['created'] = '%09d' % i
+            associations.append(association)
+        units_collection.insert(units)
+        RepoContentUnit.get_collection().insert(associations)
+
+
+def legacy_get_units(repo_id, criteria):
+    """
+    get_units as it was before the associations were read a page at a time.
+    """
+    manager = RepoUnitAssociationQueryManager
+    cursor = RepoContentUnit.get_collection().find({'repo_id': repo_id})
+    associations = cursor
+    if criteria.association_sort:
+        cursor.sort(criteria.association_sort)
+        associations = manager._with_skip_and_limit(cursor, criteria.skip, criteria.limit)
+    ordered_ids = []
+    associations_lookup = {}
+    for association in associations:
+        unit_type_id = association['unit_type_id']
+        unit_id = association['unit_id']
+        ordered_ids.append((unit_type_id, unit_id))
+        associations_lookup.setdefault(unit_type_id, {}).setdefault(unit_id, []).append(
+            association)
+    units_cursors = [manager._associated_units_by_type_cursor(t, criteria, ids.keys())
+                     for t, ids in sorted(associations_lookup.items())]
+    if criteria.association_sort:
+        units = dict(((u['_content_type_id'], u['_id']), u)
+                     for u in itertools.chain(*units_cursors))
+        return list(manager._merged_units_duplicate_units(
+            associations_lookup, (units[i] for i in ordered_ids if i in units)))
+    units_cursors = manager._associated_units_cursors_with_skip(units_cursors, criteria.skip)
+    units_cursors = manager._associated_units_cursors_with_limit(units_cursors, criteria.limit)
+    return list(manager._merged_units_unique_units(associations_lookup,
+                                                   itertools.chain(*units_cursors)))
+
+
+def best(function, repo_id, criteria):
+    """
+    :return: the fastest of RUNS calls in seconds
+    :rtype:  float
+    """
+    times = []
+    for i in range(RUNS):
+        seconds, units = common.timed(function, repo_id, criteria)
+        assert len(units) == PAGE
+        times.append(seconds)
+    return min(times)
+
+
+def main():
+    parser = common.option_parser('usage: %prog [options]', '10000,100000')
+    options, args = parser.parse_args()
+
+    manager_factory.initialize()
+    common.connect(options.database)
+    query_manager = RepoUnitAssociationQueryManager()
+    rows = []
+    try:
+        for size in common.sizes(options):
+            populate(size)
+            skip = size - PAGE
+            by_created = UnitAssociationCriteria(association_sort=[('created', 1)],
+                                                 skip=skip, limit=PAGE)
+            by_unit = UnitAssociationCriteria(skip=skip, limit=PAGE)
+            row = [size]
+            for criteria in (by_created, by_unit):
+                paged = best(query_manager.get_units, REPO_ID, criteria)
+                legacy = best(legacy_get_units, REPO_ID, criteria)
+                row.extend([paged, legacy, legacy / paged])
+            rows.append(row)
+    finally:
+        content_types_db.clean()
+        common.drop(options.database)
+
+    common.print_table(['units', 'by created (s)', 'legacy (s)', 'speedup',
+                        'by unit key (s)', 'legacy (s)', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
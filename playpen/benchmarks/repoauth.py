@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Benchmark the per-request overhead of the repo auth WSGI hook.
+
+A scratch repo auth configuration enables repo authentication and disables every installed
+authenticator, so that only the work done by the hook itself is timed. The hook, which caches
+the configuration and the authenticators until the configuration file changes, is timed
+together with the previous path, which scanned the entry points and parsed the configuration
+file on every request.
+"""
+from ConfigParser import SafeConfigParser
+from optparse import OptionParser
+import os
+import shutil
+import tempfile
+
+from pkg_resources import iter_entry_points
+
+import common
+
+from pulp.repoauth import config as repo_auth_config, wsgi
+
+
+CONFIG = """[main]
+enabled: true
+log_failed_cert_verbose: false
+disabled_authenticators: %s
+"""
+
+
+class Errors(object):
+    def write(self, message):
+        pass
+
+
+def write_config(path):
+    names = [ep.name for ep in iter_entry_points(group=wsgi.AUTH_ENTRY_POINT)]
+    f = open(path, 'w')
+    f.write(CONFIG % ','.join(names))
+    f.close()
+
+
+def legacy_allow_access(environ, path):
+    """
+    The WSGI hook as it was before the configuration was cached.
+    """
+    config = SafeConfigParser()
+    config.read(path)
+    if not config.getboolean('main', 'enabled'):
+        return True
+
+    authenticators = {}
+    for ep in iter_entry_points(group=wsgi.AUTH_ENTRY_POINT):
+        authenticators.update({ep.name: ep.load()})
+
+    config = SafeConfigParser()
+    config.read(path)
+    disabled_authenticators = []
+    if config.has_option('main', 'disabled_authenticators'):
+        disabled_authenticators = config.get('main', 'disabled_authenticators').split(',')
+
+    for auth_method in authenticators:
+        if auth_method in disabled_authenticators:
+            continue
+        if not authenticators[auth_method](environ):
+            return False
+    return True
+
+
+def repeat(count, function, *args):
+    for i in xrange(count):
+        function(*args)
+
+
+def main():
+    parser = OptionParser(usage='usage: %prog [options]')
+    parser.add_option('--requests', default='1000,10000,100000',
+                      help='comma separated numbers of requests [default: %default]')
+    options, args = parser.parse_args()
+
+    working_dir = tempfile.mkdtemp()
+    path = os.path.join(working_dir, 'repo_auth.conf')
+    write_config(path)
+    repo_auth_config._CACHE = repo_auth_config.ConfigCache(path)
+    environ = {'wsgi.errors': Errors()}
+
+    rows = []
+    try:
+        for count in [int(s) for s in options.requests.split(',') if s.strip()]:
+            cached = common.timed(repeat, count, wsgi.allow_access, environ, None)[0]
+            legacy = common.timed(repeat, count, legacy_allow_access, environ, path)[0]
+            rows.append([count, cached, cached / count * 1e6, legacy, legacy / count * 1e6,
+                         legacy / cached])
+    finally:
+        shutil.rmtree(working_dir)
+
+    common.print_table(['requests', 'cached (s)', 'us/request', 'uncached (s)', 'us/request',
+                        'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
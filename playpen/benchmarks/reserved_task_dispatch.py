@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+Benchmark the resource manager dispatching reserved tasks to workers.
+
+Tasks that each reserve a different repository, as a batch of repository syncs does, are
+dispatched to simulated workers. Each worker completes its tasks at once and releases their
+reservations as _release_resource does. The ReservationDispatcher, which keeps the workers and
+reservations in memory and is woken by each release, is timed together with the previous
+loop, which read every worker and reservation from the database and slept a quarter of a
+second whenever no worker was free.
+
+The simulated workers report releases by calling the dispatcher directly, standing in for the
+message that the ReleaseMonitor receives through the broker.
+"""
+import Queue
+import threading
+import time
+
+import common
+
+from pulp.server.async import tasks
+from pulp.server.db.model import ReservedResource, Worker
+
+
+class SimulatedWorker(threading.Thread):
+    """
+    Runs the tasks routed to a worker, each of which completes at once.
+    """
+
+    def __init__(self, worker_name, dispatcher):
+        super(SimulatedWorker, self).__init__(name=worker_name)
+        self.daemon = True
+        self.dispatcher = dispatcher
+        self.queue = Queue.Queue()
+
+    def run(self):
+        while True:
+            task_id = self.queue.get()
+            if task_id is None:
+                return
+            ReservedResource.objects(task_id=task_id).delete()
+            if self.dispatcher is not None:
+                self.dispatcher.released(task_id)
+
+
+def legacy_reserve(task_id, resource_id):
+    """
+    The worker selection loop of _queue_reserved_task before the ReservationDispatcher.
+
+    The worker holding a reservation of the resource is preferred, then any worker without
+    reservations; the loop sleeps a quarter of a second while neither exists.
+    """
+    while True:
+        reservation = ReservedResource.objects(resource_id=resource_id).first()
+        if reservation:
+            worker = Worker.objects(name=reservation['worker_name']).first()
+            break
+
+        workers = dict((w['name'], w) for w in Worker.objects())
+        reserved_names = set(r['worker_name'] for r in ReservedResource.objects.all())
+        unreserved_names = set(filter(tasks._is_worker, workers)) - reserved_names
+        if unreserved_names:
+            worker = workers[unreserved_names.pop()]
+            break
+
+        time.sleep(0.25)
+
+    ReservedResource(task_id=task_id, worker_name=worker['name'], resource_id=resource_id).save()
+    return worker['name']
+
+
+def dispatch(count, worker_count, dispatcher):
+    """
+    Dispatch count tasks to worker_count simulated workers.
+
+    :param dispatcher: the dispatcher to reserve with, or None for the legacy loop
+    :type  dispatcher: pulp.server.async.tasks.ReservationDispatcher
+    :return: the number of tasks completed
+    :rtype:  int
+    """
+    Worker.objects().delete()
+    ReservedResource.objects.delete()
+    workers = {}
+    for i in range(worker_count):
+        name = 'reserved_resource_worker-%d@benchmark' % i
+        Worker(name=name).save()
+        workers[name] = SimulatedWorker(name, dispatcher)
+        workers[name].start()
+    reserve = legacy_reserve if dispatcher is None else dispatcher.reserve
+
+    for i in range(count):
+        task_id = 'task-%d' % i
+        workers[reserve(task_id, 'repository:repo-%d' % i)].queue.put(task_id)
+
+    for worker in workers.values():
+        worker.queue.put(None)
+        worker.join()
+    assert ReservedResource.objects.count() == 0
+    return count
+
+
+def main():
+    parser = common.option_parser('usage: %prog [options]', '500,2000')
+    parser.add_option('--workers', default='4,16',
+                      help='comma separated numbers of workers [default: %default]')
+    options, args = parser.parse_args()
+
+    common.connect(options.database)
+    rows = []
+    try:
+        for size in common.sizes(options):
+            for worker_count in [int(w) for w in options.workers.split(',') if w.strip()]:
+                seconds, count = common.timed(
+                    dispatch, size, worker_count, tasks.ReservationDispatcher())
+                legacy, count = common.timed(dispatch, size, worker_count, None)
+                rows.append([size, worker_count, size / seconds, size / legacy,
+                             legacy / seconds])
+    finally:
+        common.drop(options.database)
+
+    common.print_table(['tasks', 'workers', 'dispatcher (tasks/s)', 'legacy (tasks/s)',
+                        'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
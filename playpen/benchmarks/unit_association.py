@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+"""
+Benchmark copying units between repositories and removing them again.
+
+Synthetic units of one type are associated with a source repository. Copying them all to
+a destination repository through RepoUnitAssociationManager.associate_all_by_ids, which
+writes the associations with bulk upserts, is timed together with the previous path, which
+issued a count, a find_one and a save for each unit. Removing them from the destination
+through unassociate_all_by_ids, which removes the associations with bulk deletes and takes
+the count delta from the result, is timed together with the previous path, which issued one
+count query per unit after the removal.
+"""
+import uuid
+
+import common
+
+from pulp.plugins.types import database as content_types_db
+from pulp.plugins.types.model import TypeDefinition
+from pulp.server.controllers import repository as repo_controller
+from pulp.server.db import model
+from pulp.server.db.model.criteria import UnitAssociationCriteria
+from pulp.server.db.model.repository import RepoContentUnit
+from pulp.server.managers import factory as manager_factory
+from pulp.server.managers.repo.unit_association import RepoUnitAssociationManager
+
+
+TYPE_DEF = TypeDefinition('benchmark_unit', 'Benchmark Unit', None, 'name', [], [])
+SOURCE_REPO_ID = 'benchmark-source'
+DEST_REPO_ID = 'benchmark-dest'
+
+
+def populate(count):
+    """
+    Create count content units associated with the source repository.
+
+    :return: the IDs of the units
+    :rtype:  list of str
+    """
+    content_types_db.clean()
+    content_types_db.update_database([TYPE_DEF])
+    RepoContentUnit.get_collection().remove()
+    model.Repository.objects.delete()
+    for repo_id in (SOURCE_REPO_ID, DEST_REPO_ID):
+        model.Repository(repo_id=repo_id).save()
+    units_collection = content_types_db.type_units_collection(TYPE_DEF.id)
+    unit_ids = []
+    for start in range(0, count, 1000):
+        units = []
+        associations = []
+        for i in range(start, min(start + 1000, count)):
+            unit_id = str(uuid.uuid4())
+            units.append({'_id': unit_id, 'name': 'unit-%d' % i,
+                          '_content_type_id': TYPE_DEF.id})
+            associations.append(RepoContentUnit(SOURCE_REPO_ID, unit_id, TYPE_DEF.id))
+            unit_ids.append(unit_id)
+        units_collection.insert(units)
+        RepoContentUnit.get_collection().insert(associations)
+    return unit_ids
+
+
+def associated_count(repo_id):
+    return RepoContentUnit.get_collection().find({'repo_id': repo_id}).count()
+
+
+def copy_one_at_a_time(repo_id, unit_type_id, unit_ids):
+    """
+    The association loop used before associations were written in bulk.
+    """
+    collection = RepoContentUnit.get_collection()
+    unique_count = 0
+    for unit_id in unit_ids:
+        if not RepoUnitAssociationManager.association_exists(repo_id, unit_id, unit_type_id):
+            unique_count += 1
+        spec = {'repo_id': repo_id, 'unit_id': unit_id, 'unit_type_id': unit_type_id}
+        if collection.find_one(spec) is not None:
+            continue
+        collection.save(RepoContentUnit(repo_id, unit_id, unit_type_id))
+    if unique_count:
+        repo_controller.update_unit_count(repo_id, unit_type_id, unique_count)
+        repo_controller.update_last_unit_added(repo_id)
+    return unique_count
+
+
+def remove_one_at_a_time(repo_id, unit_type_id, unit_ids):
+    """
+    The unassociation path used before the count delta was taken from the bulk delete.
+    """
+    criteria = UnitAssociationCriteria(type_ids=[unit_type_id],
+                                       association_filters={'unit_id': {'$in': unit_ids}})
+    query_manager = manager_factory.repo_unit_association_query_manager()
+    units = query_manager.get_units(repo_id, criteria=criteria)
+    removed_ids = [u['unit_id'] for u in units]
+    RepoContentUnit.get_collection().remove(
+        {'repo_id': repo_id, 'unit_type_id': unit_type_id, 'unit_id': {'$in': removed_ids}})
+    unique_count = sum(1 for unit_id in removed_ids
+                       if not RepoUnitAssociationManager.association_exists(
+                           repo_id, unit_id, unit_type_id))
+    repo_controller.update_unit_count(repo_id, unit_type_id, -unique_count)
+    repo_controller.update_last_unit_removed(repo_id)
+    return unique_count
+
+
+def bulk_remove(repo_id, unit_type_id, unit_ids):
+    manager = RepoUnitAssociationManager()
+    result = manager.unassociate_all_by_ids(repo_id, unit_type_id, unit_ids,
+                                            notify_plugins=False)
+    return len(result['units_successful'])
+
+
+def main():
+    parser = common.option_parser('usage: %prog [options]', '10000,100000')
+    options, args = parser.parse_args()
+
+    manager_factory.initialize()
+    common.connect(options.database)
+    rows = []
+    try:
+        for size in common.sizes(options):
+            unit_ids = populate(size)
+            manager = RepoUnitAssociationManager()
+
+            bulk_copy, copied = common.timed(
+                manager.associate_all_by_ids, DEST_REPO_ID, TYPE_DEF.id, unit_ids)
+            assert copied == size == associated_count(DEST_REPO_ID)
+            bulk_rm, removed = common.timed(bulk_remove, DEST_REPO_ID, TYPE_DEF.id, unit_ids)
+            assert removed == size and associated_count(DEST_REPO_ID) == 0
+
+            legacy_copy, copied = common.timed(
+                copy_one_at_a_time, DEST_REPO_ID, TYPE_DEF.id, unit_ids)
+            assert copied == size == associated_count(DEST_REPO_ID)
+            legacy_rm, removed = common.timed(
+                remove_one_at_a_time, DEST_REPO_ID, TYPE_DEF.id, unit_ids)
+            assert removed == size and associated_count(DEST_REPO_ID) == 0
+
+            rows.append([size, bulk_copy, legacy_copy, legacy_copy / bulk_copy,
+                         bulk_rm, legacy_rm, legacy_rm / bulk_rm])
+    finally:
+        content_types_db.clean()
+        common.drop(options.database)
+
+    common.print_table(['units', 'bulk copy (s)', 'one at a time (s)', 'speedup',
+                        'bulk remove (s)', 'one at a time (s)', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Benchmark an importer saving units through its conduit, as it does during a sync.
+
+Synthetic units of one type are saved through AddUnitMixin.save_unit into an empty
+repository, and then saved again as a re-sync of the same content does. Buffered saving,
+enabled by setting flush_size on the conduit and which writes units and associations with
+bulk upserts once per flush, is timed together with unbuffered saving, which looks up,
+writes and associates each unit in turn.
+"""
+import common
+
+from pulp.plugins.conduits.mixins import AddUnitMixin
+from pulp.plugins.model import Unit
+from pulp.plugins.types import database as content_types_db
+from pulp.plugins.types.model import TypeDefinition
+from pulp.server.db import model
+from pulp.server.db.model.repository import RepoContentUnit
+from pulp.server.managers import factory as manager_factory
+
+
+TYPE_DEF = TypeDefinition('benchmark_unit', 'Benchmark Unit', None, ['name', 'version'], [], [])
+REPO_ID = 'benchmark-repo'
+FLUSH_SIZE = 1000
+
+
+def reset():
+    """
+    Remove all units and create an empty repository.
+    """
+    content_types_db.clean()
+    content_types_db.update_database([TYPE_DEF])
+    RepoContentUnit.get_collection().remove()
+    model.Repository.objects.delete()
+    model.Repository(repo_id=REPO_ID).save()
+
+
+def save(count, flush_size):
+    """
+    Save count units through a conduit with the given flush size.
+
+    :return: the number of units added and updated
+    :rtype:  tuple
+    """
+    conduit = AddUnitMixin(REPO_ID, 'benchmark-importer')
+    conduit.flush_size = flush_size
+    for i in range(count):
+        unit_key = {'name': 'unit-%d' % i, 'version': '1.0'}
+        metadata = {'summary': 'unit %d' % i, 'size': i}
+        unit = Unit(TYPE_DEF.id, unit_key, metadata, '/var/lib/pulp/content/unit-%d' % i)
+        conduit.save_unit(unit)
+    conduit.flush()
+    return conduit._added_count, conduit._updated_count
+
+
+def associated_count():
+    return RepoContentUnit.get_collection().find({'repo_id': REPO_ID}).count()
+
+
+def main():
+    parser = common.option_parser('usage: %prog [options]', '1000,10000,50000')
+    options, args = parser.parse_args()
+
+    manager_factory.initialize()
+    common.connect(options.database)
+    rows = []
+    try:
+        for size in common.sizes(options):
+            row = [size]
+            for flush_size in (FLUSH_SIZE, 0):
+                reset()
+                first, counts = common.timed(save, size, flush_size)
+                assert counts == (size, 0) and associated_count() == size
+                again, counts = common.timed(save, size, flush_size)
+                assert counts == (0, size) and associated_count() == size
+                row.extend([first, again])
+            rows.append(row + [row[3] / row[1], row[4] / row[2]])
+    finally:
+        content_types_db.clean()
+        common.drop(options.database)
+
+    common.print_table(['units', 'buffered sync (s)', 'buffered re-sync (s)',
+                        'unbuffered sync (s)', 'unbuffered re-sync (s)',
+                        'sync speedup', 're-sync speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
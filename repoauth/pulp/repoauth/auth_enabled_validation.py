@@ -5,11 +5,9 @@ to prevent the more costly tests from being run in the case the Pulp server
 doesn't care at all about repo authentication.
 '''
 
-from ConfigParser import SafeConfigParser
+from pulp.repoauth import config as repo_auth_config
 
-# This needs to be accessible on both Pulp and the CDS instances, so a
-# separate config file for repo auth purposes is used.
-CONFIG_FILENAME = '/etc/pulp/repo_auth.conf'
+CONFIG_FILENAME = repo_auth_config.CONFIG_FILENAME
 
 
 # -- framework------------------------------------------------------------------
@@ -30,6 +28,4 @@ def authenticate(environ):
 
 
 def _config():
-    config = SafeConfigParser()
-    config.read(CONFIG_FILENAME)
-    return config
+    return repo_auth_config.get_config()
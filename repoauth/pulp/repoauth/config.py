@@ -0,0 +1,133 @@
+'''
+Per-process cache of the repo auth configuration.
+
+The repo auth hooks run for every request made against the content served by
+Apache, so the configuration file is only parsed again when its modification
+time changes. Values that are expensive to derive from the configuration, such
+as the list of authenticators to run, are cached alongside it and discarded
+when the file changes.
+'''
+
+from ConfigParser import SafeConfigParser
+import os
+from threading import Lock
+
+# This needs to be accessible on both Pulp and the CDS instances, so a
+# separate config file for repo auth purposes is used.
+CONFIG_FILENAME = '/etc/pulp/repo_auth.conf'
+
+
+class ConfigCache(object):
+    '''
+    A parsed configuration file, read again whenever the file's modification
+    time changes.
+    '''
+
+    def __init__(self, filename):
+        '''
+        :param filename: absolute path to the configuration file
+        :type  filename: str
+        '''
+        self.filename = filename
+        self._lock = Lock()
+        self._mtime = None
+        self._config = None
+        self._derived = {}
+
+    def get(self):
+        '''
+        :return: the parsed configuration file
+        :rtype:  ConfigParser.SafeConfigParser
+        '''
+        mtime = self._read_mtime()
+        self._lock.acquire()
+        try:
+            if self._config is None or mtime != self._mtime:
+                config = SafeConfigParser()
+                config.read(self.filename)
+                self._config = config
+                self._mtime = mtime
+                self._derived = {}
+            return self._config
+        finally:
+            self._lock.release()
+
+    def get_derived(self, key, build):
+        '''
+        Return a value computed from the configuration, building it only if it
+        has not been built since the configuration was last read.
+
+        :param key: identifies the value
+        :type  key: str
+        :param build: called with the parsed configuration to build the value
+        :type  build: callable
+        :return: the value returned by build
+        '''
+        config = self.get()
+        self._lock.acquire()
+        try:
+            if self._config is not config:
+                # the file changed since get() returned; build from what was read
+                return build(config)
+            try:
+                return self._derived[key]
+            except KeyError:
+                value = build(config)
+                self._derived[key] = value
+                return value
+        finally:
+            self._lock.release()
+
+    def clear(self):
+        '''
+        Discard the cached configuration so that it is read again on next use.
+        '''
+        self._lock.acquire()
+        try:
+            self._config = None
+            self._mtime = None
+            self._derived = {}
+        finally:
+            self._lock.release()
+
+    def _read_mtime(self):
+        '''
+        :return: modification time of the configuration file; None if it does not exist
+        :rtype:  float or None
+        '''
+        try:
+            return os.stat(self.filename).st_mtime
+        except OSError:
+            return None
+
+
+_CACHE = ConfigCache(CONFIG_FILENAME)
+
+
+def get_config():
+    '''
+    :return: the parsed repo auth configuration
+    :rtype:  ConfigParser.SafeConfigParser
+    '''
+    return _CACHE.get()
+
+
+def get_derived(key, build):
+    '''
+    Return a value computed from the repo auth configuration, cached until the
+    configuration file changes.
+
+    :param key: identifies the value
+    :type  key: str
+    :param build: called with the parsed configuration to build the value
+    :type  build: callable
+    :return: the value returned by build
+    '''
+    return _CACHE.get_derived(key, build)
+
+
+def clear_cache():
+    '''
+    Discard the cached repo auth configuration and the values derived from it.
+    '''
+    _CACHE.clear()
@@ -3,6 +3,7 @@ This module contains utilities for manipulating a local store of protected
 repo information.
 '''
 
+from collections import deque
 import os
 from threading import RLock
 
@@ -14,6 +15,8 @@ WRITE_LOCK = RLock()
 class ProtectedRepoUtils:
     def __init__(self, config):
         self.config = config
+        self._index = None
+        self._index_key = None
 
     # -- public -------------------------------------------------------------------------
 
@@ -78,9 +81,115 @@ class ProtectedRepoUtils:
         f.load()
         return f.listings
 
+    def read_protected_repo_index(self):
+        '''
+        Returns an index of the protected repo listings that can be used to find
+        the repo a request URL belongs to. The index is kept between calls and is
+        only built again when the listings file changes.
+
+        @return: index of relative path URL to repo ID
+        @rtype:  ProtectedRepoIndex
+        '''
+        filename = self.config.get('repos', 'protected_repo_listing_file')
+        try:
+            stat = os.stat(filename)
+            key = (filename, stat.st_mtime, stat.st_size)
+        except OSError:
+            key = (filename, None, None)
+
+        if self._index is None or key != self._index_key:
+            self._index = ProtectedRepoIndex(self.read_protected_repo_listings())
+            self._index_key = key
+        return self._index
+
 
 # -- classes -------------------------------------------------------------------------
 
+class ProtectedRepoIndex:
+    '''
+    Aho-Corasick automaton of the protected repo relative paths, so that finding
+    the relative paths contained in a URL takes time proportional to the length
+    of the URL rather than to the number of protected repos.
+
+    Relative paths are inconsistent in Pulp, so a relative path matches when it
+    appears anywhere in the URL, which copes with a leading / being missing,
+    present or duplicated. When several relative paths match, the one that comes
+    first in the listings wins, as when the listings were searched in turn.
+    '''
+
+    def __init__(self, listings):
+        '''
+        @param listings: mapping of relative path URL to repo ID
+        @type  listings: dict {str, str}
+        '''
+        self.repo_ids = []
+        # Per state: the transitions by character, the failure state, and the position in
+        # the listings of the first relative path that ends at the state or at a suffix of it
+        self.goto = [{}]
+        self.fail = [0]
+        self.first = [None]
+
+        for position, (relative_path_url, repo_id) in enumerate(listings.items()):
+            self.repo_ids.append(repo_id)
+            state = 0
+            for char in relative_path_url:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.first.append(None)
+                    self.goto[state][char] = next_state
+                state = next_state
+            if self.first[state] is None:
+                self.first[state] = position
+
+        # Breadth first, so the failure state of a state is complete before the state itself
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            self.first[state] = _first(self.first[state], self.first[self.fail[state]])
+            for char, child in self.goto[state].items():
+                fail = self.fail[state]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[child] = self.goto[fail].get(char, 0)
+                queue.append(child)
+
+    def find(self, url):
+        '''
+        Finds the repo whose relative path appears in the given URL.
+
+        @param url: path portion of a request URL
+        @type  url: str
+
+        @return: ID of the matching repo; None if no protected repo matches
+        @rtype:  str
+        '''
+        state = 0
+        first = self.first[0]
+        for char in url:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            first = _first(first, self.first[state])
+        if first is None:
+            return None
+        return self.repo_ids[first]
+
+
+def _first(position, other):
+    '''
+    @return: the earlier of two listing positions, either of which may be None
+    @rtype:  int
+    '''
+    if position is None:
+        return other
+    if other is None:
+        return position
+    return min(position, other)
+
+
 class ProtectedRepoListingFile:
     def __init__(self, filename):
         '''
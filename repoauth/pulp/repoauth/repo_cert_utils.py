@@ -30,10 +30,14 @@ The validate_cert_bundle method is used to ensure that only these keys are prese
 in a cert bundle dict.
 '''
 
+from collections import deque, namedtuple
+import calendar
+import hashlib
+import itertools
 import logging
 import shutil
 import time
-from threading import RLock
+from threading import Lock, RLock
 import os
 
 from M2Crypto import X509, BIO
@@ -55,6 +59,105 @@ WRITE_LOCK = RLock()
 
 GLOBAL_BUNDLE_PREFIX = 'pulp-global-repo'
 
+# Maximum number of bundle files and of parsed CA certificate chains kept in memory
+CA_CACHE_SIZE = 256
+
+# Maximum number of client certificate verification results kept in memory
+VERIFICATION_CACHE_SIZE = 10000
+
+# Maximum number of seconds a verification result is kept; a result is never kept
+# past the notAfter date of the client certificate
+VERIFICATION_CACHE_TTL = 600
+
+
+class LRUCache(object):
+    '''
+    Thread safe mapping holding at most a fixed number of items; the least
+    recently used item is dropped to make room for a new one.
+
+    Each use of a key appends it to a queue along with a stamp from a counter.
+    The queue may hold stale entries for keys used again since; they are
+    skipped when evicting and discarded when the queue is compacted.
+    '''
+
+    def __init__(self, size):
+        '''
+        @param size: maximum number of items held
+        @type  size: int
+        '''
+        self.size = size
+        self._items = {}
+        self._order = deque()
+        self._stamps = itertools.count()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        self._lock.acquire()
+        try:
+            try:
+                entry = self._items[key]
+            except KeyError:
+                return default
+            self._touch(key, entry)
+            return entry[1]
+        finally:
+            self._lock.release()
+
+    def put(self, key, value):
+        self._lock.acquire()
+        try:
+            entry = [None, value]
+            self._items[key] = entry
+            self._touch(key, entry)
+            while len(self._items) > self.size:
+                stamp, oldest = self._order.popleft()
+                entry = self._items.get(oldest)
+                if entry is not None and entry[0] == stamp:
+                    del self._items[oldest]
+        finally:
+            self._lock.release()
+
+    def clear(self):
+        self._lock.acquire()
+        try:
+            self._items.clear()
+            self._order.clear()
+        finally:
+            self._lock.release()
+
+    def __len__(self):
+        return len(self._items)
+
+    def _touch(self, key, entry):
+        '''
+        Mark the entry of the key as the most recently used.
+        '''
+        entry[0] = self._stamps.next()
+        self._order.append((entry[0], key))
+        if len(self._order) > 2 * self.size:
+            self._order = deque(sorted((e[0], k) for k, e in self._items.iteritems()))
+
+
+# A parsed chain of CA certificates; the id identifies the chain's contents
+CAChain = namedtuple('CAChain', ['id', 'certs'])
+
+# Contents of the bundle files, keyed by filename, along with the mtime and size they were read at
+CERT_FILE_CACHE = LRUCache(CA_CACHE_SIZE)
+
+# Parsed CA chains keyed by their PEM encoded contents
+CA_CHAIN_CACHE = LRUCache(CA_CACHE_SIZE)
+
+# Client certificate verification results keyed by certificate fingerprint and CA chain id
+VERIFICATION_CACHE = LRUCache(VERIFICATION_CACHE_SIZE)
+
+
+def clear_caches():
+    '''
+    Discard the cached bundle files, CA chains and verification results.
+    '''
+    for cache in (CERT_FILE_CACHE, CA_CHAIN_CACHE, VERIFICATION_CACHE):
+        cache.clear()
+
 
 class RepoCertUtils:
     def __init__(self, config):
@@ -123,10 +226,8 @@ class RepoCertUtils:
         for suffix in pieces:
             filename = os.path.join(cert_dir, '%s.%s' % (GLOBAL_BUNDLE_PREFIX, suffix))
 
-            if os.path.exists(filename):
-                f = open(filename, 'r')
-                contents = f.read()
-                f.close()
+            contents = self._read_cert_file(filename)
+            if contents is not None:
                 result = result or {}
                 result[suffix] = contents
             elif self.log_failed_cert_verbose and log_func:
@@ -176,10 +277,8 @@ class RepoCertUtils:
         for suffix in pieces:
             filename = os.path.join(cert_dir, 'consumer-%s.%s' % (repo_id, suffix))
 
-            if os.path.exists(filename):
-                f = open(filename, 'r')
-                contents = f.read()
-                f.close()
+            contents = self._read_cert_file(filename)
+            if contents is not None:
                 result = result or {}
                 result[suffix] = contents
 
@@ -270,6 +369,10 @@ class RepoCertUtils:
         Validates a certificate against a CA certificate.
         Input expects PEM encoded strings.
 
+        The parsed CA certificates and the result of the verification are cached, so
+        validating a certificate again against the same CA certificates is a lookup
+        until the result expires, or the certificate does.
+
         @param cert_pem: PEM encoded certificate
         @type  cert_pem: str
 
@@ -285,9 +388,24 @@ class RepoCertUtils:
         '''
         if not log_func:
             log_func = LOG.info
+        ca_chain = self._parse_ca_chain(ca_pem, log_func)
+
+        key = (hashlib.sha1(cert_pem).hexdigest(), ca_chain.id)
+        now = time.time()
+        cached = VERIFICATION_CACHE.get(key)
+        if cached is not None and cached[1] > now:
+            valid = cached[0]
+            if not valid:
+                log_func('Cert verification failed against %d ca cert(s) (cached result)' %
+                         len(ca_chain.certs))
+            return valid
+
         cert = X509.load_cert_string(cert_pem)
-        ca_chain = self.get_certs_from_string(ca_pem, log_func)
-        return self.x509_verify_cert(cert, ca_chain, log_func=log_func)
+        valid = self.x509_verify_cert(cert, ca_chain.certs, log_func=log_func)
+        expires = min(now + VERIFICATION_CACHE_TTL, self._not_after(cert))
+        if expires > now:
+            VERIFICATION_CACHE.put(key, (valid, expires))
+        return valid
 
     def x509_verify_cert(self, cert, ca_certs, log_func=None):
         """
@@ -433,6 +551,71 @@ class RepoCertUtils:
 
     # -- private ----------------------------------------------------------------------------
 
+    def _read_cert_file(self, filename):
+        '''
+        Reads a bundle file. The contents are cached until the file's mtime or size
+        changes.
+
+        @param filename: absolute path to the file
+        @type  filename: str
+
+        @return: contents of the file; None if it does not exist
+        @rtype:  str
+        '''
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+
+        cached = CERT_FILE_CACHE.get(filename)
+        if cached is not None and cached[:2] == (stat.st_mtime, stat.st_size):
+            return cached[2]
+
+        f = open(filename, 'r')
+        try:
+            contents = f.read()
+        finally:
+            f.close()
+        CERT_FILE_CACHE.put(filename, (stat.st_mtime, stat.st_size, contents))
+        return contents
+
+    def _parse_ca_chain(self, ca_pem, log_func=None):
+        '''
+        Parses PEM encoded CA certificates, reusing a previous parse of the same
+        contents.
+
+        @param ca_pem: PEM encoded CA certificates
+        @type  ca_pem: str
+
+        @param log_func: logging function
+        @type log_func: function accepting a single string
+
+        @return: the parsed CA certificates
+        @rtype:  CAChain
+        '''
+        key = (ca_pem, self.max_num_certs_in_chain)
+        ca_chain = CA_CHAIN_CACHE.get(key)
+        if ca_chain is None:
+            ca_chain = CAChain(hashlib.sha1(ca_pem).hexdigest(),
+                               self.get_certs_from_string(ca_pem, log_func))
+            CA_CHAIN_CACHE.put(key, ca_chain)
+        return ca_chain
+
+    @staticmethod
+    def _not_after(cert):
+        '''
+        @param cert: a X509 certificate
+        @type cert: M2Crypto.X509.X509
+
+        @return: the certificate's notAfter date in seconds since the epoch; 0 if it
+                 cannot be read
+        @rtype:  float
+        '''
+        try:
+            return calendar.timegm(cert.get_not_after().get_datetime().utctimetuple())
+        except Exception:
+            return 0
+
     def _write_cert_bundle(self, file_prefix, cert_dir, bundle):
         '''
         Writes the files represented by the cert bundle to a directory on the
@@ -1,10 +1,9 @@
-from ConfigParser import SafeConfigParser
 from pkg_resources import iter_entry_points
 
-from pulp.repoauth import auth_enabled_validation
+from pulp.repoauth import auth_enabled_validation, config as repo_auth_config
 
 AUTH_ENTRY_POINT = 'pulp_content_authenticators'
-CONFIG_FILENAME = '/etc/pulp/repo_auth.conf'
+CONFIG_FILENAME = repo_auth_config.CONFIG_FILENAME
 
 
 def allow_access(environ, host):
@@ -13,6 +12,9 @@ def allow_access(environ, host):
     authentication.  If the authentication is successful, this method returns
     True.  If validation fails, False is returned.
 
+    The authenticators to run are looked up once per process and again only
+    when the repo auth configuration file changes.
+
     :param environ: environ passed in from mod_wsgi
     :type  environ: dict of env vars
 
@@ -28,31 +30,46 @@ def allow_access(environ, host):
     if auth_enabled_validation.authenticate(environ):
         return True
 
+    # loop through authenticators. If any return False, kick the user out.
+    for authenticator in repo_auth_config.get_derived(AUTH_ENTRY_POINT, _get_authenticators):
+        if not authenticator(environ):
+            return False
+
+    # if we get this far then the user is authorized
+    return True
+
+
+def _get_authenticators(config):
+    """
+    Load the authenticator methods that are not disabled in the configuration.
+
+    :param config: repo auth configuration
+    :type  config: ConfigParser.SafeConfigParser
+    :return: authenticator methods to try
+    :rtype:  list of callable
+    """
     # find all of the authenticator methods we need to try
     authenticators = {}
     for ep in iter_entry_points(group=AUTH_ENTRY_POINT):
         authenticators.update({ep.name: ep.load()})
 
     # load our list of disabled authenticators
-    disabled_authenticators = _get_disabled_authenticators()
+    disabled_authenticators = _get_disabled_authenticators(config)
 
-    # loop through authenticators. If any return False, kick the user out.
-    for auth_method in authenticators:
-        if auth_method in disabled_authenticators:
-            continue
-        if not authenticators[auth_method](environ):
-            return False
-
-    # if we get this far then the user is authorized
-    return True
+    return [authenticators[name] for name in authenticators
+            if name not in disabled_authenticators]
 
 
-def _get_disabled_authenticators():
-    disabled_authenticators = []
-    config = SafeConfigParser()
-    config.read(CONFIG_FILENAME)
+def _get_disabled_authenticators(config):
+    """
+    :param config: repo auth configuration
+    :type  config: ConfigParser.SafeConfigParser
+    :return: names of the authenticators disabled in the configuration
+    :rtype:  set
+    """
+    disabled_authenticators = set()
 
     if config.has_option('main', 'disabled_authenticators'):
-        disabled_authenticators = config.get('main', 'disabled_authenticators').split(',')
+        disabled_authenticators = set(config.get('main', 'disabled_authenticators').split(','))
 
     return disabled_authenticators
@@ -6,14 +6,11 @@ import pulp.repoauth.auth_enabled_validation as auth_enabled_validation
 
 class TestAuthEnabledValiation(unittest.TestCase):
 
-    @mock.patch("pulp.repoauth.auth_enabled_validation.SafeConfigParser")
-    def test_config_read(self, mock_parser):
-        mock_parser_instance = mock.Mock()
-        mock_parser.return_value = mock_parser_instance
+    @mock.patch("pulp.repoauth.auth_enabled_validation.repo_auth_config.get_config")
+    def test_config_read(self, mock_get_config):
+        config = auth_enabled_validation._config()
 
-        auth_enabled_validation._config()
-
-        mock_parser_instance.read.assert_called_once_with('/etc/pulp/repo_auth.conf')
+        self.assertTrue(config is mock_get_config.return_value)
 
     @mock.patch("pulp.repoauth.auth_enabled_validation._config")
     def test_authenticate_enabled(self, mock_config):
@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from pulp.repoauth import config as repo_auth_config
+
+
+class TestConfigCache(unittest.TestCase):
+
+    def setUp(self):
+        self.working_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.working_dir, 'repo_auth.conf')
+        self.write_config('false', 1000)
+        self.cache = repo_auth_config.ConfigCache(self.filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.working_dir)
+
+    def write_config(self, enabled, mtime):
+        f = open(self.filename, 'w')
+        f.write('[main]\nenabled: %s\n' % enabled)
+        f.close()
+        os.utime(self.filename, (mtime, mtime))
+
+    def test_get(self):
+        config = self.cache.get()
+
+        self.assertFalse(config.getboolean('main', 'enabled'))
+
+    @mock.patch('pulp.repoauth.config.SafeConfigParser')
+    def test_get_parses_once(self, mock_parser):
+        config = self.cache.get()
+
+        self.assertTrue(self.cache.get() is config)
+        mock_parser.return_value.read.assert_called_once_with(self.filename)
+
+    def test_get_reads_changed_file(self):
+        config = self.cache.get()
+        self.write_config('true', 2000)
+
+        changed = self.cache.get()
+
+        self.assertFalse(changed is config)
+        self.assertTrue(changed.getboolean('main', 'enabled'))
+
+    def test_get_missing_file(self):
+        cache = repo_auth_config.ConfigCache(os.path.join(self.working_dir, 'missing.conf'))
+
+        config = cache.get()
+
+        self.assertTrue(cache.get() is config)
+        self.assertFalse(config.has_section('main'))
+
+    def test_get_derived(self):
+        build = mock.Mock()
+
+        value = self.cache.get_derived('key', build)
+
+        self.assertTrue(self.cache.get_derived('key', build) is value)
+        build.assert_called_once_with(self.cache.get())
+
+    def test_get_derived_rebuilt_on_change(self):
+        build = mock.Mock()
+        self.cache.get_derived('key', build)
+        self.write_config('true', 2000)
+
+        self.cache.get_derived('key', build)
+
+        self.assertEqual(build.call_count, 2)
+        build.assert_called_with(self.cache.get())
+
+    def test_clear(self):
+        config = self.cache.get()
+        build = mock.Mock()
+        self.cache.get_derived('key', build)
+
+        self.cache.clear()
+
+        self.assertFalse(self.cache.get() is config)
+        self.cache.get_derived('key', build)
+        self.assertEqual(build.call_count, 2)
+
+
+class TestModuleCache(unittest.TestCase):
+
+    def tearDown(self):
+        repo_auth_config.clear_cache()
+
+    def test_filename(self):
+        self.assertEqual(repo_auth_config._CACHE.filename, '/etc/pulp/repo_auth.conf')
+
+    @mock.patch('pulp.repoauth.config._CACHE')
+    def test_get_config(self, mock_cache):
+        self.assertTrue(repo_auth_config.get_config() is mock_cache.get.return_value)
+
+    @mock.patch('pulp.repoauth.config._CACHE')
+    def test_get_derived(self, mock_cache):
+        build = mock.Mock()
+
+        value = repo_auth_config.get_derived('key', build)
+
+        self.assertTrue(value is mock_cache.get_derived.return_value)
+        mock_cache.get_derived.assert_called_once_with('key', build)
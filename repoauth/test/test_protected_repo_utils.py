@@ -5,7 +5,8 @@ import os
 import shutil
 import unittest
 
-from pulp.repoauth.protected_repo_utils import ProtectedRepoListingFile, ProtectedRepoUtils
+from pulp.repoauth.protected_repo_utils import (ProtectedRepoIndex, ProtectedRepoListingFile,
+                                                ProtectedRepoUtils)
 
 
 # -- constants -----------------------------------------------------------------------
@@ -166,3 +167,98 @@ class TestProtectedRepoListingFile(unittest.TestCase):
 
         # Verify
         self.assertEqual(1, len(f.listings))
+
+
+class TestReadProtectedRepoIndex(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists(TEST_FILE):
+            os.remove(TEST_FILE)
+        self.utils = ProtectedRepoUtils(CONFIG)
+
+    def tearDown(self):
+        if os.path.exists(TEST_FILE):
+            os.remove(TEST_FILE)
+
+    def test_read_index(self):
+        self.utils.add_protected_repo('/repos/pulp/fedora-14', 'repo-1')
+
+        index = self.utils.read_protected_repo_index()
+
+        self.assertEqual(index.find('/repos/pulp/fedora-14/repodata/repomd.xml'), 'repo-1')
+
+    def test_index_kept_until_file_changes(self):
+        self.utils.add_protected_repo('/repos/pulp/fedora-14', 'repo-1')
+        index = self.utils.read_protected_repo_index()
+
+        self.assertTrue(self.utils.read_protected_repo_index() is index)
+
+        self.utils.add_protected_repo('/repos/pulp/fedora-15', 'repo-2')
+        os.utime(TEST_FILE, (0, 0))
+        changed = self.utils.read_protected_repo_index()
+
+        self.assertFalse(changed is index)
+        self.assertEqual(changed.find('/repos/pulp/fedora-15/'), 'repo-2')
+
+    @mock.patch('pulp.repoauth.protected_repo_utils.ProtectedRepoUtils.'
+                'read_protected_repo_listings')
+    def test_index_read_once(self, mock_read_listings):
+        mock_read_listings.return_value = {'foo': 'repo-1'}
+
+        self.utils.read_protected_repo_index()
+        self.utils.read_protected_repo_index()
+
+        mock_read_listings.assert_called_once_with()
+
+
+class TestProtectedRepoIndex(unittest.TestCase):
+    def setUp(self):
+        self.listings = {
+            '/pulp/pulp/fedora-14/x86_64': 'repo-x',
+            'pulp/pulp/fedora-13/x86_64/': 'repo-y',
+            '//pulp/pulp/fedora-13': 'repo-z',
+        }
+        self.index = ProtectedRepoIndex(self.listings)
+
+    def scan(self, url):
+        # The linear search the index replaces
+        for relative_repo_url in self.listings.keys():
+            if url.find(relative_repo_url) != -1:
+                return self.listings[relative_repo_url]
+        return None
+
+    def test_find_prefix(self):
+        self.assertEqual(self.index.find('/pulp/pulp/fedora-14/x86_64/repodata/repomd.xml'),
+                         'repo-x')
+
+    def test_find_inside_url(self):
+        self.assertEqual(self.index.find('/repos/pulp/pulp/fedora-14/x86_64/'), 'repo-x')
+
+    def test_find_substring(self):
+        # A match need not end on a path segment boundary
+        self.assertEqual(self.index.find('/pulp/pulp/fedora-14/x86_64-debug/'), 'repo-x')
+        self.assertEqual(self.index.find('/xpulp/pulp/fedora-13/x86_64/os/'), 'repo-y')
+
+    def test_find_slashes_as_listed(self):
+        self.assertEqual(self.index.find('/pulp/pulp/fedora-13/i386/os/'), None)
+        self.assertEqual(self.index.find('///pulp/pulp/fedora-13/i386/os/'), 'repo-z')
+
+    def test_find_first_listed(self):
+        url = '//pulp/pulp/fedora-13/x86_64/os/'
+        self.assertEqual(self.index.find(url), self.scan(url))
+
+    def test_find_matches_scan(self):
+        urls = ['', '/', 'pulp', '/pulp/pulp/fedora-14/x86_64', '/pulp/pulp/fedora-14/x86_6',
+                '//pulp/pulp/fedora-13/x86_64/', 'a//pulp/pulp/fedora-14/x86_64//pulp/pulp/',
+                '/pulp/pulp/pulp/fedora-13/x86_64/', '/pulp/pulp/fedora-12/x86_64/']
+        for url in urls:
+            self.assertEqual(self.index.find(url), self.scan(url), url)
+
+    def test_find_no_match(self):
+        self.assertEqual(self.index.find('/pulp/pulp/fedora-12/x86_64/'), None)
+        self.assertEqual(self.index.find(''), None)
+
+    def test_empty_listing_matches_everything(self):
+        index = ProtectedRepoIndex({'': 'repo-1'})
+
+        self.assertEqual(index.find('/pulp/pulp/fedora-13/'), 'repo-1')
+        self.assertEqual(index.find(''), 'repo-1')
@@ -1,9 +1,12 @@
 from ConfigParser import SafeConfigParser
+import calendar
 import shutil
 import os
+import tempfile
 import unittest
 
 from M2Crypto import X509
+import mock
 
 from pulp.repoauth import repo_cert_utils
 
@@ -466,3 +469,176 @@ class TestCertVerify(unittest.TestCase):
         ca_chain_pems = open(ca_chain_path).read()
         test_cert_pem = open(test_cert_path).read()
         self.assertTrue(self.utils.validate_certificate_pem(test_cert_pem, ca_chain_pems))
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_get_put(self):
+        cache = repo_cert_utils.LRUCache(2)
+        cache.put('a', 1)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('b', 2), 2)
+
+    def test_least_recently_used_dropped(self):
+        cache = repo_cert_utils.LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+
+        cache.put('c', 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_eviction_order(self):
+        cache = repo_cert_utils.LRUCache(3)
+        for key in 'abc':
+            cache.put(key, key)
+        # Repeated use of the same keys compacts the recency queue along the way
+        for i in range(10):
+            cache.get('a')
+            cache.get('b')
+        cache.put('c', 'c')
+
+        cache.put('d', 'd')
+        self.assertEqual(cache.get('a'), None)
+        cache.put('e', 'e')
+        self.assertEqual(cache.get('b'), None)
+        cache.put('f', 'f')
+        self.assertEqual(cache.get('c'), None)
+
+        self.assertEqual(len(cache), 3)
+        self.assertEqual([cache.get(k) for k in 'def'], ['d', 'e', 'f'])
+
+    def test_clear(self):
+        cache = repo_cert_utils.LRUCache(2)
+        cache.put('a', 1)
+
+        cache.clear()
+
+        self.assertEqual(len(cache), 0)
+
+
+class TestCertCaching(unittest.TestCase):
+    def setUp(self):
+        repo_cert_utils.clear_caches()
+        self.utils = repo_cert_utils.RepoCertUtils(CONFIG)
+        self.working_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        repo_cert_utils.clear_caches()
+        shutil.rmtree(self.working_dir)
+
+    def test_read_cert_file(self):
+        filename = os.path.join(self.working_dir, 'consumer-repo.ca')
+        f = open(filename, 'w')
+        f.write('PEM-1')
+        f.close()
+
+        self.assertEqual(self.utils._read_cert_file(filename), 'PEM-1')
+
+        f = open(filename, 'w')
+        f.write('PEM-22')
+        f.close()
+
+        self.assertEqual(self.utils._read_cert_file(filename), 'PEM-22')
+
+        os.remove(filename)
+
+        self.assertEqual(self.utils._read_cert_file(filename), None)
+
+    @mock.patch('__builtin__.open')
+    @mock.patch('os.stat')
+    def test_read_cert_file_cached(self, mock_stat, mock_open):
+        mock_stat.return_value.st_mtime = 1000.0
+        mock_stat.return_value.st_size = 5
+        mock_open.return_value.read.return_value = 'PEM-1'
+
+        self.assertEqual(self.utils._read_cert_file('/certs/consumer-repo.ca'), 'PEM-1')
+        self.assertEqual(self.utils._read_cert_file('/certs/consumer-repo.ca'), 'PEM-1')
+
+        mock_open.assert_called_once_with('/certs/consumer-repo.ca', 'r')
+
+        mock_stat.return_value.st_mtime = 2000.0
+        self.utils._read_cert_file('/certs/consumer-repo.ca')
+
+        self.assertEqual(mock_open.call_count, 2)
+
+    @mock.patch('pulp.repoauth.repo_cert_utils.RepoCertUtils.get_certs_from_string')
+    def test_parse_ca_chain_cached(self, mock_get_certs):
+        ca_chain = self.utils._parse_ca_chain('CA-PEM')
+
+        self.assertTrue(self.utils._parse_ca_chain('CA-PEM') is ca_chain)
+        self.assertTrue(ca_chain.certs is mock_get_certs.return_value)
+        self.assertEqual(mock_get_certs.call_count, 1)
+        self.assertNotEqual(self.utils._parse_ca_chain('OTHER-CA-PEM').id, ca_chain.id)
+
+    @mock.patch('pulp.repoauth.repo_cert_utils.time.time', return_value=1000.0)
+    @mock.patch('pulp.repoauth.repo_cert_utils.RepoCertUtils._not_after', return_value=5000.0)
+    @mock.patch('pulp.repoauth.repo_cert_utils.RepoCertUtils.x509_verify_cert', return_value=1)
+    @mock.patch('pulp.repoauth.repo_cert_utils.X509.load_cert_string')
+    @mock.patch('pulp.repoauth.repo_cert_utils.RepoCertUtils.get_certs_from_string')
+    def test_validate_certificate_pem_cached(self, mock_get_certs, mock_load, mock_verify,
+                                             mock_not_after, mock_time):
+        self.assertTrue(self.utils.validate_certificate_pem('CERT-PEM', 'CA-PEM'))
+        self.assertTrue(self.utils.validate_certificate_pem('CERT-PEM', 'CA-PEM'))
+
+        self.assertEqual(mock_verify.call_count, 1)
+        self.assertEqual(mock_get_certs.call_count, 1)
+
+        # a different CA is verified again
+        self.assertTrue(self.utils.validate_certificate_pem('CERT-PEM', 'OTHER-CA-PEM'))
+        self.assertEqual(mock_verify.call_count, 2)
+
+        # so is the same certificate once the result expired
+        mock_time.return_value = 1000.0 + repo_cert_utils.VERIFICATION_CACHE_TTL
+        self.assertTrue(self.utils.validate_certificate_pem('CERT-PEM', 'CA-PEM'))
+        self.assertEqual(mock_verify.call_count, 3)
+
+    @mock.patch('pulp.repoauth.repo_cert_utils.time.time', return_value=1000.0)
+    @mock.patch('pulp.repoauth.repo_cert_utils.RepoCertUtils._not_after', return_value=1010.0)
+    @mock.patch('pulp.repoauth.repo_cert_utils.RepoCertUtils.x509_verify_cert', return_value=1)
+    @mock.patch('pulp.repoauth.repo_cert_utils.X509.load_cert_string')
+    @mock.patch('pulp.repoauth.repo_cert_utils.RepoCertUtils.get_certs_from_string')
+    def test_validate_certificate_pem_expires_with_cert(self, mock_get_certs, mock_load,
+                                                        mock_verify, mock_not_after, mock_time):
+        self.utils.validate_certificate_pem('CERT-PEM', 'CA-PEM')
+        mock_time.return_value = 1005.0
+        self.utils.validate_certificate_pem('CERT-PEM', 'CA-PEM')
+
+        self.assertEqual(mock_verify.call_count, 1)
+
+        mock_time.return_value = 1010.0
+        mock_verify.return_value = False
+        self.assertFalse(self.utils.validate_certificate_pem('CERT-PEM', 'CA-PEM'))
+
+        self.assertEqual(mock_verify.call_count, 2)
+
+    @mock.patch('pulp.repoauth.repo_cert_utils.time.time', return_value=1000.0)
+    @mock.patch('pulp.repoauth.repo_cert_utils.RepoCertUtils._not_after', return_value=0)
+    @mock.patch('pulp.repoauth.repo_cert_utils.RepoCertUtils.x509_verify_cert',
+                return_value=False)
+    @mock.patch('pulp.repoauth.repo_cert_utils.X509.load_cert_string')
+    @mock.patch('pulp.repoauth.repo_cert_utils.RepoCertUtils.get_certs_from_string')
+    def test_validate_certificate_pem_expired_not_cached(self, mock_get_certs, mock_load,
+                                                         mock_verify, mock_not_after, mock_time):
+        self.utils.validate_certificate_pem('CERT-PEM', 'CA-PEM')
+        self.utils.validate_certificate_pem('CERT-PEM', 'CA-PEM')
+
+        self.assertEqual(mock_verify.call_count, 2)
+        self.assertEqual(len(repo_cert_utils.VERIFICATION_CACHE), 0)
+
+    def test_not_after(self):
+        cert = X509.load_cert(CERT)
+        expected = calendar.timegm(cert.get_not_after().get_datetime().utctimetuple())
+
+        self.assertEqual(repo_cert_utils.RepoCertUtils._not_after(cert), expected)
+
+    def test_not_after_unreadable(self):
+        cert = mock.Mock()
+        cert.get_not_after.side_effect = ValueError()
+
+        self.assertEqual(repo_cert_utils.RepoCertUtils._not_after(cert), 0)
@@ -1,7 +1,8 @@
 import unittest
 import mock
 
-from pulp.repoauth.wsgi import allow_access, _get_disabled_authenticators
+from pulp.repoauth import config as repo_auth_config
+from pulp.repoauth.wsgi import allow_access, _get_authenticators, _get_disabled_authenticators
 
 
 class TestWsgi(unittest.TestCase):
@@ -23,6 +24,11 @@ class TestWsgi(unittest.TestCase):
 
         self.entrypoint_list = [entrypoint_one, entrypoint_two]
 
+        repo_auth_config.clear_cache()
+
+    def tearDown(self):
+        repo_auth_config.clear_cache()
+
     @mock.patch('pulp.repoauth.auth_enabled_validation.authenticate')
     def test_auth_disabled(self, auth_enabled):
         """
@@ -120,16 +126,68 @@ class TestWsgi(unittest.TestCase):
 
         self.assertTrue(allow_access(environ, 'fake.host.name'))
 
-    @mock.patch("pulp.repoauth.wsgi.SafeConfigParser")
-    def test_config_read(self, mock_parser):
+    @mock.patch('pulp.repoauth.auth_enabled_validation.authenticate')
+    @mock.patch('pulp.repoauth.wsgi.iter_entry_points')
+    def test_entry_points_loaded_once(self, iter_ep, auth_enabled):
+        """
+        Test that entry points are only loaded for the first request
+        """
+        auth_enabled.return_value = False
+        environ = mock.Mock()
+        iter_ep.return_value = self.entrypoint_list
+
+        self.assertTrue(allow_access(environ, 'fake.host.name'))
+        self.assertTrue(allow_access(environ, 'fake.host.name'))
+
+        self.assertEquals(iter_ep.call_count, 1)
+        self.assertEquals(self.auth_one.call_count, 2)
+        self.assertEquals(self.auth_two.call_count, 2)
+
+    @mock.patch('pulp.repoauth.auth_enabled_validation.authenticate')
+    @mock.patch('pulp.repoauth.wsgi.iter_entry_points')
+    def test_entry_points_reloaded_on_config_change(self, iter_ep, auth_enabled):
+        """
+        Test that entry points are loaded again once the config has been read again
+        """
+        auth_enabled.return_value = False
+        environ = mock.Mock()
+        iter_ep.return_value = self.entrypoint_list
+
+        self.assertTrue(allow_access(environ, 'fake.host.name'))
+        repo_auth_config.clear_cache()
+        self.assertTrue(allow_access(environ, 'fake.host.name'))
+
+        self.assertEquals(iter_ep.call_count, 2)
+
+    @mock.patch('pulp.repoauth.wsgi.iter_entry_points')
+    def test_get_authenticators(self, iter_ep):
+        """
+        Test that disabled authenticators are left out
+        """
+        config = mock.Mock()
+        config.has_option.return_value = True
+        config.get.return_value = 'auth_two,auth_three'
+        iter_ep.return_value = self.entrypoint_list
+
+        self.assertEquals(_get_authenticators(config), [self.auth_one])
+
+    def test_config_read(self):
         """
-        Test that we are reading the file we think we are reading
+        Test that disabled authenticators are read from the config
         """
-        mock_parser_instance = mock.Mock()
-        mock_parser_instance.get.return_value = "foo,bar,baz"
-        mock_parser.return_value = mock_parser_instance
+        config = mock.Mock()
+        config.get.return_value = "foo,bar,baz"
 
-        self.assertEquals(_get_disabled_authenticators(), ['foo', 'bar', 'baz'])
+        self.assertEquals(_get_disabled_authenticators(config), set(['foo', 'bar', 'baz']))
+
+        config.has_option.assert_called_once_with('main', 'disabled_authenticators')
+        config.get.assert_called_once_with('main', 'disabled_authenticators')
+
+    def test_config_read_no_option(self):
+        """
+        Test that no authenticators are disabled if the option is missing
+        """
+        config = mock.Mock()
+        config.has_option.return_value = False
 
-        mock_parser_instance.read.assert_called_once_with('/etc/pulp/repo_auth.conf')
-        mock_parser_instance.has_option.assert_called_once_with('main', 'disabled_authenticators')
+        self.assertEquals(_get_disabled_authenticators(config), set())
@@ -1,23 +1,43 @@
+from bson.objectid import ObjectId
+
 from pulp.server.managers import factory as managers
 
 
 class CatalogerConduit(object):
     """
     Provides access to pulp platform API.
+
+    Entries are added to (and deleted from) a catalog generation which
+    becomes visible once the content source refresh has completed.
+
+    When a flush_size is specified, the conduit is buffered.  Added and deleted
+    entries are accumulated and written to the catalog using a single bulk
+    operation each time flush_size entries are pending, and when flush() is called.
+    Entries are written in the order in which they were added or deleted.
     """
 
-    def __init__(self, source_id, expires):
+    def __init__(self, source_id, expires, flush_size=0, generation=None):
         """
         :param source_id: The content source ID.
         :type source_id: str
         :param expires: The content expiration in seconds.
         :type expires: int
+        :param flush_size: The number of pending entries that triggers a flush.
+            When 0, entries are written to the catalog immediately.
+        :type flush_size: int
+        :param generation: The catalog generation to which entries are written.
+            A new generation is used when not specified.
+        :type generation: bson.objectid.ObjectId
         :return:
         """
         self.source_id = source_id
         self.expires = expires
+        self.flush_size = flush_size
+        self.generation = generation or ObjectId()
         self.added_count = 0
         self.deleted_count = 0
+        self._added = []
+        self._deleted = []
 
     def add_entry(self, type_id, unit_key, url):
         """
@@ -29,9 +49,15 @@ class CatalogerConduit(object):
         :param url: The URL used to download content associated with the unit.
         :type url: str
         """
-        manager = managers.content_catalog_manager()
-        manager.add_entry(self.source_id, self.expires, type_id, unit_key, url)
-        self.added_count += 1
+        if not self.flush_size:
+            manager = managers.content_catalog_manager()
+            manager.add_entry(self.source_id, self.generation, type_id, unit_key, url)
+            self.added_count += 1
+            return
+        self._flush_deleted()
+        self._added.append((type_id, unit_key, url))
+        if len(self._added) >= self.flush_size:
+            self._flush_added()
 
     def delete_entry(self, type_id, unit_key):
         """
@@ -41,13 +67,51 @@ class CatalogerConduit(object):
         :param unit_key: The content unit key.
         :type unit_key: dict
         """
-        manager = managers.content_catalog_manager()
-        manager.delete_entry(self.source_id, type_id, unit_key)
-        self.deleted_count += 1
+        if not self.flush_size:
+            manager = managers.content_catalog_manager()
+            manager.delete_entry(self.source_id, self.generation, type_id, unit_key)
+            self.deleted_count += 1
+            return
+        self._flush_added()
+        self._deleted.append((type_id, unit_key))
+        if len(self._deleted) >= self.flush_size:
+            self._flush_deleted()
+
+    def flush(self):
+        """
+        Write pending entries to the content catalog.
+        """
+        self._flush_added()
+        self._flush_deleted()
 
     def reset(self):
         """
-        Reset statistics.
+        Reset statistics and discard pending entries.
         """
         self.added_count = 0
         self.deleted_count = 0
+        self._added = []
+        self._deleted = []
+
+    def _flush_added(self):
+        """
+        Write pending added entries to the content catalog.
+        """
+        if not self._added:
+            return
+        manager = managers.content_catalog_manager()
+        self.added_count += manager.add_entries(self.source_id, self.generation, self._added)
+        self._added = []
+
+    def _flush_deleted(self):
+        """
+        Delete pending deleted entries from the content catalog.
+        The deleted count is the number of entries deleted by the plugin, the
+        same as when the conduit is not buffered.
+        """
+        if not self._deleted:
+            return
+        manager = managers.content_catalog_manager()
+        manager.delete_entries(self.source_id, self.generation, self._deleted)
+        self.deleted_count += len(self._deleted)
+        self._deleted = []
@@ -1,6 +1,7 @@
 from gettext import gettext as _
 import logging
 import sys
+import threading
 
 from pymongo.errors import DuplicateKeyError
 
@@ -410,6 +411,16 @@ class AddUnitMixin(object):
     allowed to do whatever threading makes sense to optimize its process.
     Calls into this instance do not have to be coordinated for thread safety,
     the instance will take care of it itself.
+
+    When the importer sets flush_size, saving units is buffered. Saved units
+    are accumulated and written to the Pulp server, along with their
+    associations to the repository, using bulk operations each time flush_size
+    units are pending, and when flush() is called. The repository unit counts
+    are updated once for each flush.
+
+    :ivar flush_size: The number of pending saved units that triggers a flush.
+        When 0, units are saved immediately.
+    :type flush_size: int
     """
 
     def __init__(self, repo_id, importer_id):
@@ -423,10 +434,15 @@ class AddUnitMixin(object):
         """
         self.repo_id = repo_id
         self.importer_id = importer_id
+        self.flush_size = 0
 
         self._added_count = 0
         self._updated_count = 0
 
+        self._pending_units = []
+        self._pending_keys = set()
+        self._pending_lock = threading.RLock()
+
     def init_unit(self, type_id, unit_key, metadata, relative_path):
         """
         Initializes the Pulp representation of a content unit. The conduit will
@@ -491,7 +507,9 @@ class AddUnitMixin(object):
         the attributes on the passed-in unit.
 
         A reference to the provided unit is returned from this call. This call
-        will populate the unit's id field with the UUID for the unit.
+        will populate the unit's id field with the UUID for the unit. When saving
+        units is buffered (see flush_size), the unit is saved and its id field
+        populated when the pending units are flushed.
 
         :param unit: unit object returned from the init_unit call
         :type  unit: Unit
@@ -499,6 +517,17 @@ class AddUnitMixin(object):
         :return: object reference to the provided unit, its state updated from the call
         :rtype:  Unit
         """
+        if self.flush_size:
+            with self._pending_lock:
+                key = (unit.type_id, repr(sorted(unit.unit_key.items())))
+                if key in self._pending_keys:
+                    # the unit is saved again; its previous save must be written first
+                    self.flush()
+                self._pending_units.append(unit)
+                self._pending_keys.add(key)
+                if len(self._pending_units) >= self.flush_size:
+                    self.flush()
+            return unit
         try:
             association_manager = manager_factory.repo_unit_association_manager()
 
@@ -515,6 +544,37 @@ class AddUnitMixin(object):
             _logger.exception(_('Content unit association failed [%s]' % str(unit)))
             raise ImporterConduitException(e), None, sys.exc_info()[2]
 
+    def flush(self):
+        """
+        Save the pending units and associate them with the repository using one
+        bulk write of units and one of associations for each unit type. The id
+        field of each unit is populated.
+        """
+        with self._pending_lock:
+            units = self._pending_units
+            self._pending_units = []
+            self._pending_keys = set()
+            if not units:
+                return
+            units_by_type = {}
+            for unit in units:
+                units_by_type.setdefault(unit.type_id, []).append(unit)
+            try:
+                association_manager = manager_factory.repo_unit_association_manager()
+                content_manager = manager_factory.content_manager()
+                for type_id, type_units in units_by_type.items():
+                    pulp_units = [common_utils.to_pulp_unit(u) for u in type_units]
+                    unit_ids, added_count = content_manager.save_content_units(type_id,
+                                                                               pulp_units)
+                    for unit, unit_id in zip(type_units, unit_ids):
+                        unit.id = unit_id
+                    self._added_count += added_count
+                    self._updated_count += len(type_units) - added_count
+                    association_manager.associate_all_by_ids(self.repo_id, type_id, unit_ids)
+            except Exception, e:
+                _logger.exception(_('Saving content units failed'))
+                raise ImporterConduitException(e), None, sys.exc_info()[2]
+
     def _update_unit(self, unit, pulp_unit):
         """
         Update a unit. If it is not found, add it.
@@ -586,6 +646,9 @@ class AddUnitMixin(object):
         @param to_unit: will be referenced by the from_unit
         @type  to_unit: L{Unit}
         """
+        # pending saved units are written first so that their ids are populated
+        self.flush()
+
         content_manager = manager_factory.content_manager()
 
         try:
@@ -17,8 +17,15 @@ _logger = logging.getLogger(__name__)
 
 class ProfilerConduit(MultipleRepoUnitsMixin):
 
-    def __init__(self):
+    def __init__(self, unit_ids=None):
+        """
+        :param unit_ids: if specified, get_repo_units() only returns the units with these ids.
+                         This is used to calculate applicability incrementally against only the
+                         units recently added to a repository.
+        :type  unit_ids: list of str
+        """
         MultipleRepoUnitsMixin.__init__(self, ProfilerConduitException)
+        self.unit_ids = unit_ids
 
     def get_bindings(self, consumer_id):
         """
@@ -62,8 +69,12 @@ class ProfilerConduit(MultipleRepoUnitsMixin):
             # that are needed.
             query_manager = managers.repo_unit_association_query_manager()
             unit_fields = list(unit_key_fields) + list(additional_unit_fields)
+            association_filters = None
+            if self.unit_ids is not None:
+                association_filters = {'unit_id': {'$in': list(self.unit_ids)}}
             criteria = UnitAssociationCriteria(association_fields=['unit_id'],
-                                               unit_fields=unit_fields)
+                                               unit_fields=unit_fields,
+                                               association_filters=association_filters)
             units = query_manager.get_units_by_type(repo_id, content_type_id, criteria)
 
             # Convert units to plugin units with unit_key and required metadata values for each unit
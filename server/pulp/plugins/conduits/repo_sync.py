@@ -93,6 +93,8 @@ class RepoSyncConduit(RepoScratchPadMixin, ImporterScratchPadMixin, AddUnitMixin
         @param unit: unit object (must have its id value set)
         @type  unit: L{Unit}
         """
+        # pending saved units are written first
+        self.flush()
 
         try:
             self._association_manager.unassociate_unit_by_id(
@@ -131,6 +133,7 @@ class RepoSyncConduit(RepoScratchPadMixin, ImporterScratchPadMixin, AddUnitMixin
         @param details: potentially longer log of the sync; may be None
         @type  details: any serializable
         """
+        self.flush()
         r = SyncReport(True, self._added_count, self._updated_count,
                        self._removed_count, summary, details)
         return r
@@ -156,6 +159,7 @@ class RepoSyncConduit(RepoScratchPadMixin, ImporterScratchPadMixin, AddUnitMixin
         @param details: potentially longer log of the sync; may be None
         @type  details: any serializable
         """
+        self.flush()
         r = SyncReport(False, self._added_count, self._updated_count,
                        self._removed_count, summary, details)
         return r
@@ -180,6 +184,7 @@ class RepoSyncConduit(RepoScratchPadMixin, ImporterScratchPadMixin, AddUnitMixin
         @param details: potentially longer log of the sync; may be None
         @type  details: any serializable
         """
+        self.flush()
         r = SyncReport(False, self._added_count, self._updated_count,
                        self._removed_count, summary, details)
         r.canceled_flag = True
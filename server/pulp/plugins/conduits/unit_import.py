@@ -82,6 +82,33 @@ class ImportUnitConduit(ImporterScratchPadMixin, RepoScratchPadMixin,
             _logger.exception(_('Content unit association failed [%s]' % str(unit)))
             raise ImporterConduitException(e), None, sys.exc_info()[2]
 
+    def associate_units(self, units):
+        """
+        Associates the given units with the destination repository for the import
+        using one bulk write per unit type. Importers copying many units should
+        prefer this to calling associate_unit for each unit.
+
+        This call is idempotent. Existing associations are not affected.
+
+        :param units: unit objects returned from the init_unit call
+        :type  units: iterable of pulp.plugins.model.Unit
+
+        :return: the provided units
+        :rtype:  list of pulp.plugins.model.Unit
+        """
+        units = list(units)
+        unit_ids = {}
+        for unit in units:
+            unit_ids.setdefault(unit.type_id, []).append(unit.id)
+        try:
+            for type_id, id_list in unit_ids.items():
+                self.__association_manager.associate_all_by_ids(
+                    self.dest_repo_id, type_id, id_list)
+            return units
+        except Exception, e:
+            _logger.exception(_('Content unit association failed'))
+            raise ImporterConduitException(e), None, sys.exc_info()[2]
+
     def get_source_units(self, criteria=None, as_generator=False):
         """
         Returns the collection of content units associated with the source
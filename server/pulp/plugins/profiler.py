@@ -85,6 +85,14 @@ class Profiler(object):
         * types - List of all content type IDs that may be processed using this
                   profiler.
 
+        The following keys are optional:
+
+        * incremental_applicability - True if the applicability of a unit does not
+                  depend on the other units in the repository. Pulp may then update
+                  existing applicability data by calling calculate_applicable_units
+                  with a conduit that only returns the units added to the repository
+                  since the data was calculated. Defaults to False.
+
         This method call may be made multiple times during the course of a
         running Pulp server and thus should not be used for initialization
         purposes.
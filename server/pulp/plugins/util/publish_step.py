@@ -1098,12 +1098,13 @@ class GetLocalUnitsStep(SaveUnitsStep):
     which must be an iterable of unit model instances with the unit keys populated
     """
 
-    def __init__(self, importer_type, unit_pagination_size=50, **kwargs):
+    def __init__(self, importer_type, unit_pagination_size=1000, **kwargs):
         """
         :param importer_type: unique identifier for the type of importer
         :type  importer_type: basestring
-        :param unit_pagination_size: How many units should be queried at one time (default 50)
-        :type  importer_type: int
+        :param unit_pagination_size: How many units should be queried and associated at one
+                                     time (default 1000)
+        :type  unit_pagination_size: int
         """
         super(GetLocalUnitsStep, self).__init__(step_type=reporting_constants.SYNC_STEP_GET_LOCAL,
                                                 plugin_type=importer_type,
@@ -1125,14 +1126,24 @@ class GetLocalUnitsStep(SaveUnitsStep):
         # any units that are already in pulp
         units_we_already_had = set()
 
-        for units_group in misc.paginate(self.parent.available_units, self.unit_pagination_size):
+        pages = misc.paginate(self.parent.available_units, self.unit_pagination_size)
+        for page_number, units_group in enumerate(pages, 1):
+            start = time.time()
             # Get this group of units
-            query = units_controller.find_units(units_group)
+            found_units = list(units_controller.find_units(units_group,
+                                                           self.unit_pagination_size))
+            repo_controller.associate_units(self.get_repo(), found_units)
 
-            for found_unit in query:
+            for found_unit in found_units:
                 units_we_already_had.add(hash(found_unit))
-                repo_controller.associate_single_unit(self.get_repo(), found_unit)
 
             for unit in units_group:
                 if hash(unit) not in units_we_already_had:
                     self.units_to_download.append(unit)
+
+            self.progress_details = _('Page %(p)d: %(f)d of %(t)d units already in pulp, '
+                                      '%(s).3f seconds') % {'p': page_number,
+                                                            'f': len(found_units),
+                                                            't': len(units_group),
+                                                            's': time.time() - start}
+            self.report_progress()
@@ -22,6 +22,8 @@ celery = Celery('tasks', broker=broker_url)
 
 DEDICATED_QUEUE_EXCHANGE = 'C.dq'
 RESOURCE_MANAGER_QUEUE = 'resource_manager'
+# The queue on which the resource manager is told about released reservations
+RESOURCE_RELEASE_QUEUE = 'resource_manager.releases'
 CELERYBEAT_SCHEDULE = {
     'reap_expired_documents': {
         'task': 'pulp.server.db.reaper.queue_reap_expired_documents',
@@ -2,6 +2,7 @@ from datetime import datetime
 from gettext import gettext as _
 import logging
 import signal
+import threading
 import time
 import traceback
 import uuid
@@ -14,11 +15,10 @@ from mongoengine.queryset import DoesNotExist
 from pulp.common.constants import SCHEDULER_WORKER_NAME
 from pulp.common import constants, dateutils, tags
 from pulp.server.async.celery_instance import celery, RESOURCE_MANAGER_QUEUE, \
-    DEDICATED_QUEUE_EXCHANGE
+    RESOURCE_RELEASE_QUEUE, DEDICATED_QUEUE_EXCHANGE
 from pulp.server.exceptions import PulpException, MissingResource, \
     PulpCodedException
 from pulp.server.db.model import Worker, ReservedResource, TaskStatus
-from pulp.server.exceptions import NoWorkers
 from pulp.server.managers.repo import _common as common_utils
 from pulp.server.managers import factory as managers
 from pulp.server.managers.schedule import utils
@@ -27,6 +27,9 @@ from pulp.server.managers.schedule import utils
 controller = control.Control(app=celery)
 _logger = logging.getLogger(__name__)
 
+# The ReservationDispatcher of the resource manager, created when it first queues a task
+_dispatcher = None
+
 
 @task(acks_late=True)
 def _queue_reserved_task(name, task_id, resource_id, inner_args, inner_kwargs):
@@ -39,7 +42,7 @@ def _queue_reserved_task(name, task_id, resource_id, inner_args, inner_kwargs):
 
     The inner task is dispatched into a dedicated queue for a worker that is decided at dispatch
     time. The logic deciding which queue receives a task is controlled through the
-    find_worker function.
+    ReservationDispatcher class.
 
     :param name:          The name of the task to be called
     :type name:           basestring
@@ -54,99 +57,261 @@ def _queue_reserved_task(name, task_id, resource_id, inner_args, inner_kwargs):
 
     :return: None
     """
-    while True:
-        try:
-            worker = get_worker_for_reservation(resource_id)
-        except NoWorkers:
-            pass
-        else:
-            break
-
-        try:
-            worker = _get_unreserved_worker()
-        except NoWorkers:
-            pass
-        else:
-            break
-
-        # No worker is ready for this work, so we need to wait
-        time.sleep(0.25)
+    worker_name = _get_dispatcher().reserve(task_id, resource_id)
 
-    ReservedResource(task_id=task_id, worker_name=worker['name'], resource_id=resource_id).save()
-
-    inner_kwargs['routing_key'] = worker.name
+    inner_kwargs['routing_key'] = worker_name
     inner_kwargs['exchange'] = DEDICATED_QUEUE_EXCHANGE
     inner_kwargs['task_id'] = task_id
 
     try:
         celery.tasks[name].apply_async(*inner_args, **inner_kwargs)
     finally:
-        _release_resource.apply_async((task_id, ), routing_key=worker.name,
+        _release_resource.apply_async((task_id, ), routing_key=worker_name,
                                       exchange=DEDICATED_QUEUE_EXCHANGE)
 
 
-def _is_worker(worker_name):
+def _get_dispatcher():
     """
-    Strip out workers that should never be assigned work. We need to check
-    via "startswith()" since we do not know which host the worker is running on.
+    Return the ReservationDispatcher of this process. It is created, and a ReleaseMonitor
+    started for it, the first time this is called. This happens in the resource manager's
+    worker process, after celery has forked it, so that the monitor thread runs there.
+
+    :return: The ReservationDispatcher of this process
+    :rtype:  ReservationDispatcher
     """
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = ReservationDispatcher()
+        ReleaseMonitor(_dispatcher).start()
+    return _dispatcher
 
-    if worker_name.startswith(SCHEDULER_WORKER_NAME) or \
-       worker_name.startswith(RESOURCE_MANAGER_QUEUE):
-        return False
-    return True
 
+class ReservationDispatcher(object):
+    """
+    Decides which worker each task queued through _queue_reserved_task is routed to.
+
+    The workers and the reservations they hold are kept in memory so that finding a worker does
+    not read the workers and reserved_resources collections. The state is updated as
+    reservations are made here and as releases are reported to released(). It is reloaded from
+    the database when the dispatcher is first used, when resync() is called, and whenever it
+    is older than RESYNC_INTERVAL seconds. This bounds how long a release that was never
+    reported can hold up a task. A task that cannot be assigned waits until a reservation is
+    released.
+
+    One lock guards the state. Choosing a worker and recording the reservation are therefore
+    atomic with respect to releases and to other threads that reserve.
+    """
+
+    # The longest time in seconds that the state is used without reloading it
+    RESYNC_INTERVAL = 5
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        # Maps the task_id of every reservation to a (worker_name, resource_id) tuple
+        self._reservations = {}
+        # Maps the name of every worker that may be assigned work to its number of reservations
+        self._workers = {}
+        # The names of the workers that hold no reservations
+        self._idle = set()
+        # Maps every reserved resource_id to a [worker_name, number of reservations] list
+        self._resources = {}
+        self._synced = None
+
+    def reserve(self, task_id, resource_id):
+        """
+        Reserve a resource for a task. The task is assigned to the worker that already holds a
+        reservation for the resource, or else to a worker that holds no reservations. If there
+        is no such worker, this blocks until there is one.
+
+        :param task_id:     The UUID of the task the reservation is for
+        :type  task_id:     basestring
+        :param resource_id: The name of the resource to reserve
+        :type  resource_id: basestring
+        :return:            The name of the worker that the task is to be routed to
+        :rtype:             basestring
+        """
+        with self._condition:
+            while True:
+                if self._synced is None or time.time() - self._synced > self.RESYNC_INTERVAL:
+                    self.resync()
+                worker_name = self._find_worker(resource_id)
+                if worker_name is not None:
+                    break
+                # No worker is ready for this work, so we need to wait
+                self._condition.wait(self.RESYNC_INTERVAL)
+
+            ReservedResource(task_id=task_id, worker_name=worker_name,
+                             resource_id=resource_id).save()
+            self._add(task_id, worker_name, resource_id)
+            return worker_name
+
+    def released(self, task_id):
+        """
+        Remove the reservation of a task and wake any task waiting for a worker.
+
+        :param task_id: The UUID of the task whose reservation was released
+        :type  task_id: basestring
+        """
+        with self._condition:
+            if self._remove(task_id):
+                self._condition.notify_all()
+
+    def resync(self):
+        """
+        Reload the workers and reservations from the database and wake any task waiting for
+        a worker.
+        """
+        with self._condition:
+            self._reservations = {}
+            self._workers = dict((worker['name'], 0) for worker in Worker.objects()
+                                 if _is_worker(worker['name']))
+            self._idle = set(self._workers)
+            self._resources = {}
+            for reservation in ReservedResource.objects():
+                self._add(reservation['task_id'], reservation['worker_name'],
+                          reservation['resource_id'])
+            self._synced = time.time()
+            self._condition.notify_all()
+
+    def _find_worker(self, resource_id):
+        """
+        :param resource_id: The name of the resource to reserve
+        :type  resource_id: basestring
+        :return:            The name of the worker to assign the resource to, or None if no
+                            worker can take it
+        :rtype:             basestring
+        """
+        holder = self._resources.get(resource_id)
+        if holder is not None:
+            # A reservation held on a missing worker blocks the resource until the next resync
+            # drops it, as _delete_worker removes it from the database.
+            return holder[0] if holder[0] in self._workers else None
+        return next(iter(self._idle), None)
+
+    def _add(self, task_id, worker_name, resource_id):
+        if task_id in self._reservations:
+            return
+        self._reservations[task_id] = (worker_name, resource_id)
+        if worker_name in self._workers:
+            self._workers[worker_name] += 1
+            self._idle.discard(worker_name)
+        self._resources.setdefault(resource_id, [worker_name, 0])[1] += 1
 
-def get_worker_for_reservation(resource_id):
+    def _remove(self, task_id):
+        """
+        :return: True if the task held a reservation, False otherwise
+        :rtype:  bool
+        """
+        try:
+            worker_name, resource_id = self._reservations.pop(task_id)
+        except KeyError:
+            return False
+        if worker_name in self._workers:
+            self._workers[worker_name] -= 1
+            if not self._workers[worker_name]:
+                self._idle.add(worker_name)
+        holder = self._resources[resource_id]
+        holder[1] -= 1
+        if not holder[1]:
+            del self._resources[resource_id]
+        return True
+
+
+class ReleaseMonitor(threading.Thread):
+    """
+    A thread in the resource manager that receives the messages sent by _notify_dispatcher() and
+    applies them to a ReservationDispatcher. Waiting tasks therefore wake as soon as a worker
+    releases a reservation, starts, or is deleted.
     """
-    Return the Worker instance that is associated with a reservation of type resource_id. If
-    there are no workers with that reservation_id type a pulp.server.exceptions.NoWorkers
-    exception is raised.
 
-    :param resource_id:    The name of the resource you wish to reserve for your task.
+    def __init__(self, dispatcher):
+        """
+        :param dispatcher: The dispatcher to apply the messages to
+        :type  dispatcher: ReservationDispatcher
+        """
+        super(ReleaseMonitor, self).__init__(name='ReleaseMonitor')
+        self.daemon = True
+        self.dispatcher = dispatcher
 
-    :raises NoWorkers:     If all workers have reserved_resource entries associated with them.
+    def run(self):
+        """
+        The thread entry point, which calls monitor_releases().
 
-    :type resource_id:     basestring
-    :returns:              The Worker instance that has a reserved_resource entry of type
-                           `resource_id` associated with it.
-    :rtype:                pulp.server.db.model.resources.Worker
+        monitor_releases() does not return, so it is re-entered after an unexpected Exception
+        has been logged. While it is not running the dispatcher still notices releases when it
+        resyncs.
+        """
+        while True:
+            try:
+                self.monitor_releases()
+            except Exception as e:
+                _logger.error(e)
+            time.sleep(10)
+
+    def monitor_releases(self):
+        """
+        Block on the release queue and apply each message to the dispatcher.
+        """
+        with celery.connection() as connection:
+            queue = _release_queue(connection)
+            try:
+                while True:
+                    message = queue.get(block=True)
+                    message.ack()
+                    task_id = message.payload.get('task_id')
+                    if task_id is None:
+                        self.dispatcher.resync()
+                    else:
+                        self.dispatcher.released(task_id)
+            finally:
+                queue.close()
+
+
+def _release_queue(connection):
     """
-    reservation = ReservedResource.objects(resource_id=resource_id).first()
-    if reservation:
-        return Worker.objects(name=reservation['worker_name']).first()
-    else:
-        raise NoWorkers()
+    :param connection: A connection to the broker
+    :type  connection: kombu.Connection
+    :return:           The queue on which the resource manager is told about released
+                       reservations. Messages are only useful to a running resource manager,
+                       so the queue is not durable.
+    :rtype:            kombu.simple.SimpleQueue
+    """
+    return connection.SimpleQueue(RESOURCE_RELEASE_QUEUE, queue_opts={'durable': False})
 
 
-def _get_unreserved_worker():
+def _notify_dispatcher(task_id=None):
     """
-    Return the Worker instance that has no reserved_resource entries
-    associated with it. If there are no unreserved workers a
-    pulp.server.exceptions.NoWorkers exception is raised.
+    Tell the resource manager that the reservation of a task was released. When task_id is
+    None, the resource manager instead reloads its reservations and workers, which is how
+    workers that start or are deleted are announced.
 
-    :raises NoWorkers: If all workers have reserved_resource entries associated with them.
+    A message that cannot be sent is logged and dropped, because the resource manager
+    reloads its state periodically anyway.
 
-    :returns:          The Worker instance that has no reserved_resource
-                       entries associated with it.
-    :rtype:            pulp.server.db.model.resources.Worker
+    :param task_id: The UUID of the task whose reservation was released
+    :type  task_id: basestring
     """
+    try:
+        with celery.connection_or_acquire() as connection:
+            queue = _release_queue(connection)
+            try:
+                queue.put({'task_id': task_id})
+            finally:
+                queue.close()
+    except Exception as e:
+        _logger.warning(_('Unable to notify the resource manager: %(e)s') % {'e': e})
 
-    # Build a mapping of queue names to Worker objects
-    workers_dict = dict((worker['name'], worker) for worker in Worker.objects())
-    worker_names = workers_dict.keys()
-    reserved_names = [r['worker_name'] for r in ReservedResource.objects.all()]
 
-    # Find an unreserved worker using set differences of the names, and filter
-    # out workers that should not be assigned work.
-    # NB: this is a little messy but set comprehensions are in python 2.7+
-    unreserved_workers = set(filter(_is_worker, worker_names)) - set(reserved_names)
+def _is_worker(worker_name):
+    """
+    Strip out workers that should never be assigned work. We need to check
+    via "startswith()" since we do not know which host the worker is running on.
+    """
 
-    try:
-        return workers_dict[unreserved_workers.pop()]
-    except KeyError:
-        # All workers are reserved
-        raise NoWorkers()
+    if worker_name.startswith(SCHEDULER_WORKER_NAME) or \
+       worker_name.startswith(RESOURCE_MANAGER_QUEUE):
+        return False
+    return True
 
 
 def _delete_worker(name, normal_shutdown=False):
@@ -176,6 +341,7 @@ def _delete_worker(name, normal_shutdown=False):
 
     # Delete all reserved_resource documents for the worker
     ReservedResource.objects(worker_name=name).delete()
+    _notify_dispatcher()
 
     # Cancel all of the tasks that were assigned to this worker's queue
     for task_status in TaskStatus.objects(worker_name=name,
@@ -196,6 +362,7 @@ def _release_resource(task_id):
     :type  task_id: basestring
     """
     ReservedResource.objects(task_id=task_id).delete()
+    _notify_dispatcher(task_id)
 
 
 class TaskResult(object):
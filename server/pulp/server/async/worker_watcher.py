@@ -17,7 +17,7 @@ from datetime import datetime
 from gettext import gettext as _
 import logging
 
-from pulp.server.async.tasks import _delete_worker
+from pulp.server.async.tasks import _delete_worker, _notify_dispatcher
 from pulp.server.db.model import Worker
 
 
@@ -67,8 +67,8 @@ def handle_worker_heartbeat(event):
 
     The event is first parsed and logged.  Then the existing Worker objects are
     searched for one to update. If an existing one is found, it is updated.
-    Otherwise a new Worker entry is created. Logging at the info and debug
-    level is also done.
+    Otherwise a new Worker entry is created and the resource manager is told so that it can
+    assign work to it. Logging at the info and debug level is also done.
 
     :param event: A celery event to handle.
     :type event: dict
@@ -83,6 +83,9 @@ def handle_worker_heartbeat(event):
     Worker.objects(name=event_info['worker_name']).\
         update_one(set__last_heartbeat=event_info['timestamp'], upsert=True)
 
+    if not worker:
+        _notify_dispatcher()
+
 
 def handle_worker_offline(event):
     """
@@ -10,6 +10,7 @@ BASE_URL = 'base_url'
 PATHS = 'paths'
 PRIORITY = 'priority'
 EXPIRES = 'expires'
+CATALOG_FLUSH_SIZE = 'catalog_flush_size'
 
 MAX_CONCURRENT = 'max_concurrent'
 MAX_SPEED = 'max_speed'
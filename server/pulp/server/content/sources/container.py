@@ -1,12 +1,15 @@
 from collections import namedtuple
 from logging import getLogger
+from multiprocessing.pool import ThreadPool
 from threading import Thread, RLock
 from Queue import Queue, Empty, Full
+import time
 
 from nectar.listener import DownloadEventListener
 from nectar.report import DownloadReport as NectarDownloadReport
 from nectar.request import DownloadRequest
 
+from pulp.plugins.util import misc as plugin_misc
 from pulp.server.content.sources.model import ContentSource, PrimarySource, \
     DownloadReport, DownloadDetails, RefreshReport
 from pulp.server.managers import factory as managers
@@ -15,6 +18,14 @@ from pulp.server.managers import factory as managers
 log = getLogger(__name__)
 
 
+# The number of download requests for which content sources are looked up
+# in the catalog with a single query.
+CATALOG_PAGE_SIZE = 500
+
+# The number of content sources refreshed concurrently.
+REFRESH_CONCURRENCY = 4
+
+
 class ContentContainer(object):
     """
     The content container represents a virtual collection of content that is
@@ -31,7 +42,7 @@ class ContentContainer(object):
         """
         self.sources = ContentSource.load_all(path)
 
-    def download(self, canceled, downloader, requests, listener=None):
+    def download(self, canceled, downloader, requests, listener=None, cache=False):
         """
         Download files using available alternate content sources.
         An attempt is made to satisfy each download request using the alternate
@@ -47,18 +58,23 @@ class ContentContainer(object):
         :type requests: iterable
         :param listener: An optional download request listener.
         :type listener: Listener
+        :param cache: Keep the catalog entries looked up for the duration of the download.
+            Useful when the same content unit is requested more than once.
+        :type cache: bool
         :return: A download report.
         :rtype: DownloadReport
         """
         self.refresh(canceled)
         primary = PrimarySource(downloader)
-        batch = Batch(canceled, primary, self.sources, requests, listener)
+        batch = Batch(canceled, primary, self.sources, requests, listener, cache=cache)
         report = batch.download()
         return report
 
     def refresh(self, canceled, force=False):
         """
         Refresh the content catalog using available content sources.
+        Content sources are refreshed concurrently, at most REFRESH_CONCURRENCY
+        at a time.  Sources not yet started when the refresh is canceled are skipped.
         :param canceled: An event that indicates the refresh has been canceled.
         :type canceled: threading.Event
         :param force: Force refresh of content sources with unexpired catalog entries.
@@ -68,21 +84,47 @@ class ContentContainer(object):
         """
         reports = []
         catalog = managers.content_catalog_manager()
+        sources = []
         for source_id, source in self.sources.items():
             if canceled.is_set():
                 break
             if force or not catalog.has_entries(source_id):
-                try:
-                    report = source.refresh(canceled)
-                    reports.extend(report)
-                except Exception, e:
-                    log.error('refresh %s, failed: %s', source_id, e)
-                    report = RefreshReport(source_id, '')
-                    report.errors.append(str(e))
-                    reports.append(report)
+                sources.append(source)
+        if sources:
+            pool = ThreadPool(min(REFRESH_CONCURRENCY, len(sources)))
+            try:
+                for source_reports in pool.map(
+                        lambda source: self._refresh_source(canceled, source), sources):
+                    reports.extend(source_reports)
+            finally:
+                pool.close()
+                pool.join()
         catalog.purge_expired()
         return reports
 
+    @staticmethod
+    def _refresh_source(canceled, source):
+        """
+        Refresh the content catalog using the specified content source.
+        :param canceled: An event that indicates the refresh has been canceled.
+        :type canceled: threading.Event
+        :param source: The content source to refresh.
+        :type source: ContentSource
+        :return: A list of refresh reports.
+        :rtype: list of: pulp.server.content.sources.model.RefreshReport
+        """
+        if canceled.is_set():
+            return []
+        started = time.time()
+        try:
+            return source.refresh(canceled)
+        except Exception, e:
+            log.error('refresh %s, failed: %s', source.id, e)
+            report = RefreshReport(source.id, '')
+            report.errors.append(str(e))
+            report.seconds = time.time() - started
+            return [report]
+
     def purge_orphans(self):
         """
         Purge the catalog of orphaned entries.
@@ -250,9 +292,12 @@ class Batch(object):
     :type in_progress: Tracker
     :ivar queues: A dictionary of: RequestQueue keyed by source_id.
     :type queues: dict
+    :ivar cache: Catalog entries keyed by locator, kept for the duration of the
+        download.  None when not caching.
+    :type cache: dict
     """
 
-    def __init__(self, canceled, primary, sources, requests, listener):
+    def __init__(self, canceled, primary, sources, requests, listener, cache=False):
         """
         :param canceled: A cancel event.  Signals cancellation requested.
         :type canceled: threading.Event
@@ -265,6 +310,8 @@ class Batch(object):
         :type requests: iterable
         :param listener: An optional download request listener.
         :type listener: Listener
+        :param cache: Keep the catalog entries looked up for the duration of the download.
+        :type cache: bool
         """
         self._mutex = RLock()
         self.canceled = canceled
@@ -274,6 +321,7 @@ class Batch(object):
         self.listener = listener
         self.in_progress = Tracker(canceled)
         self.queues = {}
+        self.cache = {} if cache else None
 
     @property
     def is_canceled(self):
@@ -335,6 +383,39 @@ class Batch(object):
         queue.start()
         return queue
 
+    def find_entries(self, requests, details):
+        """
+        Find the catalog entries for a page of requests using a single query.
+        :param requests: A list of: pulp.server.content.sources.model.Request.
+        :type requests: list
+        :param details: Updated with the catalog lookup details.
+        :type details: pulp.server.content.sources.model.CatalogDetails
+        :return: A dictionary of lists of catalog entries keyed by locator.
+        :rtype: dict
+        """
+        entries = {}
+        locators = set()
+        for request in requests:
+            locator = request.locator
+            if self.cache is not None and locator in self.cache:
+                entries[locator] = self.cache[locator]
+                details.total_cached += 1
+            else:
+                locators.add(locator)
+        if not locators:
+            return entries
+        catalog = managers.content_catalog_manager()
+        started = time.time()
+        found = catalog.find_by_locators(locators)
+        details.seconds += time.time() - started
+        details.total_queries += 1
+        details.total_locators += len(locators)
+        for locator in locators:
+            entries[locator] = found.get(locator, [])
+        if self.cache is not None:
+            self.cache.update((locator, entries[locator]) for locator in locators)
+        return entries
+
     def download(self):
         """
         Begin processing the batch of requests.
@@ -351,12 +432,16 @@ class Batch(object):
         report.total_sources = len(self.sources)
 
         try:
-            for request in self.requests:
+            for page in plugin_misc.paginate(self.requests, CATALOG_PAGE_SIZE):
                 if self.is_canceled:
                     break
-                request.find_sources(self.primary, self.sources)
-                self.dispatch(request)
-                count += 1
+                entries = self.find_entries(page, report.catalog)
+                for request in page:
+                    if self.is_canceled:
+                        break
+                    request.find_sources(self.primary, self.sources, entries[request.locator])
+                    self.dispatch(request)
+                    count += 1
         except Exception:
             self.canceled.set()
             raise
@@ -368,6 +453,11 @@ class Batch(object):
             for queue in self.queues.values():
                 queue.join()
 
+        details = report.catalog
+        log.debug('catalog lookup: %d locators, %d cached, %d queries in %.3f seconds',
+                  details.total_locators, details.total_cached, details.total_queries,
+                  details.seconds)
+
         for source_id, queue in self.queues.items():
             listener = queue.downloader.event_listener
             downloads = report.downloads.setdefault(source_id, DownloadDetails())
@@ -24,6 +24,9 @@ are supported:
      How long until cataloged information expires. The default unit is seconds however
      an optional suffix can (and should) be used.  Supported suffixes:
      (s=seconds, m=minutes, h=hours, d=days)
+ - catalog_flush_size <int>
+     The number of catalog entries added (or deleted) during a refresh that are
+     written to the catalog together.  0 writes each entry as it is added.  Default: 1000.
  - base_url <str>
      The URL used to fetch info used to refresh the catalog.
  - paths <str>
@@ -87,6 +90,7 @@ log = getLogger(__name__)
 DEFAULT = {
     constants.PRIORITY: '0',
     constants.EXPIRES: '24h',
+    constants.CATALOG_FLUSH_SIZE: '1000',
     constants.MAX_CONCURRENT: '2',
     constants.SSL_VALIDATION: 'true'
 }
@@ -99,6 +103,7 @@ SCHEMA = [
         (constants.BASE_URL, REQUIRED, ANY),
         (constants.PRIORITY, OPTIONAL, NUMBER),
         (constants.EXPIRES, OPTIONAL, ANY),
+        (constants.CATALOG_FLUSH_SIZE, OPTIONAL, NUMBER),
         (constants.PATHS, OPTIONAL, ANY),
         (constants.MAX_CONCURRENT, OPTIONAL, NUMBER),
         (constants.MAX_SPEED, OPTIONAL, NUMBER),
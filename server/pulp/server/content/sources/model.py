@@ -12,7 +12,9 @@
 import sys
 import os
 import re
+import time
 
+from multiprocessing.pool import ThreadPool
 from urlparse import urljoin
 from logging import getLogger
 from ConfigParser import ConfigParser
@@ -22,6 +24,7 @@ from pulp.plugins.conduits.cataloger import CatalogerConduit
 from pulp.plugins.loader import api as plugins
 from pulp.server.content.sources import constants
 from pulp.server.content.sources.descriptor import is_valid, to_seconds, DEFAULT
+from pulp.server.db.model.content import ContentCatalog
 from pulp.server.managers import factory as managers
 
 
@@ -80,7 +83,16 @@ class Request(object):
         self.errors = []
         self.data = None
 
-    def find_sources(self, primary, alternates):
+    @property
+    def locator(self):
+        """
+        Get the catalog locator of the requested content unit.
+        :return: The locator.
+        :rtype: str
+        """
+        return ContentCatalog.get_locator(self.type_id, self.unit_key)
+
+    def find_sources(self, primary, alternates, entries=None):
         """
         Find and set the list of content sources in the order they are to
         be used to satisfy the request.  The alternate sources are
@@ -89,10 +101,15 @@ class Request(object):
         :type primary: ContentSource
         :param alternates: A list of alternative sources.
         :type list of: ContentSource
+        :param entries: The catalog entries matching the requested unit, already
+            looked up by the caller.  When None, the catalog is queried.
+        :type entries: list
         """
         resolved = [(primary, self.url)]
-        catalog = managers.content_catalog_manager()
-        for entry in catalog.find(self.type_id, self.unit_key):
+        if entries is None:
+            catalog = managers.content_catalog_manager()
+            entries = catalog.find(self.type_id, self.unit_key)
+        for entry in entries:
             source_id = entry[constants.SOURCE_ID]
             source = alternates.get(source_id)
             if source is None:
@@ -211,6 +228,16 @@ class ContentSource(object):
         """
         return to_seconds(self.descriptor[constants.EXPIRES])
 
+    @property
+    def catalog_flush_size(self):
+        """
+        Get the number of catalog entries written together during a refresh.
+        :return: The flush size.  0 when entries are written as they are added.
+        :rtype: int
+        """
+        default = DEFAULT[constants.CATALOG_FLUSH_SIZE]
+        return int(self.descriptor.get(constants.CATALOG_FLUSH_SIZE, default))
+
     @property
     def base_url(self):
         """
@@ -228,7 +255,8 @@ class ContentSource(object):
         :return: The download concurrency.
         :rtype: int
         """
-        return int(self.descriptor[constants.MAX_CONCURRENT])
+        default = DEFAULT[constants.MAX_CONCURRENT]
+        return int(self.descriptor.get(constants.MAX_CONCURRENT, default))
 
     @property
     def urls(self):
@@ -254,13 +282,15 @@ class ContentSource(object):
             url_list.append(url)
         return url_list
 
-    def get_conduit(self):
+    def get_conduit(self, generation=None):
         """
         Get a plugin conduit.
+        :param generation: The catalog generation to which the conduit writes entries.
+        :type generation: bson.objectid.ObjectId
         :return: A plugin conduit.
         :rtype CatalogerConduit
         """
-        return CatalogerConduit(self.id, self.expires)
+        return CatalogerConduit(self.id, self.expires, self.catalog_flush_size, generation)
 
     def get_cataloger(self):
         """
@@ -288,33 +318,71 @@ class ContentSource(object):
         """
         Refresh the content catalog using the cataloger plugin as
         defined by the "type" descriptor property.
+        The URLs are refreshed concurrently, at most max_concurrent at a time.
+        URLs not yet started when the refresh is canceled are skipped.
+        The entries of all URLs are written to a new catalog generation which
+        replaces the active generation of the source when the refresh completes
+        and every URL succeeded.  Otherwise, the new generation is discarded and
+        the active generation is kept, so that the entries of a URL that failed
+        are not lost before they expire.
         :param cancel_event: An event that indicates the refresh has been canceled.
         :type cancel_event: threading.Event
-        :return: The list of refresh reports.
+        :return: The list of refresh reports.  One for each URL refreshed.
         :rtype: list of: RefreshReport
         """
-        reports = []
-        conduit = self.get_conduit()
-        plugin = self.get_cataloger()
-        for url in self.urls:
-            if cancel_event.isSet():
-                break
-            conduit.reset()
-            report = RefreshReport(self.id, url)
-            log.info(REFRESHING, self.id, url)
-            try:
-                plugin.refresh(conduit, self.descriptor, url)
-                log.info(REFRESH_SUCCEEDED, self.id, conduit.added_count, conduit.deleted_count)
-                report.succeeded = True
-                report.added_count = conduit.added_count
-                report.deleted_count = conduit.deleted_count
-            except Exception, e:
-                log.error(REFRESH_FAILED, self.id, url, e)
-                report.errors.append(str(e))
-            finally:
-                reports.append(report)
+        urls = self.urls
+        catalog = managers.content_catalog_manager()
+        generation = catalog.new_generation()
+        pool = ThreadPool(max(1, min(self.max_concurrent, len(urls))))
+        try:
+            reports = pool.map(
+                lambda url: self._refresh_url(cancel_event, generation, url), urls)
+        finally:
+            pool.close()
+            pool.join()
+        reports = [report for report in reports if report is not None]
+        succeeded = [report for report in reports if report.succeeded]
+        if len(succeeded) == len(urls) and not cancel_event.isSet():
+            catalog.activate_generation(self.id, generation, self.expires)
+        else:
+            catalog.abandon_generation(self.id, generation)
         return reports
 
+    def _refresh_url(self, cancel_event, generation, url):
+        """
+        Refresh the content catalog using the cataloger plugin and the specified URL.
+        Each URL is refreshed using its own conduit so that the counts
+        reported are those of the URL, and its own plugin instance since
+        cataloger plugins are not required to be thread-safe.
+        :param cancel_event: An event that indicates the refresh has been canceled.
+        :type cancel_event: threading.Event
+        :param generation: The catalog generation to which entries are written.
+        :type generation: bson.objectid.ObjectId
+        :param url: The URL to refresh.
+        :type url: str
+        :return: The refresh report.  None when the refresh has been canceled.
+        :rtype: RefreshReport
+        """
+        if cancel_event.isSet():
+            return None
+        conduit = self.get_conduit(generation)
+        report = RefreshReport(self.id, url)
+        log.info(REFRESHING, self.id, url)
+        started = time.time()
+        try:
+            plugin = self.get_cataloger()
+            plugin.refresh(conduit, self.descriptor, url)
+            conduit.flush()
+            log.info(REFRESH_SUCCEEDED, self.id, conduit.added_count, conduit.deleted_count)
+            report.succeeded = True
+            report.added_count = conduit.added_count
+            report.deleted_count = conduit.deleted_count
+        except Exception, e:
+            log.error(REFRESH_FAILED, self.id, url, e)
+            report.errors.append(str(e))
+        report.seconds = time.time() - started
+        return report
+
     def dict(self):
         """
         Dictionary representation.
@@ -408,6 +476,34 @@ class DownloadDetails(object):
         return self.__dict__
 
 
+class CatalogDetails(object):
+    """
+    Catalog lookup details.
+    :ivar total_queries: The total number of catalog queries.
+    :type total_queries: int
+    :ivar total_locators: The total number of locators looked up in the catalog.
+    :type total_locators: int
+    :ivar total_cached: The total number of locators resolved using the cache.
+    :type total_cached: int
+    :ivar seconds: The total time spent querying the catalog.
+    :type seconds: float
+    """
+
+    def __init__(self):
+        self.total_queries = 0
+        self.total_locators = 0
+        self.total_cached = 0
+        self.seconds = 0.0
+
+    def dict(self):
+        """
+        Dictionary representation.
+        :return: A dictionary representation.
+        :rtype: dict
+        """
+        return self.__dict__
+
+
 class DownloadReport(object):
     """
     Download report.
@@ -415,11 +511,14 @@ class DownloadReport(object):
     :type total_sources: int
     :ivar downloads: Dict of: DownloadDetails keyed by source ID.
     :type downloads: dict
+    :ivar catalog: The catalog lookup details.
+    :type catalog: CatalogDetails
     """
 
     def __init__(self):
         self.total_sources = 0
         self.downloads = {}
+        self.catalog = CatalogDetails()
 
     def dict(self):
         """
@@ -428,7 +527,8 @@ class DownloadReport(object):
         :rtype: dict
         """
         return dict(total_sources=self.total_sources,
-                    downloads=dict([(k, v.dict()) for k, v in self.downloads.items()]))
+                    downloads=dict([(k, v.dict()) for k, v in self.downloads.items()]),
+                    catalog=self.catalog.dict())
 
 
 class RefreshReport(object):
@@ -444,6 +544,8 @@ class RefreshReport(object):
     :type deleted_count: int
     :ivar errors: The list of errors.
     :type errors: list
+    :ivar seconds: The time spent refreshing.
+    :type seconds: float
     """
 
     def __init__(self, source_id, url):
@@ -459,6 +561,7 @@ class RefreshReport(object):
         self.added_count = 0
         self.deleted_count = 0
         self.errors = []
+        self.seconds = 0.0
 
     def dict(self):
         """
@@ -468,4 +571,4 @@ class RefreshReport(object):
         """
         return dict(source_id=self.source_id, url=self.url, succeeded=self.succeeded,
                     added_count=self.added_count, deleted_count=self.deleted_count,
-                    errors=self.errors)
+                    errors=self.errors, seconds=self.seconds)
@@ -28,6 +28,10 @@ from pulp.server.managers.repo import _common as common_utils
 
 _logger = logging.getLogger(__name__)
 
+# The number of repository content units (and their units) loaded into memory at
+# a time by find_repo_content_units.
+UNITS_PAGE_SIZE = 1000
+
 
 def find_repo_content_units(
         repository, repo_content_unit_q=None,
@@ -41,6 +45,9 @@ def find_repo_content_units(
     ContentUnit. If yield_content_unit is set to true then the ContentUnit will be yielded instead
     of the RepoContentUnit.
 
+    Results are ordered by unit type and unit ID so that limit and skip can be used to page
+    through them.
+
     :param repository: The repository to search.
     :type repository: pulp.server.db.model.Repository
     :param repo_content_unit_q: Any query filters to apply to the RepoContentUnits.
@@ -65,26 +72,43 @@ def find_repo_content_units(
 
     qs = model.RepositoryContentUnit.objects(q_obj=repo_content_unit_q,
                                              repo_id=repository.repo_id)
+    qs = qs.order_by('unit_type_id', 'unit_id')
 
-    type_map = {}
-    content_units = {}
+    if units_q is None:
+        # When the units are not filtered, every association yields its unit, so
+        # the skip and limit are performed by the database.
+        if skip:
+            qs = qs.skip(skip)
+        if limit:
+            qs = qs.limit(limit)
+        skip = limit = None
 
     yield_count = 1
     skip_count = 0
 
-    for repo_content_unit in qs:
-        id_set = type_map.setdefault(repo_content_unit.unit_type_id, set())
-        id_set.add(repo_content_unit.unit_id)
-        content_unit_set = content_units.setdefault(repo_content_unit.unit_type_id, dict())
-        content_unit_set[repo_content_unit.unit_id] = repo_content_unit
-
-    for unit_type, unit_ids in type_map.iteritems():
-        qs = plugin_api.get_unit_model_by_id(unit_type).objects(
-            q_obj=units_q, __raw__={'_id': {'$in': list(unit_ids)}})
-        if unit_fields:
-            qs = qs.only(unit_fields)
+    # The associations are read a page at a time, along with their units, so that
+    # only a page of associations and units is loaded into memory. The query set
+    # must not cache the associations it has returned.
+    for page in misc.paginate(qs.no_cache(), UNITS_PAGE_SIZE):
+        type_map = {}
+        for repo_content_unit in page:
+            id_set = type_map.setdefault(repo_content_unit.unit_type_id, set())
+            id_set.add(repo_content_unit.unit_id)
+
+        content_units = {}
+        for unit_type, unit_ids in type_map.iteritems():
+            unit_qs = plugin_api.get_unit_model_by_id(unit_type).objects(
+                q_obj=units_q, __raw__={'_id': {'$in': list(unit_ids)}})
+            if unit_fields:
+                unit_qs = unit_qs.only(unit_fields)
+            for unit in unit_qs:
+                content_units[(unit_type, unit.id)] = unit
+
+        for repo_content_unit in page:
+            unit = content_units.get((repo_content_unit.unit_type_id, repo_content_unit.unit_id))
+            if unit is None:
+                continue
 
-        for unit in qs:
             if skip and skip_count < skip:
                 skip_count += 1
                 continue
@@ -92,9 +116,8 @@ def find_repo_content_units(
             if yield_content_unit:
                 yield unit
             else:
-                cu = content_units[unit_type][unit.id]
-                cu.unit = unit
-                yield cu
+                repo_content_unit.unit = unit
+                yield repo_content_unit
 
             if limit:
                 if yield_count >= limit:
@@ -147,6 +170,19 @@ def associate_single_unit(repository, unit):
         upsert=True)
 
 
+def associate_units(repository, units):
+    """
+    Associate units to a repository using a single unordered bulk upsert.
+
+    :param repository: The repository to update.
+    :type repository: pulp.server.db.model.Repository
+    :param units: The units to associate to the repository.
+    :type units: iterable of pulp.server.db.model.ContentUnit
+    """
+    model.RepositoryContentUnit.objects.associate(
+        repository.repo_id, ((unit.unit_type_id, unit.id) for unit in units))
+
+
 def disassociate_units(repository, unit_iterable):
     """
     Disassociate all units in the iterable from the repository
@@ -558,6 +594,8 @@ def sync(repo_id, sync_config_override=None, scheduled_call_id=None):
         # which will set up cancel_sync_repo() as the target for the signal handler
         sync_repo = register_sigterm_handler(importer.sync_repo, importer.cancel_sync_repo)
         sync_report = sync_repo(transfer_repo, conduit, call_config)
+        # Write any units the importer saved but did not flush.
+        conduit.flush()
 
     except Exception, e:
         sync_end_timestamp = _now_timestamp()
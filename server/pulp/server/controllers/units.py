@@ -23,16 +23,23 @@ def find_units(units, pagination_size=50):
     model_class = None
 
     for units_group in misc.paginate(units, pagination_size):
-        q_object = mongoengine.Q()
-        # Build a query for the units in this group
-        for unit in units_group:
-            if model_class is None:
-                model_class = unit.__class__
-
-            # Build the query for all the units, the | operator here
-            # creates the equivalent of a mongo $or of all the unit keys
-            unit_q_obj = mongoengine.Q(**unit.unit_key)
-            q_object = q_object | unit_q_obj
+        if model_class is None:
+            model_class = units_group[0].__class__
+
+        if len(model_class.unit_key_fields) == 1:
+            # A unit key of a single field is matched using $in, which is
+            # a single index lookup rather than one clause for each unit
+            key_field = model_class.unit_key_fields[0]
+            key_values = [getattr(unit, key_field) for unit in units_group]
+            q_object = mongoengine.Q(**{'%s__in' % key_field: key_values})
+        else:
+            q_object = mongoengine.Q()
+            # Build a query for the units in this group
+            for unit in units_group:
+                # Build the query for all the units, the | operator here
+                # creates the equivalent of a mongo $or of all the unit keys
+                unit_q_obj = mongoengine.Q(**unit.unit_key)
+                q_object = q_object | unit_q_obj
 
         # Get this group of units
         query = model_class.objects(q_object)
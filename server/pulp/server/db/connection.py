@@ -25,6 +25,8 @@ _DEFAULT_MAX_POOL_SIZE = 10
 # please keep this in X.Y.Z format, with only integers.
 # see version.cpp in mongo source code for version format info.
 MONGO_MINIMUM_VERSION = "2.4.0"
+# Mongo error code for duplicate keys
+DUPLICATE_KEY_ERROR = 11000
 
 
 _logger = logging.getLogger(__name__)
@@ -0,0 +1,23 @@
+"""
+This migration removes the entries of the `content_catalog` collection.
+
+Catalog entries now belong to generations and entries written before generations
+were introduced are never visible.  The catalog is repopulated by the next refresh
+of each content source.  The index on `locator` alone is replaced by an index on
+the generation and locator.
+"""
+from pulp.server.db import connection
+
+
+def migrate(*args, **kwargs):
+    """
+    Perform the migration as described in this module's docblock.
+
+    :param args:   unused
+    :type  args:   list
+    :param kwargs: unused
+    :type  kwargs: dict
+    """
+    db = connection.get_database()
+    collection = db['content_catalog']
+    collection.drop()
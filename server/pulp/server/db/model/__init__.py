@@ -17,7 +17,8 @@ from pulp.server.async.emit import send as send_taskstatus_message
 from pulp.server.db.connection import UnsafeRetry
 from pulp.server.db.fields import ISO8601StringField
 from pulp.server.db.model.reaper_base import ReaperMixin
-from pulp.server.db.querysets import CriteriaQuerySet, RepoQuerySet
+from pulp.server.db.querysets import (CriteriaQuerySet, RepoQuerySet,
+                                      RepositoryContentUnitQuerySet)
 from pulp.server.webservices.views.serializers import Repository as RepoSerializer
 
 
@@ -172,6 +173,7 @@ class RepositoryContentUnit(AutoRetryDocument):
 
     meta = {'collection': 'repo_content_units',
             'allow_inheritance': False,
+            'queryset_class': RepositoryContentUnitQuerySet,
             'indexes': [
                 {
                     'fields': ['repo_id', 'unit_type_id', 'unit_id'],
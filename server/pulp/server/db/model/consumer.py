@@ -15,6 +15,8 @@ import datetime
 import hashlib
 import json
 
+from pymongo.errors import DuplicateKeyError
+
 from pulp.server.db.model.base import Model
 from pulp.server.db.model.reaper_base import ReaperMixin
 from pulp.common import dateutils
@@ -181,8 +183,10 @@ class RepoProfileApplicability(Model):
     unique_indices = (
         ('profile_hash', 'repo_id'),
     )
+    search_indices = ('repo_id',)
 
-    def __init__(self, profile_hash, repo_id, profile, applicability, _id=None, **kwargs):
+    def __init__(self, profile_hash, repo_id, profile, applicability, _id=None,
+                 repo_revision=None, **kwargs):
         """
         Construct a RepoProfileApplicability object.
 
@@ -197,6 +201,10 @@ class RepoProfileApplicability(Model):
         :type  applicability: dict
         :param _id:           The MongoDB ID for this object, if it exists in the database
         :type  _id:           bson.objectid.ObjectId
+        :param repo_revision: ISO8601 timestamp of the repository content the applicability data
+                              was calculated against. Units associated with the repository after
+                              this time are not reflected in the applicability data.
+        :type  repo_revision: basestring
         :param kwargs:        unused, but collected to allow instantiation from Mongo query results
         :type  kwargs:        dict
         """
@@ -207,6 +215,7 @@ class RepoProfileApplicability(Model):
         self.profile = profile
         self.applicability = applicability
         self._id = _id
+        self.repo_revision = repo_revision
 
         # The superclass puts an unnecessary (and confusingly named) id attribute on this model.
         # Let's remove it.
@@ -222,16 +231,29 @@ class RepoProfileApplicability(Model):
         """
         Save any changes made to this RepoProfileApplicability model to the database. If it doesn't
         exist in the database already, insert a new record to represent it.
+
+        A new object replaces the record that another regeneration may have saved for the same
+        profile_hash and repo_id in the meantime, rather than colliding with it.
         """
         # If this object's _id attribute is not None, then it represents an existing DB object.
         # Else, we need to create an object with this object's attributes
         new_document = {'profile_hash': self.profile_hash, 'repo_id': self.repo_id,
-                        'profile': self.profile, 'applicability': self.applicability}
+                        'profile': self.profile, 'applicability': self.applicability,
+                        'repo_revision': self.repo_revision}
         if self._id is not None:
             self.get_collection().update({'_id': self._id}, new_document)
-        else:
-            # Let's set the _id attribute to the newly created document
-            self._id = self.get_collection().insert(new_document)
+            return
+        spec = {'profile_hash': self.profile_hash, 'repo_id': self.repo_id}
+        try:
+            document = self.get_collection().find_and_modify(
+                query=spec, update={'$set': new_document}, upsert=True, new=True, fields=['_id'])
+        except DuplicateKeyError:
+            # Two upserts of the same new record both tried to insert it; the other one won, so
+            # this one now finds and updates it.
+            document = self.get_collection().find_and_modify(
+                query=spec, update={'$set': new_document}, new=True, fields=['_id'])
+        # Let's set the _id attribute to the saved document
+        self._id = document['_id']
 
 
 class UnitProfile(Model):
@@ -271,6 +293,7 @@ class UnitProfile(Model):
     unique_indices = (
         ('consumer_id', 'content_type'),
     )
+    search_indices = ('profile_hash',)
 
     def __init__(self, consumer_id, content_type, profile, profile_hash=None):
         """
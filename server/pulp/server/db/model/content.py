@@ -70,20 +70,17 @@ class ContentCatalog(Model):
     Represents a catalog of available content provided by content sources.
     Things to know about the catalog:
      - Entries are contributed by content sources.
-     - Each entry contains an expiration timestamp.  Entries are permitted
-       to remain in the catalog until they expire (plus an optional grace period).
+     - Each refresh of a content source writes its entries to a new generation.
+       Once written, the generation becomes the active generation of the source
+       and the entries of the previous generation are deleted.
+     - Only entries belonging to an active generation are visible.
+       See: ContentCatalogGeneration.
      - The locator is a hashed json encoding of the type_id and unit_key.  It is
        used for fast indexing and searching since the unit_key is arbitrary.
-     - The catalog may be refreshed concurrently.
-     - The catalog provides best effort read consistency by:
-       - lazily purging expired entries.
-       - supporting find() operations on a catalog containing multiple entries
-         matching the same locator.  In these cases, only the newest entry is
-         included for each source in the result set.
     :ivar source_id: The ID of the contributing content source.
     :type source_id: str
-    :ivar expires: The expiration UTC timestamp.
-    :type expires: int
+    :ivar generation: The generation to which the entry belongs.
+    :type generation: bson.objectid.ObjectId
     :ivar type_id: The unit type ID.
     :type type_id: str
     :ivar unit_key: The unit key.
@@ -95,7 +92,7 @@ class ContentCatalog(Model):
     """
 
     collection_name = 'content_catalog'
-    search_indices = ('source_id', 'locator')
+    search_indices = ('source_id', ('generation', 'locator'))
     unique_indices = ()
 
     @staticmethod
@@ -128,12 +125,12 @@ class ContentCatalog(Model):
         dt = now + timedelta(seconds=duration)
         return dateutils.datetime_to_utc_timestamp(dt)
 
-    def __init__(self, source_id, expiration, type_id, unit_key, url):
+    def __init__(self, source_id, generation, type_id, unit_key, url):
         """
         :param source_id: The ID of the contributing content source.
         :type source_id: str
-        :param expiration: The expiration (duration in seconds).
-        :type expiration: int
+        :param generation: The generation to which the entry belongs.
+        :type generation: bson.objectid.ObjectId
         :param type_id: A content unit's type ID.
         :type type_id: str
         :param unit_key: A content unit's key.
@@ -143,8 +140,26 @@ class ContentCatalog(Model):
         """
         Model.__init__(self)
         self.source_id = source_id
-        self.expiration = self.get_expiration(expiration)
+        self.generation = generation
         self.type_id = type_id
         self.unit_key = unit_key
         self.locator = self.get_locator(type_id, unit_key)
         self.url = url
+
+
+class ContentCatalogGeneration(Model):
+    """
+    The active content catalog generation of a content source.
+    Activating a new generation is a single update of this document, so readers
+    see either all of the entries written by a refresh or none of them.
+    :ivar source_id: The ID of the content source.
+    :type source_id: str
+    :ivar generation: The active generation.
+    :type generation: bson.objectid.ObjectId
+    :ivar expiration: The expiration UTC timestamp of the generation.
+    :type expiration: int
+    """
+
+    collection_name = 'content_catalog_generations'
+    search_indices = ()
+    unique_indices = ('source_id',)
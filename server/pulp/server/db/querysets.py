@@ -1,7 +1,10 @@
 from mongoengine.queryset import DoesNotExist, QuerySet
 from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError
 
+from pulp.common import dateutils
 from pulp.server import exceptions as pulp_exceptions
+from pulp.server.db.connection import DUPLICATE_KEY_ERROR
 
 
 class CriteriaQuerySet(QuerySet):
@@ -89,3 +92,50 @@ class RepoQuerySet(CriteriaQuerySet):
             return self.get(repo_id=repo_id)
         except DoesNotExist:
             raise pulp_exceptions.MissingResource(repository=repo_id)
+
+
+class RepositoryContentUnitQuerySet(QuerySet):
+    """
+    Custom queryset for repository content unit associations.
+    """
+
+    def associate(self, repo_id, unit_ids, update_existing=True):
+        """
+        Associate units to a repository using a single unordered bulk upsert.
+
+        :param repo_id: identifies the repository
+        :type  repo_id: str
+        :param unit_ids: (unit_type_id, unit_id) of each unit to associate
+        :type  unit_ids: iterable of tuple
+        :param update_existing: if True, the updated timestamp of associations that already
+                                exist is set; otherwise they are left untouched
+        :type  update_existing: bool
+
+        :return: number of associations created
+        :rtype:  int
+        """
+        formatted_datetime = dateutils.format_iso8601_utc_timestamp(
+            dateutils.now_utc_timestamp())
+        if update_existing:
+            document = {'$setOnInsert': {'created': formatted_datetime},
+                        '$set': {'updated': formatted_datetime}}
+        else:
+            document = {'$setOnInsert': {'created': formatted_datetime,
+                                         'updated': formatted_datetime}}
+        unit_ids = set(unit_ids)
+        if not unit_ids:
+            return 0
+        bulk = self._collection.initialize_unordered_bulk_op()
+        for unit_type_id, unit_id in unit_ids:
+            spec = {'repo_id': repo_id,
+                    'unit_id': unit_id,
+                    'unit_type_id': unit_type_id}
+            bulk.find(spec).upsert().update_one(document)
+        try:
+            return bulk.execute()['nUpserted']
+        except BulkWriteError, e:
+            # An association created concurrently makes the upsert collide on the
+            # unique index; it already exists, which is all that was asked for.
+            if any(error['code'] != DUPLICATE_KEY_ERROR for error in e.details['writeErrors']):
+                raise
+            return e.details['nUpserted']
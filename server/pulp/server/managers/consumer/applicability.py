@@ -4,15 +4,19 @@ Contains content applicability management classes
 
 from gettext import gettext as _
 from logging import getLogger
+import uuid
 
 from celery import task
+from pymongo import ASCENDING
 
+from pulp.common import dateutils, tags
 from pulp.plugins.conduits.profiler import ProfilerConduit
 from pulp.plugins.config import PluginCallConfiguration
 from pulp.plugins.loader import api as plugin_api, exceptions as plugin_exceptions
 from pulp.plugins.profiler import Profiler
-from pulp.server.async.tasks import Task
-from pulp.server.db import model
+from pulp.plugins.util import misc as plugin_misc
+from pulp.server.async.tasks import get_current_task_id, Task, TaskResult
+from pulp.server.db import connection, model
 from pulp.server.db.model.consumer import Bind, RepoProfileApplicability, UnitProfile
 from pulp.server.db.model.criteria import Criteria
 from pulp.server.managers import factory as managers
@@ -21,6 +25,17 @@ from pulp.server.managers.consumer.query import ConsumerQueryManager
 
 _logger = getLogger(__name__)
 
+# The number of existing RepoProfileApplicability documents that are loaded, recalculated and
+# saved together when regenerating applicability for a repository.
+REGENERATION_BATCH_SIZE = 500
+
+# The maximum number of (repo_id, profile_hash) pairs handled by a single task when applicability
+# regeneration is spread across the workers.
+REGENERATION_CHUNK_SIZE = 2000
+
+# The number of consumers processed at a time when streaming an applicability report.
+REPORT_PAGE_SIZE = 1000
+
 
 class ApplicabilityRegenerationManager(object):
     @staticmethod
@@ -90,27 +105,61 @@ class ApplicabilityRegenerationManager(object):
                     for unit_profile_tuple in consumer_unit_profiles_map[consumer_id]:
                         repo_profile_hashes.add((repo_id, unit_profile_tuple))
 
-        # Iterate through each tuple in repo_profile_hashes set and regenerate applicability,
-        # if it doesn't exist. These are all guaranteed to be unique tuples because of the logic
-        # used to create maps and sets above, eliminating multiple unnecessary queries
-        # to check for existing applicability for same profiles.
-        manager = managers.applicability_regeneration_manager()
+        # Collect each tuple in repo_profile_hashes set that doesn't have applicability yet.
+        # These are all guaranteed to be unique tuples because of the logic used to create maps
+        # and sets above. The existing applicability is looked up for all of them at once,
+        # eliminating a query per tuple.
+        existing_keys = ApplicabilityRegenerationManager._existing_applicability_keys(
+            repo_profile_hashes)
+        missing_profiles = []
         for repo_id, (profile_hash, content_type) in repo_profile_hashes:
-            # Check if applicability for given profile_hash and repo_id already exists
-            if ApplicabilityRegenerationManager._is_existing_applicability(repo_id, profile_hash):
+            if (repo_id, profile_hash) in existing_keys:
                 continue
-            # If applicability does not exist, generate applicability data for given profile
-            # and repo id.
             profile_id = profile_hash_profile_id_map[profile_hash]
+            missing_profiles.append((repo_id, profile_hash, content_type, profile_id))
+        skipped = len(repo_profile_hashes) - len(missing_profiles)
+        _logger.debug('Applicability exists for %d (repo, profile) pairs, generating %d' %
+                      (skipped, len(missing_profiles)))
+
+        # Generate applicability data for the missing profiles, spreading the work across the
+        # workers when there is more than one chunk of it.
+        return ApplicabilityRegenerationManager._regenerate_in_chunks(
+            missing_profiles,
+            ApplicabilityRegenerationManager.regenerate_applicability_for_profiles,
+            regenerate_applicability_for_profiles, skipped=skipped)
+
+    @staticmethod
+    def regenerate_applicability_for_profiles(repo_profiles):
+        """
+        Generate and save applicability data for the given (repo_id, profile_hash, content_type,
+        profile_id) tuples. This is the unit of work dispatched by
+        regenerate_applicability_for_consumers().
+
+        :param repo_profiles: list of (repo_id, profile_hash, content_type, profile_id) tuples
+        :type  repo_profiles: list
+        """
+        manager = managers.applicability_regeneration_manager()
+        for repo_id, profile_hash, content_type, profile_id in repo_profiles:
             manager.regenerate_applicability(profile_hash, content_type, profile_id, repo_id)
 
     @staticmethod
-    def regenerate_applicability_for_repos(repo_criteria):
+    def regenerate_applicability_for_repos(repo_criteria, incremental=False):
         """
         Regenerate and save applicability data affected by given updated repositories.
 
+        The (repo_id, profile_hash) pairs of the existing applicability data are split into
+        chunks. If there is more than one chunk, each chunk is regenerated by its own task so
+        that the work is spread across the workers, and the spawned tasks are returned in a
+        TaskResult.
+
         :param repo_criteria: The repo selection criteria
         :type repo_criteria: dict
+        :param incremental:   if True, only the units added to or removed from the repositories
+                              since the applicability data was last calculated are considered,
+                              for profilers that support it. See _regenerate_applicability_batch.
+        :type  incremental:   bool
+        :return: a TaskResult listing the spawned tasks, if any were spawned
+        :rtype:  pulp.server.async.tasks.TaskResult or None
         """
         repo_criteria = Criteria.from_dict(repo_criteria)
 
@@ -118,29 +167,381 @@ class ApplicabilityRegenerationManager(object):
         repo_criteria.fields = ['id']
         repo_ids = [r.repo_id for r in model.Repository.objects.find_by_criteria(repo_criteria)]
 
+        # The pairs are read a page at a time as the chunks are dispatched, rather than all
+        # being loaded up front.
+        total = RepoProfileApplicability.get_collection().find(
+            {'repo_id': {'$in': repo_ids}}).count()
+        repo_profile_hashes = ApplicabilityRegenerationManager._repo_profile_hashes(repo_ids)
+
+        return ApplicabilityRegenerationManager._regenerate_in_chunks(
+            repo_profile_hashes,
+            ApplicabilityRegenerationManager.regenerate_applicability_for_repo_profiles,
+            regenerate_applicability_for_repo_profiles,
+            process_kwargs={'incremental': incremental}, total=total)
+
+    @staticmethod
+    def _repo_profile_hashes(repo_ids, page_size=REGENERATION_CHUNK_SIZE):
+        """
+        Generate the (repo_id, profile_hash) pairs of the existing applicability data for the
+        given repositories.
+
+        The applicability documents of each repository are read page_size at a time, paged by
+        _id rather than read from a single long-lived cursor, so that the cursor cannot time
+        out while the chunks are being dispatched.
+
+        :param repo_ids:  ids of the repositories
+        :type  repo_ids:  list
+        :param page_size: number of applicability documents read per query
+        :type  page_size: int
+        :return: generator of (repo_id, profile_hash) pairs
+        :rtype:  generator
+        """
+        collection = RepoProfileApplicability.get_collection()
         for repo_id in repo_ids:
-            # Find all existing applicabilities for given repo_id. Setting batch size of 5 ensures
-            # the MongoDB cursor does not time out. See https://pulp.plan.io/issues/998#note-6 for
-            # more details.
-            existing_applicabilities = RepoProfileApplicability.get_collection().find(
-                {'repo_id': repo_id}).batch_size(5)
-            for existing_applicability in existing_applicabilities:
-                # Convert cursor to RepoProfileApplicability object
-                existing_applicability = RepoProfileApplicability(**dict(existing_applicability))
-                profile_hash = existing_applicability['profile_hash']
-                unit_profile = UnitProfile.get_collection().find_one({'profile_hash': profile_hash},
-                                                                     fields=['id', 'content_type'])
-                if unit_profile is None:
-                    # Unit profiles change whenever packages are installed or removed on consumers,
-                    # and it is possible that existing_applicability references a UnitProfile
-                    # that no longer exists. This is harmless, as Pulp has a monthly cleanup task
-                    # that will identify these dangling references and remove them.
-                    continue
-
-                # Regenerate applicability data for given unit_profile and repo id
-                ApplicabilityRegenerationManager.regenerate_applicability(
-                    profile_hash, unit_profile['content_type'], unit_profile['id'], repo_id,
-                    existing_applicability)
+            last_id = None
+            while True:
+                query = {'repo_id': repo_id}
+                if last_id is not None:
+                    query['_id'] = {'$gt': last_id}
+                page = list(collection.find(query, fields=['profile_hash'],
+                                            sort=[('_id', ASCENDING)], limit=page_size))
+                for applicability in page:
+                    yield repo_id, applicability['profile_hash']
+                if len(page) < page_size:
+                    break
+                last_id = page[-1]['_id']
+
+    @staticmethod
+    def regenerate_applicability_for_repo_profiles(repo_profile_hashes,
+                                                   batch_size=REGENERATION_BATCH_SIZE,
+                                                   incremental=False):
+        """
+        Regenerate and save the existing applicability data for the given (repo_id, profile_hash)
+        pairs. This is the unit of work dispatched by regenerate_applicability_for_repos().
+
+        :param repo_profile_hashes: list of (repo_id, profile_hash) pairs
+        :type  repo_profile_hashes: list
+        :param batch_size:          number of RepoProfileApplicability documents to process per
+                                    batch
+        :type  batch_size:          int
+        :param incremental:         if True, only consider the units added or removed since the
+                                    last calculation where possible
+        :type  incremental:         bool
+        :return:                    number of RepoProfileApplicability documents that were updated
+        :rtype:                     int
+        """
+        fields = ApplicabilityRegenerationManager._batch_fields(incremental)
+        profile_hashes_by_repo = {}
+        for repo_id, profile_hash in repo_profile_hashes:
+            profile_hashes_by_repo.setdefault(repo_id, []).append(profile_hash)
+
+        collection = RepoProfileApplicability.get_collection()
+        updated = 0
+        for repo_id, profile_hashes in profile_hashes_by_repo.iteritems():
+            repo_content_types = \
+                ApplicabilityRegenerationManager._get_existing_repo_content_types(repo_id)
+            if not repo_content_types:
+                continue
+            profilers = {}
+            for start in xrange(0, len(profile_hashes), batch_size):
+                query = {'repo_id': repo_id,
+                         'profile_hash': {'$in': profile_hashes[start:start + batch_size]}}
+                batch = list(collection.find(query, fields=fields))
+                updated += ApplicabilityRegenerationManager._regenerate_applicability_batch(
+                    repo_id, repo_content_types, batch, profilers, incremental)
+        return updated
+
+    @staticmethod
+    def _regenerate_in_chunks(work, process, chunk_task, chunk_size=REGENERATION_CHUNK_SIZE,
+                              skipped=0, process_kwargs=None, total=None):
+        """
+        Split the given work items into chunks of chunk_size. A single chunk is processed in the
+        current task by calling process. Otherwise every chunk is dispatched as a separate
+        chunk_task, so that the chunks are processed in parallel by the available workers.
+
+        The work items are read from the iterable a chunk at a time, so only one chunk is held
+        in memory when total is given.
+
+        The progress of the current task is reported under the 'applicability_regeneration' key.
+
+        :param work:       work items to process
+        :type  work:       iterable
+        :param process:    function that processes a list of work items in the current task
+        :type  process:    callable
+        :param chunk_task: task that processes a list of work items
+        :type  chunk_task: celery.Task
+        :param chunk_size: maximum number of work items in a chunk
+        :type  chunk_size: int
+        :param skipped:    number of items that were found not to need any work, reported in the
+                           progress only
+        :type  skipped:    int
+        :param process_kwargs: keyword arguments passed to process and chunk_task with each chunk
+        :type  process_kwargs: dict
+        :param total:      number of work items, needed when work is not a list
+        :type  total:      int
+        :return: a TaskResult listing the spawned tasks, if any were spawned
+        :rtype:  pulp.server.async.tasks.TaskResult or None
+        """
+        process_kwargs = process_kwargs or {}
+        if total is None:
+            total = len(work)
+        chunks = (list(chunk) for chunk in plugin_misc.paginate(work, chunk_size))
+        progress = {'items_total': total, 'items_skipped': skipped,
+                    'chunks_total': (total + chunk_size - 1) // chunk_size,
+                    'chunks_dispatched': 0, 'items_processed': 0}
+        _set_regeneration_progress(progress)
+
+        if total <= chunk_size:
+            for chunk in chunks:
+                process(chunk, **process_kwargs)
+            progress['items_processed'] = total
+            _set_regeneration_progress(progress)
+            return
+
+        task_tags = [tags.action_tag('content_applicability_regeneration')]
+        spawned_tasks = []
+        for chunk in chunks:
+            # The chunks of one call touch distinct (repo_id, profile_hash) pairs, so each one
+            # gets a resource of its own and may run on any free worker. Chunks of overlapping
+            # calls may share pairs; RepoProfileApplicability.save() upserts on the pair, so the
+            # last one to finish wins instead of failing on the unique index.
+            spawned_tasks.append(chunk_task.apply_async_with_reservation(
+                tags.RESOURCE_REPOSITORY_PROFILE_APPLICABILITY_TYPE, str(uuid.uuid4()),
+                (chunk,), process_kwargs, tags=task_tags))
+            progress['chunks_dispatched'] += 1
+            _set_regeneration_progress(progress)
+        return TaskResult(spawned_tasks=spawned_tasks)
+
+    @staticmethod
+    def _batch_fields(incremental):
+        """
+        :param incremental: whether the batch is regenerated incrementally
+        :type  incremental: bool
+        :return: the RepoProfileApplicability fields needed to regenerate a batch
+        :rtype:  list
+        """
+        if incremental:
+            return ['profile_hash', 'profile', 'applicability', 'repo_revision']
+        return ['profile_hash', 'profile']
+
+    @staticmethod
+    def _regenerate_applicability_batch(repo_id, repo_content_types, batch, profilers,
+                                        incremental=False):
+        """
+        Recalculate and save the applicability data for a batch of existing
+        RepoProfileApplicability documents that all belong to the same repository.
+
+        Every document is saved with the repository revision it was calculated against, which
+        is the time the calculation started. When incremental is True, documents that have a
+        revision are not recalculated from scratch if their profiler declares
+        incremental_applicability in its metadata. Instead, the profiler is only asked about the
+        units associated with the repository since that revision, and the result is merged into
+        the stored applicability after dropping the units that are no longer in the repository.
+
+        :param repo_id:            id of the repository the batch belongs to
+        :type  repo_id:            basestring
+        :param repo_content_types: content type ids that have units in the repository
+        :type  repo_content_types: list
+        :param batch:              RepoProfileApplicability documents, each having at least the
+                                   _id, profile_hash and profile fields, and the applicability and
+                                   repo_revision fields if incremental is True
+        :type  batch:              list
+        :param profilers:          cache of content type id to the result of
+                                   _applicability_profiler(), shared between batches
+        :type  profilers:          dict
+        :param incremental:        whether to regenerate incrementally where possible
+        :type  incremental:        bool
+        :return:                   number of documents updated
+        :rtype:                    int
+        """
+        revision = dateutils.format_iso8601_utc_timestamp(dateutils.now_utc_timestamp())
+
+        # Look up the content type of every profile hash in the batch with a single query
+        content_types = ApplicabilityRegenerationManager._profile_content_types(
+            set(a['profile_hash'] for a in batch))
+
+        # Group the batch by content type, so the profiler is only resolved once for each type
+        applicabilities_by_type = {}
+        for existing_applicability in batch:
+            content_type = content_types.get(existing_applicability['profile_hash'])
+            if content_type is None:
+                # Unit profiles change whenever packages are installed or removed on consumers,
+                # and it is possible that existing_applicability references a UnitProfile
+                # that no longer exists. This is harmless, as Pulp has a monthly cleanup task
+                # that will identify these dangling references and remove them.
+                continue
+            applicabilities_by_type.setdefault(content_type, []).append(existing_applicability)
+
+        added_units = present_units = None
+        if incremental:
+            added_units, present_units = ApplicabilityRegenerationManager._repo_content_delta(
+                repo_id, batch)
+
+        bulk = RepoProfileApplicability.get_collection().initialize_unordered_bulk_op()
+        updated = 0
+        for content_type, existing_applicabilities in applicabilities_by_type.iteritems():
+            if content_type not in profilers:
+                profilers[content_type] = ApplicabilityRegenerationManager._applicability_profiler(
+                    content_type, repo_content_types)
+            if profilers[content_type] is None:
+                continue
+            profiler, call_config = profilers[content_type]
+            supports_incremental = profiler.metadata().get('incremental_applicability', False)
+            profiler_conduit = ProfilerConduit()
+            try:
+                for existing_applicability in existing_applicabilities:
+                    last_revision = existing_applicability.get('repo_revision')
+                    if incremental and supports_incremental and last_revision:
+                        applicability = ApplicabilityRegenerationManager._incremental_applicability(
+                            existing_applicability, repo_id, profiler, call_config,
+                            added_units, present_units)
+                    else:
+                        applicability = profiler.calculate_applicable_units(
+                            existing_applicability['profile'], repo_id, call_config,
+                            profiler_conduit)
+                    bulk.find({'_id': existing_applicability['_id']}).update_one(
+                        {'$set': {'applicability': applicability, 'repo_revision': revision}})
+                    updated += 1
+            except NotImplementedError:
+                msg = "Profiler for content type [%s] does not support applicability" % content_type
+                _logger.debug(msg)
+                # Don't ask this profiler again for the rest of the batches
+                profilers[content_type] = None
+
+        if updated:
+            bulk.execute()
+        return updated
+
+    @staticmethod
+    def _profile_content_types(profile_hashes):
+        """
+        Look up the content type of the given profile hashes.
+
+        Many consumers usually share a profile hash, so the unit profiles are grouped by hash in
+        the database and a single document is returned for each hash.
+
+        :param profile_hashes: the profile hashes to look up
+        :type  profile_hashes: iterable
+        :return: content type keyed by profile hash, for the hashes that have a unit profile
+        :rtype:  dict
+        """
+        pipeline = [
+            {'$match': {'profile_hash': {'$in': list(profile_hashes)}}},
+            {'$group': {'_id': '$profile_hash', 'content_type': {'$first': '$content_type'}}}]
+        q = connection.get_database().command('aggregate', UnitProfile.collection_name,
+                                              pipeline=pipeline)
+        return dict((result['_id'], result['content_type']) for result in q['result'])
+
+    @staticmethod
+    def _repo_content_delta(repo_id, batch):
+        """
+        Find the repository content that changed since the oldest revision in the batch.
+
+        Removed associations leave no trace in the database, so rather than looking for removals
+        the unit ids in the stored applicability of the batch are checked against the units that
+        are still associated with the repository.
+
+        :param repo_id: id of the repository the batch belongs to
+        :type  repo_id: basestring
+        :param batch:   RepoProfileApplicability documents with the applicability and
+                        repo_revision fields
+        :type  batch:   list
+        :return: (added, present) tuple, where added maps the id of every unit associated since
+                 the oldest revision in the batch to the time of its association, and present is
+                 the set of unit ids in the stored applicability that are still associated
+        :rtype:  tuple
+        """
+        revisions = [a['repo_revision'] for a in batch if a.get('repo_revision')]
+        if not revisions:
+            return {}, set()
+
+        qs = model.RepositoryContentUnit.objects(repo_id=repo_id, created__gte=min(revisions))
+        added = dict((rcu.unit_id, rcu.created) for rcu in qs.only('unit_id', 'created'))
+
+        stored_unit_ids = set()
+        for existing_applicability in batch:
+            if existing_applicability.get('repo_revision'):
+                for unit_ids in (existing_applicability.get('applicability') or {}).itervalues():
+                    stored_unit_ids.update(unit_ids)
+        present = set()
+        for unit_ids in plugin_misc.paginate(stored_unit_ids, REGENERATION_BATCH_SIZE):
+            qs = model.RepositoryContentUnit.objects(repo_id=repo_id, unit_id__in=list(unit_ids))
+            present.update(qs.distinct('unit_id'))
+        return added, present
+
+    @staticmethod
+    def _incremental_applicability(existing_applicability, repo_id, profiler, call_config,
+                                   added_units, present_units):
+        """
+        Calculate the applicability of the units added to the repository since the revision of
+        existing_applicability, and merge it into the stored applicability.
+
+        :param existing_applicability: RepoProfileApplicability document with the profile,
+                                       applicability and repo_revision fields
+        :type  existing_applicability: dict
+        :param repo_id:                id of the repository
+        :type  repo_id:                basestring
+        :param profiler:               profiler that supports incremental applicability
+        :type  profiler:               pulp.plugins.profiler.Profiler
+        :param call_config:            plugin configuration for the profiler
+        :type  call_config:            pulp.plugins.config.PluginCallConfiguration
+        :param added_units:            map of recently associated unit ids to association times
+        :type  added_units:            dict
+        :param present_units:          stored applicable unit ids still in the repository
+        :type  present_units:          set
+        :return: the merged applicability
+        :rtype:  dict
+        """
+        last_revision = existing_applicability['repo_revision']
+        new_unit_ids = [unit_id for unit_id, created in added_units.iteritems()
+                        if created >= last_revision]
+
+        applicability = {}
+        for type_id, unit_ids in (existing_applicability.get('applicability') or {}).iteritems():
+            applicability[type_id] = [u for u in unit_ids if u in present_units]
+
+        if new_unit_ids:
+            profiler_conduit = ProfilerConduit(unit_ids=new_unit_ids)
+            delta = profiler.calculate_applicable_units(
+                existing_applicability['profile'], repo_id, call_config, profiler_conduit)
+            for type_id, unit_ids in delta.iteritems():
+                merged = applicability.setdefault(type_id, [])
+                known = set(merged)
+                for unit_id in unit_ids:
+                    if unit_id not in known:
+                        merged.append(unit_id)
+                        known.add(unit_id)
+        return applicability
+
+    @staticmethod
+    def _applicability_profiler(content_type, repo_content_types):
+        """
+        Find the profiler that calculates applicability for the given content type against a
+        repository containing the given content types.
+
+        :param content_type:       profile (unit) type ID
+        :type  content_type:       str
+        :param repo_content_types: content type ids that have units in the repository
+        :type  repo_content_types: list
+        :return: (profiler, call_config) tuple, or None if no profiler supports applicability
+                 for this content type, or if the profiler does not handle any of the content
+                 types in the repository
+        :rtype:  tuple or None
+        """
+        profiler, profiler_cfg = ApplicabilityRegenerationManager._profiler(content_type)
+
+        # Check if the profiler supports applicability. If the base class
+        # calculate_applicable_units method would be called, skip applicability regeneration.
+        if profiler.calculate_applicable_units == Profiler.calculate_applicable_units:
+            return None
+
+        # Only regenerate if the profiler handles at least one of the types in the repo
+        if not set(repo_content_types) & set(profiler.metadata()['types']):
+            return None
+
+        call_config = PluginCallConfiguration(plugin_config=profiler_cfg,
+                                              repo_plugin_config=None)
+        return profiler, call_config
 
     @staticmethod
     def regenerate_applicability(profile_hash, content_type, profile_id,
@@ -166,50 +567,47 @@ class ApplicabilityRegenerationManager(object):
         :type existing_applicability: pulp.server.db.model.consumer.RepoProfileApplicability
         """
         profiler_conduit = ProfilerConduit()
-        # Get the profiler for content_type of given unit_profile
-        profiler, profiler_cfg = ApplicabilityRegenerationManager._profiler(content_type)
-
-        # Check if the profiler supports applicability, else return
-        if profiler.calculate_applicable_units == Profiler.calculate_applicable_units:
-            # If base class calculate_applicable_units method is called,
-            # skip applicability regeneration
-            return
-
         # Find out which content types have unit counts greater than zero in the bound repo
         repo_content_types = ApplicabilityRegenerationManager._get_existing_repo_content_types(
             bound_repo_id)
-        # Get the intersection of existing types in the repo and the types that the profiler
-        # handles. If the intersection is not empty, regenerate applicability
-        if (set(repo_content_types) & set(profiler.metadata()['types'])):
-            # Get the actual profile for existing_applicability or lookup using profile_id
-            if existing_applicability:
-                profile = existing_applicability.profile
-            else:
-                unit_profile = UnitProfile.get_collection().find_one({'id': profile_id},
-                                                                     fields=['profile'])
-                profile = unit_profile['profile']
-            call_config = PluginCallConfiguration(plugin_config=profiler_cfg,
-                                                  repo_plugin_config=None)
-            try:
-                applicability = profiler.calculate_applicable_units(profile,
-                                                                    bound_repo_id,
-                                                                    call_config,
-                                                                    profiler_conduit)
-            except NotImplementedError:
-                msg = "Profiler for content type [%s] does not support applicability" % content_type
-                _logger.debug(msg)
-                return
-
-            if existing_applicability:
-                # Update existing applicability object
-                existing_applicability.applicability = applicability
-                existing_applicability.save()
-            else:
-                # Create a new RepoProfileApplicability object and save it in the db
-                RepoProfileApplicability.objects.create(profile_hash,
-                                                        bound_repo_id,
-                                                        unit_profile['profile'],
-                                                        applicability)
+        # Get the profiler for content_type of given unit_profile. If it does not support
+        # applicability or does not handle any of the types in the repo, there is nothing to do.
+        profiler_and_config = ApplicabilityRegenerationManager._applicability_profiler(
+            content_type, repo_content_types)
+        if profiler_and_config is None:
+            return
+        profiler, call_config = profiler_and_config
+
+        # Get the actual profile for existing_applicability or lookup using profile_id
+        if existing_applicability:
+            profile = existing_applicability.profile
+        else:
+            unit_profile = UnitProfile.get_collection().find_one({'id': profile_id},
+                                                                 fields=['profile'])
+            profile = unit_profile['profile']
+        revision = dateutils.format_iso8601_utc_timestamp(dateutils.now_utc_timestamp())
+        try:
+            applicability = profiler.calculate_applicable_units(profile,
+                                                                bound_repo_id,
+                                                                call_config,
+                                                                profiler_conduit)
+        except NotImplementedError:
+            msg = "Profiler for content type [%s] does not support applicability" % content_type
+            _logger.debug(msg)
+            return
+
+        if existing_applicability:
+            # Update existing applicability object
+            existing_applicability.applicability = applicability
+            existing_applicability.repo_revision = revision
+            existing_applicability.save()
+        else:
+            # Create a new RepoProfileApplicability object and save it in the db
+            RepoProfileApplicability.objects.create(profile_hash,
+                                                    bound_repo_id,
+                                                    unit_profile['profile'],
+                                                    applicability,
+                                                    repo_revision=revision)
 
     @staticmethod
     def _get_existing_repo_content_types(repo_id):
@@ -234,21 +632,41 @@ class ApplicabilityRegenerationManager(object):
         return repo_content_types_with_non_zero_unit_count
 
     @staticmethod
-    def _is_existing_applicability(repo_id, profile_hash):
+    def _existing_applicability_keys(repo_profile_hashes, batch_size=REGENERATION_BATCH_SIZE):
         """
-        Check if applicability for given repo and profle hash is already calculated.
-
-        :param repo_id:      repo id
-        :type repo_id:       basestring
-        :param profile_hash: unit profile hash
-        :type profile_hash:  basestring
-        :return:             true if applicability exists, false otherwise
-        :type:               boolean
+        Find which of the given repo and profile hash combinations already have applicability
+        calculated. The lookup is done with one query per batch_size profile hashes rather than
+        one query per combination.
+
+        :param repo_profile_hashes: iterable of (repo_id, (profile_hash, content_type)) tuples
+        :type  repo_profile_hashes: iterable
+        :param batch_size:          maximum number of profile hashes in a single query
+        :type  batch_size:          int
+        :return:                    set of (repo_id, profile_hash) tuples that have applicability
+        :rtype:                     set
         """
-        query_params = {'repo_id': repo_id, 'profile_hash': profile_hash}
-        if RepoProfileApplicability.get_collection().find_one(query_params, fields=['_id']):
-            return True
-        return False
+        repo_ids = set()
+        profile_hashes = set()
+        candidates = set()
+        for repo_id, (profile_hash, content_type) in repo_profile_hashes:
+            repo_ids.add(repo_id)
+            profile_hashes.add(profile_hash)
+            candidates.add((repo_id, profile_hash))
+
+        collection = RepoProfileApplicability.get_collection()
+        repo_ids = list(repo_ids)
+        profile_hashes = list(profile_hashes)
+        existing_keys = set()
+        for start in xrange(0, len(profile_hashes), batch_size):
+            query = {'repo_id': {'$in': repo_ids},
+                     'profile_hash': {'$in': profile_hashes[start:start + batch_size]}}
+            for applicability in collection.find(query, fields=['repo_id', 'profile_hash']):
+                key = (applicability['repo_id'], applicability['profile_hash'])
+                # The query matches every combination of the repos and profile hashes, so only
+                # keep the ones that were asked about.
+                if key in candidates:
+                    existing_keys.add(key)
+        return existing_keys
 
     @staticmethod
     def _profiler(type_id):
@@ -276,6 +694,27 @@ regenerate_applicability_for_consumers = task(
 regenerate_applicability_for_repos = task(
     ApplicabilityRegenerationManager.regenerate_applicability_for_repos, base=Task,
     ignore_result=True)
+regenerate_applicability_for_profiles = task(
+    ApplicabilityRegenerationManager.regenerate_applicability_for_profiles, base=Task,
+    ignore_result=True)
+regenerate_applicability_for_repo_profiles = task(
+    ApplicabilityRegenerationManager.regenerate_applicability_for_repo_profiles, base=Task,
+    ignore_result=True)
+
+
+def _set_regeneration_progress(progress):
+    """
+    Record the progress of an applicability regeneration on the status of the current task. This
+    does nothing when not running within a task.
+
+    :param progress: progress of the regeneration
+    :type  progress: dict
+    """
+    task_id = get_current_task_id()
+    if task_id is None:
+        return
+    model.TaskStatus.objects(task_id=task_id).update_one(
+        set__progress_report={'applicability_regeneration': progress})
 
 
 class DoesNotExist(Exception):
@@ -298,7 +737,7 @@ class RepoProfileApplicabilityManager(object):
     """
     This class is useful for querying for RepoProfileApplicability objects in the database.
     """
-    def create(self, profile_hash, repo_id, profile, applicability):
+    def create(self, profile_hash, repo_id, profile, applicability, repo_revision=None):
         """
         Create and return a RepoProfileApplicability object.
 
@@ -312,12 +751,15 @@ class RepoProfileApplicabilityManager(object):
         :param applicability: A dictionary structure mapping unit type IDs to lists of applicable
                               Unit IDs.
         :type  applicability: dict
+        :param repo_revision: ISO8601 timestamp of the repository content the applicability data
+                              was calculated against
+        :type  repo_revision: basestring
         :return:              A new RepoProfileApplicability object
         :rtype:               pulp.server.db.model.consumer.RepoProfileApplicability
         """
         applicability = RepoProfileApplicability(
             profile_hash=profile_hash, repo_id=repo_id, profile=profile,
-            applicability=applicability)
+            applicability=applicability, repo_revision=repo_revision)
         applicability.save()
         return applicability
 
@@ -425,6 +867,54 @@ def retrieve_consumer_applicability(consumer_criteria, content_types=None):
     # We only need the consumer ids
     consumer_criteria['fields'] = ['id']
     consumer_ids = [c['id'] for c in ConsumerQueryManager.find_by_criteria(consumer_criteria)]
+    return _consumer_applicability_report(consumer_ids, content_types)
+
+
+def retrieve_consumer_applicability_iter(consumer_criteria, content_types=None,
+                                         page_size=REPORT_PAGE_SIZE):
+    """
+    Query content applicability for consumers matched by a given consumer_criteria, optionally
+    limiting by content type, and yield the report entries one at a time.
+
+    The entries have the same format as the ones returned by retrieve_consumer_applicability().
+    The matching consumers are processed page_size at a time, so the memory used does not grow
+    with the number of consumers. As a consequence, consumers are only collated together with
+    consumers from the same page, and the same applicability data may be reported in more than
+    one entry.
+
+    :param consumer_criteria: The consumer selection criteria
+    :type  consumer_criteria: dict
+    :param content_types:     An optional list of content types that the caller wishes to limit
+                              the results to. Defaults to None, which will return data for all
+                              types
+    :type  content_types:     list
+    :param page_size:         number of consumers to process at a time
+    :type  page_size:         int
+    :return: generator of applicability report entries
+    :rtype:  generator
+    """
+    # Only the consumer ids are loaded up front, so the cursor cannot time out while the
+    # pages are being reported.
+    consumer_criteria['fields'] = ['id']
+    consumer_ids = [c['id'] for c in ConsumerQueryManager.find_by_criteria(consumer_criteria)]
+    for page in plugin_misc.paginate(consumer_ids, page_size):
+        for entry in _consumer_applicability_report(list(page), content_types):
+            yield entry
+
+
+def _consumer_applicability_report(consumer_ids, content_types):
+    """
+    Build the applicability report for the given consumers.
+
+    :param consumer_ids:  A list of consumer ids that the applicability data should be retrieved
+                          against
+    :type  consumer_ids:  list
+    :param content_types: An optional list of content types that the caller wishes to limit the
+                          results to, or None for all types
+    :type  content_types: list
+    :return: applicability report, see retrieve_consumer_applicability()
+    :rtype:  list
+    """
     consumer_map = dict([(c, {'profiles': [], 'repo_ids': []}) for c in consumer_ids])
 
     # Fill out the mapping of consumer_ids to profiles, and store the list of profile_hashes
@@ -432,8 +922,6 @@ def retrieve_consumer_applicability(consumer_criteria, content_types=None):
 
     # Now add in repo_ids that the consumers are bound to
     _add_repo_ids_to_consumer_map(consumer_ids, consumer_map)
-    # We don't need the list of consumer_ids anymore, so let's free a little RAM
-    del consumer_ids
 
     # Now lets get all RepoProfileApplicability objects that have the profile hashes for our
     # consumers
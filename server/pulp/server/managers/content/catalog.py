@@ -9,46 +9,98 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+from datetime import datetime, timedelta
 from logging import getLogger
 
-from pymongo import ASCENDING
+from bson.objectid import ObjectId
 
-from pulp.server.db.model.content import ContentCatalog
+from pulp.common import dateutils
+from pulp.server.db.model.content import ContentCatalog, ContentCatalogGeneration
 
 
 log = getLogger(__name__)
 
 
 # The grace period in seconds.
-# The grace_period defines how long an entry is permitted to remain
-# in the catalog after it has expired.
+# The grace_period defines how long an active generation is permitted
+# to remain in the catalog after it has expired.
 GRACE_PERIOD = 3600  # 1 hour.
 
+# The age in seconds after which a generation that was never activated
+# is considered abandoned (by a refresh that did not complete) and purged.
+ABANDONED_PERIOD = 86400  # 1 day.
+
 
 class ContentCatalogManager(object):
     """
     Manages the content unit catalog.
     Things to know about the catalog:
      - Entries are contributed by content sources.
-     - Each entry contains an expiration timestamp.  Entries are permitted
-       to remain in the catalog until they expire (plus an optional grace period).
+     - Each refresh of a content source writes its entries to a new generation
+       which is not visible until activated.  Activating a generation is a single
+       atomic update that makes it the active generation of the content source.
+       The entries of the previous generation are then deleted in bulk.
+     - Each active generation contains an expiration timestamp.  Generations are
+       permitted to remain in the catalog until they expire (plus an optional
+       grace period).
      - The locator is a hashed json encoding of the type_id and unit_key.  It is
        used for fast indexing and searching since the unit_key is arbitrary.
      - The catalog may be refreshed concurrently.
-     - The catalog provides best effort read consistency by:
-       - lazily purging expired entries.
-       - supporting find() operations on a catalog containing multiple entries
-         matching the same locator.  In these cases, only the newest entry is
-         included for each source in the result set.
+     - find() operations only include entries belonging to active generations.
     """
 
-    def add_entry(self, source_id, expires, type_id, unit_key, url):
+    def new_generation(self):
         """
-        Add an entry to the content catalog.
+        Get a new generation to which the entries of a refresh are written.
+        :return: The new generation.
+        :rtype: bson.objectid.ObjectId
+        """
+        return ObjectId()
+
+    def activate_generation(self, source_id, generation, expires):
+        """
+        Make the specified generation the active generation of a content source
+        and delete the entries belonging to the previously active generation.
         :param source_id: A content source ID.
         :type source_id: str
-        :param expires: The entry expiration in seconds.
+        :param generation: The generation to activate.
+        :type generation: bson.objectid.ObjectId
+        :param expires: The generation expiration in seconds.
         :type expires: int
+        :return: The number of entries deleted.
+        :rtype: int
+        """
+        collection = ContentCatalogGeneration.get_collection()
+        expiration = ContentCatalog.get_expiration(expires)
+        previous = collection.find_and_modify(
+            query={'source_id': source_id},
+            update={'$set': {'generation': generation, 'expiration': expiration}},
+            upsert=True)
+        if not previous or previous['generation'] == generation:
+            return 0
+        return self.abandon_generation(source_id, previous['generation'])
+
+    def abandon_generation(self, source_id, generation):
+        """
+        Delete the entries belonging to a generation that will not be activated.
+        :param source_id: A content source ID.
+        :type source_id: str
+        :param generation: The generation to delete.
+        :type generation: bson.objectid.ObjectId
+        :return: The number of entries deleted.
+        :rtype: int
+        """
+        collection = ContentCatalog.get_collection()
+        result = collection.remove({'source_id': source_id, 'generation': generation})
+        return result['n']
+
+    def add_entry(self, source_id, generation, type_id, unit_key, url):
+        """
+        Add an entry to the content catalog.
+        :param source_id: A content source ID.
+        :type source_id: str
+        :param generation: The generation to which the entry is added.
+        :type generation: bson.objectid.ObjectId
         :param type_id: The unit type ID.
         :type type_id: str
         :param unit_key: The unit key.
@@ -57,14 +109,37 @@ class ContentCatalogManager(object):
         :type url: str
         """
         collection = ContentCatalog.get_collection()
-        entry = ContentCatalog(source_id, expires, type_id, unit_key, url)
+        entry = ContentCatalog(source_id, generation, type_id, unit_key, url)
         collection.insert(entry)
 
-    def delete_entry(self, source_id, type_id, unit_key):
+    def add_entries(self, source_id, generation, entries):
+        """
+        Add entries to the content catalog using a single unordered bulk insert.
+        :param source_id: A content source ID.
+        :type source_id: str
+        :param generation: The generation to which the entries are added.
+        :type generation: bson.objectid.ObjectId
+        :param entries: A list of: (type_id, unit_key, url).
+        :type entries: list
+        :return: The number of entries added.
+        :rtype: int
+        """
+        if not entries:
+            return 0
+        collection = ContentCatalog.get_collection()
+        bulk = collection.initialize_unordered_bulk_op()
+        for type_id, unit_key, url in entries:
+            bulk.insert(ContentCatalog(source_id, generation, type_id, unit_key, url))
+        result = bulk.execute()
+        return result['nInserted']
+
+    def delete_entry(self, source_id, generation, type_id, unit_key):
         """
         Delete an entry from the content catalog.
         :param source_id: A content source ID.
         :type source_id: str
+        :param generation: The generation from which the entry is deleted.
+        :type generation: bson.objectid.ObjectId
         :param type_id: The unit type ID.
         :type type_id: str
         :param unit_key: The unit key.
@@ -72,9 +147,33 @@ class ContentCatalogManager(object):
         """
         collection = ContentCatalog.get_collection()
         locator = ContentCatalog.get_locator(type_id, unit_key)
-        query = {'source_id': source_id, 'locator': locator}
+        query = {'source_id': source_id, 'generation': generation, 'locator': locator}
         collection.remove(query)
 
+    def delete_entries(self, source_id, generation, entries):
+        """
+        Delete entries from the content catalog using a single query.
+        :param source_id: A content source ID.
+        :type source_id: str
+        :param generation: The generation from which the entries are deleted.
+        :type generation: bson.objectid.ObjectId
+        :param entries: A list of: (type_id, unit_key).
+        :type entries: list
+        :return: The number of entries deleted.
+        :rtype: int
+        """
+        if not entries:
+            return 0
+        collection = ContentCatalog.get_collection()
+        locators = [ContentCatalog.get_locator(type_id, unit_key) for type_id, unit_key in entries]
+        query = {
+            'source_id': source_id,
+            'generation': generation,
+            'locator': {'$in': locators}
+        }
+        result = collection.remove(query)
+        return result['n']
+
     def purge(self, source_id):
         """
         Purge (delete) entries from the content catalog belonging
@@ -84,28 +183,41 @@ class ContentCatalogManager(object):
         :return: The number of entries purged.
         :rtype: int
         """
+        ContentCatalogGeneration.get_collection().remove({'source_id': source_id})
         collection = ContentCatalog.get_collection()
-        query = {'source_id': source_id}
-        result = collection.remove(query)
+        result = collection.remove({'source_id': source_id})
         return result['n']
 
     def purge_expired(self, grace_period=GRACE_PERIOD):
         """
-        Purge (delete) expired entries from the content catalog belonging
-        to the specified content source by ID.
+        Purge (delete) expired generations from the content catalog along
+        with generations abandoned by refreshes that did not complete.
         :param grace_period: The grace period in seconds.
-            The grace_period defines how long an entry is permitted to remain
+            The grace_period defines how long a generation is permitted to remain
             in the catalog after it has expired.  The default is 1 hour.
         :type grace_period: int
         :return: The number of entries purged.
         :rtype: int
         """
-        collection = ContentCatalog.get_collection()
-        now = ContentCatalog.get_expiration(0)
-        timestamp = now - grace_period
-        query = {'expiration': {'$lt': timestamp}}
-        result = collection.remove(query)
-        return result['n']
+        purged = 0
+        collection = ContentCatalogGeneration.get_collection()
+        timestamp = ContentCatalog.get_expiration(0) - grace_period
+        for expired in collection.find({'expiration': {'$lt': timestamp}}):
+            query = {'source_id': expired['source_id'], 'generation': expired['generation']}
+            result = collection.remove(query)
+            if result['n']:
+                purged += self.abandon_generation(expired['source_id'], expired['generation'])
+        now = datetime.now(dateutils.utc_tz())
+        abandoned = ObjectId.from_datetime(now - timedelta(seconds=ABANDONED_PERIOD))
+        query = {
+            'generation': {
+                '$lt': abandoned,
+                '$nin': self._active_generations(expired=True)
+            }
+        }
+        result = ContentCatalog.get_collection().remove(query)
+        purged += result['n']
+        return purged
 
     def purge_orphans(self, valid_ids):
         """
@@ -118,8 +230,9 @@ class ContentCatalogManager(object):
         :rtype: int
         """
         purged = 0
-        collection = ContentCatalog.get_collection()
-        for source_id in collection.distinct('source_id'):
+        source_ids = set(ContentCatalog.get_collection().distinct('source_id'))
+        source_ids.update(ContentCatalogGeneration.get_collection().distinct('source_id'))
+        for source_id in source_ids:
             if source_id not in valid_ids:
                 purged += self.purge(source_id)
         return purged
@@ -127,9 +240,8 @@ class ContentCatalogManager(object):
     def find(self, type_id, unit_key):
         """
         Find entries in the content catalog using the specified unit type_id
-        and unit_key.  The catalog may contain more than one entry matching the
-        locator for a given content source.  In this case, only the newest entry
-        for each source is included in the result set.
+        and unit_key.  Only entries belonging to the active generation of each
+        content source are included, one for each source.
         :param type_id: The unit type ID.
         :type type_id: str
         :param unit_key: The unit key.
@@ -137,29 +249,62 @@ class ContentCatalogManager(object):
         :return: A list of matching entries.
         :rtype: list
         """
-        collection = ContentCatalog.get_collection()
         locator = ContentCatalog.get_locator(type_id, unit_key)
+        return self.find_by_locators([locator]).get(locator, [])
+
+    def find_by_locators(self, locators):
+        """
+        Find entries in the content catalog for many locators using a single query.
+        As with find(), only entries belonging to active generations are included,
+        one for each source and locator.
+        :param locators: A list of locators.
+            See: ContentCatalog.get_locator().
+        :type locators: iterable
+        :return: A dictionary of lists of matching entries keyed by locator.
+            Locators without entries are not included.
+        :rtype: dict
+        """
+        generations = self._active_generations()
+        if not generations:
+            return {}
+        collection = ContentCatalog.get_collection()
         query = {
-            'locator': locator,
-            'expiration': {'$gte': ContentCatalog.get_expiration(0)}
+            'generation': {'$in': generations},
+            'locator': {'$in': list(locators)}
         }
-        newest_by_source = {}
-        for entry in collection.find(query, sort=[('_id', ASCENDING)]):
-            newest_by_source[entry['source_id']] = entry
-        return newest_by_source.values()
+        by_locator = {}
+        for entry in collection.find(query):
+            by_source = by_locator.setdefault(entry['locator'], {})
+            by_source[entry['source_id']] = entry
+        return dict((locator, by_source.values()) for locator, by_source in by_locator.items())
 
     def has_entries(self, source_id):
         """
-        Get whether the specified content source has entries in the catalog.
+        Get whether the specified content source has an active, unexpired
+        generation in the catalog.
         :param source_id: A content source ID.
         :type source_id: str
         :return: True if has entries.
         :rtype: bool
         """
-        collection = ContentCatalog.get_collection()
+        collection = ContentCatalogGeneration.get_collection()
         query = {
             'source_id': source_id,
             'expiration': {'$gte': ContentCatalog.get_expiration(0)}
         }
-        cursor = collection.find(query)
-        return cursor.count() > 0
+        return collection.find_one(query) is not None
+
+    @staticmethod
+    def _active_generations(expired=False):
+        """
+        Get the active generations of all content sources.
+        :param expired: Include active generations that have expired.
+        :type expired: bool
+        :return: A list of generations.
+        :rtype: list
+        """
+        collection = ContentCatalogGeneration.get_collection()
+        query = {}
+        if not expired:
+            query['expiration'] = {'$gte': ContentCatalog.get_expiration(0)}
+        return [g['generation'] for g in collection.find(query, fields=['generation'])]
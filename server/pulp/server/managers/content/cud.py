@@ -1,7 +1,10 @@
 import uuid
 
+from pymongo.errors import BulkWriteError
+
 from pulp.common import dateutils
 from pulp.plugins.types import database as content_types_db
+from pulp.server.db.connection import DUPLICATE_KEY_ERROR
 from pulp.server.exceptions import InvalidValue
 
 
@@ -49,6 +52,71 @@ class ContentManager(object):
         collection = content_types_db.type_units_collection(content_type)
         collection.update({'_id': unit_id}, {'$set': unit_metadata_delta})
 
+    def save_content_units(self, content_type, units_metadata):
+        """
+        Add or update multiple content units using a single unordered bulk
+        upsert keyed by the unit key. Units that already exist are updated with
+        the given metadata; the others are added with a generated id.
+        @param content_type: unique id of content collection
+        @type content_type: str
+        @param units_metadata: metadata, including the unit key fields, of
+                               content units with distinct unit keys
+        @type units_metadata: list of dict
+        @return: the unit ids, in the same order as units_metadata, and the
+                 number of units that were added
+        @rtype: tuple of (list of str, int)
+        """
+        key_fields = content_types_db.type_units_unit_key(content_type)
+        if key_fields is None:
+            raise InvalidValue(['content_type'])
+        collection = content_types_db.type_units_collection(content_type)
+        unit_ids = [None] * len(units_metadata)
+        added_count = 0
+        pending = range(len(units_metadata))
+        # An upsert collides with a unit added concurrently with the same unit
+        # key. The unit exists when the upsert is retried, so it is updated.
+        for retry in (False, True):
+            if not pending:
+                break
+            last_updated = dateutils.now_utc_timestamp()
+            bulk = collection.initialize_unordered_bulk_op()
+            for index in pending:
+                unit_metadata = units_metadata[index]
+                spec = dict((k, unit_metadata[k]) for k in key_fields)
+                unit_doc = dict(unit_metadata)
+                unit_doc['_content_type_id'] = content_type
+                unit_doc['_last_updated'] = last_updated
+                bulk.find(spec).upsert().update_one(
+                    {'$set': unit_doc, '$setOnInsert': {'_id': str(uuid.uuid4())}})
+            failed = []
+            try:
+                result = bulk.execute()
+            except BulkWriteError, e:
+                result = e.details
+                errors = result['writeErrors']
+                if retry or any(error['code'] != DUPLICATE_KEY_ERROR for error in errors):
+                    raise
+                failed = [pending[error['index']] for error in errors]
+            for upserted in result['upserted']:
+                unit_ids[pending[upserted['index']]] = upserted['_id']
+            added_count += len(result['upserted'])
+            pending = failed
+        # Look up the ids of the units that were updated.
+        updated = [i for i, unit_id in enumerate(unit_ids) if unit_id is None]
+        if updated:
+            specs = [dict((k, units_metadata[i][k]) for k in key_fields) for i in updated]
+            ids_by_key = {}
+            fields = ['_id'] + list(key_fields)
+            for unit_doc in collection.find({'$or': specs}, fields=fields):
+                ids_by_key[tuple(unit_doc[k] for k in key_fields)] = unit_doc['_id']
+            for index, spec in zip(updated, specs):
+                unit_id = ids_by_key.get(tuple(spec[k] for k in key_fields))
+                if unit_id is None:
+                    # the stored key values differ in type from the given ones
+                    unit_id = collection.find_one(spec, fields=['_id'])['_id']
+                unit_ids[index] = unit_id
+        return unit_ids, added_count
+
     def remove_content_unit(self, content_type, unit_id):
         """
         Remove a content unit and its metadata from the corresponding pulp db
@@ -1,16 +1,20 @@
 from gettext import gettext as _
+from multiprocessing.pool import ThreadPool
+import heapq
 import logging
 import os
 import re
 import shutil
+import time
 
 from celery import task
+from pymongo import ASCENDING
 
 from pulp.plugins.types import database as content_types_db
 from pulp.plugins.loader import api as plugin_api
 from pulp.plugins.util import misc as plugin_misc
 from pulp.server import config as pulp_config, exceptions as pulp_exceptions
-from pulp.server.async.tasks import Task
+from pulp.server.async.tasks import get_current_task_id, Task
 from pulp.server.controllers import units as units_controller
 from pulp.server.db.model.repository import RepoContentUnit
 from pulp.server.db import model
@@ -19,6 +23,13 @@ from pulp.server.exceptions import MissingResource
 
 _logger = logging.getLogger(__name__)
 
+# The number of content units whose associations are checked with a single query when looking
+# for orphans.
+ORPHAN_PAGE_SIZE = 1000
+
+# The number of threads used to unlink the files of the orphaned content units of a page.
+ORPHAN_DELETE_THREADS = 8
+
 
 class OrphanManager(object):
 
@@ -46,9 +57,11 @@ class OrphanManager(object):
         :return: count of orphaned units of the given type
         :rtype: int
         """
+        content_units_collection = content_types_db.type_units_collection(content_type_id)
         count = 0
-        for unit in OrphanManager.generate_orphans_by_type(content_type_id):
-            count += 1
+        for page in OrphanManager._paginate_units(content_units_collection, ['_id']):
+            unit_ids = [content_unit['_id'] for content_unit in page]
+            count += len(unit_ids) - len(OrphanManager._associated_unit_ids(unit_ids))
         return count
 
     def generate_all_orphans(self, fields=None):
@@ -100,17 +113,64 @@ class OrphanManager(object):
 
         fields = fields if fields is not None else ['_id']
         content_units_collection = content_types_db.type_units_collection(content_type_id)
-        repo_content_units_collection = RepoContentUnit.get_collection()
 
-        for content_unit in content_units_collection.find({}, fields=fields):
+        for page in OrphanManager._paginate_units(content_units_collection, fields):
+            associated_unit_ids = OrphanManager._associated_unit_ids(
+                [content_unit['_id'] for content_unit in page])
+            for content_unit in page:
+                if content_unit['_id'] not in associated_unit_ids:
+                    yield content_unit
 
-            repo_content_units_cursor = repo_content_units_collection.find(
-                {'unit_id': content_unit['_id']})
+    @staticmethod
+    def _paginate_units(content_units_collection, fields, unit_ids=None,
+                        page_size=ORPHAN_PAGE_SIZE):
+        """
+        Return a generator of pages of the content units in the given collection.
+
+        The pages are queried by ascending _id rather than read from a single cursor, so that a
+        slow consumer of the pages cannot cause the cursor to time out, and so that units may be
+        deleted while the pages are being read.
+
+        :param content_units_collection: collection of the content units
+        :type  content_units_collection: pymongo.collection.Collection
+        :param fields:                   list of fields to include in each content unit
+        :type  fields:                   list
+        :param unit_ids:                 if not None, only the units with these ids are included
+        :type  unit_ids:                 list or None
+        :param page_size:                maximum number of content units in a page
+        :type  page_size:                int
+        :return: generator of lists of content units
+        :rtype:  generator
+        """
+        last_id = None
+        while True:
+            query = {}
+            if unit_ids is not None:
+                query['_id'] = {'$in': unit_ids}
+            if last_id is not None:
+                query.setdefault('_id', {})['$gt'] = last_id
+            page = list(content_units_collection.find(query, fields=fields,
+                                                      sort=[('_id', ASCENDING)], limit=page_size))
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            last_id = page[-1]['_id']
 
-            if repo_content_units_cursor.count() > 0:
-                continue
+    @staticmethod
+    def _associated_unit_ids(unit_ids):
+        """
+        Find which of the given content units are associated with at least one repository.
 
-            yield content_unit
+        :param unit_ids: ids of content units
+        :type  unit_ids: list
+        :return: the ids of the units that are associated with a repository
+        :rtype:  set
+        """
+        repo_content_units_collection = RepoContentUnit.get_collection()
+        return set(repo_content_units_collection.find(
+            {'unit_id': {'$in': unit_ids}}).distinct('unit_id'))
 
     @staticmethod
     def generate_orphans_by_type_with_unit_keys(content_type_id):
@@ -149,11 +209,11 @@ class OrphanManager(object):
                                  given content type and unit id
         """
 
-        for content_unit in OrphanManager.generate_orphans_by_type(content_type_id):
-
-            if content_unit['_id'] != content_unit_id:
-                continue
+        content_units_collection = content_types_db.type_units_collection(content_type_id)
+        content_unit = content_units_collection.find_one({'_id': content_unit_id}, fields=['_id'])
 
+        if content_unit is not None and \
+                not OrphanManager._associated_unit_ids([content_unit_id]):
             return content_unit
 
         raise pulp_exceptions.MissingResource(content_type=content_type_id,
@@ -164,12 +224,13 @@ class OrphanManager(object):
         """
         Delete all orphaned content units.
         """
+        progress = {}
 
         for content_type_id in content_types_db.all_type_ids():
-            OrphanManager.delete_orphans_by_type(content_type_id)
+            OrphanManager.delete_orphans_by_type(content_type_id, progress=progress)
 
         for content_type_id in plugin_api.list_unit_models():
-            OrphanManager.delete_orphan_content_units_by_type(content_type_id)
+            OrphanManager.delete_orphan_content_units_by_type(content_type_id, progress=progress)
 
     @staticmethod
     def delete_orphans_by_id(content_unit_list):
@@ -193,11 +254,13 @@ class OrphanManager(object):
                 content_unit['content_type_id'], [])
             content_unit_id_list.append(content_unit['unit_id'])
 
+        progress = {}
         for content_type_id, content_unit_id_list in content_units_by_content_type.items():
-            OrphanManager.delete_orphans_by_type(content_type_id, content_unit_id_list)
+            OrphanManager.delete_orphans_by_type(content_type_id, content_unit_id_list,
+                                                 progress=progress)
 
     @staticmethod
-    def delete_orphans_by_type(content_type_id, content_unit_ids=None):
+    def delete_orphans_by_type(content_type_id, content_unit_ids=None, progress=None):
         """
         Delete the orphaned content units for the given content type.
 
@@ -210,24 +273,34 @@ class OrphanManager(object):
         :type content_type_id: basestring
         :param content_unit_ids: list of content unit ids to delete; None means delete them all
         :type content_unit_ids: iterable or None
+        :param progress: deletion progress of each content type, reported on the current task;
+                         the progress of this content type is added to it
+        :type progress: dict or None
         """
 
         content_units_collection = content_types_db.type_units_collection(content_type_id)
-
-        for content_unit in OrphanManager.generate_orphans_by_type(content_type_id,
-                                                                   fields=['_id', '_storage_path']):
-
-            if content_unit_ids is not None and content_unit['_id'] not in content_unit_ids:
+        if content_unit_ids is not None:
+            content_unit_ids = list(content_unit_ids)
+        deletion = OrphanDeletion(content_type_id, progress)
+
+        pages = OrphanManager._paginate_units(content_units_collection, ['_id', '_storage_path'],
+                                              content_unit_ids)
+        for page in pages:
+            associated_unit_ids = OrphanManager._associated_unit_ids(
+                [content_unit['_id'] for content_unit in page])
+            orphans = [content_unit for content_unit in page
+                       if content_unit['_id'] not in associated_unit_ids]
+            if not orphans:
                 continue
 
-            content_units_collection.remove(content_unit['_id'], safe=False)
-
-            storage_path = content_unit.get('_storage_path', None)
-            if storage_path is not None:
-                OrphanManager.delete_orphaned_file(storage_path)
+            content_units_collection.remove(
+                {'_id': {'$in': [content_unit['_id'] for content_unit in orphans]}})
+            storage_paths = [content_unit['_storage_path'] for content_unit in orphans
+                             if content_unit.get('_storage_path')]
+            deletion.update(len(orphans), OrphanManager.delete_orphaned_files(storage_paths))
 
     @staticmethod
-    def delete_orphan_content_units_by_type(type_id):
+    def delete_orphan_content_units_by_type(type_id, progress=None):
         """
         Delete the orphaned content units for the given content type.
         This method only applies to new style content units that are loaded via entry points
@@ -236,13 +309,17 @@ class OrphanManager(object):
 
         :param type_id: id of the content type
         :type type_id: basestring
+        :param progress: deletion progress of each content type, reported on the current task;
+                         the progress of this content type is added to it
+        :type progress: dict or None
         """
         # get the model matching the type
         content_model = plugin_api.get_unit_model_by_id(type_id)
         content_units = content_model.objects().only('id', 'storage_path')
+        deletion = OrphanDeletion(type_id, progress)
 
         # Paginate the content units
-        for units_group in plugin_misc.paginate(content_units):
+        for units_group in plugin_misc.paginate(content_units, ORPHAN_PAGE_SIZE):
             # Build the list of ids to search for an easier way to access units in the group by id
             unit_dict = dict()
             for unit in units_group:
@@ -255,12 +332,48 @@ class OrphanManager(object):
                 .distinct('unit_id')
             for non_orphan_id in non_orphan:
                 unit_dict.pop(non_orphan_id)
+            if not unit_dict:
+                continue
+
+            # Remove the units with a single query, then any references on disk
+            content_model.objects(id__in=list(unit_dict.iterkeys())).delete()
+            storage_paths = [unit.storage_path for unit in unit_dict.itervalues()
+                             if unit.storage_path]
+            deletion.update(len(unit_dict), OrphanManager.delete_orphaned_files(storage_paths))
+
+    @staticmethod
+    def delete_orphaned_files(paths):
+        """
+        Delete orphaned files and any parent directories that become empty.
+
+        The files are unlinked by a pool of threads. The parent directories are only checked once
+        all of the files have been unlinked, and each of them is checked once no matter how many of
+        the files it contained.
+
+        :param paths: absolute paths to the files to delete
+        :type  paths: list
+        :return: the number of files that were deleted; files that could not be deleted are
+                 logged and not counted
+        :rtype:  int
+        """
+        if not paths:
+            return 0
+        for path in paths:
+            if not os.path.isabs(path):
+                raise ValueError(_('Path: %(p)s must be absolute path') % {'p': path})
 
-            # Remove the unit and any references on disk
-            for unit_to_delete in unit_dict.itervalues():
-                unit_to_delete.delete()
-                if unit_to_delete.storage_path:
-                    OrphanManager.delete_orphaned_file(unit_to_delete.storage_path)
+        storage_dir = pulp_config.config.get('server', 'storage_dir')
+        pool = ThreadPool(min(ORPHAN_DELETE_THREADS, len(paths)))
+        try:
+            results = pool.map(
+                lambda path: OrphanManager._unlink_orphaned_file(storage_dir, path), paths)
+        finally:
+            pool.close()
+            pool.join()
+
+        OrphanManager._prune_empty_directories(
+            storage_dir, [directory for deleted, directory in results if directory is not None])
+        return len([deleted for deleted, directory in results if deleted])
 
     @staticmethod
     def delete_orphaned_file(path):
@@ -269,32 +382,71 @@ class OrphanManager(object):
         @param path: absolute path to the file to delete
         @type  path: str
         """
-        _logger.debug(_('Deleting orphaned file: %(p)s') % {'p': path})
-
         if not os.path.isabs(path):
             raise ValueError(_('Path: %(p)s must be absolute path') % {'p': path})
 
         storage_dir = pulp_config.config.get('server', 'storage_dir')
+        deleted, directory = OrphanManager._unlink_orphaned_file(storage_dir, path)
+        if directory is not None:
+            OrphanManager._prune_empty_directories(storage_dir, [directory])
+
+    @staticmethod
+    def _unlink_orphaned_file(storage_dir, path):
+        """
+        Delete an orphaned file, leaving its parent directory in place.
+
+        :param storage_dir: The absolute path to the pulp content storage directory.
+        :type  storage_dir: str
+        :param path: absolute path to the file to delete
+        :type  path: str
+        :return: tuple of whether the file was deleted, and the parent directory of the file,
+                 which may have fallen empty; the directory is None if the file was in shared
+                 storage, whose directories are cleaned up by unlink_shared
+        :rtype:  tuple
+        """
+        _logger.debug(_('Deleting orphaned file: %(p)s') % {'p': path})
 
         # shared content
         if OrphanManager.is_shared(storage_dir, path):
-            OrphanManager.unlink_shared(path)
-            return
+            return OrphanManager.unlink_shared(path), None
 
-        OrphanManager.delete(path)
+        return OrphanManager.delete(path), os.path.dirname(path)
 
-        # delete parent directories on the path as long as they fall empty
-        root_content_regex = re.compile(os.path.join(storage_dir, 'content', '[^/]+/?'))
-        while True:
-            path = os.path.dirname(path)
-            if root_content_regex.match(path):
-                break
-            contents = os.listdir(path)
-            if contents:
-                break
-            if not os.access(path, os.W_OK):
-                break
-            os.rmdir(path)
+    @staticmethod
+    def _prune_empty_directories(storage_dir, directories):
+        """
+        Delete the given directories, and their parents, as long as they fall empty.
+
+        The deepest directories are checked first so that a parent is only checked once all of its
+        children that may fall empty have been deleted, and so that each directory is checked at
+        most once. Only directories below the content type directories under <storage_dir>/content
+        are deleted.
+
+        :param storage_dir: The absolute path to the pulp content storage directory.
+        :type  storage_dir: str
+        :param directories: absolute paths of the directories that may have fallen empty
+        :type  directories: iterable
+        """
+        content_dir = os.path.join(os.path.normpath(storage_dir), 'content') + os.sep
+        root_content_regex = re.compile(os.path.join(storage_dir, 'content', '[^/]+/?$'))
+        seen = set(directories)
+        pending = [(-path.count(os.sep), path) for path in seen]
+        heapq.heapify(pending)
+        while pending:
+            path = heapq.heappop(pending)[1]
+            if not path.startswith(content_dir) or root_content_regex.match(path):
+                continue
+            try:
+                if os.listdir(path) or not os.access(path, os.W_OK):
+                    continue
+                os.rmdir(path)
+            except OSError, e:
+                _logger.error(_('Delete path: %(p)s failed: %(m)s'), {'p': path, 'm': str(e)})
+                continue
+            parent = os.path.dirname(path)
+            if parent not in seen:
+                seen.add(parent)
+                heapq.heappush(pending, (-parent.count(os.sep), parent))
 
     @staticmethod
     def is_shared(storage_dir, path):
@@ -327,19 +479,22 @@ class OrphanManager(object):
         After all of the links have been removed, the link target is removed.
         :param path: The absolute path to a link.
         :type path: str
+        :return: True if the link was deleted.
+        :rtype: bool
         :see: is_shared
         """
         path = os.path.normpath(path)
         ref_path = os.path.abspath(os.readlink(path))
-        OrphanManager.delete(path)
+        deleted = OrphanManager.delete(path)
         link_dir = os.path.dirname(path)
         if os.listdir(link_dir):
             # still used
-            return
+            return deleted
         if os.path.dirname(link_dir) != os.path.dirname(ref_path):
             # must be siblings
-            return
+            return deleted
         OrphanManager.delete(ref_path)
+        return deleted
 
     @staticmethod
     def delete(path):
@@ -349,6 +504,8 @@ class OrphanManager(object):
         Exceptions are logged and discarded.
         :param path: An absolute path.
         :type path: str
+        :return: True if the path was deleted.
+        :rtype: bool
         """
         try:
             if os.path.isfile(path) or os.path.islink(path):
@@ -357,6 +514,57 @@ class OrphanManager(object):
                 shutil.rmtree(path)
         except OSError, e:
             _logger.error(_('Delete path: %(p)s failed: %(m)s'), {'p': path, 'm': str(e)})
+            return False
+        return True
+
+
+class OrphanDeletion(object):
+    """
+    Tracks the throughput of deleting the orphans of a content type, and reports it on the
+    progress of the current task.
+
+    :ivar content_type_id: id of the content type whose orphans are deleted
+    :type content_type_id: basestring
+    :ivar progress: deletion progress of each content type, keyed by content type id
+    :type progress: dict
+    """
+
+    def __init__(self, content_type_id, progress=None):
+        """
+        :param content_type_id: id of the content type whose orphans are deleted
+        :type  content_type_id: basestring
+        :param progress: deletion progress of other content types to report along with this one
+        :type  progress: dict or None
+        """
+        self.content_type_id = content_type_id
+        self.progress = progress if progress is not None else {}
+        self.started = time.time()
+        self.progress[content_type_id] = {'units_deleted': 0, 'files_deleted': 0,
+                                          'elapsed_seconds': 0.0, 'units_per_second': 0.0}
+
+    def update(self, units_deleted, files_deleted):
+        """
+        Add a page of deleted orphans to the progress and report it on the current task. This
+        reports nothing when not running within a task.
+
+        :param units_deleted: number of content units deleted from the database
+        :type  units_deleted: int
+        :param files_deleted: number of files deleted from disk
+        :type  files_deleted: int
+        """
+        progress = self.progress[self.content_type_id]
+        progress['units_deleted'] += units_deleted
+        progress['files_deleted'] += files_deleted
+        elapsed = time.time() - self.started
+        progress['elapsed_seconds'] = elapsed
+        if elapsed > 0:
+            progress['units_per_second'] = progress['units_deleted'] / elapsed
+
+        task_id = get_current_task_id()
+        if task_id is None:
+            return
+        model.TaskStatus.objects(task_id=task_id).update_one(
+            set__progress_report={'orphan_deletion': self.progress})
 
 
 delete_all_orphans = task(OrphanManager.delete_all_orphans, base=Task, ignore_result=True)
@@ -14,6 +14,7 @@ from pulp.common import error_codes
 from pulp.plugins.conduits.unit_import import ImportUnitConduit
 from pulp.plugins.config import PluginCallConfiguration
 from pulp.plugins.loader import api as plugin_api
+from pulp.plugins.util.misc import paginate
 from pulp.server.async.tasks import Task
 from pulp.server.controllers import repository as repo_controller
 from pulp.server.controllers import units as units_controller
@@ -37,6 +38,9 @@ SORT_DESCENDING = pymongo.DESCENDING
 
 _VALID_DIRECTIONS = (SORT_ASCENDING, SORT_DESCENDING)
 
+# Number of associations written or removed by each bulk operation
+BULK_PAGE_SIZE = 1000
+
 logger = logging.getLogger(__name__)
 
 
@@ -79,25 +83,11 @@ class RepoUnitAssociationManager(object):
         @raise InvalidType: if the given owner type is not of the valid enumeration
         """
 
-        # If the association already exists, no need to do anything else
-        spec = {'repo_id': repo_id,
-                'unit_id': unit_id,
-                'unit_type_id': unit_type_id}
-        existing_association = RepoContentUnit.get_collection().find_one(spec)
-        if existing_association is not None:
-            return
-
-        similar_exists = False
-        if update_repo_metadata:
-            similar_exists = RepoUnitAssociationManager.association_exists(repo_id, unit_id,
-                                                                           unit_type_id)
-
-        # Create the database entry
-        association = RepoContentUnit(repo_id, unit_id, unit_type_id)
-        RepoContentUnit.get_collection().save(association)
+        created = model.RepositoryContentUnit.objects.associate(
+            repo_id, [(unit_type_id, unit_id)], update_existing=False)
 
         # update the count and times of associated units on the repo object
-        if update_repo_metadata and not similar_exists:
+        if update_repo_metadata and created:
             repo_controller.update_unit_count(repo_id, unit_type_id, 1)
             repo_controller.update_last_unit_added(repo_id)
 
@@ -122,15 +112,10 @@ class RepoUnitAssociationManager(object):
         @raise InvalidType: if the given owner type is not of the valid enumeration
         """
 
-        # There may be a way to batch this in mongo which would be ideal for a
-        # bulk operation like this. But for deadline purposes, this call will
-        # simply loop and call the single method.
-
         unique_count = 0
-        for unit_id in unit_id_list:
-            if not RepoUnitAssociationManager.association_exists(repo_id, unit_id, unit_type_id):
-                unique_count += 1
-            self.associate_unit_by_id(repo_id, unit_type_id, unit_id, False)
+        for page in paginate(unit_id_list, BULK_PAGE_SIZE):
+            unique_count += model.RepositoryContentUnit.objects.associate(
+                repo_id, [(unit_type_id, unit_id) for unit_id in page], update_existing=False)
 
         # update the count of associated units on the repo object
         if unique_count:
@@ -240,6 +225,8 @@ class RepoUnitAssociationManager(object):
             copied_units = importer_instance.import_units(
                 transfer_source_repo, transfer_dest_repo, conduit, call_config,
                 units=transfer_units)
+            # Write any units the importer saved but did not flush.
+            conduit.flush()
 
             unit_ids = [u.to_id_dict() for u in copied_units]
             return {'units_successful': unit_ids}
@@ -327,19 +314,19 @@ class RepoUnitAssociationManager(object):
         collection = RepoContentUnit.get_collection()
 
         for unit_type_id, unit_ids in unit_map.items():
-            spec = {'repo_id': repo_id,
-                    'unit_type_id': unit_type_id,
-                    'unit_id': {'$in': unit_ids}
-                    }
-            collection.remove(spec)
-
-            unique_count = sum(
-                1 for unit_id in unit_ids if not RepoUnitAssociationManager.association_exists(
-                    repo_id, unit_id, unit_type_id))
-            if not unique_count:
+            # The associations are unique so the number removed is the count delta
+            bulk = collection.initialize_unordered_bulk_op()
+            for page in paginate(unit_ids, BULK_PAGE_SIZE):
+                spec = {'repo_id': repo_id,
+                        'unit_type_id': unit_type_id,
+                        'unit_id': {'$in': page}
+                        }
+                bulk.find(spec).remove()
+            removed_count = bulk.execute()['nRemoved']
+            if not removed_count:
                 continue
 
-            repo_controller.update_unit_count(repo_id, unit_type_id, -unique_count)
+            repo_controller.update_unit_count(repo_id, unit_type_id, -removed_count)
 
         repo_controller.update_last_unit_removed(repo_id)
 
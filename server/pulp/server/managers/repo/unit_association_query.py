@@ -6,6 +6,7 @@ import itertools
 import pymongo
 
 from pulp.plugins.types import database as types_db
+from pulp.plugins.util.misc import paginate
 from pulp.server.db.model.criteria import UnitAssociationCriteria
 from pulp.server.db.model.repository import RepoContentUnit
 
@@ -22,6 +23,13 @@ SORT_DESCENDING = pymongo.DESCENDING
 
 _VALID_DIRECTIONS = (SORT_ASCENDING, SORT_DESCENDING)
 
+# The number of units (or unit ids) loaded into memory at a time when the
+# units and their associations are read in pages.
+PAGE_SIZE = 1000
+
+# The association fields read when only the ids of the associated units are needed.
+_ASSOCIATION_ID_FIELDS = {'_id': False, 'unit_type_id': True, 'unit_id': True}
+
 
 class RepoUnitAssociationQueryManager(object):
 
@@ -44,6 +52,16 @@ class RepoUnitAssociationQueryManager(object):
         Get the units associated with the repository based on the provided unit
         association criteria.
 
+        When not ordering by association fields, the units of each type are
+        selected by the ids of the units associated with the repository: the
+        ids of the associated units of one type are read and sent to the
+        database in a single $in query when that type is reached. The memory
+        used and the size of that query grow with the number of units of the
+        type in the repository, not with the requested page. The query is not
+        driven from the unit collection instead because those collections are
+        shared by every repository, so scanning them for a small repository
+        would read far more units than are associated with it.
+
         :param repo_id: identifies the repository
         :type  repo_id: str
 
@@ -59,34 +77,46 @@ class RepoUnitAssociationQueryManager(object):
 
         criteria = criteria or UnitAssociationCriteria()
 
-        unit_associations_generator = self._unit_associations_cursor(repo_id, criteria)
+        # If we're ordering by association fields, but not filtering the
+        # content units, then the page of associations is selected by the
+        # database and only that page is loaded into memory. Otherwise, only
+        # the unit ids are read from the associations and the rest of each
+        # association is read once its unit has made it through the skip and
+        # limit.
+        page_associations = bool(criteria.association_sort) and not criteria.unit_filters
+
+        if page_associations:
+            unit_associations_generator = self._unit_associations_cursor(
+                repo_id, criteria, criteria.association_fields)
+            # A unit is associated with a repository at most once (see the
+            # unique index on RepoContentUnit), so the skip and limit are the
+            # same whether or not we're removing duplicates.
+            if criteria.skip:
+                unit_associations_generator.skip(criteria.skip)
+            if criteria.limit:
+                unit_associations_generator.limit(criteria.limit)
+        elif criteria.association_sort:
+            unit_associations_generator = self._unit_associations_cursor(
+                repo_id, criteria, _ASSOCIATION_ID_FIELDS)
+        else:
+            # The associated unit ids are read a type at a time below.
+            unit_associations_generator = []
 
-        if criteria.remove_duplicates:
+        if criteria.association_sort and criteria.remove_duplicates:
             unit_associations_generator = self._unit_associations_no_duplicates(
                 criteria, unit_associations_generator)
 
-        if criteria.association_sort and not criteria.unit_filters:
-            # If we're ordering by association fields, but not filtering the
-            # content units, then perform the skip and limit on this generator
-            # to limit the number of units we load into memory.
-            # Manually perform skip and limit so we don't have to differentiate
-            # based on whether we're removing duplicates or not.
-            unit_associations_generator = self._with_skip_and_limit(unit_associations_generator,
-                                                                    criteria.skip, criteria.limit)
-
         # The unit ids are used for ordering the units when association field
         # ordering is specified (i.e. created timestamps, etc.)
         # The ids are (unit_type_id, unit_id) tuples.
         association_ordered_unit_ids = []
 
-        # The unit association information is part of the return values, so we
-        # construct a lookup in order to retrieve that information when we are
-        # iterating over the content units.
+        # The unit association information is part of the return values, so
+        # when the page of associations has been loaded, we construct a lookup
+        # in order to retrieve that information when we are iterating over the
+        # content units.
         #
         # unit_type_id -> unit_id -> (ordered)[association_1, association_2, ...]
-        #
-        # We also use the unit_id keys to lookup the units from unit_type_id
-        # collections.
         associations_lookup = {}
 
         for association in unit_associations_generator:
@@ -98,37 +128,15 @@ class RepoUnitAssociationQueryManager(object):
             association_ordered_unit_ids.append((unit_type_id, unit_id))
 
             # Build the lookup.
-            association_type_dict = associations_lookup.setdefault(unit_type_id, {})
-            association_list = association_type_dict.setdefault(unit_id, [])
-            association_list.append(association)
-
-        association_unit_types = criteria.type_ids or self.unit_type_ids_for_repo(repo_id)
-        # The unit types should always be sorted in the same order, this allows
-        # multiple calls with skip and limit to work across types.
-        association_unit_types = sorted(association_unit_types)
-
-        # Use a generator expression here to keep from going back to the types
-        # collections once we've returned our limit of results.
-        # Be sure to skip cursors that would otherwise return an empty result set.
-        units_cursors = (self._associated_units_by_type_cursor(t, criteria,
-                                                               associations_lookup[t].keys())
-                         for t in association_unit_types if t in associations_lookup)
-
-        if not criteria.association_sort:
-            # If we're not sorting based on association fields, then set the
-            # skip and limit individually across the cursors to get consistent
-            # behavior across multiple calls across multiple unit types.
-            # The order that the generators are applied here is extremely
-            # important. DO NOT CHANGE!
-            units_cursors = self._associated_units_cursors_with_skip(units_cursors, criteria.skip)
-            units_cursors = self._associated_units_cursors_with_limit(units_cursors, criteria.limit)
-
-        units_generator = itertools.chain(*units_cursors)
+            if page_associations:
+                association_type_dict = associations_lookup.setdefault(unit_type_id, {})
+                association_list = association_type_dict.setdefault(unit_id, [])
+                association_list.append(association)
 
         if criteria.association_sort:
             # Use the ordered associations we created to properly order the results.
             units_generator = self._association_ordered_units(association_ordered_unit_ids,
-                                                              units_generator)
+                                                              criteria)
 
             if criteria.unit_filters:
                 # If we're ordering by association fields and filtering the
@@ -137,6 +145,28 @@ class RepoUnitAssociationQueryManager(object):
                 units_generator = self._with_skip_and_limit(units_generator, criteria.skip,
                                                             criteria.limit)
 
+        else:
+            association_unit_types = criteria.type_ids or self.unit_type_ids_for_repo(repo_id)
+            # The unit types should always be sorted in the same order, this allows
+            # multiple calls with skip and limit to work across types.
+            association_unit_types = sorted(association_unit_types)
+
+            # Use a generator here to keep from going back to the associations and
+            # types collections once we've returned our limit of results.
+            units_cursors = self._associated_units_by_type_cursors(repo_id, criteria,
+                                                                   association_unit_types)
+
+            # If we're not sorting based on association fields, then set the
+            # skip and limit individually across the cursors to get consistent
+            # behavior across multiple calls across multiple unit types.
+            # The order that the generators are applied here is extremely
+            # important. DO NOT CHANGE!
+            units_cursors = self._associated_units_cursors_with_skip(units_cursors, criteria.skip)
+            units_cursors = self._associated_units_cursors_with_limit(units_cursors, criteria.limit)
+
+            units_generator = itertools.chain(*units_cursors)
+
+        if page_associations:
             # The association ordering will generate the same unit for every
             # association it has with the repository, hence "duplicate units".
             units_generator = self._merged_units_duplicate_units(associations_lookup,
@@ -145,7 +175,7 @@ class RepoUnitAssociationQueryManager(object):
         else:
             # Unit ordering or no ordering only produce unique units, hence
             # "unique units".
-            units_generator = self._merged_units_unique_units(associations_lookup, units_generator)
+            units_generator = self._merged_units_by_page(repo_id, criteria, units_generator)
 
         if as_generator:
             return units_generator
@@ -240,13 +270,15 @@ class RepoUnitAssociationQueryManager(object):
     # -- unit association methods ----------------------------------------------
 
     @staticmethod
-    def _unit_associations_cursor(repo_id, criteria):
+    def _unit_associations_cursor(repo_id, criteria, fields):
         """
         Retrieve a pymongo cursor for unit associations for the given repository
         that match the given criteria.
 
         :type repo_id: str
         :type criteria: UnitAssociationCriteria
+        :param fields: the association fields to retrieve; all fields when None
+        :type fields: list or dict or None
         :rtype: pymongo.cursor.Cursor
         """
 
@@ -258,7 +290,7 @@ class RepoUnitAssociationQueryManager(object):
 
         collection = RepoContentUnit.get_collection()
 
-        cursor = collection.find(spec, fields=criteria.association_fields)
+        cursor = collection.find(spec, fields=fields)
 
         if criteria.association_sort:
             cursor.sort(criteria.association_sort)
@@ -371,6 +403,34 @@ class RepoUnitAssociationQueryManager(object):
 
         return cursor
 
+    @classmethod
+    def _associated_units_by_type_cursors(cls, repo_id, criteria, unit_type_ids):
+        """
+        Generate a pymongo cursor for the units of each given type associated
+        with the repository that meet the provided criteria.
+
+        The ids of the associated units of each type are only read when the
+        cursor for that type is generated. Types without associated units are
+        skipped.
+
+        :type repo_id: str
+        :type criteria: UnitAssociationCriteria
+        :type unit_type_ids: list
+        :rtype: generator
+        """
+        collection = RepoContentUnit.get_collection()
+
+        for unit_type_id in unit_type_ids:
+            spec = criteria.association_filters.copy()
+            spec['repo_id'] = repo_id
+            spec['unit_type_id'] = unit_type_id
+            cursor = collection.find(spec, fields=_ASSOCIATION_ID_FIELDS)
+            associated_unit_ids = [a['unit_id'] for a in cursor]
+            if not associated_unit_ids:
+                continue
+            yield cls._associated_units_by_type_cursor(unit_type_id, criteria,
+                                                       associated_unit_ids)
+
     @staticmethod
     def _associated_units_cursors_with_skip(units_cursors, skip):
         """
@@ -436,34 +496,45 @@ class RepoUnitAssociationQueryManager(object):
                 generated_elements += cursor.count()
                 yield cursor
 
-    @staticmethod
-    def _association_ordered_units(associated_unit_ids, associated_units):
+            # Stop before the next cursor is created once the limit is reached.
+            if limit and generated_elements == limit:
+                return
+
+    @classmethod
+    def _association_ordered_units(cls, associated_unit_ids, criteria):
         """
         Return associated units in the order specified by the associated unit id
         list.
 
+        The units are read a page at a time so that only a page of units is
+        loaded into memory.
+
         :type associated_unit_ids: list
-        :type associated_units: iterator
+        :type criteria: UnitAssociationCriteria
         :rtype: generator
         """
 
         # This algorithm assumes that associated_unit_ids has already been sorted.
 
-        # XXX This is unfortunate as it's the one place that loads all of the
-        # associated_units into memory.
-        # It is worth noting that the units have already been filtered by type,
-        # association filters, and unit filters. In addition, skip and limit
-        # may have also been performed, so it's potentially not as bad as it seems.
-        associated_units_by_id = dict(
-            ((u['_content_type_id'], u['_id']), u) for u in associated_units)
-
-        for id_tuple in associated_unit_ids:
-            # the associated_unit_ids are sorted, but not all of the units may
-            # be in the associated_units_by_id
-            if id_tuple not in associated_units_by_id:
-                continue
+        for page in paginate(associated_unit_ids, PAGE_SIZE):
+
+            unit_ids_by_type = {}
+            for unit_type_id, unit_id in page:
+                unit_ids_by_type.setdefault(unit_type_id, []).append(unit_id)
+
+            associated_units_by_id = {}
+            for unit_type_id, unit_ids in unit_ids_by_type.items():
+                cursor = cls._associated_units_by_type_cursor(unit_type_id, criteria, unit_ids)
+                associated_units_by_id.update(
+                    ((u['_content_type_id'], u['_id']), u) for u in cursor)
 
-            yield associated_units_by_id[id_tuple]
+            for id_tuple in page:
+                # the associated_unit_ids are sorted, but not all of the units may
+                # be in the associated_units_by_id
+                if id_tuple not in associated_units_by_id:
+                    continue
+
+                yield associated_units_by_id[id_tuple]
 
     @staticmethod
     def _merged_units_duplicate_units(associations_lookup, associated_units):
@@ -516,3 +587,43 @@ class RepoUnitAssociationQueryManager(object):
                 association = association.copy()
                 association['metadata'] = unit
                 yield association
+
+    @classmethod
+    def _merged_units_by_page(cls, repo_id, criteria, associated_units):
+        """
+        Return associated units as the unit association information and the unit
+        information as metadata on the unit association information.
+
+        The associations are read a page of units at a time so that only the
+        associations of the units being returned are loaded into memory.
+
+        :type repo_id: str
+        :type criteria: UnitAssociationCriteria
+        :type associated_units: iterator
+        :rtype: generator
+        """
+
+        collection = RepoContentUnit.get_collection()
+
+        for page in paginate(associated_units, PAGE_SIZE):
+
+            unit_ids_by_type = {}
+            for unit in page:
+                unit_ids_by_type.setdefault(unit['_content_type_id'], []).append(unit['_id'])
+
+            associations_lookup = {}
+            for unit_type_id, unit_ids in unit_ids_by_type.items():
+                spec = {'repo_id': repo_id,
+                        'unit_type_id': unit_type_id,
+                        'unit_id': {'$in': unit_ids}}
+                association_type_dict = associations_lookup.setdefault(unit_type_id, {})
+                for association in collection.find(spec, fields=criteria.association_fields):
+                    association_list = association_type_dict.setdefault(association['unit_id'], [])
+                    association_list.append(association)
+
+            # Skip any unit that was unassociated after it was read.
+            page = [u for u in page
+                    if u['_id'] in associations_lookup[u['_content_type_id']]]
+
+            for association in cls._merged_units_unique_units(associations_lookup, page):
+                yield association
@@ -15,7 +15,8 @@ from pulp.server.managers.consumer import bind
 from pulp.server.managers.consumer import profile
 from pulp.server.managers.consumer import query as query_manager
 from pulp.server.managers.consumer.applicability import (regenerate_applicability_for_consumers,
-                                                         retrieve_consumer_applicability)
+                                                         retrieve_consumer_applicability,
+                                                         retrieve_consumer_applicability_iter)
 from pulp.server.managers.schedule.consumer import (UNIT_INSTALL_ACTION, UNIT_UNINSTALL_ACTION,
                                                     UNIT_UPDATE_ACTION)
 from pulp.server.webservices.views import search
@@ -25,8 +26,10 @@ from pulp.server.webservices.views.util import (_ensure_input_encoding,
                                                 generate_json_response,
                                                 generate_json_response_with_pulp_encoder,
                                                 generate_redirect_response,
+                                                generate_streaming_json_response,
                                                 json_body_required,
-                                                json_body_allow_empty)
+                                                json_body_allow_empty,
+                                                streaming_supported)
 
 
 def add_link(consumer):
@@ -804,7 +807,8 @@ class ConsumerContentApplicabilityView(View):
         Query content applicability for a given consumer criteria query.
 
         body {criteria: <object>,
-              content_types: <array>[optional]}
+              content_types: <array>[optional],
+              stream: <boolean>[optional]}
 
         This method returns a JSON document containing an array of objects that each have two
         keys: 'consumers', and 'applicability'. 'consumers' will index an array of consumer_ids,
@@ -817,6 +821,10 @@ class ConsumerContentApplicabilityView(View):
          {'consumers': ['consumer_2', 'consumer_3'],
           'applicability': {'content_type_1': ['unit_1', 'unit_2']}}]
 
+        When stream is true, the report is streamed as it is generated, a page of consumers at
+        a time, and consumers are only collated with consumers from the same page. Streaming
+        requires Django 1.5 or later; with older versions, stream is ignored.
+
         :param request: WSGI request object
         :type request: django.core.handlers.wsgi.WSGIRequest
 
@@ -830,9 +838,16 @@ class ConsumerContentApplicabilityView(View):
         try:
             consumer_criteria = self._get_consumer_criteria(request)
             content_types = self._get_content_types(request)
+            stream = self._get_stream(request)
         except InvalidValue, e:
             return HttpResponseBadRequest(str(e))
 
+        if stream and streaming_supported():
+            # The report is streamed as it is generated, so that memory use is bounded regardless
+            # of how many consumers match the criteria
+            report = retrieve_consumer_applicability_iter(consumer_criteria, content_types)
+            return generate_streaming_json_response(report)
+
         response = retrieve_consumer_applicability(consumer_criteria, content_types)
         return generate_json_response_with_pulp_encoder(response)
 
@@ -882,6 +897,28 @@ class ConsumerContentApplicabilityView(View):
 
         return content_types
 
+    def _get_stream(self, request):
+        """
+        Get whether the caller asked for the report to be streamed. If the caller did not
+        include stream, this will return False.
+
+        :param request: WSGI request object
+        :type request: django.core.handlers.wsgi.WSGIRequest
+
+        :raises InvalidValue: if some parameters were invalid
+
+        :return: True if the report should be streamed
+        :rtype:  bool
+        """
+
+        body = request.body_as_json
+
+        stream = body.get('stream', False)
+        if not isinstance(stream, bool):
+            raise InvalidValue('stream must be a boolean.')
+
+        return stream
+
 
 class ConsumerContentApplicRegenerationView(View):
     """
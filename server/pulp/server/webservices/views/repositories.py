@@ -960,6 +960,7 @@ class ContentApplicabilityRegenerationView(View):
         :type  request: django.core.handlers.wsgi.WSGIRequest
 
         :raises pulp_exceptions.MissingValue: if repo_critera is not a body parameter
+        :raises pulp_exceptions.InvalidValue: if incremental is not a boolean
         :raises pulp_exceptions.InvalidValue: if repo_critera (dict) has unsupported keys,
                                               the manager will raise an InvalidValue for the
                                               specific keys. Here, we create a parent exception
@@ -971,6 +972,9 @@ class ContentApplicabilityRegenerationView(View):
         repo_criteria_body = request.body_as_json.get('repo_criteria', None)
         if repo_criteria_body is None:
             raise pulp_exceptions.MissingValue('repo_criteria')
+        incremental = request.body_as_json.get('incremental', False)
+        if not isinstance(incremental, bool):
+            raise pulp_exceptions.InvalidValue(['incremental'])
         try:
             repo_criteria = Criteria.from_client_input(repo_criteria_body)
         except pulp_exceptions.InvalidValue, e:
@@ -981,7 +985,7 @@ class ContentApplicabilityRegenerationView(View):
         regeneration_tag = tags.action_tag('content_applicability_regeneration')
         async_result = regenerate_applicability_for_repos.apply_async_with_reservation(
             tags.RESOURCE_REPOSITORY_PROFILE_APPLICABILITY_TYPE, tags.RESOURCE_ANY_ID,
-            (repo_criteria.as_dict(),), tags=[regeneration_tag])
+            (repo_criteria.as_dict(),), {'incremental': incremental}, tags=[regeneration_tag])
         raise pulp_exceptions.OperationPostponed(async_result)
 
 
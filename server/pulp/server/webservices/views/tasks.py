@@ -2,6 +2,8 @@
 This module contains views related to Pulp's task system models.
 """
 from datetime import datetime
+import hashlib
+import time
 
 from django.views.generic import View
 from django.http import HttpResponse
@@ -11,9 +13,10 @@ from pulp.common import error_codes
 from pulp.common.constants import CALL_CANCELED_STATE, CALL_COMPLETE_STATES
 from pulp.server import exceptions as pulp_exceptions
 from pulp.server.async import tasks
+from pulp.server.compat import json
 from pulp.server.auth import authorization
 from pulp.server.db.model import Worker, TaskStatus
-from pulp.server.exceptions import MissingResource
+from pulp.server.exceptions import InvalidValue, MissingResource
 from pulp.server.webservices.views import search
 from pulp.server.webservices.views.decorators import auth_required
 from pulp.server.webservices.views.serializers import dispatch as serial_dispatch
@@ -24,6 +27,16 @@ from pulp.server.webservices.views.util import (generate_json_response,
 # This constant set is used for deleting the completed tasks from the collection.
 VALID_STATES = set(filter(lambda state: state != CALL_CANCELED_STATE, CALL_COMPLETE_STATES))
 
+# The maximum number of seconds a GET of a single task may wait for the task to change.
+# A waiting request occupies a WSGI request thread, so this is kept short to bound how
+# long waiting clients can hold the threads that serve the rest of the API.
+MAX_WAIT = 5
+
+# The number of seconds between reads of a task while waiting for it to change. This
+# matches the rate at which clients polled before they could wait, so a waiting client
+# reads the database no more often than a polling one did.
+WAIT_INTERVAL = 1
+
 
 def task_serializer(task):
     """
@@ -41,6 +54,22 @@ def task_serializer(task):
     return task
 
 
+def task_digest(task):
+    """
+    Calculate a digest of the parts of a task that change while it runs. A client
+    waiting for a task to change passes the digest of the task it last read.
+
+    :param task: The task from the database
+    :type  task: pulp.server.db.model.TaskStatus
+
+    :return: hex digest
+    :rtype:  str
+    """
+    changing = [task['state'], task['progress_report'], task['spawned_tasks'], task['error']]
+    encoded = json.dumps(changing, sort_keys=True, default=repr)
+    return hashlib.sha1(encoded).hexdigest()
+
+
 class TaskSearchView(search.SearchView):
     """
     This view provides GET and POST searching on TaskStatus objects.
@@ -110,6 +139,11 @@ class TaskResourceView(View):
         """
         Return a response containing a single task.
 
+        When the optional 'wait' parameter is specified, the response also contains the
+        digest of the task. When both 'wait' and 'digest' are specified, the response is
+        delayed until the task has a different digest, has completed, or 'wait' seconds
+        (up to MAX_WAIT) have elapsed. This lets clients wait for a task without polling.
+
         :param request: WSGI request object
         :type  request: django.core.handlers.wsgi.WSGIRequest
         :param task_id: The ID of the task you wish to cancel
@@ -118,13 +152,61 @@ class TaskResourceView(View):
         :return: Response containing a serialized dict of the requested task
         :rtype : django.http.HttpResponse
         :raises MissingResource: if task is not found
+        :raises InvalidValue: if wait is not a non-negative number
         """
+        task = self._get_task(task_id)
+        if 'wait' not in request.GET:
+            return self._task_response(task)
+
         try:
-            task = TaskStatus.objects.get(task_id=task_id)
+            wait = float(request.GET['wait'])
+        except ValueError:
+            raise InvalidValue(['wait'])
+        if not wait >= 0:
+            raise InvalidValue(['wait'])
+        wait = min(wait, MAX_WAIT)
+
+        digest = request.GET.get('digest')
+        if digest:
+            deadline = time.time() + wait
+            while task['state'] not in CALL_COMPLETE_STATES and task_digest(task) == digest:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                time.sleep(min(WAIT_INTERVAL, remaining))
+                task = self._get_task(task_id)
+
+        return self._task_response(task, digest=task_digest(task))
+
+    @staticmethod
+    def _get_task(task_id):
+        """
+        :param task_id: The ID of the task
+        :type  task_id: basestring
+
+        :return: the task from the database
+        :rtype:  pulp.server.db.model.TaskStatus
+        :raises MissingResource: if task is not found
+        """
+        try:
+            return TaskStatus.objects.get(task_id=task_id)
         except DoesNotExist:
             raise MissingResource(task_id)
 
+    @staticmethod
+    def _task_response(task, digest=None):
+        """
+        :param task: The task from the database
+        :type  task: pulp.server.db.model.TaskStatus
+        :param digest: The digest of the task to be included in the response
+        :type  digest: str
+
+        :return: Response containing a serialized dict of the task
+        :rtype : django.http.HttpResponse
+        """
         task_dict = task_serializer(task)
+        if digest:
+            task_dict['digest'] = digest
         if 'worker_name' in task_dict:
             queue_name = Worker(name=task_dict['worker_name'],
                                 last_heartbeat=datetime.now()).queue_name
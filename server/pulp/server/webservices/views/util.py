@@ -1,13 +1,22 @@
 from datetime import datetime
 from functools import wraps
+from gettext import gettext as _
 
 import functools
 import httplib
+import itertools
 import json
+import logging
 import sys
 
 from django.http import HttpResponse
 from django.utils.encoding import iri_to_uri
+try:
+    from django.http import StreamingHttpResponse
+except ImportError:
+    # Django < 1.5 cannot stream a response; ConditionalGetMiddleware reads the whole content
+    # of an HttpResponse to set its Content-Length, so a generator would not be streamed.
+    StreamingHttpResponse = None
 
 from pulp.common import dateutils, error_codes
 from pulp.common.util import decode_unicode, encode_unicode
@@ -15,6 +24,9 @@ from pulp.server.compat import json_util
 from pulp.server.exceptions import PulpCodedValidationException, InputEncodingError
 
 
+_logger = logging.getLogger(__name__)
+
+
 def pulp_json_encoder(obj):
     """
     Specialized json encoding.
@@ -65,6 +77,59 @@ generate_json_response_with_pulp_encoder = functools.partial(
 )
 
 
+def streaming_supported():
+    """
+    :return: True if the installed Django can stream a response, which requires Django 1.5
+    :rtype:  bool
+    """
+    return StreamingHttpResponse is not None
+
+
+def generate_streaming_json_response(items, default=pulp_json_encoder,
+                                     content_type='application/json; charset=utf-8'):
+    """
+    Serialize the items of an iterable as a JSON array and return a django response that
+    sends the array as it is serialized, one item at a time, so that the whole array never
+    needs to be held in memory.
+
+    The first item is retrieved before the response is returned, so an error raised while it
+    is generated results in an error response. An error raised after the response has started
+    is logged and raised again, so that the server aborts the connection instead of
+    completing the response; the closing bracket of the array is never sent.
+
+    This may only be used if streaming_supported() is True.
+
+    :param items        : items to be serialized
+    :type  items        : iterable of objects that are serializable by json.dumps
+    :param default      : function used by json.dumps to serialize content (also called default)
+    :type  default      : function or None
+    :param content_type : type of returned content
+    :type  content_type : str
+
+    :return             : response that streams the serialized items
+    :rtype              : django.http.StreamingHttpResponse
+    """
+    items = iter(items)
+    try:
+        first = [next(items)]
+    except StopIteration:
+        first = []
+
+    def _serialize():
+        yield '['
+        separator = ''
+        try:
+            for item in itertools.chain(first, items):
+                yield separator + json.dumps(item, default=default)
+                separator = ', '
+        except Exception:
+            _logger.exception(_('Streamed response aborted'))
+            raise
+        yield ']'
+
+    return StreamingHttpResponse(_serialize(), content_type=content_type)
+
+
 def generate_redirect_response(response, href):
     response['Location'] = iri_to_uri(href)
     response.status_code = httplib.CREATED
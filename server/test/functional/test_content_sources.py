@@ -14,7 +14,7 @@ from pulp.common.constants import PRIMARY_ID
 from pulp.plugins.loader import api as plugins
 from pulp.plugins.conduits.cataloger import CatalogerConduit
 from pulp.server.db import connection
-from pulp.server.db.model.content import ContentCatalog
+from pulp.server.db.model.content import ContentCatalog, ContentCatalogGeneration
 from pulp.server.content.sources import ContentContainer, Request, ContentSource, Listener
 from pulp.server.content.sources.descriptor import nectar_config
 from pulp.server.managers import factory as managers
@@ -131,6 +131,7 @@ class ContainerTest(TestCase):
     def setUp(self):
         super(ContainerTest, self).setUp()
         ContentCatalog.get_collection().remove()
+        ContentCatalogGeneration.get_collection().remove()
         self.tmp_dir = mkdtemp()
         self.downloaded = os.path.join(self.tmp_dir, 'downloaded')
         os.makedirs(self.downloaded)
@@ -141,6 +142,7 @@ class ContainerTest(TestCase):
     def tearDown(self):
         super(ContainerTest, self).tearDown()
         ContentCatalog.get_collection().remove()
+        ContentCatalogGeneration.get_collection().remove()
         shutil.rmtree(self.tmp_dir, ignore_errors=True)
         plugins.finalize()
 
@@ -171,6 +173,8 @@ class ContainerTest(TestCase):
     def populate_catalog(self, source_id, n_start, n_units, checksum='0xAA'):
         _dir = self.populate_content(source_id, n_start, n_units)
         collection = ContentCatalog.get_collection()
+        catalog = managers.content_catalog_manager()
+        generation = catalog.new_generation()
         entry_list = []
         for n in range(n_start, n_start + n_units):
             unit_key = {
@@ -180,10 +184,11 @@ class ContainerTest(TestCase):
                 'checksum': checksum
             }
             url = 'file://%s/unit_%d' % (_dir, n)
-            entry = ContentCatalog(source_id, EXPIRES, TYPE_ID, unit_key, url)
+            entry = ContentCatalog(source_id, generation, TYPE_ID, unit_key, url)
             entry_list.append(entry)
         for entry in entry_list:
             collection.insert(entry)
+        catalog.activate_generation(source_id, generation, EXPIRES)
         return _dir, entry_list
 
 
@@ -487,13 +492,15 @@ class TestRefreshing(ContainerTest):
             self.assertTrue(r.succeeded)
             self.assertEqual(r.added_count, 100)
             self.assertEqual(r.deleted_count, 0)
-        calls = iter(plugin.refresh.call_args_list)
+        calls = dict((args[2], args) for args, kwargs in plugin.refresh.call_args_list)
         for source in ContentSource.load_all(self.tmp_dir).values():
             for url in source.urls:
-                args = calls.next()[0]
+                args = calls[url]
                 self.assertTrue(isinstance(args[0], CatalogerConduit))
                 self.assertEqual(args[1], source.descriptor)
-                self.assertEqual(args[2], url)
+        catalog = managers.content_catalog_manager()
+        for source_id in container.sources:
+            self.assertTrue(catalog.has_entries(source_id))
 
     @patch('pulp.plugins.loader.api.get_cataloger_by_id', return_value=(FakeCataloger(ValueError),
            {}))
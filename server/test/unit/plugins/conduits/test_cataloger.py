@@ -1,5 +1,7 @@
 from uuid import uuid4
 
+from bson.objectid import ObjectId
+
 from ... import base
 from pulp.plugins.conduits.cataloger import CatalogerConduit
 from pulp.server.db.model.content import ContentCatalog
@@ -47,6 +49,7 @@ class TestCatalogerConduit(base.PulpServerTests):
         for unit_key, url in units:
             locator = ContentCatalog.get_locator(TYPE_ID, unit_key)
             entry = collection.find_one({'locator': locator})
+            self.assertEqual(entry['generation'], conduit.generation)
             self.assertEqual(entry['type_id'], TYPE_ID)
             self.assertEqual(entry['unit_key'], unit_key)
             self.assertEqual(entry['url'], url)
@@ -71,6 +74,13 @@ class TestCatalogerConduit(base.PulpServerTests):
         entry = collection.find_one({'locator': locator})
         self.assertTrue(entry is None)
 
+    def test_generation(self):
+        generation = ObjectId()
+        conduit = CatalogerConduit(SOURCE_ID, EXPIRES, generation=generation)
+        self.assertEqual(conduit.generation, generation)
+        self.assertNotEqual(CatalogerConduit(SOURCE_ID, EXPIRES).generation,
+                            CatalogerConduit(SOURCE_ID, EXPIRES).generation)
+
     def test_reset(self):
         conduit = CatalogerConduit(SOURCE_ID, EXPIRES)
         conduit.added_count = 10
@@ -78,3 +88,58 @@ class TestCatalogerConduit(base.PulpServerTests):
         conduit.reset()
         self.assertEqual(conduit.added_count, 0)
         self.assertEqual(conduit.deleted_count, 0)
+
+    def test_reset_buffered(self):
+        conduit = CatalogerConduit(SOURCE_ID, EXPIRES, 100)
+        for unit_key, url in self.units(0, 10):
+            conduit.add_entry(TYPE_ID, unit_key, url)
+        conduit.reset()
+        conduit.flush()
+        self.assertEqual(ContentCatalog.get_collection().find().count(), 0)
+        self.assertEqual(conduit.added_count, 0)
+
+    def test_add_buffered(self):
+        units = self.units(0, 25)
+        conduit = CatalogerConduit(SOURCE_ID, EXPIRES, 10)
+        collection = ContentCatalog.get_collection()
+        for unit_key, url in units:
+            conduit.add_entry(TYPE_ID, unit_key, url)
+        self.assertEqual(collection.find().count(), 20)
+        self.assertEqual(conduit.added_count, 20)
+        conduit.flush()
+        self.assertEqual(collection.find().count(), len(units))
+        self.assertEqual(conduit.added_count, len(units))
+        self.assertEqual(conduit.deleted_count, 0)
+        for unit_key, url in units:
+            locator = ContentCatalog.get_locator(TYPE_ID, unit_key)
+            entry = collection.find_one({'locator': locator})
+            self.assertEqual(entry['source_id'], SOURCE_ID)
+            self.assertEqual(entry['type_id'], TYPE_ID)
+            self.assertEqual(entry['unit_key'], unit_key)
+            self.assertEqual(entry['url'], url)
+
+    def test_delete_buffered(self):
+        units = self.units(0, 10)
+        conduit = CatalogerConduit(SOURCE_ID, EXPIRES, 100)
+        for unit_key, url in units:
+            conduit.add_entry(TYPE_ID, unit_key, url)
+        for unit_key, url in units[:5]:
+            conduit.delete_entry(TYPE_ID, unit_key)
+        conduit.flush()
+        collection = ContentCatalog.get_collection()
+        self.assertEqual(collection.find().count(), 5)
+        self.assertEqual(conduit.added_count, len(units))
+        self.assertEqual(conduit.deleted_count, 5)
+        for unit_key, url in units[:5]:
+            locator = ContentCatalog.get_locator(TYPE_ID, unit_key)
+            self.assertTrue(collection.find_one({'locator': locator}) is None)
+
+    def test_add_after_delete_buffered(self):
+        unit_key, url = self.units(0, 1)[0]
+        conduit = CatalogerConduit(SOURCE_ID, EXPIRES, 100)
+        conduit.delete_entry(TYPE_ID, unit_key)
+        conduit.add_entry(TYPE_ID, unit_key, url)
+        conduit.flush()
+        locator = ContentCatalog.get_locator(TYPE_ID, unit_key)
+        entry = ContentCatalog.get_collection().find_one({'locator': locator})
+        self.assertEqual(entry['url'], url)
@@ -745,6 +745,72 @@ class AddUnitMixinTests(unittest.TestCase):
         # Test
         self.assertRaises(mixins.ImporterConduitException, self.mixin.save_unit, None)
 
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.save_content_units')
+    @mock.patch('pulp.server.managers.repo.unit_association.RepoUnitAssociationManager.'
+                'associate_all_by_ids')
+    def test_save_unit_buffered(self, mock_associate, mock_save):
+        # Setup
+        self.mixin.flush_size = 3
+        units = [Unit('t1', {'k': 'v1'}, {'m': 'm'}, 'p1'),
+                 Unit('t2', {'k': 'v2'}, {'m': 'm'}, 'p2'),
+                 Unit('t1', {'k': 'v3'}, {'m': 'm'}, 'p3')]
+        mock_save.side_effect = lambda type_id, pulp_units: (
+            ['%s-%s' % (type_id, u['k']) for u in pulp_units], 1)
+
+        # Test
+        for unit in units[:2]:
+            self.mixin.save_unit(unit)
+
+        # Verify
+        self.assertEqual(0, mock_save.call_count)
+        self.assertEqual(None, units[0].id)
+
+        self.mixin.save_unit(units[2])
+
+        self.assertEqual(2, mock_save.call_count)
+        saved = dict(c[0] for c in mock_save.call_args_list)
+        self.assertEqual(['p1', 'p3'], [u['_storage_path'] for u in saved['t1']])
+        self.assertEqual(['p2'], [u['_storage_path'] for u in saved['t2']])
+        mock_associate.assert_any_call(self.repo_id, 't1', ['t1-v1', 't1-v3'])
+        mock_associate.assert_any_call(self.repo_id, 't2', ['t2-v2'])
+        self.assertEqual(['t1-v1', 't2-v2', 't1-v3'], [u.id for u in units])
+        self.assertEqual(2, self.mixin._added_count)
+        self.assertEqual(1, self.mixin._updated_count)
+
+        # nothing is pending
+        self.mixin.flush()
+        self.assertEqual(2, mock_save.call_count)
+
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.save_content_units')
+    @mock.patch('pulp.server.managers.repo.unit_association.RepoUnitAssociationManager.'
+                'associate_all_by_ids')
+    def test_save_unit_buffered_same_unit(self, mock_associate, mock_save):
+        # Setup
+        self.mixin.flush_size = 10
+        mock_save.return_value = (['unit-id'], 0)
+
+        # Test
+        self.mixin.save_unit(Unit('t', {'k': 'v'}, {'m': 'm1'}, 'p'))
+        self.mixin.save_unit(Unit('t', {'k': 'v'}, {'m': 'm2'}, 'p'))
+
+        # Verify
+        self.assertEqual(1, mock_save.call_count)
+        self.assertEqual('m1', mock_save.call_args[0][1][0]['m'])
+        self.mixin.flush()
+        self.assertEqual(2, mock_save.call_count)
+        self.assertEqual('m2', mock_save.call_args[0][1][0]['m'])
+        self.assertEqual(2, self.mixin._updated_count)
+
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.save_content_units')
+    def test_flush_with_error(self, mock_save):
+        # Setup
+        self.mixin.flush_size = 10
+        mock_save.side_effect = Exception()
+        self.mixin.save_unit(Unit('t', {'k': 'v'}, {'m': 'm'}, 'p'))
+
+        # Test
+        self.assertRaises(mixins.ImporterConduitException, self.mixin.flush)
+
     @mock.patch('pulp.server.managers.content.cud.ContentManager.link_referenced_content_units')
     def test_link_unit(self, mock_link):
         # Setup
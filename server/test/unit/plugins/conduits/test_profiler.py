@@ -149,3 +149,13 @@ class BaseProfilerConduitTests(base.PulpServerTests):
         for u in units:
             self.assertTrue('key-1' in u.unit_key)
             self.assertTrue('extra_field' in u.metadata)
+
+    def test_get_repo_units_limited_unit_ids(self):
+        # Setup
+        self.populate()
+        # Test
+        conduit = ProfilerConduit(unit_ids=['unit-0', 'unit-1', 'unit-9'])
+        units = conduit.get_repo_units(self.REPO_ID, content_type_id=self.TYPE_1_DEF.id)
+
+        # Verify that only the requested units of the given type are returned
+        self.assertEquals(sorted(u.metadata['unit_id'] for u in units), ['unit-0', 'unit-1'])
@@ -3,6 +3,7 @@ import mock
 from ... import base
 from pulp.plugins.conduits import mixins, unit_import
 from pulp.plugins.conduits.mixins import ImporterConduitException
+from pulp.plugins.model import Unit
 from pulp.server.db.model.criteria import UnitAssociationCriteria
 
 
@@ -46,3 +47,32 @@ class ImportUnitConduitTests(base.PulpServerTests):
 
         # Verify the correct propagation to the mixin method
         mock_get.assert_called_once_with(self.dest_repo_id, criteria, ImporterConduitException)
+
+    def test_associate_units(self):
+        # Setup
+        manager = mock.MagicMock()
+        self.conduit._ImportUnitConduit__association_manager = manager
+        units = [Unit('type-1', {'n': 1}, {}, None), Unit('type-2', {'n': 2}, {}, None),
+                 Unit('type-1', {'n': 3}, {}, None)]
+        for n, unit in enumerate(units):
+            unit.id = 'unit-%d' % n
+
+        # Test
+        associated = self.conduit.associate_units(iter(units))
+
+        # Verify
+        self.assertEqual(associated, units)
+        self.assertEqual(2, manager.associate_all_by_ids.call_count)
+        manager.associate_all_by_ids.assert_any_call(self.dest_repo_id, 'type-1',
+                                                     ['unit-0', 'unit-2'])
+        manager.associate_all_by_ids.assert_any_call(self.dest_repo_id, 'type-2', ['unit-1'])
+
+    def test_associate_units_error(self):
+        # Setup
+        manager = mock.MagicMock()
+        manager.associate_all_by_ids.side_effect = ValueError()
+        self.conduit._ImportUnitConduit__association_manager = manager
+
+        # Test
+        self.assertRaises(ImporterConduitException, self.conduit.associate_units,
+                          [Unit('type-1', {'n': 1}, {}, None)])
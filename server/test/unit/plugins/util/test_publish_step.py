@@ -9,7 +9,7 @@ import traceback
 import unittest
 
 import mongoengine
-from mock import Mock, patch, MagicMock
+from mock import Mock, patch, MagicMock, call
 from nectar.downloaders.local import LocalFileDownloader
 from nectar.request import DownloadRequest
 
@@ -1040,7 +1040,7 @@ class DownloadStepTests(unittest.TestCase):
         self.assertTrue(dlstep.downloader.is_canceled)
 
 
-@patch('pulp.plugins.util.publish_step.repo_controller.associate_single_unit')
+@patch('pulp.plugins.util.publish_step.repo_controller.associate_units')
 @patch('pulp.plugins.util.publish_step.units_controller.find_units')
 class TestGetLocalUnitsStep(unittest.TestCase):
 
@@ -1076,7 +1076,7 @@ class TestGetLocalUnitsStep(unittest.TestCase):
 
         self.step.process_main()
 
-        mock_paginate.assert_called_once_with(self.step.parent.available_units, 50)
+        mock_paginate.assert_called_once_with(self.step.parent.available_units, 1000)
 
     def test_saves_unit(self, mock_find_units, mock_associate):
         """
@@ -1090,8 +1090,8 @@ class TestGetLocalUnitsStep(unittest.TestCase):
         mock_find_units.return_value = [existing_demo]
 
         self.step.process_main()
-        mock_associate.assert_called_once_with('fake_repo', existing_demo)
-        mock_find_units.assert_called_once_with((demo, ))
+        mock_associate.assert_called_once_with('fake_repo', [existing_demo])
+        mock_find_units.assert_called_once_with((demo, ), 1000)
 
         # Ensure that the unit was not marked for download
         self.assertEqual(self.step.units_to_download, [])
@@ -1108,13 +1108,38 @@ class TestGetLocalUnitsStep(unittest.TestCase):
         mock_find_units.return_value = [existing_demo]
 
         self.step.process_main()
-        mock_find_units.assert_called_once_with((demo_1, demo_2))
+        mock_find_units.assert_called_once_with((demo_1, demo_2), 1000)
 
         # The one that exists is associated
-        mock_associate.assert_called_once_with('fake_repo', existing_demo)
+        mock_associate.assert_called_once_with('fake_repo', [existing_demo])
         # The one that does not exist yet is added to the download list
         self.assertEqual(self.step.units_to_download, [demo_1])
 
+    def test_pages(self, mock_find_units, mock_associate):
+        """
+        Test that units are queried and associated a page at a time and that each
+        page is reported
+        """
+        units = [self.DemoModel(key_field=str(i)) for i in range(5)]
+        self.parent.available_units = units
+        self.step.unit_pagination_size = 2
+        self.step.report_progress = MagicMock()
+        mock_find_units.side_effect = lambda page, size: [u for u in page if u.key_field != '3']
+
+        self.step.process_main()
+
+        self.assertEqual(mock_find_units.call_args_list,
+                         [call((units[0], units[1]), 2), call((units[2], units[3]), 2),
+                          call((units[4], ), 2)])
+        self.assertEqual(mock_associate.call_args_list,
+                         [call('fake_repo', [units[0], units[1]]),
+                          call('fake_repo', [units[2]]),
+                          call('fake_repo', [units[4]])])
+        self.assertEqual(self.step.units_to_download, [units[3]])
+        self.assertEqual(3, self.step.report_progress.call_count)
+        self.assertTrue(self.step.progress_details.startswith(
+            'Page 3: 1 of 1 units already in pulp'))
+
 
 class TestSaveUnitsStep(unittest.TestCase):
 
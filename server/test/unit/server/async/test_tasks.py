@@ -3,6 +3,7 @@ This module contains tests for the pulp.server.async.tasks module.
 """
 from datetime import datetime
 import signal
+import threading
 import unittest
 import uuid
 
@@ -19,7 +20,7 @@ from pulp.devel.unit.util import compare_dict
 from pulp.server.async import tasks
 from pulp.server.db.model import Worker, ReservedResource, TaskStatus
 from pulp.server.db.reaper import queue_reap_expired_documents
-from pulp.server.exceptions import NoWorkers, PulpException, PulpCodedException
+from pulp.server.exceptions import PulpException, PulpCodedException
 from pulp.server.maintenance.monthly import queue_monthly_maintenance
 
 
@@ -32,17 +33,10 @@ WORKER_3 = 'worker-3'
 class TestQueueReservedTask(ResourceReservationTests):
 
     def setUp(self):
-        self.patch_a = mock.patch('pulp.server.async.tasks.get_worker_for_reservation')
-        self.mock_get_worker_for_reservation = self.patch_a.start()
-
-        self.patch_b = mock.patch('pulp.server.async.tasks._get_unreserved_worker')
-        self.mock_get_unreserved_worker = self.patch_b.start()
-
-        self.patch_c = mock.patch('pulp.server.async.tasks.time', autospec=True)
-        self.mock_time = self.patch_c.start()
-
-        self.patch_d = mock.patch('pulp.server.async.tasks.ReservedResource', autospec=True)
-        self.mock_reserved_resource = self.patch_d.start()
+        self.patch_a = mock.patch('pulp.server.async.tasks._get_dispatcher')
+        self.mock_get_dispatcher = self.patch_a.start()
+        self.mock_reserve = self.mock_get_dispatcher.return_value.reserve
+        self.mock_reserve.return_value = 'worker1'
 
         self.patch_e = mock.patch('pulp.server.async.tasks.celery', autospec=True)
         self.mock_celery = self.patch_e.start()
@@ -55,76 +49,156 @@ class TestQueueReservedTask(ResourceReservationTests):
 
     def tearDown(self):
         self.patch_a.stop()
-        self.patch_b.stop()
-        self.patch_c.stop()
-        self.patch_d.stop()
         self.patch_e.stop()
         self.patch_f.stop()
         super(TestQueueReservedTask, self).tearDown()
 
-    def test_creates_and_saves_reserved_resource(self):
-        self.mock_get_worker_for_reservation.return_value = Worker(
-            name='worker1', last_heartbeat=datetime.utcnow())
+    def test_reserves_resource(self):
         tasks._queue_reserved_task('task_name', 'my_task_id', 'my_resource_id', [1, 2], {'a': 2})
-        self.mock_reserved_resource.assert_called_once_with(task_id='my_task_id',
-                                                            worker_name='worker1',
-                                                            resource_id='my_resource_id')
-        self.mock_reserved_resource.return_value.save.assert_called_once_with()
+        self.mock_reserve.assert_called_once_with('my_task_id', 'my_resource_id')
 
     def test_dispatches_inner_task(self):
-        self.mock_get_worker_for_reservation.return_value = Worker(
-            name='worker1', last_heartbeat=datetime.utcnow())
         tasks._queue_reserved_task('task_name', 'my_task_id', 'my_resource_id', [1, 2], {'a': 2})
         apply_async = self.mock_celery.tasks['task_name'].apply_async
         apply_async.assert_called_once_with(1, 2, a=2, routing_key='worker1', task_id='my_task_id',
                                             exchange='C.dq')
 
     def test_dispatches__release_resource(self):
-        self.mock_get_worker_for_reservation.return_value = Worker(
-            name='worker1', last_heartbeat=datetime.utcnow())
         tasks._queue_reserved_task('task_name', 'my_task_id', 'my_resource_id', [1, 2], {'a': 2})
         self.mock__release_resource.apply_async.assert_called_once_with(('my_task_id',),
                                                                         routing_key='worker1',
                                                                         exchange='C.dq')
 
-    def test_get_worker_for_reservation_breaks_out_of_loop(self):
-        self.mock_get_worker_for_reservation.return_value = Worker(
-            name='worker1', last_heartbeat=datetime.utcnow())
-        tasks._queue_reserved_task('task_name', 'my_task_id', 'my_resource_id', [1, 2], {'a': 2})
-        self.assertTrue(not self.mock_get_unreserved_worker.called)
-        self.assertTrue(not self.mock_time.sleep.called)
 
-    def test_get_unreserved_worker_breaks_out_of_loop(self):
-        self.mock_get_worker_for_reservation.side_effect = NoWorkers()
-        self.mock_get_unreserved_worker.return_value = Worker(name='worker1',
-                                                              last_heartbeat=datetime.utcnow())
-        tasks._queue_reserved_task('task_name', 'my_task_id', 'my_resource_id', [1, 2], {'a': 2})
-        self.assertTrue(not self.mock_time.sleep.called)
+class TestGetDispatcher(unittest.TestCase):
+
+    def tearDown(self):
+        tasks._dispatcher = None
+
+    @mock.patch('pulp.server.async.tasks.ReleaseMonitor', autospec=True)
+    def test_created_once(self, mock_monitor):
+        tasks._dispatcher = None
+        dispatcher = tasks._get_dispatcher()
+
+        self.assertTrue(isinstance(dispatcher, tasks.ReservationDispatcher))
+        self.assertTrue(tasks._get_dispatcher() is dispatcher)
+        mock_monitor.assert_called_once_with(dispatcher)
+        mock_monitor.return_value.start.assert_called_once_with()
+
+
+class TestReservationDispatcher(ResourceReservationTests):
+
+    def setUp(self):
+        super(TestReservationDispatcher, self).setUp()
+        for name in (WORKER_1, WORKER_2, tasks.RESOURCE_MANAGER_QUEUE + '@host'):
+            Worker(name=name, last_heartbeat=datetime.utcnow()).save()
+        self.dispatcher = tasks.ReservationDispatcher()
+
+    def test_reserve_idle_worker(self):
+        worker_name = self.dispatcher.reserve('task-1', 'resource-1')
+
+        self.assertTrue(worker_name in (WORKER_1, WORKER_2))
+        reservation = ReservedResource.objects.get(task_id='task-1')
+        self.assertEqual(reservation['worker_name'], worker_name)
+        self.assertEqual(reservation['resource_id'], 'resource-1')
 
-    def test_loops_and_sleeps_waiting_for_available_worker(self):
-        self.mock_get_worker_for_reservation.side_effect = NoWorkers()
-        self.mock_get_unreserved_worker.side_effect = NoWorkers()
+    def test_reserve_worker_holding_resource(self):
+        worker_name = self.dispatcher.reserve('task-1', 'resource-1')
+        other_worker = self.dispatcher.reserve('task-2', 'resource-2')
 
+        self.assertEqual(self.dispatcher.reserve('task-3', 'resource-1'), worker_name)
+        self.assertNotEqual(other_worker, worker_name)
+        self.assertEqual(ReservedResource.objects.count(), 3)
+
+    def test_reserve_loads_reservations(self):
+        ReservedResource(task_id='task-1', worker_name=WORKER_1, resource_id='resource-1').save()
+
+        self.assertEqual(self.dispatcher.reserve('task-2', 'resource-2'), WORKER_2)
+        self.assertEqual(self.dispatcher.reserve('task-3', 'resource-1'), WORKER_1)
+
+    def test_reserve_waits_for_release(self):
+        self.dispatcher.reserve('task-1', 'resource-1')
+        busy_worker = self.dispatcher.reserve('task-2', 'resource-2')
+        result = []
+        waiter = threading.Thread(
+            target=lambda: result.append(self.dispatcher.reserve('task-3', 'resource-3')))
+        waiter.start()
+        waiter.join(0.1)
+        self.assertTrue(waiter.is_alive())
+
+        self.dispatcher.released('task-2')
+        waiter.join(self.dispatcher.RESYNC_INTERVAL)
+
+        self.assertFalse(waiter.is_alive())
+        self.assertEqual(result, [busy_worker])
+
+    def test_released_frees_resource(self):
+        worker_name = self.dispatcher.reserve('task-1', 'resource-1')
+        self.dispatcher.reserve('task-2', 'resource-2')
+        self.dispatcher.released('task-1')
+
+        self.assertEqual(self.dispatcher.reserve('task-3', 'resource-3'), worker_name)
+
+    def test_released_unknown_task(self):
+        self.dispatcher.reserve('task-1', 'resource-1')
+        self.dispatcher.released('made_up_task_id')
+
+        self.assertEqual(self.dispatcher._reservations.keys(), ['task-1'])
+
+    @mock.patch('pulp.server.async.tasks.time')
+    def test_resync_when_stale(self, mock_time):
+        mock_time.time.return_value = 100
+        self.dispatcher.reserve('task-1', 'resource-1')
+        Worker.objects().delete()
+        Worker(name=WORKER_3, last_heartbeat=datetime.utcnow()).save()
+
+        mock_time.time.return_value = 100 + self.dispatcher.RESYNC_INTERVAL + 1
+        self.assertEqual(self.dispatcher.reserve('task-2', 'resource-2'), WORKER_3)
+
+
+class TestReleaseMonitor(unittest.TestCase):
+
+    @mock.patch('pulp.server.async.tasks.celery')
+    def test_monitor_releases(self, mock_celery):
         class BreakOutException(Exception):
             pass
 
-        def side_effect(*args):
-            def second_call(*args):
-                raise BreakOutException()
-            self.mock_time.sleep.side_effect = second_call
-            return None
+        messages = [mock.Mock(payload={'task_id': 'task-1'}), mock.Mock(payload={'task_id': None})]
+        connection = mock_celery.connection.return_value.__enter__.return_value
+        queue = connection.SimpleQueue.return_value
+        queue.get.side_effect = messages + [BreakOutException()]
+        dispatcher = mock.Mock()
 
-        self.mock_time.sleep.side_effect = side_effect
+        monitor = tasks.ReleaseMonitor(dispatcher)
+        self.assertRaises(BreakOutException, monitor.monitor_releases)
+
+        connection.SimpleQueue.assert_called_once_with(tasks.RESOURCE_RELEASE_QUEUE,
+                                                       queue_opts={'durable': False})
+        for message in messages:
+            message.ack.assert_called_once_with()
+        dispatcher.released.assert_called_once_with('task-1')
+        dispatcher.resync.assert_called_once_with()
+        queue.close.assert_called_once_with()
 
-        try:
-            tasks._queue_reserved_task('task_name', 'my_task_id', 'my_resource_id', [1, 2],
-                                       {'a': 2})
-        except BreakOutException:
-            pass
-        else:
-            self.fail('_queue_reserved_task should have raised a BreakOutException')
 
-        self.mock_time.sleep.assert_has_calls([mock.call(0.25), mock.call(0.25)])
+class TestNotifyDispatcher(unittest.TestCase):
+
+    @mock.patch('pulp.server.async.tasks.celery')
+    def test_notify(self, mock_celery):
+        connection = mock_celery.connection_or_acquire.return_value.__enter__.return_value
+        tasks._notify_dispatcher('task-1')
+
+        queue = connection.SimpleQueue.return_value
+        queue.put.assert_called_once_with({'task_id': 'task-1'})
+        queue.close.assert_called_once_with()
+
+    @mock.patch('pulp.server.async.tasks._logger', autospec=True)
+    @mock.patch('pulp.server.async.tasks.celery')
+    def test_notify_failure_logged(self, mock_celery, mock_logger):
+        mock_celery.connection_or_acquire.side_effect = IOError('broker is down')
+        tasks._notify_dispatcher('task-1')
+
+        self.assertEqual(mock_logger.warning.call_count, 1)
 
 
 class TestDeleteWorker(ResourceReservationTests):
@@ -151,6 +225,9 @@ class TestDeleteWorker(ResourceReservationTests):
         self.patch_i = mock.patch('pulp.server.async.tasks.constants', autospec=True)
         self.mock_constants = self.patch_i.start()
 
+        self.patch_j = mock.patch('pulp.server.async.tasks._notify_dispatcher', autospec=True)
+        self.mock_notify_dispatcher = self.patch_j.start()
+
         super(TestDeleteWorker, self).setUp()
 
     def tearDown(self):
@@ -161,6 +238,7 @@ class TestDeleteWorker(ResourceReservationTests):
         self.patch_f.stop()
         self.patch_g.stop()
         self.patch_i.stop()
+        self.patch_j.stop()
         super(TestDeleteWorker, self).tearDown()
 
     def test_normal_shutdown_true_logs_correctly(self):
@@ -181,6 +259,10 @@ class TestDeleteWorker(ResourceReservationTests):
         remove = self.mock_reserved_resource.objects.return_value.delete
         remove.assert_called_once_with()
 
+    def test_notifies_dispatcher(self):
+        tasks._delete_worker('worker1')
+        self.mock_notify_dispatcher.assert_called_once_with()
+
     @mock.patch('pulp.server.async.tasks.Worker.objects')
     def test_removes_the_worker(self, mock_worker_objects):
         mock_document = mock.Mock()
@@ -215,6 +297,15 @@ class TestReleaseResource(ResourceReservationTests):
     """
     Test the _release_resource() Task.
     """
+    def setUp(self):
+        super(TestReleaseResource, self).setUp()
+        self.patch_a = mock.patch('pulp.server.async.tasks._notify_dispatcher', autospec=True)
+        self.mock_notify_dispatcher = self.patch_a.start()
+
+    def tearDown(self):
+        self.patch_a.stop()
+        super(TestReleaseResource, self).tearDown()
+
     def test_resource_not_in_resource_map(self):
         """
         Test _release_resource() with a resource that is not in the database. This should be
@@ -276,6 +367,7 @@ class TestReleaseResource(ResourceReservationTests):
 
         # resource_2 should have been removed from the database
         self.assertEqual(ReservedResource.objects.count(), 1)
+        self.mock_notify_dispatcher.assert_called_once_with(reserved_resource_2.task_id)
         rr_1 = ReservedResource.objects.get(task_id=reserved_resource_1.task_id)
         self.assertEqual(rr_1['worker_name'], reserved_resource_1.worker_name)
         self.assertEqual(rr_1['resource_id'], 'resource_1')
@@ -877,86 +969,7 @@ class TestScheduledTasks(unittest.TestCase):
         mock_monthly_apply_async.assert_called_once_with(tags=[action_tag('monthly')])
 
 
-class TestGetWorkerForReservation(ResourceReservationTests):
-
-    @mock.patch('pulp.server.async.tasks.Worker.objects')
-    @mock.patch('pulp.server.async.tasks.ReservedResource')
-    def test_existing_reservation_correctly_found(self, mock_reserved_resource,
-                                                  mock_worker_objects):
-        get_objects = mock_reserved_resource.objects
-        tasks.get_worker_for_reservation('resource1')
-        get_objects.assert_called_once_with(resource_id='resource1')
-        get_objects.return_value.first.assert_called_once_with()
-
-    @mock.patch('pulp.server.async.tasks.Worker.objects')
-    @mock.patch('pulp.server.async.tasks.ReservedResource')
-    def test_correct_worker_returned(self, mock_reserved_resource, mock_worker_objects):
-        find_one = mock_reserved_resource.objects.return_value.first
-        find_one.return_value = {'worker_name': 'worker1'}
-        mock_worker_objects.return_value.first.return_value = find_one.return_value
-        result = tasks.get_worker_for_reservation('resource1')
-        self.assertTrue(result is find_one.return_value)
-
-    @mock.patch('pulp.server.async.tasks.ReservedResource')
-    def test_no_workers_raised_if_no_reservations(self, mock_reserved_resource):
-        find_one = mock_reserved_resource.objects.return_value.first
-        find_one.return_value = False
-        try:
-            tasks.get_worker_for_reservation('resource1')
-        except NoWorkers:
-            pass
-        else:
-            self.fail("NoWorkers() Exception should have been raised.")
-
-
-class TestGetUnreservedWorker(ResourceReservationTests):
-
-    @mock.patch('pulp.server.async.tasks.ReservedResource')
-    def test_reserved_resources_queried_correctly(self, mock_reserved_resource):
-        find = mock_reserved_resource.objects.all
-        find.return_value = [{'worker_name': 'a'}, {'worker_name': 'b'}]
-        try:
-            tasks._get_unreserved_worker()
-        except NoWorkers:
-            pass
-        else:
-            self.fail("NoWorkers() Exception should have been raised.")
-        find.assert_called_once_with()
-
-    @mock.patch('pulp.server.async.tasks.Worker.objects')
-    @mock.patch('pulp.server.async.tasks.ReservedResource')
-    def test_worker_returned_when_one_worker_is_not_reserved(self, mock_reserved_resource,
-                                                             mock_worker_objects):
-        mock_worker_objects.return_value = [{'name': 'a'}, {'name': 'b'}]
-        mock_reserved_resource.objects.all.return_value = [{'worker_name': 'a'}]
-        result = tasks._get_unreserved_worker()
-        self.assertEqual(result, {'name': 'b'})
-
-    @mock.patch('pulp.server.async.tasks.Worker.objects')
-    @mock.patch('pulp.server.async.tasks.ReservedResource')
-    def test_no_workers_raised_when_all_workers_reserved(self, mock_reserved_resource, mock_worker):
-        mock_worker.objects.return_value = [{'name': 'a'}, {'name': 'b'}]
-        find = mock_reserved_resource.objects
-        find.return_value = [{'worker_name': 'a'}, {'worker_name': 'b'}]
-        try:
-            tasks._get_unreserved_worker()
-        except NoWorkers:
-            pass
-        else:
-            self.fail("NoWorkers() Exception should have been raised.")
-
-    @mock.patch('pulp.server.async.tasks.Worker.objects')
-    @mock.patch('pulp.server.async.tasks.ReservedResource')
-    def test_no_workers_raised_when_there_are_no_workers(self, mock_reserved_resource, mock_worker):
-        mock_worker.objects.return_value = []
-        find = mock_reserved_resource.objects
-        find.return_value = [{'worker_name': 'a'}, {'worker_name': 'b'}]
-        try:
-            tasks._get_unreserved_worker()
-        except NoWorkers:
-            pass
-        else:
-            self.fail("NoWorkers() Exception should have been raised.")
+class TestIsWorker(ResourceReservationTests):
 
     def test_is_worker(self):
         self.assertTrue(tasks._is_worker("a_worker@some.hostname"))
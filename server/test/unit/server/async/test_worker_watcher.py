@@ -45,13 +45,15 @@ class TestLogEvent(unittest.TestCase):
 
 class TestHandleWorkerHeartbeat(unittest.TestCase):
 
+    @mock.patch('pulp.server.async.worker_watcher._notify_dispatcher')
     @mock.patch('pulp.server.async.worker_watcher._logger')
     @mock.patch('pulp.server.async.worker_watcher.Worker')
     @mock.patch('pulp.server.async.worker_watcher._parse_and_log_event')
     def test_handle_worker_heartbeat_new(self, mock__parse_and_log_event,
-                                         mock_worker, mock_logger):
+                                         mock_worker, mock_logger, mock_notify_dispatcher):
         """
-        Ensure that we save a record and log when a new worker comes online.
+        Ensure that we save a record, log and notify the resource manager when a new worker
+        comes online.
         """
 
         mock_event = mock.Mock()
@@ -65,12 +67,14 @@ class TestHandleWorkerHeartbeat(unittest.TestCase):
         mock_worker.objects.return_value.update_one.\
             assert_called_once_with(set__last_heartbeat='2014-12-08T15:52:29Z', upsert=True)
         mock_logger.info.assert_called_once_with('New worker \'fake-worker\' discovered')
+        mock_notify_dispatcher.assert_called_once_with()
 
+    @mock.patch('pulp.server.async.worker_watcher._notify_dispatcher')
     @mock.patch('pulp.server.async.worker_watcher._logger')
     @mock.patch('pulp.server.async.worker_watcher.Worker')
     @mock.patch('pulp.server.async.worker_watcher._parse_and_log_event')
     def test_handle_worker_heartbeat_update(self, mock__parse_and_log_event,
-                                            mock_worker, mock_logger):
+                                            mock_worker, mock_logger, mock_notify_dispatcher):
         """
         Ensure that we save a record but don't log when an existing worker is updated.
         """
@@ -86,6 +90,7 @@ class TestHandleWorkerHeartbeat(unittest.TestCase):
         mock_worker.objects.return_value.update_one.\
             assert_called_once_with(set__last_heartbeat='2014-12-08T15:52:29Z', upsert=True)
         self.assertEquals(mock_logger.info.called, False)
+        self.assertEquals(mock_notify_dispatcher.called, False)
 
 
 class TestHandleWorkerOffline(unittest.TestCase):
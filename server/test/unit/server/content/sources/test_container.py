@@ -76,10 +76,29 @@ class TestContainer(TestCase):
         fake_load.assert_called_with(path)
         fake_refresh.assert_called_with(canceled)
         fake_primary.assert_called_with(downloader)
-        fake_batch.assert_called_with(canceled, fake_primary(), fake_load(), requests, listener)
+        fake_batch.assert_called_with(canceled, fake_primary(), fake_load(), requests, listener,
+                                      cache=False)
         fake_batch().download.assert_called_with()
         self.assertEqual(report, _batch.download.return_value)
 
+    @patch('pulp.server.content.sources.container.Batch')
+    @patch('pulp.server.content.sources.container.PrimarySource')
+    @patch('pulp.server.content.sources.container.ContentContainer.refresh')
+    @patch('pulp.server.content.sources.container.ContentSource.load_all')
+    def test_download_cached(self, fake_load, fake_refresh, fake_primary, fake_batch):
+        downloader = Mock()
+        requests = Mock()
+        canceled = Mock()
+        canceled.is_set.return_value = False
+
+        # test
+        container = ContentContainer(Mock())
+        container.download(canceled, downloader, requests, cache=True)
+
+        # validation
+        fake_batch.assert_called_with(canceled, fake_primary(), fake_load(), requests, None,
+                                      cache=True)
+
     @patch('pulp.server.content.sources.container.ContentSource.load_all')
     @patch('pulp.server.content.sources.container.managers.content_catalog_manager')
     def test_refresh(self, fake_manager, fake_load):
@@ -128,8 +147,9 @@ class TestContainer(TestCase):
         for s in sources.values():
             s.refresh.assert_called_with(canceled)
 
+        self.assertEqual(len(report), len(sources))
         for r in report:
-            r.errors = ['must be int']
+            self.assertEqual(r.errors, ['must be int'])
 
     @patch('pulp.server.content.sources.container.ContentSource.load_all')
     @patch('pulp.server.content.sources.container.managers.content_catalog_manager')
@@ -174,6 +194,49 @@ class TestContainer(TestCase):
         for s in sources.values():
             self.assertFalse(s.refresh.called)
 
+    @patch('pulp.server.content.sources.container.ContentSource.load_all')
+    @patch('pulp.server.content.sources.container.managers.content_catalog_manager')
+    def test_refresh_canceled_while_refreshing(self, fake_manager, fake_load):
+        sources = {}
+        for n in range(3):
+            s = ContentSource('s-%d' % n, {})
+            s.refresh = Mock(return_value=[n])
+            sources[s.id] = s
+
+        fake_manager().has_entries.return_value = False
+        fake_load.return_value = sources
+
+        # test
+        canceled = Mock()
+        canceled.is_set.side_effect = [False, False, False, True, True, True]
+        container = ContentContainer('')
+        report = container.refresh(canceled)
+
+        # validation
+        self.assertEqual(report, [])
+        for s in sources.values():
+            self.assertFalse(s.refresh.called)
+
+    @patch('pulp.server.content.sources.container.ThreadPool')
+    @patch('pulp.server.content.sources.container.REFRESH_CONCURRENCY', 2)
+    @patch('pulp.server.content.sources.container.ContentSource.load_all')
+    @patch('pulp.server.content.sources.container.managers.content_catalog_manager')
+    def test_refresh_concurrency(self, fake_manager, fake_load, fake_pool):
+        fake_load.return_value = dict(('s-%d' % n, ContentSource('s-%d' % n, {}))
+                                      for n in range(3))
+        fake_manager().has_entries.return_value = False
+        fake_pool.return_value.map.return_value = [[1], [2, 3]]
+
+        # test
+        container = ContentContainer('')
+        report = container.refresh(Mock(is_set=Mock(return_value=False)))
+
+        # validation
+        fake_pool.assert_called_once_with(2)
+        fake_pool.return_value.close.assert_called_once_with()
+        fake_pool.return_value.join.assert_called_once_with()
+        self.assertEqual(report, [1, 2, 3])
+
     @patch('pulp.server.content.sources.container.ContentSource.load_all')
     @patch('pulp.server.content.sources.container.managers.content_catalog_manager')
     def test_purge_orphans(self, fake_manager, fake_load):
@@ -421,6 +484,54 @@ class TestBatch(TestCase):
         self.assertEqual(len(batch.queues), 0)
         self.assertTrue(isinstance(batch.in_progress, Tracker))
         self.assertTrue(isinstance(batch.queues, dict))
+        self.assertEqual(batch.cache, None)
+
+    @patch('pulp.server.content.sources.container.RLock', Mock())
+    def test_construction_cached(self):
+        batch = Batch(Mock(), None, None, None, None, cache=True)
+        self.assertEqual(batch.cache, {})
+
+    @patch('pulp.server.content.sources.container.RLock', Mock())
+    @patch('pulp.server.content.sources.container.managers.content_catalog_manager')
+    def test_find_entries(self, fake_manager):
+        requests = [Mock(locator='l-1'), Mock(locator='l-2'), Mock(locator='l-1')]
+        fake_manager().find_by_locators.return_value = {'l-1': ['entry-1']}
+        details = DownloadReport().catalog
+
+        # test
+        batch = Batch(Mock(), None, None, None, None)
+        entries = batch.find_entries(requests, details)
+
+        # validation
+        self.assertEqual(entries, {'l-1': ['entry-1'], 'l-2': []})
+        fake_manager().find_by_locators.assert_called_once_with(set(['l-1', 'l-2']))
+        self.assertEqual(details.total_queries, 1)
+        self.assertEqual(details.total_locators, 2)
+        self.assertEqual(details.total_cached, 0)
+
+    @patch('pulp.server.content.sources.container.RLock', Mock())
+    @patch('pulp.server.content.sources.container.managers.content_catalog_manager')
+    def test_find_entries_cached(self, fake_manager):
+        fake_manager().find_by_locators.return_value = {'l-1': ['entry-1']}
+        details = DownloadReport().catalog
+        batch = Batch(Mock(), None, None, None, None, cache=True)
+
+        # test
+        batch.find_entries([Mock(locator='l-1')], details)
+        entries = batch.find_entries([Mock(locator='l-1'), Mock(locator='l-2')], details)
+
+        # validation
+        self.assertEqual(entries, {'l-1': ['entry-1'], 'l-2': []})
+        calls = fake_manager().find_by_locators.call_args_list
+        self.assertEqual(calls[1][0][0], set(['l-2']))
+        self.assertEqual(details.total_queries, 2)
+        self.assertEqual(details.total_locators, 2)
+        self.assertEqual(details.total_cached, 1)
+
+        # everything cached
+        batch.find_entries([Mock(locator='l-2')], details)
+        self.assertEqual(details.total_queries, 2)
+        self.assertEqual(details.total_cached, 2)
 
     @patch('pulp.server.content.sources.container.RLock', Mock())
     def test_is_canceled(self):
@@ -539,12 +650,14 @@ class TestBatch(TestCase):
         self.assertEqual(batch.queues[fake_source.id], fake_queue())
         self.assertEqual(queue, fake_queue())
 
+    @patch('pulp.server.content.sources.container.Batch.find_entries')
     @patch('pulp.server.content.sources.container.Tracker.wait')
     @patch('pulp.server.content.sources.container.Batch.dispatch')
-    def test_download(self, fake_dispatch, fake_wait):
+    def test_download(self, fake_dispatch, fake_wait, fake_find_entries):
         primary = Mock()
         sources = [Mock(), Mock()]
-        requests = [Mock(), Mock(), Mock()]
+        requests = [Mock(locator='l-1'), Mock(locator='l-2'), Mock(locator='l-3')]
+        fake_find_entries.return_value = {'l-1': [], 'l-2': ['entry-2'], 'l-3': []}
 
         queue_1 = Mock()
         queue_1.downloader = Mock()
@@ -565,9 +678,12 @@ class TestBatch(TestCase):
         report = batch.download()
 
         # validation
+        # catalog lookup
+        fake_find_entries.assert_called_once_with(requests, report.catalog)
         # initial dispatch
         for request in requests:
-            request.find_sources.assert_called_with(primary, sources)
+            request.find_sources.assert_called_with(
+                primary, sources, fake_find_entries.return_value[request.locator])
         calls = fake_dispatch.call_args_list
         self.assertEqual(len(calls), len(requests))
         for i, request in enumerate(requests):
@@ -646,13 +762,15 @@ class TestBatch(TestCase):
         self.assertEqual(report.downloads['source-2'].total_succeeded, 200)
         self.assertEqual(report.downloads['source-2'].total_failed, 10)
 
+    @patch('pulp.server.content.sources.container.Batch.find_entries')
     @patch('pulp.server.content.sources.container.Tracker.wait')
     @patch('pulp.server.content.sources.container.Batch.dispatch')
-    def test_download_with_exception(self, fake_dispatch, fake_wait):
+    def test_download_with_exception(self, fake_dispatch, fake_wait, fake_find_entries):
         primary = Mock()
         fake_dispatch.side_effect = ValueError()
         sources = [Mock(), Mock()]
         requests = [Mock(), Mock(), Mock()]
+        fake_find_entries.return_value = dict((r.locator, []) for r in requests)
 
         # test
         canceled = Mock()
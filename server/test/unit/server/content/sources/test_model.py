@@ -8,7 +8,8 @@ from pulp.common.constants import PRIMARY_ID
 from pulp.plugins.conduits.cataloger import CatalogerConduit
 from pulp.server.content.sources import constants
 from pulp.server.content.sources.model import Request, PrimarySource, ContentSource, RefreshReport
-from pulp.server.content.sources.model import DownloadDetails, DownloadReport
+from pulp.server.content.sources.model import CatalogDetails, DownloadDetails, DownloadReport
+from pulp.server.db.model.content import ContentCatalog
 from pulp.server.content.sources.descriptor import DEFAULT
 
 
@@ -78,15 +79,13 @@ CATALOG = [
 
 class FakeRefresh(object):
 
-    def __init__(self):
-        self._added = 10
-        self._deleted = 1
+    def __init__(self, urls):
+        self._urls = urls
 
-    def __call__(self, conduit, *unused):
-        conduit.added_count = self._added
-        conduit.deleted_count = self._deleted
-        self._added += 10
-        self._deleted += 1
+    def __call__(self, conduit, descriptor, url):
+        n = self._urls.index(url) + 1
+        conduit.added_count = 10 * n
+        conduit.deleted_count = n
 
 
 class TestRequest(TestCase):
@@ -147,6 +146,31 @@ class TestRequest(TestCase):
         self.assertEqual(request.sources[4][0].id, primary.id)
         self.assertEqual(request.sources[4][1], url)
 
+    @patch('pulp.server.content.sources.container.managers.content_catalog_manager')
+    def test_find_sources_with_entries(self, fake_manager):
+        url = 'http://redhat.com/repository'
+        primary = PrimarySource(None)
+        alternatives = dict([(s, ContentSource(s, d)) for s, d in DESCRIPTOR])
+
+        # test
+
+        request = Request('test_1', 1, url, '/tmp/123')
+        request.find_sources(primary, alternatives, CATALOG[2:])
+
+        # validation
+
+        self.assertFalse(fake_manager().find.called)
+        request.sources = list(request.sources)
+        self.assertEqual(len(request.sources), 3)
+        self.assertEqual(request.sources[0][1], CATALOG[2][constants.URL])
+        self.assertEqual(request.sources[1][1], CATALOG[3][constants.URL])
+        self.assertEqual(request.sources[2][0].id, primary.id)
+
+    def test_locator(self):
+        unit_key = {'name': 'zsh', 'version': '1.0'}
+        request = Request(TYPE_ID, unit_key, '', '')
+        self.assertEqual(request.locator, ContentCatalog.get_locator(TYPE_ID, unit_key))
+
     def test_next_source(self):
         sources = [1, 2, 3]
         request = Request('', {}, '', '')
@@ -291,6 +315,13 @@ class TestContentSource(TestCase):
         source = ContentSource('s-1', {constants.EXPIRES: '1h'})
         self.assertEqual(source.expires, 3600)
 
+    def test_catalog_flush_size(self):
+        source = ContentSource('s-1', {constants.CATALOG_FLUSH_SIZE: '10'})
+        self.assertEqual(source.catalog_flush_size, 10)
+        source = ContentSource('s-1', {})
+        self.assertEqual(source.catalog_flush_size,
+                         int(DEFAULT[constants.CATALOG_FLUSH_SIZE]))
+
     def test_base_url(self):
         source = ContentSource('s-1', {constants.BASE_URL: 'http://xyz.com'})
         self.assertEqual(source.base_url, 'http://xyz.com')
@@ -340,8 +371,17 @@ class TestContentSource(TestCase):
 
         self.assertEqual(conduit.source_id, source.id)
         self.assertEqual(conduit.expires, 3600)
+        self.assertEqual(conduit.flush_size, source.catalog_flush_size)
         self.assertTrue(isinstance(conduit, CatalogerConduit))
 
+    def test_conduit_generation(self):
+        source = ContentSource('s-1', {constants.EXPIRES: '1h'})
+        generation = Mock()
+
+        conduit = source.get_conduit(generation)
+
+        self.assertEqual(conduit.generation, generation)
+
     @patch('pulp.server.content.sources.model.plugins')
     def test_cataloger(self, fake_plugins):
         plugin = Mock()
@@ -376,20 +416,21 @@ class TestContentSource(TestCase):
         fake_cataloger.get_downloader.assert_called_with(fake_conduit, source.descriptor, url)
         self.assertEqual(downloader, fake_downloader)
 
+    @patch('pulp.server.content.sources.model.managers')
     @patch('pulp.server.content.sources.model.ContentSource.urls')
-    def test_refresh(self, fake_urls):
+    def test_refresh(self, fake_urls, fake_managers):
         url = 'http://xyz.com'
         urls = ['url-1', 'url-2']
         fake_urls.__get__ = Mock(return_value=urls)
 
         canceled = Mock()
         canceled.isSet = Mock(return_value=False)
-        conduit = Mock()
+        conduits = [Mock() for _url in urls]
         cataloger = Mock()
-        cataloger.refresh.side_effect = FakeRefresh()
+        cataloger.refresh.side_effect = FakeRefresh(urls)
 
-        source = ContentSource('s-1', {constants.BASE_URL: url})
-        source.get_conduit = Mock(return_value=conduit)
+        source = ContentSource('s-1', {constants.BASE_URL: url, constants.EXPIRES: '1h'})
+        source.get_conduit = Mock(side_effect=conduits)
         source.get_cataloger = Mock(return_value=cataloger)
 
         # test
@@ -398,9 +439,17 @@ class TestContentSource(TestCase):
 
         # validation
 
-        self.assertEqual(canceled.isSet.call_count, len(urls))
-        self.assertEqual(conduit.reset.call_count, len(urls))
+        catalog = fake_managers.content_catalog_manager.return_value
+        generation = catalog.new_generation.return_value
+        self.assertEqual(canceled.isSet.call_count, len(urls) + 1)
+        self.assertEqual(source.get_conduit.call_count, len(urls))
+        source.get_conduit.assert_called_with(generation)
+        self.assertEqual(source.get_cataloger.call_count, len(urls))
         self.assertEqual(cataloger.refresh.call_count, len(urls))
+        for conduit in conduits:
+            self.assertEqual(conduit.flush.call_count, 1)
+        catalog.activate_generation.assert_called_once_with(source.id, generation, source.expires)
+        self.assertFalse(catalog.abandon_generation.called)
 
         n = 0
         added = 10
@@ -417,8 +466,9 @@ class TestContentSource(TestCase):
             deleted += 1
             n += 1
 
+    @patch('pulp.server.content.sources.model.managers')
     @patch('pulp.server.content.sources.model.ContentSource.urls')
-    def test_refresh_canceled(self, fake_urls):
+    def test_refresh_canceled(self, fake_urls, fake_managers):
         url = 'http://xyz.com'
         urls = ['url-1', 'url-2']
 
@@ -439,13 +489,62 @@ class TestContentSource(TestCase):
 
         # validation
 
-        self.assertEqual(canceled.isSet.call_count, 1)
-        self.assertEqual(conduit.reset.call_count, 0)
+        catalog = fake_managers.content_catalog_manager.return_value
+        generation = catalog.new_generation.return_value
+        self.assertEqual(canceled.isSet.call_count, len(urls))
+        self.assertEqual(source.get_conduit.call_count, 0)
+        self.assertFalse(source.get_cataloger.called)
         self.assertEqual(cataloger.refresh.call_count, 0)
         self.assertEqual(report, [])
+        catalog.abandon_generation.assert_called_once_with(source.id, generation)
+        self.assertFalse(catalog.activate_generation.called)
 
+    @patch('pulp.server.content.sources.model.managers')
+    @patch('pulp.server.content.sources.model.ThreadPool')
     @patch('pulp.server.content.sources.model.ContentSource.urls')
-    def test_refresh_raised(self, fake_urls):
+    def test_refresh_concurrency(self, fake_urls, fake_pool, fake_managers):
+        urls = ['url-1', 'url-2', 'url-3']
+        fake_urls.__get__ = Mock(return_value=urls)
+        fake_pool.return_value.map.return_value = []
+
+        source = ContentSource('s-1', {constants.MAX_CONCURRENT: '2'})
+        source.get_cataloger = Mock()
+
+        # test
+
+        source.refresh(Mock())
+
+        # validation
+
+        fake_pool.assert_called_once_with(2)
+        fake_pool.return_value.close.assert_called_once_with()
+        fake_pool.return_value.join.assert_called_once_with()
+
+    @patch('pulp.server.content.sources.model.managers')
+    @patch('pulp.server.content.sources.model.time')
+    @patch('pulp.server.content.sources.model.ContentSource.urls')
+    def test_refresh_timed(self, fake_urls, fake_time, fake_managers):
+        fake_urls.__get__ = Mock(return_value=['url-1'])
+        fake_time.time.side_effect = [10.0, 12.5]
+        canceled = Mock()
+        canceled.isSet.return_value = False
+
+        source = ContentSource('s-1', {constants.EXPIRES: '1h'})
+        source.get_conduit = Mock(return_value=Mock(added_count=10, deleted_count=1))
+        source.get_cataloger = Mock()
+
+        # test
+
+        report = source.refresh(canceled)
+
+        # validation
+
+        self.assertEqual(len(report), 1)
+        self.assertEqual(report[0].seconds, 2.5)
+
+    @patch('pulp.server.content.sources.model.managers')
+    @patch('pulp.server.content.sources.model.ContentSource.urls')
+    def test_refresh_raised(self, fake_urls, fake_managers):
         url = 'http://xyz.com'
         urls = ['url-1', 'url-2']
         fake_urls.__get__ = Mock(return_value=urls)
@@ -466,9 +565,13 @@ class TestContentSource(TestCase):
 
         # validation
 
+        catalog = fake_managers.content_catalog_manager.return_value
+        generation = catalog.new_generation.return_value
         self.assertEqual(canceled.isSet.call_count, len(urls))
-        self.assertEqual(conduit.reset.call_count, len(urls))
+        self.assertEqual(source.get_conduit.call_count, len(urls))
         self.assertEqual(cataloger.refresh.call_count, len(urls))
+        catalog.abandon_generation.assert_called_once_with(source.id, generation)
+        self.assertFalse(catalog.activate_generation.called)
 
         n = 0
         for _url in source.urls:
@@ -481,6 +584,41 @@ class TestContentSource(TestCase):
             self.assertEqual(report[n].deleted_count, 0)
             n += 1
 
+    @patch('pulp.server.content.sources.model.managers')
+    @patch('pulp.server.content.sources.model.ContentSource.urls')
+    def test_refresh_one_failed(self, fake_urls, fake_managers):
+        urls = ['url-1', 'url-2']
+        fake_urls.__get__ = Mock(return_value=urls)
+
+        canceled = Mock()
+        canceled.isSet = Mock(return_value=False)
+        cataloger = Mock()
+
+        def refresh(conduit, descriptor, url):
+            if url == 'url-2':
+                raise ValueError('just failed')
+
+        cataloger.refresh.side_effect = refresh
+
+        source = ContentSource('s-1', {constants.EXPIRES: '1h'})
+        source.get_conduit = Mock(return_value=Mock(added_count=10, deleted_count=1))
+        source.get_cataloger = Mock(return_value=cataloger)
+
+        # test
+
+        report = source.refresh(canceled)
+
+        # validation
+
+        catalog = fake_managers.content_catalog_manager.return_value
+        generation = catalog.new_generation.return_value
+        catalog.abandon_generation.assert_called_once_with(source.id, generation)
+        self.assertFalse(catalog.activate_generation.called)
+        self.assertEqual([r.url for r in report], urls)
+        self.assertTrue(report[0].succeeded)
+        self.assertFalse(report[1].succeeded)
+        self.assertEqual(report[1].errors, ['just failed'])
+
     def test_dict(self):
         descriptor = {'A': 1, 'B': 2}
 
@@ -571,6 +709,7 @@ class TestDownloadReport(TestCase):
         report = DownloadReport()
         self.assertEqual(report.total_sources, 0)
         self.assertEqual(report.downloads, {})
+        self.assertTrue(isinstance(report.catalog, CatalogDetails))
 
     def test_dict(self):
         report = DownloadReport()
@@ -582,6 +721,8 @@ class TestDownloadReport(TestCase):
                 's1': {'total_failed': 0, 'total_succeeded': 0},
                 's2': {'total_failed': 0, 'total_succeeded': 0}
             },
+            'catalog': {'total_queries': 0, 'total_locators': 0, 'total_cached': 0,
+                        'seconds': 0.0},
         }
         self.assertEqual(report.dict(), expected)
 
@@ -598,6 +739,7 @@ class TestRefreshReport(TestCase):
         self.assertEqual(report.added_count, 0)
         self.assertEqual(report.deleted_count, 0)
         self.assertEqual(report.errors, [])
+        self.assertEqual(report.seconds, 0.0)
 
     def test_dict(self):
         source_id = 's-1'
@@ -610,3 +752,4 @@ class TestRefreshReport(TestCase):
         self.assertEqual(report_dict['added_count'], 0)
         self.assertEqual(report_dict['deleted_count'], 0)
         self.assertEqual(report_dict['errors'], [])
+        self.assertEqual(report_dict['seconds'], 0.0)
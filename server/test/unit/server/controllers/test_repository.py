@@ -21,6 +21,22 @@ class DemoModel(model.ContentUnit):
     unit_type_id = 'demo_model'
 
 
+class FakeQuerySet(list):
+    """Supports the query set methods used to page through repository content units."""
+
+    def order_by(self, *fields):
+        return self
+
+    def skip(self, skip):
+        return FakeQuerySet(self[skip:])
+
+    def limit(self, limit):
+        return FakeQuerySet(self[:limit])
+
+    def no_cache(self):
+        return self
+
+
 @patch('pulp.server.controllers.repository.model.RepositoryContentUnit.objects')
 class FindRepoContentUnitsTest(unittest.TestCase):
 
@@ -45,7 +61,7 @@ class FindRepoContentUnitsTest(unittest.TestCase):
         test_rcu = model.RepositoryContentUnit(repo_id='foo',
                                                unit_type_id='demo_model',
                                                unit_id='bar')
-        mock_rcu_objects.return_value = [test_rcu]
+        mock_rcu_objects.return_value = FakeQuerySet([test_rcu])
 
         u_filter = mongoengine.Q(key_field='baz')
         u_fields = ['key_field']
@@ -72,7 +88,7 @@ class FindRepoContentUnitsTest(unittest.TestCase):
         test_rcu = model.RepositoryContentUnit(repo_id='foo',
                                                unit_type_id='demo_model',
                                                unit_id='bar')
-        mock_rcu_objects.return_value = [test_rcu]
+        mock_rcu_objects.return_value = FakeQuerySet([test_rcu])
 
         u_filter = mongoengine.Q(key_field='baz')
         u_fields = ['key_field']
@@ -105,7 +121,7 @@ class FindRepoContentUnitsTest(unittest.TestCase):
             rcu_list.append(rcu)
             unit_list.append(DemoModel(id=unit_id, key_field=unit_key))
 
-        mock_rcu_objects.return_value = rcu_list
+        mock_rcu_objects.return_value = FakeQuerySet(rcu_list)
 
         mock_get_model.return_value = DemoModel
         mock_demo_objects.return_value = unit_list
@@ -133,7 +149,7 @@ class FindRepoContentUnitsTest(unittest.TestCase):
             rcu_list.append(rcu)
             unit_list.append(DemoModel(id=unit_id, key_field=unit_key))
 
-        mock_rcu_objects.return_value = rcu_list
+        mock_rcu_objects.return_value = FakeQuerySet(rcu_list)
 
         mock_get_model.return_value = DemoModel
         mock_demo_objects.return_value = unit_list
@@ -143,6 +159,78 @@ class FindRepoContentUnitsTest(unittest.TestCase):
         self.assertEquals(result[0].unit_id, 'bar_5')
         self.assertEquals(result[4].unit_id, 'bar_9')
 
+    def test_skip_and_limit_query(self, mock_rcu_objects):
+        """
+        Test that the skip and limit are performed by the database when the units are not filtered
+        """
+        repo = MagicMock(repo_id='foo')
+        list(repo_controller.find_repo_content_units(repo, limit=5, skip=10))
+
+        qs = mock_rcu_objects.return_value
+        qs.order_by.assert_called_once_with('unit_type_id', 'unit_id')
+        qs.order_by.return_value.skip.assert_called_once_with(10)
+        qs.order_by.return_value.skip.return_value.limit.assert_called_once_with(5)
+
+    @patch.object(DemoModel, 'objects')
+    @patch('pulp.server.controllers.repository.plugin_api.get_unit_model_by_id')
+    def test_skip_and_limit_units_filter(self, mock_get_model, mock_demo_objects,
+                                         mock_rcu_objects):
+        """
+        Test that the skip and limit are applied to the filtered units
+        """
+        repo = MagicMock(repo_id='foo')
+        rcu_list = []
+        unit_list = []
+        for i in range(10):
+            unit_id = 'bar_%i' % i
+            rcu_list.append(model.RepositoryContentUnit(repo_id='foo',
+                                                        unit_type_id='demo_model',
+                                                        unit_id=unit_id))
+            # only the even units match the filter
+            if i % 2 == 0:
+                unit_list.append(DemoModel(id=unit_id, key_field='key_%i' % i))
+
+        mock_rcu_objects.return_value = FakeQuerySet(rcu_list)
+        mock_get_model.return_value = DemoModel
+        mock_demo_objects.return_value = unit_list
+        u_filter = mongoengine.Q(key_field__ne='')
+        result = list(repo_controller.find_repo_content_units(repo, units_q=u_filter,
+                                                              limit=2, skip=1))
+
+        self.assertEquals(['bar_2', 'bar_4'], [rcu.unit_id for rcu in result])
+
+    @patch('pulp.server.controllers.repository.UNITS_PAGE_SIZE', 3)
+    @patch.object(DemoModel, 'objects')
+    @patch('pulp.server.controllers.repository.plugin_api.get_unit_model_by_id')
+    def test_paged(self, mock_get_model, mock_demo_objects, mock_rcu_objects):
+        """
+        Test that the units are fetched a page of associations at a time and in association order
+        """
+        repo = MagicMock(repo_id='foo')
+        rcu_list = []
+        units = {}
+        for i in range(7):
+            unit_id = 'bar_%i' % i
+            rcu_list.append(model.RepositoryContentUnit(repo_id='foo',
+                                                        unit_type_id='demo_model',
+                                                        unit_id=unit_id))
+            # the association to bar_5 has no unit
+            if i != 5:
+                units[unit_id] = DemoModel(id=unit_id, key_field='key_%i' % i)
+
+        def objects(q_obj=None, __raw__=None):
+            return [units[i] for i in reversed(sorted(__raw__['_id']['$in'])) if i in units]
+
+        mock_rcu_objects.return_value = FakeQuerySet(rcu_list)
+        mock_get_model.return_value = DemoModel
+        mock_demo_objects.side_effect = objects
+        result = list(repo_controller.find_repo_content_units(repo, yield_content_unit=True))
+
+        self.assertEquals(['bar_0', 'bar_1', 'bar_2', 'bar_3', 'bar_4', 'bar_6'],
+                          [unit.id for unit in result])
+        # one query for each page
+        self.assertEquals(3, mock_demo_objects.call_count)
+
 
 class UpdateRepoUnitCountsTests(unittest.TestCase):
 
@@ -190,6 +278,20 @@ class AssociateSingleUnitTests(unittest.TestCase):
             upsert=True)
 
 
+class AssociateUnitsTests(unittest.TestCase):
+
+    @patch('pulp.server.controllers.repository.model.RepositoryContentUnit.objects')
+    def test_unit_association(self, mock_rcu_objects):
+        test_units = [DemoModel(id='bar', key_field='baz'), DemoModel(id='baz', key_field='qux')]
+        repo = MagicMock(repo_id='foo')
+        repo_controller.associate_units(repo, test_units)
+
+        self.assertEqual(mock_rcu_objects.associate.call_count, 1)
+        repo_id, unit_ids = mock_rcu_objects.associate.call_args[0]
+        self.assertEqual(repo_id, 'foo')
+        self.assertEqual(list(unit_ids), [('demo_model', 'bar'), ('demo_model', 'baz')])
+
+
 class TestDisassociateUnits(unittest.TestCase):
 
     @patch('pulp.server.controllers.repository.model.RepositoryContentUnit.objects')
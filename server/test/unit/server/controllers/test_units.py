@@ -14,6 +14,15 @@ class DemoModel(model.ContentUnit):
     save = MagicMock()
 
 
+class PairModel(model.ContentUnit):
+    key_1 = mongoengine.StringField()
+    key_2 = mongoengine.StringField()
+    unit_key_fields = ('key_1', 'key_2')
+    unit_type_id = 'pair_model'
+    objects = MagicMock()
+    save = MagicMock()
+
+
 class FindUnitsTests(unittest.TestCase):
 
     @patch('pulp.server.controllers.units.misc.paginate')
@@ -41,7 +50,22 @@ class FindUnitsTests(unittest.TestCase):
         # turn into list so the generator will be evaluated
         list(units_controller.find_units(units_iterable))
         query_dict = DemoModel.objects.call_args[0][0].to_query(DemoModel)
-        expected_result = {'$or': [{'key_field': u'a'}, {'key_field': u'B'}]}
+        expected_result = {'key_field': {'$in': [u'a', u'B']}}
+        self.assertDictEqual(query_dict, expected_result)
+
+    def test_query_multiple_key_fields(self):
+        """
+        Test that units with a unit key of multiple fields are queried using $or
+        """
+        model_1 = PairModel(key_1='a', key_2='b')
+        model_2 = PairModel(key_1='c', key_2='d')
+        units_iterable = (model_1, model_2)
+
+        # turn into list so the generator will be evaluated
+        list(units_controller.find_units(units_iterable))
+        query_dict = PairModel.objects.call_args[0][0].to_query(PairModel)
+        expected_result = {'$or': [{'key_1': u'a', 'key_2': u'b'},
+                                   {'key_1': u'c', 'key_2': u'd'}]}
         self.assertDictEqual(query_dict, expected_result)
 
     def test_results(self):
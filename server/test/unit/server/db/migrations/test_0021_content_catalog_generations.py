@@ -0,0 +1,22 @@
+"""
+This module contains tests for pulp.server.db.migrations.0021_content_catalog_generations.py
+"""
+import unittest
+
+from mock import patch
+
+from pulp.server.db.migrate.models import _import_all_the_way
+
+migration = _import_all_the_way('pulp.server.db.migrations.0021_content_catalog_generations')
+
+
+class TestMigrate(unittest.TestCase):
+    """
+    Test the migrate() function.
+    """
+
+    @patch.object(migration.connection, 'get_database')
+    def test_content_catalog_collection_dropped(self, mock_get_database):
+        collection = mock_get_database.return_value['content_catalog']
+        migration.migrate()
+        collection.drop.assert_called_once_with()
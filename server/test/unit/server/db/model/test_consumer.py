@@ -147,6 +147,40 @@ class TestRepoProfileApplicability(PulpServerTests):
         # Our applicability object should now have the correct _id attribute
         self.assertEqual(applicability._id, document['_id'])
 
+    def test_save_new_existing_key(self):
+        """
+        Test that saving a new object replaces the record saved for the same profile_hash and
+        repo_id by another regeneration, instead of failing on the unique index.
+        """
+        first = consumer.RepoProfileApplicability(
+            profile_hash='hash', repo_id='repo_id', profile=['a', 'profile'],
+            applicability={'type_id': ['package a']})
+        second = consumer.RepoProfileApplicability(
+            profile_hash='hash', repo_id='repo_id', profile=['a', 'profile'],
+            applicability={'type_id': ['package b']})
+
+        first.save()
+        second.save()
+
+        self.assertEqual(self.collection.find().count(), 1)
+        document = self.collection.find_one()
+        self.assertEqual(document['applicability'], {'type_id': ['package b']})
+        self.assertEqual(first._id, document['_id'])
+        self.assertEqual(second._id, document['_id'])
+
+    def test_save_repo_revision(self):
+        """
+        Test that save() stores the repository revision.
+        """
+        applicability = consumer.RepoProfileApplicability(
+            profile_hash='hash', repo_id='repo_id', profile=['a', 'profile'],
+            applicability={}, repo_revision='2016-01-01T00:00:00Z')
+
+        applicability.save()
+
+        document = self.collection.find_one()
+        self.assertEqual(document['repo_revision'], '2016-01-01T00:00:00Z')
+
 
 class TestUnitProfile(unittest.TestCase):
     """
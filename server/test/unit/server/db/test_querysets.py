@@ -2,10 +2,12 @@ import unittest
 
 from mongoengine import Document
 from mongoengine.queryset import DoesNotExist
+from pymongo.errors import BulkWriteError
 import mock
 
 from pulp.server import exceptions as pulp_exceptions
 from pulp.server.db import querysets
+from pulp.server.db.connection import DUPLICATE_KEY_ERROR
 
 
 class MockDocument(Document):
@@ -102,3 +104,66 @@ class TestReqoQuerySet(unittest.TestCase):
         qs.get = mock_get
         self.assertRaises(pulp_exceptions.MissingResource, qs.get_repo_or_missing_resource, 'repo')
         mock_get.assert_called_once_with(repo_id='repo')
+
+
+class TestRepositoryContentUnitQuerySet(unittest.TestCase):
+    """
+    Tests for the repository content unit custom query set.
+    """
+
+    def setUp(self):
+        self.qs = querysets.RepositoryContentUnitQuerySet(mock.MagicMock(), mock.MagicMock())
+        self.bulk = self.qs._collection.initialize_unordered_bulk_op.return_value
+        self.bulk.execute.return_value = {'nUpserted': 2}
+
+    @mock.patch('pulp.server.db.querysets.dateutils.format_iso8601_utc_timestamp')
+    def test_associate(self, mock_get_timestamp):
+        """
+        Each unit is upserted once and the updated timestamp of existing associations is set.
+        """
+        mock_get_timestamp.return_value = 'foo_tstamp'
+
+        created = self.qs.associate('foo', iter([('demo', 'bar'), ('demo', 'bar'),
+                                                 ('demo', 'baz')]))
+
+        self.assertEqual(created, 2)
+        self.assertEqual(sorted(c[0][0]['unit_id'] for c in self.bulk.find.call_args_list),
+                         ['bar', 'baz'])
+        self.bulk.find.assert_called_with(
+            {'repo_id': 'foo', 'unit_id': mock.ANY, 'unit_type_id': 'demo'})
+        self.bulk.find.return_value.upsert.return_value.update_one.assert_called_with(
+            {'$setOnInsert': {'created': 'foo_tstamp'}, '$set': {'updated': 'foo_tstamp'}})
+        self.bulk.execute.assert_called_once_with()
+
+    @mock.patch('pulp.server.db.querysets.dateutils.format_iso8601_utc_timestamp')
+    def test_associate_not_update_existing(self, mock_get_timestamp):
+        """
+        Existing associations are left untouched if update_existing is False.
+        """
+        mock_get_timestamp.return_value = 'foo_tstamp'
+
+        self.qs.associate('foo', [('demo', 'bar')], update_existing=False)
+
+        self.bulk.find.return_value.upsert.return_value.update_one.assert_called_once_with(
+            {'$setOnInsert': {'created': 'foo_tstamp', 'updated': 'foo_tstamp'}})
+
+    def test_associate_no_units(self):
+        self.assertEqual(self.qs.associate('foo', []), 0)
+        self.assertFalse(self.bulk.execute.called)
+
+    def test_associate_duplicate_key(self):
+        """
+        Associations created concurrently are not errors.
+        """
+        self.bulk.execute.side_effect = BulkWriteError(
+            {'writeErrors': [{'code': DUPLICATE_KEY_ERROR}], 'nUpserted': 1})
+
+        created = self.qs.associate('foo', [('demo', 'bar'), ('demo', 'baz')])
+
+        self.assertEqual(created, 1)
+
+    def test_associate_error(self):
+        self.bulk.execute.side_effect = BulkWriteError(
+            {'writeErrors': [{'code': 2}], 'nUpserted': 0})
+
+        self.assertRaises(BulkWriteError, self.qs.associate, 'foo', [('demo', 'bar')])
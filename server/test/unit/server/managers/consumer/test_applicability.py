@@ -9,11 +9,13 @@ from pulp.server.db.model.consumer import (Bind, Consumer, RepoProfileApplicabil
 from pulp.server.db.model.criteria import Criteria
 from pulp.server.db.model.repository import RepoDistributor
 from pulp.server.managers import factory as factory
+from pulp.server.managers.consumer import applicability as applicability_module
 from pulp.server.managers.consumer.applicability import (
     _add_consumers_to_applicability_map, _add_profiles_to_consumer_map_and_get_hashes,
     _add_repo_ids_to_consumer_map, _format_report, _get_applicability_map,
     _get_consumer_applicability_map, DoesNotExist, MultipleObjectsReturned,
-    retrieve_consumer_applicability, ApplicabilityRegenerationManager)
+    retrieve_consumer_applicability, retrieve_consumer_applicability_iter,
+    ApplicabilityRegenerationManager)
 from pulp.server.managers.consumer.bind import BindManager
 from pulp.server.managers.consumer.cud import ConsumerManager
 from pulp.server.managers.consumer.profile import ProfileManager
@@ -98,6 +100,11 @@ class ApplicabilityRegenerationManagerTests(base.PulpServerTests):
             for repo_id in self.REPO_IDS:
                 bind_manager.bind(consumer_id, repo_id, self.YUM_DISTRIBUTOR_ID, False, {})
 
+    def _repo_profile_hashes(self, repo_id):
+        # The (repo_id, profile_hash) pairs of the existing applicability data for the repo
+        return [(repo_id, a['profile_hash'])
+                for a in RepoProfileApplicability.get_collection().find({'repo_id': repo_id})]
+
     # Applicability regeneration for consumers with no unit profiles associated with them
     @mock.patch('pulp.server.managers.consumer.bind.model.Repository.objects')
     def test_regenerate_applicability_for_consumers_with_no_profiles(self, mock_repo_qs):
@@ -280,23 +287,404 @@ class ApplicabilityRegenerationManagerTests(base.PulpServerTests):
         self.assertEqual(applicability_list[0]['profile'], self.PROFILE1)
         self.assertEqual(applicability_list[0]['applicability'], expected_applicability)
 
-    @mock.patch('pulp.server.managers.consumer.applicability.model.Repository.objects')
-    @mock.patch('pulp.server.db.model.consumer.RepoProfileApplicability.get_collection')
-    def test_regenerate_applicability_for_repos_batch_size(self, mock_get_collection, mock_repo_qs):
+    @mock.patch('pulp.server.managers.consumer.bind.model.Repository.objects')
+    @mock.patch('pulp.server.managers.consumer.applicability.ApplicabilityRegenerationManager.'
+                '_regenerate_in_chunks')
+    def test_regenerate_applicability_for_repos_pairs(self, mock_chunks, mock_repo_qs):
+        for repo_id in self.REPO_IDS:
+            for profile_hash in ('hash-1', 'hash-2'):
+                RepoProfileApplicability.objects.create(profile_hash, repo_id, self.PROFILE1, {})
+        RepoProfileApplicability.objects.create('hash-1', 'repo-3', self.PROFILE1, {})
+        mock_repo_qs.find_by_criteria.return_value = [mock.Mock(repo_id=repo_id)
+                                                      for repo_id in self.REPO_IDS]
+        manager = factory.applicability_regeneration_manager()
+
+        result = manager.regenerate_applicability_for_repos(self.REPO_CRITERIA)
+
+        self.assertEqual(result, mock_chunks.return_value)
+        work, process, chunk_task = mock_chunks.call_args[0]
+        expected = set((repo_id, profile_hash) for repo_id in self.REPO_IDS
+                       for profile_hash in ('hash-1', 'hash-2'))
+        work = list(work)
+        self.assertEqual(len(work), 4)
+        self.assertEqual(set(work), expected)
+        self.assertEqual(mock_chunks.call_args[1], {'process_kwargs': {'incremental': False},
+                                                    'total': 4})
+        self.assertEqual(
+            process, ApplicabilityRegenerationManager.regenerate_applicability_for_repo_profiles)
+        self.assertEqual(chunk_task,
+                         applicability_module.regenerate_applicability_for_repo_profiles)
+
+    @mock.patch('pulp.server.managers.consumer.bind.model.Repository.objects')
+    @mock.patch('pulp.server.managers.consumer.applicability.ApplicabilityRegenerationManager.'
+                '_regenerate_in_chunks')
+    def test_regenerate_applicability_for_consumers_missing_profiles(self, mock_chunks,
+                                                                     mock_repo_qs):
+        self.populate_consumers()
+        self.populate_bindings()
+        manager = factory.applicability_regeneration_manager()
+
+        result = manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+
+        self.assertEqual(result, mock_chunks.return_value)
+        work, process, chunk_task = mock_chunks.call_args[0]
+        profile = UnitProfile.get_collection().find_one({'consumer_id': self.CONSUMER_IDS[0]})
+        self.assertEqual(len(work), 2)
+        self.assertEqual(sorted(w[0] for w in work), self.REPO_IDS)
+        for repo_id, profile_hash, content_type, profile_id in work:
+            self.assertEqual(profile_hash, profile['profile_hash'])
+            self.assertEqual(content_type, 'rpm')
+        self.assertEqual(process,
+                         ApplicabilityRegenerationManager.regenerate_applicability_for_profiles)
+        self.assertEqual(chunk_task, applicability_module.regenerate_applicability_for_profiles)
+        self.assertEqual(mock_chunks.call_args[1], {'skipped': 0})
+
+    @mock.patch('pulp.server.managers.consumer.bind.model.Repository.objects')
+    @mock.patch('pulp.server.managers.consumer.applicability.ApplicabilityRegenerationManager.'
+                '_regenerate_in_chunks')
+    def test_regenerate_applicability_for_consumers_skips_existing(self, mock_chunks,
+                                                                   mock_repo_qs):
+        self.populate_consumers()
+        self.populate_bindings()
+        profile = UnitProfile.get_collection().find_one({'consumer_id': self.CONSUMER_IDS[0]})
+        RepoProfileApplicability.objects.create(profile['profile_hash'], self.REPO_IDS[0],
+                                                self.PROFILE1, {})
+        manager = factory.applicability_regeneration_manager()
+
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+
+        work = mock_chunks.call_args[0][0]
+        self.assertEqual([w[0] for w in work], [self.REPO_IDS[1]])
+        self.assertEqual(mock_chunks.call_args[1], {'skipped': 1})
+
+    @mock.patch('pulp.server.managers.consumer.bind.model.Repository.objects')
+    @mock.patch('pulp.server.managers.consumer.applicability.ApplicabilityRegenerationManager.'
+                '_regenerate_in_chunks')
+    def test_regenerate_applicability_for_consumers_overlapping(self, mock_chunks,
+                                                                mock_repo_qs):
+        """
+        Two regenerations that find the same pairs missing may both generate them.
+        """
+        self.populate_consumers()
+        self.populate_bindings()
+        manager = factory.applicability_regeneration_manager()
+        # Both regenerations look for missing pairs before either one generates them
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        first, second = [c[0][0] for c in mock_chunks.call_args_list]
+        self.assertEqual(sorted(first), sorted(second))
+
+        ApplicabilityRegenerationManager.regenerate_applicability_for_profiles(first)
+        ApplicabilityRegenerationManager.regenerate_applicability_for_profiles(second)
+
+        applicability_list = list(RepoProfileApplicability.get_collection().find())
+        self.assertEqual(sorted(a['repo_id'] for a in applicability_list), self.REPO_IDS)
+
+    def test_existing_applicability_keys(self):
+        RepoProfileApplicability.objects.create('hash-1', 'repo-1', self.PROFILE1, {})
+        RepoProfileApplicability.objects.create('hash-2', 'repo-2', self.PROFILE1, {})
+        RepoProfileApplicability.objects.create('hash-3', 'repo-1', self.PROFILE1, {})
+        candidates = [('repo-1', ('hash-1', 'rpm')), ('repo-1', ('hash-2', 'rpm')),
+                      ('repo-2', ('hash-2', 'rpm')), ('repo-2', ('hash-4', 'rpm'))]
+
+        # A batch size of 1 forces one query per profile hash
+        existing = ApplicabilityRegenerationManager._existing_applicability_keys(
+            candidates, batch_size=1)
+
+        self.assertEqual(existing, set([('repo-1', 'hash-1'), ('repo-2', 'hash-2')]))
+
+    def test_existing_applicability_keys_no_candidates(self):
+        existing = ApplicabilityRegenerationManager._existing_applicability_keys([])
+
+        self.assertEqual(existing, set())
+
+    @mock.patch('pulp.server.managers.consumer.bind.model.Repository.objects')
+    def test_regenerate_applicability_for_repo_profiles(self, mock_repo_qs):
+        self.populate_consumers_different_profiles()
+        self.populate_bindings()
+        manager = factory.applicability_regeneration_manager()
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        RepoProfileApplicability.get_collection().update(
+            {}, {'$set': {'applicability': {}}}, multi=True)
+        pairs = [(a['repo_id'], a['profile_hash'])
+                 for a in RepoProfileApplicability.get_collection().find()]
+
+        updated = ApplicabilityRegenerationManager.regenerate_applicability_for_repo_profiles(
+            pairs[:3], batch_size=1)
+
+        self.assertEqual(updated, 3)
+        expected_applicability = {'rpm': ['rpm-1', 'rpm-2'], 'erratum': ['errata-1', 'errata-2']}
+        for a in RepoProfileApplicability.get_collection().find():
+            if (a['repo_id'], a['profile_hash']) in pairs[:3]:
+                self.assertEqual(a['applicability'], expected_applicability)
+            else:
+                self.assertEqual(a['applicability'], {})
+
+    @mock.patch('pulp.server.managers.consumer.applicability._set_regeneration_progress')
+    def test_regenerate_in_chunks_single_chunk(self, mock_progress):
+        process = mock.Mock()
+        chunk_task = mock.Mock()
+
+        result = ApplicabilityRegenerationManager._regenerate_in_chunks(
+            [1, 2, 3], process, chunk_task, chunk_size=3)
+
+        self.assertTrue(result is None)
+        process.assert_called_once_with([1, 2, 3])
+        self.assertFalse(chunk_task.apply_async_with_reservation.called)
+        mock_progress.assert_called_with({'items_total': 3, 'items_skipped': 0, 'chunks_total': 1,
+                                          'chunks_dispatched': 0, 'items_processed': 3})
+
+    def test_repo_profile_hashes(self):
+        for profile_hash in ('hash-1', 'hash-2', 'hash-3'):
+            RepoProfileApplicability.objects.create(profile_hash, 'repo-1', self.PROFILE1, {})
+        RepoProfileApplicability.objects.create('hash-1', 'repo-2', self.PROFILE1, {})
+
+        # A page size of 1 forces one query per applicability document
+        pairs = list(ApplicabilityRegenerationManager._repo_profile_hashes(
+            ['repo-1', 'repo-2', 'repo-3'], page_size=1))
+
+        self.assertEqual(sorted(pairs), [('repo-1', 'hash-1'), ('repo-1', 'hash-2'),
+                                         ('repo-1', 'hash-3'), ('repo-2', 'hash-1')])
+
+    @mock.patch('pulp.server.managers.consumer.applicability._set_regeneration_progress')
+    def test_regenerate_in_chunks_iterable(self, mock_progress):
+        process = mock.Mock()
+        chunk_task = mock.Mock()
+        chunk_task.apply_async_with_reservation.side_effect = ['task-1', 'task-2']
+
+        ApplicabilityRegenerationManager._regenerate_in_chunks(
+            iter([1, 2, 3]), process, chunk_task, chunk_size=2, total=3)
+
+        calls = chunk_task.apply_async_with_reservation.call_args_list
+        self.assertEqual([c[0][2] for c in calls], [([1, 2],), ([3],)])
+        mock_progress.assert_called_with({'items_total': 3, 'items_skipped': 0, 'chunks_total': 2,
+                                          'chunks_dispatched': 2, 'items_processed': 0})
+
+    @mock.patch('pulp.server.managers.consumer.applicability._set_regeneration_progress')
+    def test_regenerate_in_chunks_nothing_to_do(self, mock_progress):
+        process = mock.Mock()
+        chunk_task = mock.Mock()
+
+        result = ApplicabilityRegenerationManager._regenerate_in_chunks([], process, chunk_task)
+
+        self.assertTrue(result is None)
+        self.assertFalse(process.called)
+        self.assertFalse(chunk_task.apply_async_with_reservation.called)
+
+    @mock.patch('pulp.server.managers.consumer.applicability._set_regeneration_progress')
+    def test_regenerate_in_chunks_dispatch(self, mock_progress):
+        process = mock.Mock()
+        chunk_task = mock.Mock()
+        chunk_task.apply_async_with_reservation.side_effect = ['task-1', 'task-2']
+
+        result = ApplicabilityRegenerationManager._regenerate_in_chunks(
+            [1, 2, 3], process, chunk_task, chunk_size=2)
+
+        self.assertFalse(process.called)
+        calls = chunk_task.apply_async_with_reservation.call_args_list
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[0][0][2], ([1, 2],))
+        self.assertEqual(calls[1][0][2], ([3],))
+        self.assertEqual(calls[1][0][3], {})
+        # every chunk reserves a resource of its own
+        self.assertNotEqual(calls[0][0][1], calls[1][0][1])
+        self.assertEqual(result.spawned_tasks, [{'task_id': 'task-1'}, {'task_id': 'task-2'}])
+        mock_progress.assert_called_with({'items_total': 3, 'items_skipped': 0, 'chunks_total': 2,
+                                          'chunks_dispatched': 2, 'items_processed': 0})
+
+    @mock.patch('pulp.server.managers.consumer.applicability.get_current_task_id')
+    @mock.patch('pulp.server.managers.consumer.applicability.model.TaskStatus')
+    def test_set_regeneration_progress(self, mock_task_status, mock_task_id):
+        mock_task_id.return_value = 'task-1'
+
+        applicability_module._set_regeneration_progress({'items_total': 1})
+
+        mock_task_status.objects.assert_called_once_with(task_id='task-1')
+        mock_task_status.objects.return_value.update_one.assert_called_once_with(
+            set__progress_report={'applicability_regeneration': {'items_total': 1}})
+
+    @mock.patch('pulp.server.managers.consumer.applicability.get_current_task_id')
+    @mock.patch('pulp.server.managers.consumer.applicability.model.TaskStatus')
+    def test_set_regeneration_progress_not_in_task(self, mock_task_status, mock_task_id):
+        mock_task_id.return_value = None
+
+        applicability_module._set_regeneration_progress({'items_total': 1})
+
+        self.assertFalse(mock_task_status.objects.called)
+
+    @mock.patch('pulp.server.managers.consumer.bind.model.Repository.objects')
+    def test_regenerate_applicability_for_repo_profiles_batches(self, mock_repo_qs):
+        self.populate_consumers_different_profiles()
+        self.populate_bindings()
+        manager = factory.applicability_regeneration_manager()
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        RepoProfileApplicability.get_collection().update(
+            {}, {'$set': {'applicability': {}}}, multi=True)
+        yum_profiler, cfg = plugins.get_profiler_by_type('rpm')
+        yum_profiler.calculate_applicable_units.reset_mock()
+
+        # A batch size of 1 forces one batch per applicability document
+        updated = ApplicabilityRegenerationManager.regenerate_applicability_for_repo_profiles(
+            self._repo_profile_hashes(self.REPO_IDS[0]), batch_size=1)
+
+        self.assertEqual(updated, 2)
+        self.assertEqual(yum_profiler.calculate_applicable_units.call_count, 2)
+        expected_applicability = {'rpm': ['rpm-1', 'rpm-2'], 'erratum': ['errata-1', 'errata-2']}
+        for applicability in RepoProfileApplicability.get_collection().find():
+            if applicability['repo_id'] == self.REPO_IDS[0]:
+                self.assertEqual(applicability['applicability'], expected_applicability)
+            else:
+                self.assertEqual(applicability['applicability'], {})
+
+    @mock.patch('pulp.server.managers.consumer.bind.model.Repository.objects')
+    def test_regenerate_applicability_for_repo_profiles_missing_profile(self, mock_repo_qs):
+        self.populate_consumers()
+        self.populate_bindings()
+        manager = factory.applicability_regeneration_manager()
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        repo_profile_hashes = self._repo_profile_hashes(self.REPO_IDS[0])
+        UnitProfile.get_collection().remove()
+
+        updated = ApplicabilityRegenerationManager.regenerate_applicability_for_repo_profiles(
+            repo_profile_hashes)
 
-        factory.initialize()
-        applicability_manager = ApplicabilityRegenerationManager()
-        repo_criteria = {'filters': None, 'sort': None, 'limit': None,
-                         'skip': None, 'fields': None}
-        mock_repo = mock.MagicMock()
-        mock_repo.repo_id = 'fake-repo'
-        mock_repo_qs.find_by_criteria.return_value = [mock_repo]
+        self.assertEqual(updated, 0)
 
-        applicability_manager.regenerate_applicability_for_repos(repo_criteria)
+    def test_regenerate_applicability_for_repo_profiles_no_content(self):
+        ApplicabilityRegenerationManager._get_existing_repo_content_types.return_value = []
 
-        # validate that batch size of 5 is used
+        updated = ApplicabilityRegenerationManager.regenerate_applicability_for_repo_profiles(
+            [('repo', 'hash-1')])
+
+        self.assertEqual(updated, 0)
+
+    def test_profile_content_types(self):
+        self.populate_consumers()
+        profile_hash = UnitProfile.get_collection().find_one()['profile_hash']
+        # the consumers share their profile
+        self.assertTrue(
+            UnitProfile.get_collection().find({'profile_hash': profile_hash}).count() > 1)
 
-        mock_get_collection.return_value.find.return_value.batch_size.assert_called_with(5)
+        content_types = ApplicabilityRegenerationManager._profile_content_types(
+            [profile_hash, 'missing'])
+
+        self.assertEqual(content_types, {profile_hash: 'rpm'})
+
+    def test_applicability_profiler_type_mismatch(self):
+        result = ApplicabilityRegenerationManager._applicability_profiler('rpm', ['iso'])
+
+        self.assertTrue(result is None)
+
+    @mock.patch('pulp.server.managers.consumer.bind.model.Repository.objects')
+    def test_regenerate_applicability_records_revision(self, mock_repo_qs):
+        self.populate_consumers()
+        self.populate_bindings()
+        manager = factory.applicability_regeneration_manager()
+
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+
+        for applicability in RepoProfileApplicability.get_collection().find():
+            self.assertTrue(applicability['repo_revision'])
+
+    @mock.patch('pulp.server.managers.consumer.bind.model.Repository.objects')
+    def test_regenerate_applicability_for_repo_profiles_incremental(self, mock_repo_qs):
+        self.populate_consumers()
+        self.populate_bindings()
+        manager = factory.applicability_regeneration_manager()
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        yum_profiler, cfg = plugins.get_profiler_by_type('rpm')
+        yum_profiler.metadata.return_value = {'types': ['rpm', 'erratum'],
+                                              'incremental_applicability': True}
+        yum_profiler.calculate_applicable_units.reset_mock()
+
+        updated = ApplicabilityRegenerationManager.regenerate_applicability_for_repo_profiles(
+            self._repo_profile_hashes(self.REPO_IDS[0]), incremental=True)
+
+        # Nothing was added to the repository, so the profiler is not asked at all, and none of
+        # the previously applicable units are associated with the repository any more.
+        self.assertEqual(updated, 1)
+        self.assertFalse(yum_profiler.calculate_applicable_units.called)
+        applicability = RepoProfileApplicability.get_collection().find_one(
+            {'repo_id': self.REPO_IDS[0]})
+        self.assertEqual(applicability['applicability'], {'rpm': [], 'erratum': []})
+
+    @mock.patch('pulp.server.managers.consumer.bind.model.Repository.objects')
+    def test_regenerate_for_repo_profiles_incremental_unsupported(self, mock_repo_qs):
+        self.populate_consumers()
+        self.populate_bindings()
+        manager = factory.applicability_regeneration_manager()
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        yum_profiler, cfg = plugins.get_profiler_by_type('rpm')
+        yum_profiler.calculate_applicable_units.reset_mock()
+
+        ApplicabilityRegenerationManager.regenerate_applicability_for_repo_profiles(
+            self._repo_profile_hashes(self.REPO_IDS[0]), incremental=True)
+
+        # The profiler does not declare incremental_applicability, so it recalculates everything
+        self.assertEqual(yum_profiler.calculate_applicable_units.call_count, 1)
+
+    @mock.patch('pulp.server.managers.consumer.applicability.ProfilerConduit')
+    def test_incremental_applicability(self, mock_conduit):
+        existing = {'profile': self.PROFILE1, 'repo_revision': '2016-01-02T00:00:00Z',
+                    'applicability': {'rpm': ['rpm-1', 'rpm-2'], 'erratum': ['errata-1']}}
+        added = {'rpm-3': '2016-01-03T00:00:00Z', 'rpm-0': '2016-01-01T00:00:00Z'}
+        present = set(['rpm-1', 'errata-1'])
+        profiler = mock.Mock()
+        profiler.calculate_applicable_units.return_value = {'rpm': ['rpm-3', 'rpm-1'],
+                                                            'erratum': []}
+
+        applicability = ApplicabilityRegenerationManager._incremental_applicability(
+            existing, 'repo-1', profiler, 'config', added, present)
+
+        self.assertEqual(applicability, {'rpm': ['rpm-1', 'rpm-3'], 'erratum': ['errata-1']})
+        mock_conduit.assert_called_once_with(unit_ids=['rpm-3'])
+        profiler.calculate_applicable_units.assert_called_once_with(
+            self.PROFILE1, 'repo-1', 'config', mock_conduit.return_value)
+
+    def test_incremental_applicability_nothing_added(self):
+        existing = {'profile': self.PROFILE1, 'repo_revision': '2016-01-02T00:00:00Z',
+                    'applicability': {'rpm': ['rpm-1', 'rpm-2']}}
+        profiler = mock.Mock()
+
+        applicability = ApplicabilityRegenerationManager._incremental_applicability(
+            existing, 'repo-1', profiler, 'config', {}, set(['rpm-2']))
+
+        self.assertEqual(applicability, {'rpm': ['rpm-2']})
+        self.assertFalse(profiler.calculate_applicable_units.called)
+
+    def test_repo_content_delta(self):
+        model.RepositoryContentUnit(repo_id='repo-1', unit_id='rpm-1', unit_type_id='rpm',
+                                    created='2016-01-01T00:00:00Z').save()
+        model.RepositoryContentUnit(repo_id='repo-1', unit_id='rpm-2', unit_type_id='rpm',
+                                    created='2016-01-03T00:00:00Z').save()
+        model.RepositoryContentUnit(repo_id='repo-2', unit_id='rpm-3', unit_type_id='rpm',
+                                    created='2016-01-03T00:00:00Z').save()
+        batch = [{'repo_revision': '2016-01-02T00:00:00Z',
+                  'applicability': {'rpm': ['rpm-1', 'rpm-4']}},
+                 {'repo_revision': None, 'applicability': {'rpm': ['rpm-5']}}]
+
+        try:
+            added, present = ApplicabilityRegenerationManager._repo_content_delta('repo-1', batch)
+        finally:
+            model.RepositoryContentUnit.drop_collection()
+
+        self.assertEqual(added, {'rpm-2': '2016-01-03T00:00:00Z'})
+        self.assertEqual(present, set(['rpm-1']))
+
+    def test_repo_content_delta_no_revisions(self):
+        batch = [{'repo_revision': None, 'applicability': {'rpm': ['rpm-1']}}]
+
+        added, present = ApplicabilityRegenerationManager._repo_content_delta('repo-1', batch)
+
+        self.assertEqual(added, {})
+        self.assertEqual(present, set())
+
+    def test_applicability_profiler(self):
+        profiler, call_config = ApplicabilityRegenerationManager._applicability_profiler(
+            'rpm', ['rpm'])
+
+        self.assertEqual(profiler, plugins.get_profiler_by_type('rpm')[0])
+        self.assertEqual(call_config.repo_plugin_config, {})
 
     @mock.patch('pulp.server.managers.consumer.applicability.model.Repository.objects')
     def test_get_existing_repo_content_types_no_repo(self, mock_repo_qs):
@@ -1084,6 +1472,85 @@ class TestRetrieveConsumerApplicability(base.PulpServerTests,
         self.assert_equal_ignoring_list_order(applicability, expected_applicability)
 
 
+class TestRetrieveConsumerApplicabilityIter(base.PulpServerTests,
+                                            base.RecursiveUnorderedListComparisonMixin):
+    """
+    Test the retrieve_consumer_applicability_iter() function.
+    """
+    def tearDown(self):
+        """
+        Empty the collections that were written to during this test suite.
+        """
+        super(TestRetrieveConsumerApplicabilityIter, self).tearDown()
+        Consumer.get_collection().remove()
+        UnitProfile.get_collection().remove()
+        RepoProfileApplicability.get_collection().drop()
+        Bind.get_collection().drop()
+
+    @mock.patch('pulp.server.managers.consumer.bind.factory.consumer_history_manager')
+    @mock.patch('pulp.server.managers.consumer.bind.factory.repo_distributor_manager')
+    @mock.patch('pulp.server.managers.consumer.bind.model.Repository.objects')
+    def populate(self, *unused_mocks):
+        """
+        Create two consumers that share their profile, bindings and applicability.
+        """
+        consumer_ids = ['consumer_1', 'consumer_2']
+        manager = factory.consumer_manager()
+        for consumer_id in consumer_ids:
+            manager.register(consumer_id)
+        consumer_profile_data = ['unit_1-0.9.1', 'unit_2-1.1.3', 'unit_3-12.0.13']
+        manager = ProfileManager()
+        for consumer_id in consumer_ids:
+            consumer_profile = manager.create(consumer_id, 'content_type',
+                                              consumer_profile_data)
+        applicability = {'content_type': ['unit_1-0.9.2', 'unit_3-13.0.1']}
+        RepoProfileApplicability.objects.create(consumer_profile.profile_hash, 'repo_id',
+                                                consumer_profile_data, applicability)
+        bind_manager = BindManager()
+        for consumer_id in consumer_ids:
+            bind_manager.bind(consumer_id, 'repo_id', 'distributor_id', False, {})
+
+    def test_single_page(self):
+        """
+        Test that consumers in the same page are collated together.
+        """
+        self.populate()
+
+        applicability = retrieve_consumer_applicability_iter(Criteria(filters={}))
+
+        self.assertEqual(type(applicability).__name__, 'generator')
+        expected_applicability = [
+            {'consumers': ['consumer_1', 'consumer_2'],
+             'applicability': {'content_type': ['unit_1-0.9.2', 'unit_3-13.0.1']}}]
+        self.assert_equal_ignoring_list_order(list(applicability), expected_applicability)
+
+    def test_pages(self):
+        """
+        Test that every page of consumers is reported separately.
+        """
+        self.populate()
+
+        applicability = retrieve_consumer_applicability_iter(Criteria(filters={}), page_size=1)
+
+        expected_applicability = [
+            {'consumers': ['consumer_1'],
+             'applicability': {'content_type': ['unit_1-0.9.2', 'unit_3-13.0.1']}},
+            {'consumers': ['consumer_2'],
+             'applicability': {'content_type': ['unit_1-0.9.2', 'unit_3-13.0.1']}}]
+        self.assert_equal_ignoring_list_order(list(applicability), expected_applicability)
+
+    def test_content_types(self):
+        """
+        Test that the report is limited to the requested content types.
+        """
+        self.populate()
+
+        applicability = retrieve_consumer_applicability_iter(Criteria(filters={}),
+                                                             content_types=['other_type'])
+
+        self.assertEqual(list(applicability), [])
+
+
 class TestAddConsumersToApplicabilityMap(base.PulpServerTests,
                                          base.RecursiveUnorderedListComparisonMixin):
     """
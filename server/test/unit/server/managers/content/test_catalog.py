@@ -1,9 +1,13 @@
+from datetime import datetime, timedelta
 from uuid import uuid4
 
+from bson.objectid import ObjectId
+
 from ....base import PulpServerTests
-from pulp.server.db.model.content import ContentCatalog
+from pulp.common import dateutils
+from pulp.server.db.model.content import ContentCatalog, ContentCatalogGeneration
 from pulp.server.managers import factory
-from pulp.server.managers.content.catalog import ContentCatalogManager
+from pulp.server.managers.content.catalog import ContentCatalogManager, ABANDONED_PERIOD
 
 
 TYPE_ID = 'type_a'
@@ -16,10 +20,12 @@ class TestCatalogManager(PulpServerTests):
     def setUp(self):
         super(TestCatalogManager, self).setUp()
         ContentCatalog.get_collection().remove()
+        ContentCatalogGeneration.get_collection().remove()
 
     def tearDown(self):
         super(TestCatalogManager, self).tearDown()
         ContentCatalog.get_collection().remove()
+        ContentCatalogGeneration.get_collection().remove()
 
     def test_locator(self):
         key_1 = {'a': 1, 'b': 2, 'c': 3}
@@ -48,25 +54,33 @@ class TestCatalogManager(PulpServerTests):
             units.append((unit_key, url))
         return units
 
+    def refresh(self, source_id, units, expires=EXPIRATION):
+        manager = ContentCatalogManager()
+        generation = manager.new_generation()
+        for unit_key, url in units:
+            manager.add_entry(source_id, generation, TYPE_ID, unit_key, url)
+        manager.activate_generation(source_id, generation, expires)
+        return generation
+
     def test_add(self):
         units = self.units(0, 10)
         manager = ContentCatalogManager()
+        generation = manager.new_generation()
         for unit_key, url in units:
-            manager.add_entry(SOURCE_ID, EXPIRATION, TYPE_ID, unit_key, url)
+            manager.add_entry(SOURCE_ID, generation, TYPE_ID, unit_key, url)
         collection = ContentCatalog.get_collection()
         self.assertEqual(len(units), collection.find().count())
         for unit_key, url in units:
             locator = ContentCatalog.get_locator(TYPE_ID, unit_key)
             entry = collection.find_one({'locator': locator})
+            self.assertEqual(entry['generation'], generation)
             self.assertEqual(entry['type_id'], TYPE_ID)
             self.assertEqual(entry['unit_key'], unit_key)
             self.assertEqual(entry['url'], url)
 
     def test_delete(self):
         units = self.units(0, 10)
-        manager = ContentCatalogManager()
-        for unit_key, url in units:
-            manager.add_entry(SOURCE_ID, EXPIRATION, TYPE_ID, unit_key, url)
+        generation = self.refresh(SOURCE_ID, units)
         collection = ContentCatalog.get_collection()
         self.assertEqual(len(units), collection.find().count())
         unit_key, url = units[5]
@@ -75,19 +89,106 @@ class TestCatalogManager(PulpServerTests):
         self.assertEqual(entry['type_id'], TYPE_ID)
         self.assertEqual(entry['unit_key'], unit_key)
         self.assertEqual(entry['url'], url)
-        manager.delete_entry(SOURCE_ID, TYPE_ID, unit_key)
+        manager = ContentCatalogManager()
+        manager.delete_entry(SOURCE_ID, manager.new_generation(), TYPE_ID, unit_key)
+        self.assertEqual(len(units), collection.find().count())
+        manager.delete_entry(SOURCE_ID, generation, TYPE_ID, unit_key)
         self.assertEqual(len(units) - 1, collection.find().count())
         entry = collection.find_one({'locator': locator})
         self.assertTrue(entry is None)
 
+    def test_add_entries(self):
+        units = self.units(0, 10)
+        manager = ContentCatalogManager()
+        generation = manager.new_generation()
+        entries = [(TYPE_ID, unit_key, url) for unit_key, url in units]
+        added = manager.add_entries(SOURCE_ID, generation, entries)
+        collection = ContentCatalog.get_collection()
+        self.assertEqual(added, len(units))
+        self.assertEqual(len(units), collection.find().count())
+        for unit_key, url in units:
+            locator = ContentCatalog.get_locator(TYPE_ID, unit_key)
+            entry = collection.find_one({'locator': locator})
+            self.assertEqual(entry['source_id'], SOURCE_ID)
+            self.assertEqual(entry['generation'], generation)
+            self.assertEqual(entry['type_id'], TYPE_ID)
+            self.assertEqual(entry['unit_key'], unit_key)
+            self.assertEqual(entry['url'], url)
+
+    def test_add_entries_empty(self):
+        manager = ContentCatalogManager()
+        added = manager.add_entries(SOURCE_ID, manager.new_generation(), [])
+        self.assertEqual(added, 0)
+        self.assertEqual(ContentCatalog.get_collection().find().count(), 0)
+
+    def test_delete_entries(self):
+        units = self.units(0, 10)
+        generation = self.refresh(SOURCE_ID, units)
+        self.refresh('other', units)
+        manager = ContentCatalogManager()
+        keys = [(TYPE_ID, unit_key) for unit_key, url in units[:4]]
+        deleted = manager.delete_entries(SOURCE_ID, generation, keys)
+        collection = ContentCatalog.get_collection()
+        self.assertEqual(deleted, 4)
+        self.assertEqual(collection.find({'source_id': SOURCE_ID}).count(), 6)
+        self.assertEqual(collection.find({'source_id': 'other'}).count(), 10)
+        for unit_key, url in units[:4]:
+            locator = ContentCatalog.get_locator(TYPE_ID, unit_key)
+            entry = collection.find_one({'source_id': SOURCE_ID, 'locator': locator})
+            self.assertTrue(entry is None)
+
+    def test_delete_entries_empty(self):
+        manager = ContentCatalogManager()
+        self.assertEqual(manager.delete_entries(SOURCE_ID, manager.new_generation(), []), 0)
+
+    def test_activate_generation(self):
+        units = self.units(0, 10)
+        manager = ContentCatalogManager()
+        first = self.refresh(SOURCE_ID, units)
+        second = manager.new_generation()
+        for unit_key, url in units[:5]:
+            manager.add_entry(SOURCE_ID, second, TYPE_ID, unit_key, url + '/second')
+        collection = ContentCatalog.get_collection()
+        # the new generation is not visible until activated
+        self.assertEqual(manager.find(TYPE_ID, units[0][0])[0]['generation'], first)
+        self.assertEqual(collection.find().count(), 15)
+
+        deleted = manager.activate_generation(SOURCE_ID, second, EXPIRATION)
+
+        self.assertEqual(deleted, len(units))
+        self.assertEqual(collection.find({'generation': first}).count(), 0)
+        self.assertEqual(collection.find({'generation': second}).count(), 5)
+        active = ContentCatalogGeneration.get_collection().find({'source_id': SOURCE_ID})
+        self.assertEqual([g['generation'] for g in active], [second])
+        entries = manager.find(TYPE_ID, units[0][0])
+        self.assertEqual([e['url'] for e in entries], [units[0][1] + '/second'])
+        self.assertEqual(manager.find(TYPE_ID, units[9][0]), [])
+
+    def test_activate_generation_again(self):
+        generation = self.refresh(SOURCE_ID, self.units(0, 10))
+        manager = ContentCatalogManager()
+        deleted = manager.activate_generation(SOURCE_ID, generation, EXPIRATION)
+        self.assertEqual(deleted, 0)
+        self.assertEqual(ContentCatalog.get_collection().find().count(), 10)
+
+    def test_abandon_generation(self):
+        units = self.units(0, 10)
+        active = self.refresh(SOURCE_ID, units)
+        manager = ContentCatalogManager()
+        abandoned = manager.new_generation()
+        for unit_key, url in units:
+            manager.add_entry(SOURCE_ID, abandoned, TYPE_ID, unit_key, url)
+        deleted = manager.abandon_generation(SOURCE_ID, abandoned)
+        collection = ContentCatalog.get_collection()
+        self.assertEqual(deleted, len(units))
+        self.assertEqual(collection.find({'generation': abandoned}).count(), 0)
+        self.assertEqual(collection.find({'generation': active}).count(), len(units))
+
     def test_purge(self):
         source_a = 'A'
         source_b = 'B'
-        manager = ContentCatalogManager()
-        for unit_key, url in self.units(0, 10):
-            manager.add_entry(source_a, EXPIRATION, TYPE_ID, unit_key, url)
-        for unit_key, url in self.units(0, 10):
-            manager.add_entry(source_b, EXPIRATION, TYPE_ID, unit_key, url)
+        self.refresh(source_a, self.units(0, 10))
+        self.refresh(source_b, self.units(0, 10))
         collection = ContentCatalog.get_collection()
         self.assertEqual(20, collection.find().count())
         manager = ContentCatalogManager()
@@ -95,24 +196,23 @@ class TestCatalogManager(PulpServerTests):
         self.assertEqual(purged, 10)
         self.assertEqual(collection.find({'source_id': source_a}).count(), 0)
         self.assertEqual(collection.find({'source_id': source_b}).count(), 10)
+        self.assertFalse(manager.has_entries(source_a))
+        self.assertTrue(manager.has_entries(source_b))
 
     def test_has_entries(self):
         source_a = 'A'
         source_b = 'B'
         source_c = 'C'
-        manager = ContentCatalogManager()
-        for unit_key, url in self.units(0, 10):
-            manager.add_entry(source_a, EXPIRATION, TYPE_ID, unit_key, url)
-        for unit_key, url in self.units(0, 10):
-            manager.add_entry(source_b, -1, TYPE_ID, unit_key, url)
-        for unit_key, url in self.units(0, 10):
-            manager.add_entry(source_c, EXPIRATION, TYPE_ID, unit_key, url)
+        self.refresh(source_a, self.units(0, 10))
+        self.refresh(source_b, self.units(0, 10), -1)
+        self.refresh(source_c, self.units(0, 10))
         collection = ContentCatalog.get_collection()
         self.assertEqual(30, collection.find().count())
         manager = ContentCatalogManager()
         self.assertTrue(manager.has_entries(source_a))
         self.assertFalse(manager.has_entries(source_b))
         self.assertTrue(manager.has_entries(source_c))
+        self.assertFalse(manager.has_entries('D'))
         manager.purge(source_c)
         self.assertTrue(manager.has_entries(source_a))
         self.assertFalse(manager.has_entries(source_b))
@@ -121,11 +221,8 @@ class TestCatalogManager(PulpServerTests):
     def test_purge_expired(self):
         source_a = 'A'
         source_b = 'B'
-        manager = ContentCatalogManager()
-        for unit_key, url in self.units(0, 10):
-            manager.add_entry(source_a, EXPIRATION, TYPE_ID, unit_key, url)
-        for unit_key, url in self.units(0, 10):
-            manager.add_entry(source_b, -1, TYPE_ID, unit_key, url)
+        self.refresh(source_a, self.units(0, 10))
+        self.refresh(source_b, self.units(0, 10), -1)
         collection = ContentCatalog.get_collection()
         self.assertEqual(20, collection.find().count())
         manager = ContentCatalogManager()
@@ -133,15 +230,31 @@ class TestCatalogManager(PulpServerTests):
         self.assertEqual(purged, 10)
         self.assertEqual(collection.find({'source_id': source_a}).count(), 10)
         self.assertEqual(collection.find({'source_id': source_b}).count(), 0)
+        generations = ContentCatalogGeneration.get_collection()
+        self.assertEqual(generations.find({'source_id': source_b}).count(), 0)
+
+    def test_purge_expired_abandoned(self):
+        units = self.units(0, 10)
+        active = self.refresh(SOURCE_ID, units)
+        now = datetime.now(dateutils.utc_tz())
+        abandoned = ObjectId.from_datetime(now - timedelta(seconds=ABANDONED_PERIOD + 60))
+        in_progress = ContentCatalogManager().new_generation()
+        manager = ContentCatalogManager()
+        for unit_key, url in units:
+            manager.add_entry(SOURCE_ID, abandoned, TYPE_ID, unit_key, url)
+            manager.add_entry(SOURCE_ID, in_progress, TYPE_ID, unit_key, url)
+        purged = manager.purge_expired()
+        collection = ContentCatalog.get_collection()
+        self.assertEqual(purged, len(units))
+        self.assertEqual(collection.find({'generation': abandoned}).count(), 0)
+        self.assertEqual(collection.find({'generation': in_progress}).count(), len(units))
+        self.assertEqual(collection.find({'generation': active}).count(), len(units))
 
     def test_purge_orphans(self):
         source_a = 'A'
         source_b = 'B'
-        manager = ContentCatalogManager()
-        for unit_key, url in self.units(0, 10):
-            manager.add_entry(source_a, EXPIRATION, TYPE_ID, unit_key, url)
-        for unit_key, url in self.units(0, 10):
-            manager.add_entry(source_b, 1, TYPE_ID, unit_key, url)
+        self.refresh(source_a, self.units(0, 10))
+        self.refresh(source_b, self.units(0, 10), 1)
         collection = ContentCatalog.get_collection()
         self.assertEqual(20, collection.find().count())
         manager = ContentCatalogManager()
@@ -149,20 +262,14 @@ class TestCatalogManager(PulpServerTests):
         self.assertEqual(purged, 10)
         self.assertEqual(collection.find({'source_id': source_a}).count(), 0)
         self.assertEqual(collection.find({'source_id': source_b}).count(), 10)
+        self.assertFalse(manager.has_entries(source_a))
 
     def test_find(self):
         units = self.units(0, 10)
+        self.refresh(SOURCE_ID, units)
         manager = ContentCatalogManager()
-        for unit_key, url in units:
-            manager.add_entry(SOURCE_ID, EXPIRATION, TYPE_ID, unit_key, url)
         collection = ContentCatalog.get_collection()
         self.assertEqual(len(units), collection.find().count())
-        for unit_key, url in units:
-            locator = ContentCatalog.get_locator(TYPE_ID, unit_key)
-            entry = collection.find_one({'locator': locator})
-            self.assertEqual(entry['type_id'], TYPE_ID)
-            self.assertEqual(entry['unit_key'], unit_key)
-            self.assertEqual(entry['url'], url)
         for unit_key, url in units:
             entries = manager.find(TYPE_ID, unit_key)
             self.assertEqual(len(entries), 1)
@@ -171,19 +278,48 @@ class TestCatalogManager(PulpServerTests):
             self.assertEqual(entry['unit_key'], unit_key)
             self.assertEqual(entry['url'], url)
 
-    def test_expired(self):
+    def test_find_not_activated(self):
         units = self.units(0, 10)
         manager = ContentCatalogManager()
+        generation = manager.new_generation()
         for unit_key, url in units:
-            manager.add_entry(SOURCE_ID, -1, TYPE_ID, unit_key, url)
+            manager.add_entry(SOURCE_ID, generation, TYPE_ID, unit_key, url)
+        for unit_key, url in units:
+            self.assertEqual(manager.find(TYPE_ID, unit_key), [])
+
+    def test_find_by_locators(self):
+        units = self.units(0, 10)
+        self.refresh(SOURCE_ID, units)
+        self.refresh('other', [(units[0][0], 'file://redhat.com/other')])
+        manager = ContentCatalogManager()
+        locators = [ContentCatalog.get_locator(TYPE_ID, unit_key) for unit_key, url in units[:3]]
+        missing = ContentCatalog.get_locator(TYPE_ID, {'name': 'missing'})
+
+        entries = manager.find_by_locators(locators + [missing])
+
+        self.assertEqual(sorted(entries.keys()), sorted(locators))
+        urls = dict((e['source_id'], e['url']) for e in entries[locators[0]])
+        self.assertEqual(urls, {SOURCE_ID: units[0][1],
+                                'other': 'file://redhat.com/other'})
+        for locator, (unit_key, url) in zip(locators[1:], units[1:3]):
+            self.assertEqual(len(entries[locator]), 1)
+            self.assertEqual(entries[locator][0]['unit_key'], unit_key)
+            self.assertEqual(entries[locator][0]['url'], url)
+
+    def test_find_by_locators_expired(self):
+        units = self.units(0, 3)
+        self.refresh(SOURCE_ID, units, -1)
+        manager = ContentCatalogManager()
+        locators = [ContentCatalog.get_locator(TYPE_ID, unit_key) for unit_key, url in units]
+
+        self.assertEqual(manager.find_by_locators(locators), {})
+
+    def test_expired(self):
+        units = self.units(0, 10)
+        self.refresh(SOURCE_ID, units, -1)
+        manager = ContentCatalogManager()
         collection = ContentCatalog.get_collection()
         self.assertEqual(len(units), collection.find().count())
-        for unit_key, url in units:
-            locator = ContentCatalog.get_locator(TYPE_ID, unit_key)
-            entry = collection.find_one({'locator': locator})
-            self.assertEqual(entry['type_id'], TYPE_ID)
-            self.assertEqual(entry['unit_key'], unit_key)
-            self.assertEqual(entry['url'], url)
         for unit_key, url in units:
             entries = manager.find(TYPE_ID, unit_key)
             self.assertEqual(len(entries), 0)
@@ -62,6 +62,23 @@ class PulpContentCUDTests(PulpContentTests):
         self.assertTrue(unit['search-1'] == 'two')
         self.assertTrue('_last_updated' in unit)
 
+    def test_save_content_units(self):
+        unit_id = self.cud_manager.add_content_unit(TYPE_1_DEF.id, None, TYPE_1_UNITS[0])
+        units = [{'key-1': 'A', 'search-1': 'two'}, {'key-1': 'B', 'search-1': 'one'}]
+
+        unit_ids, added_count = self.cud_manager.save_content_units(TYPE_1_DEF.id, units)
+
+        self.assertEqual(1, added_count)
+        self.assertEqual(2, len(unit_ids))
+        self.assertEqual(unit_id, unit_ids[0])
+        for unit_id, unit in zip(unit_ids, units):
+            saved = self.query_manager.get_content_unit_by_id(TYPE_1_DEF.id, unit_id)
+            self.assertEqual(unit['key-1'], saved['key-1'])
+            self.assertEqual(unit['search-1'], saved['search-1'])
+            self.assertEqual(TYPE_1_DEF.id, saved['_content_type_id'])
+            self.assertTrue('_last_updated' in saved)
+        self.assertEqual(2, len(self.query_manager.list_content_units(TYPE_1_DEF.id)))
+
     def test_delete_content_unit(self):
         unit_id = self.cud_manager.add_content_unit(TYPE_1_DEF.id, None, TYPE_1_UNITS[0])
         units = self.query_manager.list_content_units(TYPE_1_DEF.id)
@@ -16,7 +16,7 @@ from pulp.server import exceptions as pulp_exceptions
 from pulp.server.db import model
 from pulp.server.db.model.repository import RepoContentUnit
 from pulp.server.managers import factory as manager_factory
-from pulp.server.managers.content.orphan import OrphanManager
+from pulp.server.managers.content.orphan import OrphanDeletion, OrphanManager
 
 
 PHONY_TYPE_1 = TypeDefinition('phony_type_1', 'Phony Type 1', None, 'name', [], [])
@@ -225,6 +225,72 @@ class OrphanManagerGeneratorTests(OrphanManagerTests):
         self.assertEqual(len(orphans), 0)
         self.assertEqual(self.number_of_files_in_content_root(), 0)
 
+    def test_get_associated_orphan(self):
+        unit = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        associate_content_unit_with_repo(unit)
+
+        self.assertRaises(pulp_exceptions.MissingResource,
+                          self.orphan_manager.get_orphan,
+                          PHONY_TYPE_1.id, unit['_id'])
+
+    def test_orphans_count_by_type(self):
+        units = [gen_content_unit(PHONY_TYPE_1.id, self.content_root) for i in range(3)]
+        associate_content_unit_with_repo(units[1])
+
+        count = self.orphan_manager.orphans_count_by_type(PHONY_TYPE_1.id)
+        self.assertEqual(count, 2)
+
+    @patch('pulp.server.managers.content.orphan.plugin_api.list_unit_models', return_value=[])
+    def test_orphans_summary(self, mock_list_unit_models):
+        units = [gen_content_unit(PHONY_TYPE_1.id, self.content_root) for i in range(2)]
+        gen_content_unit(PHONY_TYPE_2.id, self.content_root)
+        associate_content_unit_with_repo(units[0])
+
+        summary = self.orphan_manager.orphans_summary()
+        self.assertEqual(summary[PHONY_TYPE_1.id], 1)
+        self.assertEqual(summary[PHONY_TYPE_2.id], 1)
+
+    def test_paginate_units(self):
+        units = [gen_content_unit(PHONY_TYPE_1.id, self.content_root) for i in range(5)]
+        collection = content_type_db.type_units_collection(PHONY_TYPE_1.id)
+
+        pages = list(OrphanManager._paginate_units(collection, ['_id'], page_size=2))
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        unit_ids = [unit['_id'] for page in pages for unit in page]
+        self.assertEqual(unit_ids, sorted(u['_id'] for u in units))
+
+    def test_paginate_units_by_id(self):
+        units = [gen_content_unit(PHONY_TYPE_1.id, self.content_root) for i in range(5)]
+        collection = content_type_db.type_units_collection(PHONY_TYPE_1.id)
+        wanted = [units[0]['_id'], units[3]['_id'], units[4]['_id']]
+
+        pages = list(OrphanManager._paginate_units(collection, ['_id'], wanted, page_size=2))
+        unit_ids = [unit['_id'] for page in pages for unit in page]
+        self.assertEqual(unit_ids, sorted(wanted))
+
+    def test_associated_unit_ids(self):
+        units = [gen_content_unit(PHONY_TYPE_1.id, self.content_root) for i in range(3)]
+        associate_content_unit_with_repo(units[0])
+        associate_content_unit_with_repo(units[2])
+
+        associated = OrphanManager._associated_unit_ids([u['_id'] for u in units[:2]])
+        self.assertEqual(associated, set([units[0]['_id']]))
+
+    def test_delete_by_type_with_ids(self):
+        unit_1 = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        unit_2 = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        unit_3 = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        associate_content_unit_with_repo(unit_3)
+
+        self.orphan_manager.delete_orphans_by_type(PHONY_TYPE_1.id,
+                                                   [unit_1['_id'], unit_3['_id']])
+
+        orphans = list(self.orphan_manager.generate_orphans_by_type(PHONY_TYPE_1.id))
+        self.assertEqual([o['_id'] for o in orphans], [unit_2['_id']])
+        self.assertFalse(os.path.exists(unit_1['_storage_path']))
+        self.assertTrue(os.path.exists(unit_2['_storage_path']))
+        self.assertTrue(os.path.exists(unit_3['_storage_path']))
+
     # NOTE this test is disabled for normal test runs
     def _test_delete_using_generators_performance_single_content_type(self):
         num_units = 30000
@@ -269,11 +335,11 @@ class OrphanManagerGeneratorTests(OrphanManagerTests):
         self.assertEqual(len(orphans), 0)
         self.assertEqual(self.number_of_files_in_content_root(), 0)
 
-    @patch('pulp.server.managers.content.orphan.OrphanManager.delete_orphaned_file')
+    @patch('pulp.server.managers.content.orphan.OrphanManager.delete_orphaned_files')
     @patch('pulp.server.managers.content.orphan.model.RepositoryContentUnit.objects')
     @patch('pulp.server.managers.content.orphan.plugin_api.get_unit_model_by_id')
     def test_delete_content_unit_by_type(
-            self, m_get_model, m_rcu_objects, m_del_orphan):
+            self, m_get_model, m_rcu_objects, m_del_orphans):
 
         class TestUnit(model.FileContentUnit):
             pass
@@ -282,10 +348,64 @@ class OrphanManagerGeneratorTests(OrphanManagerTests):
 
         m_get_model.return_value.objects.return_value.only.return_value = [orphan, non_orphan]
         m_rcu_objects.return_value.distinct.return_value = ['non_orphan']
+        m_del_orphans.return_value = 1
 
         self.orphan_manager.delete_orphan_content_units_by_type('foo_type')
 
-        m_del_orphan.assert_called_once_with('test_foo_path')
+        m_get_model.return_value.objects.assert_any_call(id__in=['orphan'])
+        m_get_model.return_value.objects.return_value.delete.assert_called_once_with()
+        m_del_orphans.assert_called_once_with(['test_foo_path'])
+
+    @patch('pulp.server.managers.content.orphan.OrphanManager.delete_orphaned_files')
+    @patch('pulp.server.managers.content.orphan.model.RepositoryContentUnit.objects')
+    @patch('pulp.server.managers.content.orphan.plugin_api.get_unit_model_by_id')
+    def test_delete_content_unit_by_type_no_orphans(
+            self, m_get_model, m_rcu_objects, m_del_orphans):
+
+        class TestUnit(model.FileContentUnit):
+            pass
+        non_orphan = TestUnit(storage_path='test_foo_path', id='non_orphan')
+
+        m_get_model.return_value.objects.return_value.only.return_value = [non_orphan]
+        m_rcu_objects.return_value.distinct.return_value = ['non_orphan']
+
+        self.orphan_manager.delete_orphan_content_units_by_type('foo_type')
+
+        self.assertFalse(m_get_model.return_value.objects.return_value.delete.called)
+        self.assertFalse(m_del_orphans.called)
+
+    @patch('pulp.server.managers.content.orphan.OrphanManager.delete_orphaned_files')
+    @patch('pulp.server.managers.content.orphan.model.RepositoryContentUnit.objects')
+    @patch('pulp.server.managers.content.orphan.plugin_api.get_unit_model_by_id')
+    def test_delete_content_unit_by_type_progress(
+            self, m_get_model, m_rcu_objects, m_del_orphans):
+
+        class TestUnit(model.FileContentUnit):
+            pass
+        orphans = [TestUnit(storage_path='path-%d' % i, id='orphan-%d' % i) for i in range(3)]
+
+        m_get_model.return_value.objects.return_value.only.return_value = orphans
+        m_rcu_objects.return_value.distinct.return_value = []
+        m_del_orphans.return_value = 3
+        progress = {}
+
+        self.orphan_manager.delete_orphan_content_units_by_type('foo_type', progress=progress)
+
+        self.assertEqual(progress['foo_type']['units_deleted'], 3)
+        self.assertEqual(progress['foo_type']['files_deleted'], 3)
+
+    def test_delete_by_type_progress(self):
+        units = [gen_content_unit(PHONY_TYPE_1.id, self.content_root) for i in range(3)]
+        associate_content_unit_with_repo(units[0])
+        progress = {}
+
+        self.orphan_manager.delete_orphans_by_type(PHONY_TYPE_1.id, progress=progress)
+
+        self.assertEqual(progress[PHONY_TYPE_1.id]['units_deleted'], 2)
+        self.assertEqual(progress[PHONY_TYPE_1.id]['files_deleted'], 2)
+        self.assertTrue(os.path.exists(units[0]['_storage_path']))
+        self.assertFalse(os.path.exists(units[1]['_storage_path']))
+        self.assertFalse(os.path.exists(units[2]['_storage_path']))
 
 
 class TestDelete(TestCase):
@@ -300,9 +420,10 @@ class TestDelete(TestCase):
         is_link.return_value = False
 
         # test
-        OrphanManager.delete(path)
+        deleted = OrphanManager.delete(path)
 
         # validation
+        self.assertTrue(deleted)
         is_file.assert_called_with(path)
         is_link.assert_called_with(path)
         rmtree.assert_called_with(path)
@@ -350,9 +471,10 @@ class TestDelete(TestCase):
         unlink.side_effect = OSError
 
         # test
-        OrphanManager.delete(path)
+        deleted = OrphanManager.delete(path)
 
         # validation
+        self.assertFalse(deleted)
         self.assertTrue(log_error.called)
 
 
@@ -466,6 +588,123 @@ class TestUnlinkShared(TestCase):
         delete.assert_called_once_with(path)
 
 
+class TestDeleteOrphanedFiles(TestCase):
+
+    def setUp(self):
+        self.storage_dir = tempfile.mkdtemp()
+        self.type_dir = os.path.join(self.storage_dir, 'content', 'type-1')
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_dir)
+
+    def add_file(self, *path):
+        path = os.path.join(self.type_dir, *path)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        open(path, 'w').close()
+        return path
+
+    def test_not_absolute_path(self):
+        self.assertRaises(ValueError, OrphanManager.delete_orphaned_files, ['path-1'])
+
+    def test_no_paths(self):
+        self.assertEqual(OrphanManager.delete_orphaned_files([]), 0)
+
+    @patch('pulp.server.managers.content.orphan.pulp_config.config')
+    def test_prunes_empty_directories(self, config):
+        config.get.return_value = self.storage_dir
+        paths = [self.add_file('a', 'b', 'file-%d' % i) for i in range(10)]
+        paths.append(self.add_file('a', 'c', 'file-1'))
+        kept = self.add_file('d', 'file-1')
+        paths.append(self.add_file('d', 'e', 'file-1'))
+
+        deleted = OrphanManager.delete_orphaned_files(paths)
+
+        self.assertEqual(deleted, 12)
+        for path in paths:
+            self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(os.path.join(self.type_dir, 'a')))
+        self.assertFalse(os.path.exists(os.path.join(self.type_dir, 'd', 'e')))
+        self.assertTrue(os.path.exists(kept))
+        self.assertTrue(os.path.isdir(self.type_dir))
+
+    @patch('pulp.server.managers.content.orphan.pulp_config.config')
+    def test_failed_deletes_not_counted(self, config):
+        config.get.return_value = self.storage_dir
+        paths = [self.add_file('a', 'file-1'), os.path.join(self.type_dir, 'a', 'missing')]
+
+        deleted = OrphanManager.delete_orphaned_files(paths)
+
+        self.assertEqual(deleted, 1)
+        self.assertFalse(os.path.exists(paths[0]))
+
+    @patch('os.rmdir')
+    @patch('os.listdir')
+    @patch('pulp.server.managers.content.orphan.OrphanManager.delete')
+    @patch('pulp.server.managers.content.orphan.OrphanManager.is_shared')
+    @patch('pulp.server.managers.content.orphan.pulp_config.config')
+    def test_directory_checked_once(self, config, is_shared, delete, listdir, rmdir):
+        config.get.return_value = self.storage_dir
+        is_shared.return_value = False
+        listdir.return_value = ['other-file']
+        directory = os.path.join(self.type_dir, 'a')
+        paths = [os.path.join(directory, 'file-%d' % i) for i in range(5)]
+
+        OrphanManager.delete_orphaned_files(paths)
+
+        self.assertEqual(delete.call_count, 5)
+        listdir.assert_called_once_with(directory)
+        self.assertFalse(rmdir.called)
+
+    @patch('pulp.server.managers.content.orphan.OrphanManager._prune_empty_directories')
+    @patch('pulp.server.managers.content.orphan.OrphanManager.delete')
+    @patch('pulp.server.managers.content.orphan.OrphanManager.unlink_shared')
+    @patch('pulp.server.managers.content.orphan.OrphanManager.is_shared')
+    @patch('pulp.server.managers.content.orphan.pulp_config.config')
+    def test_shared(self, config, is_shared, unlink_shared, delete, prune):
+        config.get.return_value = self.storage_dir
+        is_shared.return_value = True
+        path = os.path.join(self.storage_dir, 'content', 'shared', 'links', 'link-1')
+
+        OrphanManager.delete_orphaned_files([path])
+
+        unlink_shared.assert_called_once_with(path)
+        self.assertFalse(delete.called)
+        prune.assert_called_once_with(self.storage_dir, [])
+
+
+class TestOrphanDeletion(TestCase):
+
+    @patch('pulp.server.managers.content.orphan.get_current_task_id', return_value=None)
+    @patch('pulp.server.managers.content.orphan.model.TaskStatus')
+    def test_update_outside_task(self, task_status, get_current_task_id):
+        progress = {'other_type': {'units_deleted': 4}}
+        deletion = OrphanDeletion('type-1', progress)
+
+        deletion.update(10, 8)
+        deletion.update(5, 5)
+
+        self.assertEqual(progress['type-1']['units_deleted'], 15)
+        self.assertEqual(progress['type-1']['files_deleted'], 13)
+        self.assertEqual(progress['other_type'], {'units_deleted': 4})
+        self.assertFalse(task_status.objects.called)
+
+    @patch('pulp.server.managers.content.orphan.time.time')
+    @patch('pulp.server.managers.content.orphan.get_current_task_id', return_value='task-1')
+    @patch('pulp.server.managers.content.orphan.model.TaskStatus')
+    def test_update_reports_progress(self, task_status, get_current_task_id, mock_time):
+        mock_time.side_effect = [100.0, 102.0]
+        deletion = OrphanDeletion('type-1')
+
+        deletion.update(10, 10)
+
+        expected = {'type-1': {'units_deleted': 10, 'files_deleted': 10,
+                               'elapsed_seconds': 2.0, 'units_per_second': 5.0}}
+        task_status.objects.assert_called_once_with(task_id='task-1')
+        task_status.objects.return_value.update_one.assert_called_once_with(
+            set__progress_report={'orphan_deletion': expected})
+
+
 class TestDeleteOrphanedFile(TestCase):
 
     def test_not_absolute_path(self):
@@ -329,6 +329,35 @@ class RepoUnitAssociationManagerTests(base.PulpServerTests):
         self.manager.associate_all_by_ids(self.repo_id, 'type-1', IDS)
         mock_ctrl.update_unit_count.assert_called_once_with(self.repo_id, 'type-1', 2)
 
+    @mock.patch('pulp.server.managers.repo.unit_association.model.Repository.objects')
+    @mock.patch('pulp.server.managers.repo.unit_association.repo_controller')
+    def test_associate_all_existing(self, mock_ctrl, mock_repo_qs):
+        """
+        Existing associations are not counted or duplicated.
+        """
+        self.manager.associate_unit_by_id(self.repo_id, 'type-1', 'foo')
+        mock_ctrl.reset_mock()
+
+        ret = self.manager.associate_all_by_ids(self.repo_id, 'type-1', iter(['foo', 'bar']))
+
+        self.assertEqual(ret, 1)
+        mock_ctrl.update_unit_count.assert_called_once_with(self.repo_id, 'type-1', 1)
+        repo_units = list(RepoContentUnit.get_collection().find({'repo_id': self.repo_id}))
+        self.assertEqual(sorted(u['unit_id'] for u in repo_units), ['bar', 'foo'])
+        for unit in repo_units:
+            self.assertTrue(unit['created'])
+
+    @mock.patch('pulp.server.managers.repo.unit_association.BULK_PAGE_SIZE', 2)
+    @mock.patch('pulp.server.managers.repo.unit_association.model.Repository.objects')
+    @mock.patch('pulp.server.managers.repo.unit_association.repo_controller')
+    def test_associate_all_pages(self, mock_ctrl, mock_repo_qs):
+        ids = ['unit-%d' % i for i in range(5)]
+
+        ret = self.manager.associate_all_by_ids(self.repo_id, 'type-1', ids)
+
+        self.assertEqual(ret, 5)
+        mock_ctrl.update_unit_count.assert_called_once_with(self.repo_id, 'type-1', 5)
+
     @mock.patch('pulp.server.managers.repo.unit_association.model.Repository.objects')
     @mock.patch('pulp.server.managers.repo.unit_association.repo_controller')
     def test_unassociate_all(self, mock_ctrl, mock_repo_qs):
@@ -292,6 +292,22 @@ class UnitAssociationQueryTests(base.PulpServerTests):
         self.assertEqual(low_units[0], high_units[0])
         self.assertEqual(low_units[1], high_units[1])
 
+    def test_get_units_limit_reads_types_lazily(self):
+        # Setup
+        manager_class = association_query_manager.RepoUnitAssociationQueryManager
+        by_type_cursor = manager_class._associated_units_by_type_cursor
+
+        # Test
+        with mock.patch.object(manager_class, '_associated_units_by_type_cursor',
+                               side_effect=by_type_cursor) as mock_cursor:
+            units = self.manager.get_units_across_types(
+                'repo-1', UnitAssociationCriteria(limit=2))
+
+        # Verify
+        self.assertEqual(2, len(units))
+        self.assertEqual(1, mock_cursor.call_count)
+        self.assertEqual('alpha', mock_cursor.call_args[0][0])
+
     def test_get_units_skip(self):
         # Test
         skip_criteria = UnitAssociationCriteria(skip=2)
@@ -339,6 +355,50 @@ class UnitAssociationQueryTests(base.PulpServerTests):
         gamma_units = [u for u in units if u['unit_type_id'] == 'gamma']
         self.assertEqual(2, len(gamma_units))
 
+    def test_get_units_association_sort_pages(self):
+        # Test
+        sort = [('created', association_manager.SORT_DESCENDING),
+                ('unit_id', association_manager.SORT_ASCENDING)]
+        all_units = self.manager.get_units_across_types(
+            'repo-1', UnitAssociationCriteria(association_sort=sort))
+        pages = [self.manager.get_units_across_types(
+            'repo-1', UnitAssociationCriteria(association_sort=sort, skip=skip, limit=2))
+            for skip in range(0, self.repo_1_count, 2)]
+
+        # Verify
+        self.assertEqual(self.repo_1_count, len(all_units))
+        self.assertEqual(all_units, [u for page in pages for u in page])
+
+    @mock.patch.object(association_query_manager, 'PAGE_SIZE', 2)
+    def test_get_units_unit_sort_pages(self):
+        # Test
+        all_units = self.manager.get_units_across_types('repo-1')
+        pages = [self.manager.get_units_across_types(
+            'repo-1', UnitAssociationCriteria(skip=skip, limit=3))
+            for skip in range(0, self.repo_1_count, 3)]
+
+        # Verify
+        self.assertEqual(self.repo_1_count, len(all_units))
+        self.assertEqual(all_units, [u for page in pages for u in page])
+        for u in all_units:
+            self._assert_unit_integrity(u)
+
+    @mock.patch.object(association_query_manager, 'PAGE_SIZE', 2)
+    def test_get_units_association_sort_unit_filters_pages(self):
+        # Test
+        sort = [('created', association_manager.SORT_ASCENDING),
+                ('unit_id', association_manager.SORT_ASCENDING)]
+        all_units = self.manager.get_units_across_types(
+            'repo-1', UnitAssociationCriteria(association_sort=sort, unit_filters={'md_2': 0}))
+        page = self.manager.get_units_across_types(
+            'repo-1', UnitAssociationCriteria(association_sort=sort, unit_filters={'md_2': 0},
+                                              skip=1, limit=2))
+
+        # Verify
+        self.assertEqual(all_units[1:3], page)
+        for u in all_units:
+            self.assertEqual(0, u['metadata']['md_2'])
+
     def test_get_units_with_fields(self):
         # Test
         criteria = UnitAssociationCriteria(association_fields=['created'])
@@ -1163,6 +1163,7 @@ class TestConsumerQueryContentApplicabilityView(unittest.TestCase):
                  'applicability': {'content_type_1': ['unit_1', 'unit_3']}}]
         mock_criteria_types._get_consumer_criteria.return_value = {'mock': 'some-criteria'}
         mock_criteria_types._get_content_types.return_value = {'mock': 'some-content-types'}
+        mock_criteria_types._get_stream.return_value = False
         mock_applic.return_value = resp
 
         request = mock.MagicMock()
@@ -1173,6 +1174,76 @@ class TestConsumerQueryContentApplicabilityView(unittest.TestCase):
         mock_resp.assert_called_once_with(resp)
         self.assertTrue(response is mock_resp.return_value)
 
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_READ())
+    @mock.patch('pulp.server.webservices.views.consumers.streaming_supported',
+                return_value=True)
+    @mock.patch('pulp.server.webservices.views.consumers.generate_streaming_json_response')
+    @mock.patch('pulp.server.webservices.views.consumers.retrieve_consumer_applicability_iter')
+    @mock.patch('pulp.server.webservices.views.consumers.ConsumerContentApplicabilityView')
+    def test_query_consumer_content_applic_stream(self, mock_criteria_types, mock_applic,
+                                                  mock_resp, mock_supported):
+        """
+        Test query consumer content applicability with the report streamed
+        """
+        resp = iter([{'consumers': ['c1', 'c2'],
+                      'applicability': {'content_type_1': ['unit_1', 'unit_3']}}])
+        mock_criteria_types._get_consumer_criteria.return_value = {'mock': 'some-criteria'}
+        mock_criteria_types._get_content_types.return_value = {'mock': 'some-content-types'}
+        mock_criteria_types._get_stream.return_value = True
+        mock_applic.return_value = resp
+
+        request = mock.MagicMock()
+        request.body = json.dumps({'criteria': {'filters': {}}, 'stream': True})
+        consumer_applic = ConsumerContentApplicabilityView()
+        response = consumer_applic.post(request)
+
+        mock_resp.assert_called_once_with(resp)
+        self.assertTrue(response is mock_resp.return_value)
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_READ())
+    @mock.patch('pulp.server.webservices.views.consumers.streaming_supported',
+                return_value=False)
+    @mock.patch('pulp.server.webservices.views.consumers.generate_streaming_json_response')
+    @mock.patch(
+        'pulp.server.webservices.views.consumers.generate_json_response_with_pulp_encoder')
+    @mock.patch('pulp.server.webservices.views.consumers.retrieve_consumer_applicability')
+    @mock.patch('pulp.server.webservices.views.consumers.ConsumerContentApplicabilityView')
+    def test_query_consumer_content_applic_stream_unsupported(
+            self, mock_criteria_types, mock_applic, mock_resp, mock_stream_resp, mock_supported):
+        """
+        Test that stream is ignored when the installed Django cannot stream a response
+        """
+        resp = [{'consumers': ['c1', 'c2'],
+                 'applicability': {'content_type_1': ['unit_1', 'unit_3']}}]
+        mock_criteria_types._get_consumer_criteria.return_value = {'mock': 'some-criteria'}
+        mock_criteria_types._get_content_types.return_value = {'mock': 'some-content-types'}
+        mock_criteria_types._get_stream.return_value = True
+        mock_applic.return_value = resp
+
+        request = mock.MagicMock()
+        request.body = json.dumps({'criteria': {'filters': {}}, 'stream': True})
+        consumer_applic = ConsumerContentApplicabilityView()
+        response = consumer_applic.post(request)
+
+        mock_resp.assert_called_once_with(resp)
+        self.assertTrue(response is mock_resp.return_value)
+        self.assertFalse(mock_stream_resp.called)
+
+    def test_get_stream(self):
+        """
+        Test get stream.
+        """
+        consumer_applic = ConsumerContentApplicabilityView()
+        request = mock.MagicMock()
+        request.body_as_json = {}
+        self.assertFalse(consumer_applic._get_stream(request))
+        request.body_as_json = {'stream': True}
+        self.assertTrue(consumer_applic._get_stream(request))
+        request.body_as_json = {'stream': 'yes'}
+        self.assertRaises(InvalidValue, consumer_applic._get_stream, request)
+
     def test_get_consumer_criteria_no_criteria(self):
         """
         Test get consumer criteria.
@@ -1664,9 +1664,46 @@ class TestContentApplicabilityRegenerationView(unittest.TestCase):
         self.assertEqual(response.http_status_code, 202)
         mock_regen.apply_async_with_reservation.assert_called_once_with(
             mock_tags.RESOURCE_REPOSITORY_PROFILE_APPLICABILITY_TYPE, mock_tags.RESOURCE_ANY_ID,
-            (mock_crit.return_value.as_dict(),), tags=[mock_tags.action_tag()]
+            (mock_crit.return_value.as_dict(),), {'incremental': False},
+            tags=[mock_tags.action_tag()]
         )
 
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_CREATE())
+    @mock.patch('pulp.server.webservices.views.repositories.regenerate_applicability_for_repos')
+    @mock.patch('pulp.server.webservices.views.repositories.tags')
+    @mock.patch('pulp.server.webservices.views.repositories.Criteria.from_client_input')
+    def test_post_incremental(self, mock_crit, mock_tags, mock_regen):
+        """
+        Test regenerate content applicability incrementally.
+        """
+
+        mock_request = mock.MagicMock()
+        mock_request.body = json.dumps({'repo_criteria': {}, 'incremental': True})
+        content_app_regen = ContentApplicabilityRegenerationView()
+        self.assertRaises(pulp_exceptions.OperationPostponed, content_app_regen.post,
+                          mock_request)
+
+        mock_regen.apply_async_with_reservation.assert_called_once_with(
+            mock_tags.RESOURCE_REPOSITORY_PROFILE_APPLICABILITY_TYPE, mock_tags.RESOURCE_ANY_ID,
+            (mock_crit.return_value.as_dict(),), {'incremental': True},
+            tags=[mock_tags.action_tag()]
+        )
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_CREATE())
+    @mock.patch('pulp.server.webservices.views.repositories.regenerate_applicability_for_repos')
+    def test_post_invalid_incremental(self, mock_regen):
+        """
+        Test regenerate content applicability with a non boolean incremental value.
+        """
+
+        mock_request = mock.MagicMock()
+        mock_request.body = json.dumps({'repo_criteria': {}, 'incremental': 'yes'})
+        content_app_regen = ContentApplicabilityRegenerationView()
+        self.assertRaises(pulp_exceptions.InvalidValue, content_app_regen.post, mock_request)
+        self.assertFalse(mock_regen.apply_async_with_reservation.called)
+
     @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
                 new=assert_auth_CREATE())
     @mock.patch('pulp.server.webservices.views.repositories.Criteria.from_client_input')
@@ -9,10 +9,11 @@ from .base import assert_auth_DELETE, assert_auth_READ
 from pulp.common.compat import unittest
 from pulp.server import exceptions as pulp_exceptions
 from pulp.server.db import model
-from pulp.server.exceptions import MissingResource
+from pulp.server.exceptions import InvalidValue, MissingResource
 from pulp.server.webservices.views import util
-from pulp.server.webservices.views.tasks import (TaskCollectionView, TaskResourceView,
-                                                 TaskSearchView, task_serializer)
+from pulp.server.webservices.views.tasks import (MAX_WAIT, TaskCollectionView,
+                                                 TaskResourceView, TaskSearchView, task_digest,
+                                                 task_serializer)
 
 
 @mock.patch('pulp.server.webservices.views.tasks.serial_dispatch')
@@ -187,6 +188,93 @@ class TestTaskResource(unittest.TestCase):
         self.assertEqual(response.http_status_code, 404)
         self.assertEqual(response.error_data, {'resources': {'resource_id': 'mock_task'}})
 
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_READ())
+    @mock.patch('pulp.server.webservices.views.tasks.time')
+    @mock.patch('pulp.server.webservices.views.tasks.task_serializer', new=dict)
+    @mock.patch('pulp.server.webservices.views.tasks.TaskStatus')
+    @mock.patch('pulp.server.webservices.views.tasks.generate_json_response_with_pulp_encoder')
+    def test_get_task_resource_wait(self, mock_resp, mock_task_status, mock_time):
+        """
+        Test get task_resource waiting for the task to change.
+        """
+        waiting = {'id': 'mock_task', 'state': 'waiting', 'progress_report': {},
+                   'spawned_tasks': [], 'error': None}
+        running = dict(waiting, state='running')
+        mock_task_status.objects.get.side_effect = [waiting, waiting, running]
+        mock_time.time.return_value = 0
+        mock_request = mock.MagicMock()
+        mock_request.GET = {'wait': '30', 'digest': task_digest(waiting)}
+
+        task_resource = TaskResourceView()
+        task_resource.get(mock_request, 'mock_task')
+
+        self.assertEqual(mock_task_status.objects.get.call_count, 3)
+        self.assertEqual(mock_time.sleep.call_count, 2)
+        expected_content = dict(running, digest=task_digest(running))
+        mock_resp.assert_called_once_with(expected_content)
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_READ())
+    @mock.patch('pulp.server.webservices.views.tasks.time')
+    @mock.patch('pulp.server.webservices.views.tasks.task_serializer', new=dict)
+    @mock.patch('pulp.server.webservices.views.tasks.TaskStatus')
+    @mock.patch('pulp.server.webservices.views.tasks.generate_json_response_with_pulp_encoder')
+    def test_get_task_resource_wait_capped(self, mock_resp, mock_task_status, mock_time):
+        """
+        Test get task_resource waits no longer than MAX_WAIT.
+        """
+        waiting = {'id': 'mock_task', 'state': 'waiting', 'progress_report': {},
+                   'spawned_tasks': [], 'error': None}
+        mock_task_status.objects.get.return_value = waiting
+        mock_time.time.side_effect = [0, MAX_WAIT]
+        mock_request = mock.MagicMock()
+        mock_request.GET = {'wait': '60', 'digest': task_digest(waiting)}
+
+        task_resource = TaskResourceView()
+        task_resource.get(mock_request, 'mock_task')
+
+        self.assertFalse(mock_time.sleep.called)
+        expected_content = dict(waiting, digest=task_digest(waiting))
+        mock_resp.assert_called_once_with(expected_content)
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_READ())
+    @mock.patch('pulp.server.webservices.views.tasks.time')
+    @mock.patch('pulp.server.webservices.views.tasks.task_serializer', new=dict)
+    @mock.patch('pulp.server.webservices.views.tasks.TaskStatus')
+    @mock.patch('pulp.server.webservices.views.tasks.generate_json_response_with_pulp_encoder')
+    def test_get_task_resource_wait_timeout(self, mock_resp, mock_task_status, mock_time):
+        """
+        Test get task_resource waiting for a task that does not change.
+        """
+        waiting = {'id': 'mock_task', 'state': 'waiting', 'progress_report': {},
+                   'spawned_tasks': [], 'error': None}
+        mock_task_status.objects.get.return_value = waiting
+        mock_time.time.side_effect = [0, 0, 0.5, 1]
+        mock_request = mock.MagicMock()
+        mock_request.GET = {'wait': '1', 'digest': task_digest(waiting)}
+
+        task_resource = TaskResourceView()
+        task_resource.get(mock_request, 'mock_task')
+
+        self.assertEqual(mock_time.sleep.call_count, 2)
+        expected_content = dict(waiting, digest=task_digest(waiting))
+        mock_resp.assert_called_once_with(expected_content)
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_READ())
+    @mock.patch('pulp.server.webservices.views.tasks.TaskStatus')
+    def test_get_task_resource_invalid_wait(self, mock_task_status):
+        """
+        Test get task_resource with an invalid wait.
+        """
+        mock_request = mock.MagicMock()
+        task_resource = TaskResourceView()
+        for wait in ('-1', 'nan', 'forever'):
+            mock_request.GET = {'wait': wait}
+            self.assertRaises(InvalidValue, task_resource.get, mock_request, 'mock_task')
+
     @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
                 new=assert_auth_DELETE())
     @mock.patch('pulp.server.webservices.views.tasks.tasks')
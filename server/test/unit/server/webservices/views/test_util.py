@@ -58,6 +58,61 @@ class TestResponseGenerators(unittest.TestCase):
         util.generate_json_response_with_pulp_encoder(test_content)
         mock_json.dumps.assert_called_once_with(test_content, default=pulp_json_encoder)
 
+    def test_streaming_supported(self):
+        """
+        Make sure that streaming is only supported with a streaming response class.
+        """
+        with mock.patch('pulp.server.webservices.views.util.StreamingHttpResponse', None):
+            self.assertFalse(util.streaming_supported())
+        with mock.patch('pulp.server.webservices.views.util.StreamingHttpResponse'):
+            self.assertTrue(util.streaming_supported())
+
+    def test_generate_streaming_json_response(self):
+        """
+        Make sure that the streamed items form a JSON array.
+        """
+        items = ({'foo': i} for i in range(3))
+        response = util.generate_streaming_json_response(items)
+        self.assertEqual(response.status_code, httplib.OK)
+        self.assertEqual(response._headers.get('content-type'),
+                         ('Content-Type', 'application/json; charset=utf-8'))
+        response_content = json.loads(''.join(response))
+        self.assertEqual(response_content, [{'foo': 0}, {'foo': 1}, {'foo': 2}])
+
+    def test_generate_streaming_json_response_empty(self):
+        """
+        Make sure that no items result in an empty JSON array.
+        """
+        response = util.generate_streaming_json_response(iter([]))
+        self.assertEqual(json.loads(''.join(response)), [])
+
+    def test_generate_streaming_json_response_first_error(self):
+        """
+        Make sure that an error generating the first item is raised before the response starts.
+        """
+        def items():
+            raise ValueError()
+            yield
+
+        self.assertRaises(ValueError, util.generate_streaming_json_response, items())
+
+    @mock.patch('pulp.server.webservices.views.util._logger')
+    def test_generate_streaming_json_response_aborted(self, mock_logger):
+        """
+        Make sure that an error after the response started is raised and the array is not
+        closed.
+        """
+        def items():
+            yield {'foo': 0}
+            raise ValueError()
+
+        response = util.generate_streaming_json_response(items())
+        content = iter(response)
+        sent = [next(content), next(content)]
+        self.assertRaises(ValueError, next, content)
+        self.assertEqual(sent, ['[', '{"foo": 0}'])
+        self.assertTrue(mock_logger.exception.called)
+
     @mock.patch('pulp.server.webservices.views.util.iri_to_uri')
     def test_generate_redirect_response(self, mock_iri_to_uri):
         """